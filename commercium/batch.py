@@ -0,0 +1,147 @@
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from commercium.felt import CairoAssertionError
+from commercium.simulator import SOLVERS, AmmMarket
+from commercium.snapshot import Path, price_from_feed
+
+#####################################################################
+#                                                                   #
+#   Off-chain counterpart of Hub.swap_batch (src/lib/hub.cairo)     #
+#                                                                   #
+#####################################################################
+
+# Orders are grouped by pair. Opposite orders of a pair are matched against each other at the live oracle
+# prices, only the residual of the larger side is traded through one solver run. The trade executor sells
+# exactly the residual (multi_swap_exact_in), the matched tokens stay in the hub to pay the other side.
+# Each side's proceeds are split pro rata to the amounts sold, rounding dust stays in the hub.
+
+
+class Order(NamedTuple):
+    token_in: int
+    token_out: int
+    amount_in: int
+    min_amount_out: int
+    # Receiver of the bought tokens
+    to: int
+
+
+# @notice List every pair traded by the orders once, oriented like the first order of the pair
+def list_order_pairs(orders: Sequence[Order]) -> List[Path]:
+    pairs: List[Path] = []
+    for order in orders:
+        if order.token_in == order.token_out:
+            raise CairoAssertionError("order sells and buys the same token")
+        if Path(order.token_in, order.token_out) in pairs:
+            continue
+        if Path(order.token_out, order.token_in) in pairs:
+            continue
+        pairs.append(Path(order.token_in, order.token_out))
+    return pairs
+
+
+# @notice Query the oracle of a token like Hub.oracle_price, price snapshots are never used
+# @return price - USD token price scaled to 1e18
+def oracle_price(market: AmmMarket, token: int) -> int:
+    key = market.price_feeds.get(token)
+    if key is None:
+        raise CairoAssertionError(f"no oracle price feed for token {token}")
+    value, decimals, _, _ = market.oracle.get_spot_median(key)
+    if value == 0:
+        raise CairoAssertionError(f"no oracle price for token {token}")
+    return price_from_feed(value, decimals)
+
+
+# @notice Convert an amount of a token into another token at USD prices per whole token (scaled to 1e18)
+def convert_amount(
+    amount_in: int, price_in: int, decimals_in: int, price_out: int, decimals_out: int
+) -> int:
+    return amount_in * price_in * 10**decimals_out // (price_out * 10**decimals_in)
+
+
+def pro_rata_share(amount_in: int, sum_in: int, proceeds: int) -> int:
+    if amount_in == 0:
+        return 0
+    return proceeds * amount_in // sum_in
+
+
+# @notice Trade an amount of tokens along the path of a solver on the current state of the market
+def route_amount(
+    market: AmmMarket, solver: str, token_in: int, token_out: int, amount_in: int
+) -> int:
+    if amount_in == 0:
+        return 0
+    routers, path, amounts = SOLVERS[solver](
+        market.snapshot(), amount_in, token_in, token_out
+    )
+    return market.execute(routers, path, amounts, amount_in)
+
+
+# @notice Match the two sides of a pair and trade the residual of the larger side
+# @param decimals - Decimals of each token, 18 if missing
+# @return proceeds_a - Amount of token_b received by the orders selling token_a
+# @return proceeds_b - Amount of token_a received by the orders selling token_b
+def net_and_route(
+    market: AmmMarket,
+    solver: str,
+    token_a: int,
+    token_b: int,
+    sum_a: int,
+    sum_b: int,
+    decimals: Mapping[int, int],
+) -> Tuple[int, int]:
+    if sum_b == 0:
+        return route_amount(market, solver, token_a, token_b, sum_a), 0
+    if sum_a == 0:
+        return 0, route_amount(market, solver, token_b, token_a, sum_b)
+
+    price_a = oracle_price(market, token_a)
+    price_b = oracle_price(market, token_b)
+    decimals_a = decimals.get(token_a, 18)
+    decimals_b = decimals.get(token_b, 18)
+
+    b_in_a = convert_amount(sum_b, price_b, decimals_b, price_a, decimals_a)
+    if b_in_a <= sum_a:
+        amount_out = route_amount(market, solver, token_a, token_b, sum_a - b_in_a)
+        return sum_b + amount_out, b_in_a
+
+    a_in_b = convert_amount(sum_a, price_a, decimals_a, price_b, decimals_b)
+    amount_out = route_amount(market, solver, token_b, token_a, sum_b - a_in_b)
+    return a_in_b, sum_a + amount_out
+
+
+# @notice Execute a batch of orders the way Hub.swap_batch does, the market's pools move with the residual trades
+# @param solver - Name of the solver in commercium.simulator.SOLVERS that routes the residuals
+# @param decimals - Decimals of each token, 18 if missing
+# @return amounts_out - The amount of tokens received by each order
+def swap_batch(
+    market: AmmMarket,
+    orders: Sequence[Order],
+    solver: str,
+    decimals: Optional[Mapping[int, int]] = None,
+) -> List[int]:
+    decimals = decimals or {}
+    amounts_out: Dict[int, int] = {}
+    for pair in list_order_pairs(orders):
+        sides = [(pair.token_in, pair.token_out), (pair.token_out, pair.token_in)]
+        sum_a, sum_b = (
+            sum(
+                order.amount_in
+                for order in orders
+                if (order.token_in, order.token_out) == side
+            )
+            for side in sides
+        )
+        proceeds = net_and_route(
+            market, solver, pair.token_in, pair.token_out, sum_a, sum_b, decimals
+        )
+
+        for side, sum_in, side_proceeds in zip(sides, (sum_a, sum_b), proceeds):
+            for index, order in enumerate(orders):
+                if (order.token_in, order.token_out) != side:
+                    continue
+                amount_out = pro_rata_share(order.amount_in, sum_in, side_proceeds)
+                if amount_out < order.min_amount_out:
+                    raise CairoAssertionError("Minimum amount not received")
+                amounts_out[index] = amount_out
+
+    return [amounts_out[index] for index in range(len(orders))]
@@ -0,0 +1,533 @@
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+from commercium.constants import BASE, BASE_8
+from commercium.rpc import to_uint256
+
+##############################
+#                            #
+#     Solver Benchmarks      #
+#                            #
+##############################
+
+# Deploys the protocol with N tokens x R mock routers into an in-memory StarkNet state,
+# quotes every solver through Hub.get_amount_out_with_solver and records what the quote costs.
+# The Cairo runner of cairo-lang is imported lazily, the rest of the module only needs the standard library.
+
+ROOT = Path(__file__).resolve().parent.parent
+OWNER = 0x1234
+
+# L1 gas per Cairo step / builtin instance, as published in the StarkNet fee documentation
+CAIRO_RESOURCE_FEE_WEIGHTS = {
+    "n_steps": 0.05,
+    "pedersen_builtin": 1.6,
+    "range_check_builtin": 0.8,
+    "ecdsa_builtin": 102.4,
+    "bitwise_builtin": 3.2,
+    "ec_op_builtin": 51.2,
+    "output_builtin": 0.0,
+    "poseidon_builtin": 1.6,
+}
+# Steps a transaction may use on mainnet, quotes above it can't be used on-chain
+MAX_STEPS = 1_000_000
+# Balance of OWNER and of every router in each token when the tokens are deployed
+TOKEN_SUPPLY = 10**12 * BASE
+
+# Metrics that are compared against the baseline
+TRACKED_METRICS = ("n_steps", "storage_reads", "calls", "l1_gas")
+DEFAULT_TOLERANCE = 0.05
+
+
+@dataclass(frozen=True)
+class Scenario:
+    # Number of tokens, the first two are traded, the others are used as high liquidity tokens
+    tokens: int
+    # Number of routers, every router has a pool for every token pair
+    routers: int
+
+    @property
+    def name(self) -> str:
+        return f"{self.tokens}t-{self.routers}r"
+
+
+@dataclass(frozen=True)
+class SolverSpec:
+    source: str
+    # Builds the constructor calldata from the addresses of the deployed protocol contracts
+    constructor_args: Callable[["Protocol"], List[int]]
+    # Whether the solver reads the high liquidity tokens (and needs them to be set)
+    uses_high_liq_tokens: bool = False
+
+
+SOLVERS: Dict[str, SolverSpec] = {
+    "single_swap": SolverSpec(
+        "src/solvers/single_swap_solver.cairo", lambda p: [p.router_aggregator]
+    ),
+    "spf": SolverSpec(
+        "src/solvers/spf_solver.cairo",
+        lambda p: [OWNER, p.router_aggregator],
+        uses_high_liq_tokens=True,
+    ),
+    "dijkstra": SolverSpec(
+        "src/solvers/dijkstra_solver.cairo",
+        lambda p: [OWNER, p.router_aggregator],
+        uses_high_liq_tokens=True,
+    ),
+    "graddesc": SolverSpec(
+        "src/solvers/graddesc_solver.cairo", lambda p: [p.router_aggregator]
+    ),
+    "split": SolverSpec(
+        "src/solvers/split_solver.cairo", lambda p: [p.router_aggregator]
+    ),
+    "heuristic_splitterV2": SolverSpec(
+        "src/solvers/heuristic_splitterV2.cairo", lambda p: [p.router_aggregator]
+    ),
+    "heuristic_splitterV3": SolverSpec(
+        "src/solvers/heuristic_splitterV3.cairo",
+        lambda p: [p.router_aggregator, p.trade_executor_hash, p.hub],
+    ),
+}
+
+
+@dataclass
+class Measurement:
+    solver: str
+    scenario: str
+    n_steps: int = 0
+    n_memory_holes: int = 0
+    builtins: Dict[str, int] = field(default_factory=dict)
+    storage_reads: int = 0
+    # Number of contract calls and library calls made below the quoted hub call
+    calls: int = 0
+    library_calls: int = 0
+    l1_gas: float = 0
+    amount_out: int = 0
+    # Set instead of the metrics if the solver doesn't compile or its quote reverts
+    error: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.solver}/{self.scenario}"
+
+    @property
+    def over_step_limit(self) -> bool:
+        return self.n_steps > MAX_STEPS
+
+
+# @notice Walk a call tree, the root call first
+def iter_calls(call_info) -> Iterable[Any]:
+    stack = [call_info]
+    while stack:
+        call = stack.pop()
+        yield call
+        stack.extend(reversed(call.internal_calls))
+
+
+# @notice Resources used by a call (including its inner calls) weighted in L1 gas
+def l1_gas(resources: Dict[str, int], weights=CAIRO_RESOURCE_FEE_WEIGHTS) -> float:
+    return max(weights.get(name, 0) * value for name, value in resources.items())
+
+
+# @notice Turn the CallInfo of an executed entry point into a Measurement
+def measure(solver: str, scenario: str, call_info, amount_out: int) -> Measurement:
+    resources = call_info.execution_resources
+    calls = list(iter_calls(call_info))[1:]
+    library_calls = sum(1 for call in calls if call.call_type.name == "DELEGATE")
+    builtins = {
+        name: count
+        for name, count in sorted(resources.builtin_instance_counter.items())
+        if count
+    }
+    return Measurement(
+        solver=solver,
+        scenario=scenario,
+        n_steps=resources.n_steps,
+        n_memory_holes=resources.n_memory_holes,
+        builtins=builtins,
+        storage_reads=sum(
+            len(call.storage_read_values) for call in iter_calls(call_info)
+        ),
+        calls=len(calls) - library_calls,
+        library_calls=library_calls,
+        l1_gas=l1_gas(
+            {"n_steps": resources.n_steps + resources.n_memory_holes, **builtins}
+        ),
+        amount_out=amount_out,
+    )
+
+
+##############################
+#                            #
+#      Protocol Fixture      #
+#                            #
+##############################
+
+
+@dataclass
+class Protocol:
+    starknet: Any
+    hub: int = 0
+    solver_registry: int = 0
+    router_aggregator: int = 0
+    trade_executor_hash: int = 0
+    oracle: int = 0
+    tokens: List[int] = field(default_factory=list)
+    routers: List[int] = field(default_factory=list)
+    # Solver name -> solver id in the registry
+    solver_ids: Dict[str, int] = field(default_factory=dict)
+    # Source file of every deployed contract (by address) and declared class (by class hash)
+    sources: Dict[int, str] = field(default_factory=dict)
+    class_sources: Dict[int, str] = field(default_factory=dict)
+
+    async def execute(self, address: int, function: str, calldata=(), caller=OWNER):
+        return await self.starknet.state.execute_entry_point_raw(
+            contract_address=address,
+            selector=function,
+            calldata=list(calldata),
+            caller_address=caller,
+        )
+
+    # @notice Execute a function on a copy of the state, like a view call on a node
+    # @dev Keeps quotes independent of each other, e.g. pairs registered lazily by one quote
+    async def call(self, address: int, function: str, calldata=(), caller=OWNER):
+        return await self.starknet.state.copy().execute_entry_point_raw(
+            contract_address=address,
+            selector=function,
+            calldata=list(calldata),
+            caller_address=caller,
+        )
+
+
+class ContractCache:
+    """Compiles every contract once, scenarios only redeploy them"""
+
+    def __init__(self, root: Path = ROOT):
+        self.root = root
+        self.classes: Dict[str, Any] = {}
+        self.errors: Dict[str, str] = {}
+
+    def get(self, source: str):
+        if source in self.errors:
+            raise CompilationError(self.errors[source])
+        if source not in self.classes:
+            from starkware.starknet.compiler.compile import compile_starknet_files
+
+            try:
+                self.classes[source] = compile_starknet_files(
+                    [str(self.root / source)],
+                    debug_info=False,
+                    cairo_path=[
+                        str(self.root),
+                        str(self.root / "lib" / "cairo_contracts" / "src"),
+                    ],
+                    disable_hint_validation=True,
+                )
+            except Exception as error:
+                # The compiler reports the location on the first line
+                message = str(error).strip().splitlines()[0]
+                self.errors[source] = message.replace(f"{self.root}/", "")
+                raise CompilationError(self.errors[source]) from error
+        return self.classes[source]
+
+
+class CompilationError(Exception):
+    pass
+
+
+# @notice Last line of a (nested) Cairo error, that is where the call actually failed
+def error_message(error: Exception) -> str:
+    message = getattr(error, "message", None) or str(error)
+    lines = [line.strip() for line in message.splitlines() if line.strip()]
+    return lines[-1] if lines else type(error).__name__
+
+
+def pool_reserves(scenario: Scenario, router: int, token_a: int, token_b: int):
+    """Deterministic reserves, deeper pools for later routers and a small price skew per pool"""
+    depth = 1_000_000 * BASE * (router + 1)
+    skew = 1000 + (token_a * 7 + token_b * 3 + router) % 11
+    return depth, depth * skew // 1000
+
+
+# @param with_balances - Deploy the tokens as ERC20s so that swaps can be executed, not only quoted:
+#                        OWNER holds the supply and approved the hub, every router gets liquidity
+async def deploy_protocol(
+    scenario: Scenario,
+    solvers: Sequence[str],
+    contracts: ContractCache,
+    with_balances: bool = False,
+) -> Protocol:
+    from starkware.starknet.definitions.general_config import StarknetGeneralConfig
+    from starkware.starknet.testing.starknet import Starknet
+
+    general_config = StarknetGeneralConfig(invoke_tx_max_n_steps=100 * MAX_STEPS)
+    starknet = await Starknet.empty(general_config=general_config)
+    protocol = Protocol(starknet)
+
+    async def deploy(source: str, calldata=()) -> int:
+        contract = await starknet.deploy(
+            contract_class=contracts.get(source), constructor_calldata=list(calldata)
+        )
+        protocol.sources[contract.contract_address] = source
+        return contract.contract_address
+
+    async def declare(source: str) -> int:
+        declared = await starknet.declare(contract_class=contracts.get(source))
+        protocol.class_sources[declared.class_hash] = source
+        return declared.class_hash
+
+    protocol.trade_executor_hash = await declare("src/trade_executor.cairo")
+    router_aggregator_hash = await declare(
+        "src/router_aggregators/router_aggregator.cairo"
+    )
+    protocol.hub = await deploy("src/hub.cairo", [OWNER, protocol.trade_executor_hash])
+    protocol.solver_registry = await deploy("src/solver_registry.cairo", [OWNER])
+    protocol.router_aggregator = await deploy(
+        "src/router_aggregators/router_proxy.cairo",
+        [router_aggregator_hash, OWNER, OWNER],
+    )
+    protocol.oracle = await deploy("src/mocks/mock_price_oracle.cairo")
+    await protocol.execute(
+        protocol.hub, "set_solver_registry", [protocol.solver_registry]
+    )
+
+    # Tokens don't have to be deployed for quoting, every token is worth 1 USD
+    if with_balances:
+        for index in range(scenario.tokens):
+            token = await deploy(
+                "src/mocks/mock_ERC20.cairo",
+                [index, index, 18, *to_uint256(TOKEN_SUPPLY), OWNER, OWNER],
+            )
+            await protocol.execute(
+                token, "approve", [protocol.hub, *to_uint256(TOKEN_SUPPLY)]
+            )
+            protocol.tokens.append(token)
+    else:
+        protocol.tokens = [0x1000 + index for index in range(scenario.tokens)]
+    for key, token in enumerate(protocol.tokens, start=1):
+        await protocol.execute(protocol.oracle, "set_token_price", [key, BASE_8, 8])
+        await protocol.execute(
+            protocol.router_aggregator,
+            "set_global_price",
+            [token, key, protocol.oracle],
+        )
+
+    # Every router gets a pool for every token pair
+    for router_index in range(scenario.routers):
+        router = await deploy("src/mocks/mock_jedi_router.cairo")
+        protocol.routers.append(router)
+        if with_balances:
+            for token in protocol.tokens:
+                await protocol.execute(
+                    token, "mint", [router, *to_uint256(TOKEN_SUPPLY)]
+                )
+        pairs = []
+        for a, token_a in enumerate(protocol.tokens):
+            for b, token_b in enumerate(protocol.tokens[a + 1 :], start=a + 1):
+                pair = await deploy("src/mocks/mock_jedi_pair.cairo")
+                reserve_a, reserve_b = pool_reserves(scenario, router_index, a, b)
+                await protocol.execute(pair, "set_token0", [token_a])
+                await protocol.execute(
+                    pair,
+                    "set_reserves",
+                    [*to_uint256(reserve_a), *to_uint256(reserve_b)],
+                )
+                await protocol.execute(router, "set_pair", [token_a, token_b, pair])
+                pairs.append((token_a, token_b, pair))
+        # JediSwap router type
+        await protocol.execute(protocol.router_aggregator, "add_router", [router, 0])
+        # Pairs are registered up front, like on a deployed aggregator, so quotes skip the factory
+        tokens_a, tokens_b, pair_addresses = zip(*pairs)
+        await protocol.execute(
+            protocol.router_aggregator,
+            "register_pairs",
+            [
+                router_index,
+                len(pairs),
+                *tokens_a,
+                len(pairs),
+                *tokens_b,
+                len(pairs),
+                *pair_addresses,
+            ],
+        )
+
+    solver_id = 1
+    for name in solvers:
+        spec = SOLVERS[name]
+        try:
+            address = await deploy(spec.source, spec.constructor_args(protocol))
+        except CompilationError:
+            continue
+        if spec.uses_high_liq_tokens:
+            for index, token in enumerate(protocol.tokens[2:]):
+                await protocol.execute(address, "set_high_liq_tokens", [index, token])
+        await protocol.execute(
+            protocol.solver_registry, "set_solver", [solver_id, address]
+        )
+        protocol.solver_ids[name] = solver_id
+        solver_id += 1
+
+    return protocol
+
+
+# @notice Quote token 0 -> token 1 with every solver in every scenario
+# @param amount_in - Amount of token 0 that is sold
+# @return measurements - One measurement per (solver, scenario), failed quotes carry an error
+async def run_benchmarks(
+    scenarios: Sequence[Scenario],
+    solvers: Sequence[str] = tuple(SOLVERS),
+    amount_in: int = 10 * BASE,
+    contracts: Optional[ContractCache] = None,
+    log: Callable[[str], None] = print,
+) -> List[Measurement]:
+    contracts = contracts or ContractCache()
+    measurements = []
+    for scenario in scenarios:
+        log(
+            f"⏳ {scenario.name}: deploying {scenario.tokens} tokens x {scenario.routers} routers"
+        )
+        protocol = await deploy_protocol(scenario, solvers, contracts)
+        for name in solvers:
+            if name not in protocol.solver_ids:
+                error = contracts.errors.get(SOLVERS[name].source, "not deployed")
+                measurements.append(Measurement(name, scenario.name, error=error))
+                log(f"⚠️  {name}/{scenario.name}: {error}")
+                continue
+
+            calldata = [
+                *to_uint256(amount_in),
+                protocol.tokens[0],
+                protocol.tokens[1],
+                protocol.solver_ids[name],
+            ]
+            try:
+                call_info = await protocol.call(
+                    protocol.hub, "get_amount_out_with_solver", calldata
+                )
+            except Exception as error:
+                message = error_message(error)
+                measurements.append(Measurement(name, scenario.name, error=message))
+                log(f"⚠️  {name}/{scenario.name}: {message}")
+                continue
+
+            amount_out = call_info.retdata[0] + call_info.retdata[1] * 2**128
+            measurement = measure(name, scenario.name, call_info, amount_out)
+            measurements.append(measurement)
+            log(
+                f"✅ {measurement.key}: {measurement.n_steps} steps, "
+                f"{measurement.calls} calls, {measurement.storage_reads} storage reads"
+            )
+    return measurements
+
+
+##############################
+#                            #
+#     Results & Baseline     #
+#                            #
+##############################
+
+
+@dataclass
+class Regression:
+    key: str
+    metric: str
+    baseline: float
+    value: float
+    # Error message if the baseline entry or the measurement failed
+    error: Optional[str] = None
+
+    def __str__(self):
+        if self.error is not None:
+            return f"{self.key} {self.metric}: {self.error}"
+        change = (self.value - self.baseline) / self.baseline if self.baseline else 1
+        return (
+            f"{self.key} {self.metric}: {self.baseline} -> {self.value} (+{change:.1%})"
+        )
+
+
+def to_json(measurements: Sequence[Measurement]) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for measurement in measurements:
+        entry = asdict(measurement)
+        del entry["solver"], entry["scenario"]
+        if measurement.error is None:
+            del entry["error"]
+            entry["over_step_limit"] = measurement.over_step_limit
+        else:
+            entry = {"error": measurement.error}
+        results[measurement.key] = entry
+    return results
+
+
+def save_results(
+    path: Union[str, Path],
+    measurements: Sequence[Measurement],
+    tolerance: Optional[float] = None,
+):
+    data: Dict[str, Any] = {"results": to_json(measurements)}
+    if tolerance is not None:
+        data = {"tolerance": tolerance, **data}
+    write_json(path, data)
+
+
+# @notice Replace the baseline entries of the measured solvers/scenarios, other entries are kept
+def update_baseline(
+    path: Union[str, Path],
+    measurements: Sequence[Measurement],
+    tolerance: Optional[float] = None,
+):
+    baseline = load_baseline(path) if Path(path).exists() else {}
+    if tolerance is None:
+        tolerance = baseline.get("tolerance", DEFAULT_TOLERANCE)
+    results = {**baseline.get("results", {}), **to_json(measurements)}
+    write_json(path, {"tolerance": tolerance, "results": results})
+
+
+def write_json(path: Union[str, Path], data: Dict[str, Any]):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=4, sort_keys=False) + "\n", "utf-8")
+
+
+def load_baseline(path: Union[str, Path]) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text("utf-8"))
+
+
+# @notice Compare measurements against a baseline file
+# @dev A metric regresses if it grows by more than the tolerance. An error on either side is a regression
+#      as well: a failing measurement broke something, a failing baseline entry is stale and hides regressions
+#      until it is regenerated. Entries missing from the baseline are ignored.
+# @param tolerance - Allowed relative growth, defaults to the tolerance stored in the baseline
+def compare(
+    measurements: Sequence[Measurement],
+    baseline: Dict[str, Any],
+    tolerance: Optional[float] = None,
+) -> List[Regression]:
+    if tolerance is None:
+        tolerance = baseline.get("tolerance", 0)
+    expected = baseline.get("results", {})
+
+    regressions = []
+    for measurement in measurements:
+        entry = expected.get(measurement.key)
+        if entry is None:
+            continue
+        if measurement.error is not None:
+            regressions.append(
+                Regression(measurement.key, "error", 0, 1, measurement.error)
+            )
+            continue
+        if "error" in entry:
+            regressions.append(
+                Regression(measurement.key, "baseline error", 1, 0, entry["error"])
+            )
+            continue
+        for metric in TRACKED_METRICS:
+            value = getattr(measurement, metric)
+            if value > entry[metric] * (1 + tolerance):
+                regressions.append(
+                    Regression(measurement.key, metric, entry[metric], value)
+                )
+    return regressions
@@ -0,0 +1,33 @@
+#######################
+#                     #
+#      Constants      #
+#                     #
+#######################
+
+# Mirrors src/lib/constants.cairo. Keep both files in sync.
+
+# Cairo field prime, every felt operation is reduced by it
+PRIME = 2**251 + 17 * 2**192 + 1
+# Upper bound used by starkware.cairo.common.math_cmp.is_le (range check bound)
+RC_BOUND = 2**128
+UINT256 = 2**256
+
+# Not actual max felt, just a large feasible number for Uint256
+MAX_FELT = 340282366920938463463374607431768211454
+HALF_MAX = MAX_FELT // 2
+BASE = 10**18
+BASE_8 = 10**8
+
+# Used by the SPF/Dijkstra graph to artificially increase the weight of edges leaving token_in
+EXTRA_BASE = BASE * 100
+
+# Router Types
+JediSwap = 0
+TenK = 1
+
+# Constant product fee used by every supported router (0.3%)
+FEE_NUMERATOR = 997
+FEE_DENOMINATOR = 1000
+
+# Factories
+TenKFactory = 0x01C0A36E26A8F822E0D81F20A5A562B16A8F8A3DFD99801367DD2AEA8F1A87A2
@@ -0,0 +1,438 @@
+import asyncio
+import json
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+##########################
+#                        #
+#     Deploy Pipeline    #
+#                        #
+##########################
+
+# Contracts, declarations and configuration calls are modelled as a DAG.
+# Every level of the DAG is sent at once: declarations use consecutive nonces,
+# deployments (through the UDC) and configuration calls are bundled in a single multicall.
+# Results are persisted in a manifest, so finished steps are skipped on the next run.
+
+
+@dataclass(frozen=True)
+class Ref:
+    """Placeholder for the address (or class hash) of another node of the plan"""
+
+    name: str
+
+
+Arg = Union[int, Ref]
+
+
+@dataclass
+class Declare:
+    name: str
+    compiled_contract: Path
+    depends_on: Tuple[str, ...] = ()
+
+
+@dataclass
+class Deploy:
+    name: str
+    # Name of the Declare node of the contract class
+    contract_class: str
+    constructor_args: Sequence[Arg] = ()
+    depends_on: Tuple[str, ...] = ()
+
+
+@dataclass
+class Invoke:
+    name: str
+    # Name of the Deploy node of the called contract
+    contract: str
+    function: str
+    args: Sequence[Arg] = ()
+    depends_on: Tuple[str, ...] = ()
+
+
+Node = Union[Declare, Deploy, Invoke]
+
+
+def dependencies(node: Node) -> List[str]:
+    names = list(node.depends_on)
+    if isinstance(node, Deploy):
+        names.append(node.contract_class)
+        args = node.constructor_args
+    elif isinstance(node, Invoke):
+        names.append(node.contract)
+        args = node.args
+    else:
+        args = ()
+    names.extend(arg.name for arg in args if isinstance(arg, Ref))
+    return names
+
+
+class DeploymentPlan:
+    def __init__(self):
+        self.nodes: Dict[str, Node] = {}
+
+    def add(self, node: Node) -> Ref:
+        if node.name in self.nodes:
+            raise ValueError(f"Duplicate node {node.name}")
+        self.nodes[node.name] = node
+        return Ref(node.name)
+
+    def declare(self, name: str, compiled_contract: Union[str, Path]) -> Ref:
+        return self.add(Declare(name, Path(compiled_contract)))
+
+    def deploy(
+        self, name: str, contract_class: Ref, constructor_args: Sequence[Arg] = ()
+    ) -> Ref:
+        return self.add(Deploy(name, contract_class.name, tuple(constructor_args)))
+
+    def invoke(
+        self,
+        name: str,
+        contract: Ref,
+        function: str,
+        args: Sequence[Arg] = (),
+        depends_on=(),
+    ) -> Ref:
+        return self.add(
+            Invoke(
+                name,
+                contract.name,
+                function,
+                tuple(args),
+                tuple(ref.name for ref in depends_on),
+            )
+        )
+
+    # @notice Group the nodes in levels, every node only depends on nodes of previous levels
+    def levels(self) -> List[List[Node]]:
+        for node in self.nodes.values():
+            for dependency in dependencies(node):
+                if dependency not in self.nodes:
+                    raise ValueError(
+                        f"{node.name} depends on unknown node {dependency}"
+                    )
+
+        remaining = dict(self.nodes)
+        done = set()
+        levels = []
+        while remaining:
+            level = [
+                node
+                for node in remaining.values()
+                if all(dep in done for dep in dependencies(node))
+            ]
+            if not level:
+                raise ValueError(f"Dependency cycle between {sorted(remaining)}")
+            for node in level:
+                del remaining[node.name]
+            done.update(node.name for node in level)
+            levels.append(level)
+        return levels
+
+
+class Manifest:
+    """Persisted class hashes, contract addresses and executed calls of a network"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.classes: Dict[str, int] = {}
+        self.contracts: Dict[str, int] = {}
+        self.invokes: Dict[str, str] = {}
+        if self.path.exists():
+            data = json.loads(self.path.read_text("utf-8"))
+            self.classes = {
+                name: int(value, 16) for name, value in data.get("classes", {}).items()
+            }
+            self.contracts = {
+                name: int(value, 16)
+                for name, value in data.get("contracts", {}).items()
+            }
+            self.invokes = dict(data.get("invokes", {}))
+
+    def save(self):
+        data = {
+            "classes": {name: hex(value) for name, value in self.classes.items()},
+            "contracts": {name: hex(value) for name, value in self.contracts.items()},
+            "invokes": self.invokes,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, indent=4) + "\n", "utf-8")
+        tmp_path.replace(self.path)
+
+    def result(self, node: Node) -> Optional[Any]:
+        if isinstance(node, Declare):
+            return self.classes.get(node.name)
+        if isinstance(node, Deploy):
+            return self.contracts.get(node.name)
+        return self.invokes.get(node.name)
+
+    def record(self, node: Node, value: Any):
+        if isinstance(node, Declare):
+            self.classes[node.name] = value
+        elif isinstance(node, Deploy):
+            self.contracts[node.name] = value
+        else:
+            self.invokes[node.name] = value
+
+    def forget(self, node: Node):
+        for entries in (self.classes, self.contracts, self.invokes):
+            entries.pop(node.name, None)
+
+
+class StarknetBackend:
+    """Sends the transactions of the pipeline from a starknet_py AccountClient.
+
+    The account nonce is fetched once and then managed locally, which allows sending
+    several transactions before the previous ones are accepted.
+    """
+
+    def __init__(self, account, max_fee: int = int(1e16)):
+        from starknet_py.net.udc_deployer.deployer import Deployer
+
+        self.account = account
+        self.max_fee = max_fee
+        self.deployer = Deployer(account_address=account.address)
+        self._nonce: Optional[int] = None
+        self._nonce_lock = asyncio.Lock()
+
+    async def _next_nonce(self) -> int:
+        async with self._nonce_lock:
+            if self._nonce is None:
+                self._nonce = await self.account.client.get_contract_nonce(
+                    self.account.address, block_hash="pending"
+                )
+            nonce = self._nonce
+            self._nonce += 1
+            return nonce
+
+    # @notice Sign a transaction built by the account again, with the managed nonce
+    def _sign_with_nonce(self, transaction, nonce: int):
+        transaction = replace(transaction, nonce=nonce, signature=[])
+        signature = self.account.signer.sign_transaction(transaction)
+        return replace(transaction, signature=signature)
+
+    def class_hash(self, compiled_contract: str) -> int:
+        from starkware.starknet.core.os.class_hash import compute_class_hash
+        from starkware.starknet.services.api.contract_class import ContractClass
+
+        return compute_class_hash(ContractClass.loads(compiled_contract))
+
+    async def declare(self, compiled_contract: str) -> Tuple[int, int]:
+        # The nonce is reserved first, concurrent declarations get their nonces in call order
+        nonce = await self._next_nonce()
+        transaction = await self.account.sign_declare_transaction(
+            compiled_contract=compiled_contract, max_fee=self.max_fee
+        )
+        transaction = self._sign_with_nonce(transaction, nonce)
+        response = await self.account.client.declare(transaction=transaction)
+        return response.transaction_hash, response.class_hash
+
+    def deploy_call(self, class_hash: int, calldata: Sequence[int]):
+        deployment = self.deployer.create_deployment_call(
+            class_hash=class_hash, calldata=list(calldata)
+        )
+        return deployment.udc, deployment.address
+
+    def invoke_call(self, address: int, function: str, calldata: Sequence[int]):
+        from starknet_py.net.client_models import Call
+        from starkware.starknet.public.abi import get_selector_from_name
+
+        return Call(
+            to_addr=address,
+            selector=get_selector_from_name(function),
+            calldata=list(calldata),
+        )
+
+    async def execute(self, calls: list) -> int:
+        nonce = await self._next_nonce()
+        transaction = await self.account.sign_invoke_transaction(
+            calls=calls, max_fee=self.max_fee
+        )
+        transaction = self._sign_with_nonce(transaction, nonce)
+        response = await self.account.client.send_transaction(transaction)
+        return response.transaction_hash
+
+    async def wait(self, transaction_hash: int):
+        await self.account.wait_for_tx(transaction_hash)
+
+    async def is_declared(self, class_hash: int) -> bool:
+        try:
+            await self.account.client.get_class_by_hash(class_hash)
+            return True
+        except Exception:
+            return False
+
+    async def is_deployed(self, address: int) -> bool:
+        try:
+            await self.account.client.get_class_hash_at(address)
+            return True
+        except Exception:
+            return False
+
+
+@dataclass
+class DeploymentResult:
+    classes: Dict[str, int] = field(default_factory=dict)
+    contracts: Dict[str, int] = field(default_factory=dict)
+    # Names of the nodes that were executed (the others were taken from the manifest)
+    executed: List[str] = field(default_factory=list)
+    transactions: int = 0
+
+
+class Orchestrator:
+    def __init__(self, backend, manifest: Manifest, log=print):
+        self.backend = backend
+        self.manifest = manifest
+        self.log = log
+
+    def _resolve(self, arg: Arg, result: DeploymentResult) -> int:
+        if not isinstance(arg, Ref):
+            return arg
+        if arg.name in result.contracts:
+            return result.contracts[arg.name]
+        return result.classes[arg.name]
+
+    # @notice Drop manifest entries that don't exist on the network (e.g. on a fresh devnet)
+    async def _validate_manifest(self, plan: DeploymentPlan):
+        checks = []
+        for node in plan.nodes.values():
+            value = self.manifest.result(node)
+            if value is None:
+                continue
+            if isinstance(node, Declare):
+                checks.append((node, self.backend.is_declared(value)))
+            elif isinstance(node, Deploy):
+                checks.append((node, self.backend.is_deployed(value)))
+
+        exists = await asyncio.gather(*(check for _, check in checks))
+        for (node, _), node_exists in zip(checks, exists):
+            if not node_exists:
+                self.manifest.forget(node)
+
+    # @notice Names of the Declare nodes whose compiled contract no longer matches the class hash in the manifest
+    def _changed_classes(self, plan: DeploymentPlan) -> Set[str]:
+        changed = set()
+        for node in plan.nodes.values():
+            if not isinstance(node, Declare):
+                continue
+            class_hash = self.manifest.result(node)
+            compiled_contract = node.compiled_contract.read_text("utf-8")
+            if (
+                class_hash is not None
+                and self.backend.class_hash(compiled_contract) != class_hash
+            ):
+                changed.add(node.name)
+        return changed
+
+    async def run(self, plan: DeploymentPlan) -> DeploymentResult:
+        levels = plan.levels()
+        # Compared before the validation, which drops the class hashes that aren't declared
+        changed = self._changed_classes(plan)
+        await self._validate_manifest(plan)
+        result = DeploymentResult()
+
+        # A node is executed if it isn't in the manifest or if a contract it depends on is redeployed.
+        # Declaring a class again only redeploys its contracts if the compiled contract changed,
+        # otherwise the class hash is the same.
+        pending = set()
+        for level in levels:
+            for node in level:
+                redeployed = [
+                    dep
+                    for dep in dependencies(node)
+                    if dep in pending
+                    and (not isinstance(plan.nodes[dep], Declare) or dep in changed)
+                ]
+                if (
+                    node.name in changed
+                    or self.manifest.result(node) is None
+                    or redeployed
+                ):
+                    pending.add(node.name)
+                else:
+                    self._store(node, self.manifest.result(node), result)
+
+        # Unchanged classes only have to be declared if something still needs their class hash
+        needed = set(changed)
+        for name in pending:
+            needed.update(dependencies(plan.nodes[name]))
+        pending = {
+            name
+            for name in pending
+            if not isinstance(plan.nodes[name], Declare) or name in needed
+        }
+
+        for level_index, level in enumerate(levels):
+            nodes = [node for node in level if node.name in pending]
+            if nodes:
+                self.log(
+                    f"⏳ Level {level_index}: {', '.join(node.name for node in nodes)}"
+                )
+                await self._run_level(nodes, result)
+                self.manifest.save()
+
+        return result
+
+    async def _run_level(self, nodes: List[Node], result: DeploymentResult):
+        declares = [node for node in nodes if isinstance(node, Declare)]
+        deploys = [node for node in nodes if isinstance(node, Deploy)]
+        invokes = [node for node in nodes if isinstance(node, Invoke)]
+
+        # Declarations are separate transactions, they are all sent at once.
+        # The backend hands out the nonces in the order of the calls
+        declarations = await asyncio.gather(
+            *(
+                self.backend.declare(node.compiled_contract.read_text("utf-8"))
+                for node in declares
+            )
+        )
+        transaction_hashes = [transaction_hash for transaction_hash, _ in declarations]
+
+        # Deployments and calls are bundled in one multicall
+        calls = []
+        deployed = []
+        for node in deploys:
+            class_hash = result.classes[node.contract_class]
+            calldata = [self._resolve(arg, result) for arg in node.constructor_args]
+            call, address = self.backend.deploy_call(class_hash, calldata)
+            calls.append(call)
+            deployed.append((node, address))
+        for node in invokes:
+            address = result.contracts[node.contract]
+            calldata = [self._resolve(arg, result) for arg in node.args]
+            calls.append(self.backend.invoke_call(address, node.function, calldata))
+
+        multicall_hash = None
+        if calls:
+            multicall_hash = await self.backend.execute(calls)
+            transaction_hashes.append(multicall_hash)
+
+        await asyncio.gather(
+            *(
+                self.backend.wait(transaction_hash)
+                for transaction_hash in transaction_hashes
+            )
+        )
+        result.transactions += len(transaction_hashes)
+
+        for node, (_, class_hash) in zip(declares, declarations):
+            self._record(node, class_hash, result)
+        for node, address in deployed:
+            self._record(node, address, result)
+            self.log(f"✅ {node.name}: {hex(address)}")
+        for node in invokes:
+            self._record(node, hex(multicall_hash), result)
+
+    def _record(self, node: Node, value: Any, result: DeploymentResult):
+        self.manifest.record(node, value)
+        self._store(node, value, result)
+        result.executed.append(node.name)
+
+    def _store(self, node: Node, value: Any, result: DeploymentResult):
+        if isinstance(node, Declare):
+            result.classes[node.name] = value
+        elif isinstance(node, Deploy):
+            result.contracts[node.name] = value
@@ -0,0 +1,124 @@
+from math import isqrt
+
+from commercium.constants import PRIME, RC_BOUND, UINT256
+
+#################################
+#                               #
+#     Cairo Integer Semantics   #
+#                               #
+#################################
+
+# Python equivalents of the starkware common library functions used by the contracts.
+# Every helper reproduces the exact result (including wrap arounds) of its Cairo counterpart,
+# and raises CairoAssertionError whenever the Cairo code would fail an assertion.
+
+
+class CairoAssertionError(Exception):
+    pass
+
+
+def felt(x: int) -> int:
+    return x % PRIME
+
+
+# starkware.cairo.common.math.unsigned_div_rem
+def unsigned_div_rem(value: int, div: int):
+    value = felt(value)
+    if not 0 < div <= PRIME // RC_BOUND:
+        raise CairoAssertionError(f"unsigned_div_rem: div={div} is out of range")
+    q, r = divmod(value, div)
+    if q >= RC_BOUND:
+        raise CairoAssertionError(f"unsigned_div_rem: value={value} is out of range")
+    return q, r
+
+
+# starkware.cairo.common.math_cmp.is_nn
+def is_nn(a: int) -> int:
+    return 1 if felt(a) < RC_BOUND else 0
+
+
+# starkware.cairo.common.math_cmp.is_le
+def is_le(a: int, b: int) -> int:
+    return is_nn(b - a)
+
+
+# starkware.cairo.common.math_cmp.is_le_felt
+def is_le_felt(a: int, b: int) -> int:
+    return 1 if felt(a) <= felt(b) else 0
+
+
+# starkware.cairo.common.pow.pow
+def pow_felt(base: int, exp: int) -> int:
+    return pow(base, exp, PRIME)
+
+
+# starkware.cairo.common.math.sqrt
+def sqrt_felt(value: int) -> int:
+    value = felt(value)
+    if value >= 2**250:
+        raise CairoAssertionError(f"sqrt: value={value} is out of range")
+    return isqrt(value)
+
+
+# Utils.felt_fmul
+def felt_fmul(x: int, y: int, base: int) -> int:
+    division, _ = unsigned_div_rem(x * y, base)
+    return division
+
+
+# Utils.felt_fdiv
+def felt_fdiv(x: int, y: int, base: int) -> int:
+    division, _ = unsigned_div_rem(x * base, y)
+    return division
+
+
+#######################
+#                     #
+#       Uint256       #
+#                     #
+#######################
+
+# Uint256 values are represented as plain python ints in [0, 2**256)
+
+
+def uint256_low(x: int) -> int:
+    return x % RC_BOUND
+
+
+# uint256_mul (only the low 256 bits are kept by the contracts)
+def uint256_mul(a: int, b: int) -> int:
+    return (a * b) % UINT256
+
+
+def uint256_add(a: int, b: int) -> int:
+    return (a + b) % UINT256
+
+
+def uint256_unsigned_div_rem(a: int, div: int):
+    return divmod(a, div)
+
+
+def _to_signed(a: int) -> int:
+    return a - UINT256 if a >= UINT256 // 2 else a
+
+
+# uint256_signed_div_rem: the quotient is rounded towards zero
+def uint256_signed_div_rem(a: int, div: int):
+    a, div = _to_signed(a), _to_signed(div)
+    q = abs(a) // abs(div)
+    if (a < 0) != (div < 0):
+        q = -q
+    r = a - q * div
+    return q % UINT256, r % UINT256
+
+
+# Utils.fmul
+def fmul(x: int, y: int, base: int) -> int:
+    division, _ = uint256_unsigned_div_rem(uint256_mul(x, y), base)
+    return division
+
+
+# Utils.fdiv
+def fdiv(x: int, y: int, base: int) -> int:
+    division, _ = uint256_signed_div_rem(uint256_mul(x, base), y)
+    return division
@@ -0,0 +1,394 @@
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from commercium.benchmark import (
+    OWNER,
+    SOLVERS,
+    ContractCache,
+    Protocol,
+    Scenario,
+    deploy_protocol,
+    write_json,
+)
+from commercium.constants import BASE
+from commercium.rpc import to_uint256
+
+##############################
+#                            #
+#      Call Tree Profiler    #
+#                            #
+##############################
+
+# Turns the call tree of an executed entry point into frames with the steps, builtins and storage
+# accesses of every contract function, and writes them as collapsed stacks (flamegraph.pl, inferno)
+# or as a speedscope profile.
+# Call trees come from the in-memory StarkNet state of commercium.benchmark (CallInfo objects)
+# or from the transaction traces of a devnet feeder gateway.
+
+# Metrics a flamegraph can be weighted by, besides the builtins (e.g. "range_check_builtin")
+FRAME_METRICS = ("n_steps", "n_memory_holes", "storage_reads", "storage_keys")
+
+
+@dataclass
+class Frame:
+    contract: str
+    function: str
+    # "CALL" for contract calls, "DELEGATE" for library calls
+    call_type: str = "CALL"
+    # Resources of the call including its inner calls, like the CallInfo they come from
+    n_steps: int = 0
+    n_memory_holes: int = 0
+    builtins: Dict[str, int] = field(default_factory=dict)
+    # Storage accesses of this call only, inner calls access storage of other contracts
+    storage_reads: int = 0
+    storage_keys: int = 0
+    children: List["Frame"] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return f"{self.contract}.{self.function}"
+
+    # @notice Value of a metric for the call including its inner calls
+    def total(self, metric: str) -> int:
+        if metric in ("storage_reads", "storage_keys"):
+            return getattr(self, metric) + sum(
+                child.total(metric) for child in self.children
+            )
+        if metric in ("n_steps", "n_memory_holes"):
+            return getattr(self, metric)
+        return self.builtins.get(metric, 0)
+
+    # @notice Value of a metric spent in the call itself, not in its inner calls
+    def self_value(self, metric: str) -> int:
+        if metric in ("storage_reads", "storage_keys"):
+            return getattr(self, metric)
+        return self.total(metric) - sum(child.total(metric) for child in self.children)
+
+    def walk(
+        self, stack: Tuple[str, ...] = ()
+    ) -> Iterator[Tuple[Tuple[str, ...], "Frame"]]:
+        stack = stack + (self.name,)
+        yield stack, self
+        for child in self.children:
+            yield from child.walk(stack)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "contract": self.contract,
+            "function": self.function,
+            "call_type": self.call_type,
+            "n_steps": self.n_steps,
+            "n_memory_holes": self.n_memory_holes,
+            "builtins": self.builtins,
+            "storage_reads": self.storage_reads,
+            "storage_keys": self.storage_keys,
+            "children": [child.to_json() for child in self.children],
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "Frame":
+        return cls(
+            **{key: value for key, value in data.items() if key != "children"},
+            children=[cls.from_json(child) for child in data["children"]],
+        )
+
+
+@dataclass
+class Labels:
+    """Names of the contracts and functions of a call tree, unknown ones are shown as hex"""
+
+    # Contract address -> name
+    contracts: Dict[int, str] = field(default_factory=dict)
+    # Class hash -> name, used for library calls which run in the caller's contract
+    classes: Dict[int, str] = field(default_factory=dict)
+    # Selector -> function name
+    selectors: Dict[int, str] = field(default_factory=dict)
+
+    def contract(self, address: int, class_hash: Optional[int], call_type: str) -> str:
+        if call_type == "DELEGATE" and class_hash in self.classes:
+            return self.classes[class_hash]
+        if address in self.contracts:
+            return self.contracts[address]
+        return self.classes.get(class_hash, hex(address))
+
+    def function(self, selector: int) -> str:
+        return self.selectors.get(selector, hex(selector))
+
+    def add_functions(self, abi: Iterable[Dict[str, Any]]):
+        from starkware.starknet.public.abi import get_selector_from_name
+
+        for entry in abi:
+            if entry["type"] in ("function", "l1_handler", "constructor"):
+                self.selectors[get_selector_from_name(entry["name"])] = entry["name"]
+
+
+# @notice Name a contract after its source file, e.g. src/solvers/spf_solver.cairo -> spf_solver
+def source_name(source: str) -> str:
+    return Path(source).stem
+
+
+# @notice Labels of every contract deployed or declared by deploy_protocol
+def protocol_labels(protocol: Protocol, contracts: ContractCache) -> Labels:
+    labels = Labels(
+        contracts={
+            address: source_name(source) for address, source in protocol.sources.items()
+        },
+        classes={
+            class_hash: source_name(source)
+            for class_hash, source in protocol.class_sources.items()
+        },
+    )
+    # Several tokens and routers share a source, number them like protocol.tokens / protocol.routers
+    for kind, addresses in (("token", protocol.tokens), ("router", protocol.routers)):
+        for index, address in enumerate(addresses):
+            if address in labels.contracts:
+                labels.contracts[address] = f"{kind}{index}"
+    for contract_class in contracts.classes.values():
+        labels.add_functions(contract_class.abi or [])
+    return labels
+
+
+# @notice Build the frames of a cairo-lang CallInfo
+def frame_from_call_info(call_info, labels: Labels) -> Frame:
+    resources = call_info.execution_resources
+    call_type = call_info.call_type.name
+    class_hash = call_info.class_hash
+    if isinstance(class_hash, bytes):
+        class_hash = int.from_bytes(class_hash, "big")
+    return Frame(
+        contract=labels.contract(call_info.contract_address, class_hash, call_type),
+        function=labels.function(call_info.entry_point_selector),
+        call_type=call_type,
+        n_steps=resources.n_steps,
+        n_memory_holes=resources.n_memory_holes,
+        builtins=non_zero(resources.builtin_instance_counter),
+        storage_reads=len(call_info.storage_read_values),
+        storage_keys=len(call_info.accessed_storage_keys),
+        children=[
+            frame_from_call_info(call, labels) for call in call_info.internal_calls
+        ],
+    )
+
+
+# @notice Build the frames of a function invocation from a feeder gateway transaction trace
+# @dev Traces don't contain storage accesses, storage_reads and storage_keys stay 0
+def frame_from_trace(invocation: Dict[str, Any], labels: Labels) -> Frame:
+    resources = invocation.get("execution_resources") or {}
+    call_type = invocation.get("call_type") or "CALL"
+    class_hash = invocation.get("class_hash")
+    return Frame(
+        contract=labels.contract(
+            int(invocation["contract_address"], 16),
+            int(class_hash, 16) if class_hash else None,
+            call_type,
+        ),
+        function=labels.function(int(invocation["selector"], 16)),
+        call_type=call_type,
+        n_steps=resources.get("n_steps", 0),
+        n_memory_holes=resources.get("n_memory_holes", 0),
+        builtins=non_zero(resources.get("builtin_instance_counter", {})),
+        children=[
+            frame_from_trace(call, labels)
+            for call in invocation.get("internal_calls", [])
+        ],
+    )
+
+
+def non_zero(counters: Dict[str, int]) -> Dict[str, int]:
+    return {name: count for name, count in sorted(counters.items()) if count}
+
+
+# @notice Fetch the trace of a transaction from a devnet (or any feeder gateway) and build its frames
+def profile_transaction(
+    gateway_url: str, transaction_hash: int, labels: Optional[Labels] = None
+) -> Frame:
+    from urllib.request import urlopen
+
+    url = (
+        f"{gateway_url.rstrip('/')}/feeder_gateway/get_transaction_trace"
+        f"?transactionHash={hex(transaction_hash)}"
+    )
+    with urlopen(url) as response:
+        trace = json.load(response)
+    if trace.get("revert_error"):
+        raise RuntimeError(f"Transaction reverted: {trace['revert_error']}")
+    return frame_from_trace(trace["function_invocation"], labels or Labels())
+
+
+# @notice Deploy the benchmark protocol and profile one hub entry point of a solver
+# @param function - "quote" for get_amount_out_with_solver, "swap" for swap_exact_tokens_for_tokens_with_solver
+# @return frame - Root frame of the hub call
+async def profile_solver(
+    scenario: Scenario,
+    solver: str,
+    function: str = "swap",
+    amount_in: int = 10 * BASE,
+    contracts: Optional[ContractCache] = None,
+) -> Frame:
+    contracts = contracts or ContractCache()
+    protocol = await deploy_protocol(
+        scenario, [solver], contracts, with_balances=function == "swap"
+    )
+    if solver not in protocol.solver_ids:
+        # The solver didn't compile, get the error again
+        contracts.get(SOLVERS[solver].source)
+
+    token_in, token_out = protocol.tokens[:2]
+    solver_id = protocol.solver_ids[solver]
+    if function == "quote":
+        entry_point = "get_amount_out_with_solver"
+        calldata = [*to_uint256(amount_in), token_in, token_out, solver_id]
+    elif function == "swap":
+        entry_point = "swap_exact_tokens_for_tokens_with_solver"
+        calldata = [
+            *to_uint256(amount_in),
+            *to_uint256(0),
+            token_in,
+            token_out,
+            OWNER,
+            solver_id,
+        ]
+    else:
+        raise ValueError(f"Unknown function {function}, expected quote or swap")
+
+    call_info = await protocol.call(protocol.hub, entry_point, calldata)
+    return frame_from_call_info(call_info, protocol_labels(protocol, contracts))
+
+
+##############################
+#                            #
+#          Outputs           #
+#                            #
+##############################
+
+
+# @notice Collapsed stacks ("hub.f;solver.g 1234" per line), the format of flamegraph.pl and inferno
+# @dev The value of a stack is what its last frame spends itself, identical stacks are merged
+def to_collapsed(root: Frame, metric: str = "n_steps") -> Dict[str, int]:
+    stacks: Dict[str, int] = {}
+    for stack, frame in root.walk():
+        value = frame.self_value(metric)
+        if value:
+            key = ";".join(stack)
+            stacks[key] = stacks.get(key, 0) + value
+    return stacks
+
+
+def format_collapsed(stacks: Dict[str, int]) -> str:
+    return "".join(f"{stack} {value}\n" for stack, value in stacks.items())
+
+
+# @notice Evented speedscope profile, one profile per metric
+# @dev Inner calls are laid out one after the other at the start of their caller, so the width of a
+#      frame is its total and the gap after its inner calls is what it spends itself
+def to_speedscope(
+    root: Frame, metrics: Iterable[str] = ("n_steps",), name: str = ""
+) -> Dict[str, Any]:
+    frame_ids: Dict[str, int] = {}
+    profiles = []
+    for metric in metrics:
+        events: List[Dict[str, Any]] = []
+
+        def add(frame: Frame, at: int):
+            frame_id = frame_ids.setdefault(frame.name, len(frame_ids))
+            events.append({"type": "O", "frame": frame_id, "at": at})
+            child_at = at
+            for child in frame.children:
+                add(child, child_at)
+                child_at += child.total(metric)
+            # Inner calls never end after their caller, unless the resources are inconsistent
+            end = max(at + frame.total(metric), child_at)
+            events.append({"type": "C", "frame": frame_id, "at": end})
+            return end
+
+        end = add(root, 0)
+        profiles.append(
+            {
+                "type": "evented",
+                "name": f"{name} {metric}".strip(),
+                "unit": "none",
+                "startValue": 0,
+                "endValue": end,
+                "events": events,
+            }
+        )
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": [{"name": frame_name} for frame_name in frame_ids]},
+        "profiles": profiles,
+        "name": name or root.name,
+        "exporter": "commercium.profiler",
+    }
+
+
+def save_profile(path: Union[str, Path], root: Frame):
+    write_json(path, {"root": root.to_json()})
+
+
+def load_profile(path: Union[str, Path]) -> Frame:
+    return Frame.from_json(json.loads(Path(path).read_text("utf-8"))["root"])
+
+
+##############################
+#                            #
+#            Diff            #
+#                            #
+##############################
+
+
+class FunctionDiff(NamedTuple):
+    function: str
+    before: int
+    after: int
+
+    @property
+    def change(self) -> int:
+        return self.after - self.before
+
+
+# @notice Collapsed stacks of two profiles side by side ("stack before after"), the input of difffolded / flamegraph.pl
+def diff_collapsed(
+    before: Frame, after: Frame, metric: str = "n_steps"
+) -> List[Tuple[str, int, int]]:
+    stacks_before = to_collapsed(before, metric)
+    stacks_after = to_collapsed(after, metric)
+    stacks = list(stacks_before) + [
+        stack for stack in stacks_after if stack not in stacks_before
+    ]
+    return [
+        (stack, stacks_before.get(stack, 0), stacks_after.get(stack, 0))
+        for stack in stacks
+    ]
+
+
+def format_diff_collapsed(rows: Iterable[Tuple[str, int, int]]) -> str:
+    return "".join(f"{stack} {before} {after}\n" for stack, before, after in rows)
+
+
+# @notice Self values of every contract function in both profiles, biggest changes first
+# @dev Functions are compared wherever they are called from, which is what tells whether a hot spot moved
+def diff_functions(
+    before: Frame, after: Frame, metric: str = "n_steps"
+) -> List[FunctionDiff]:
+    totals: Dict[str, List[int]] = {}
+    for index, root in enumerate((before, after)):
+        for _, frame in root.walk():
+            totals.setdefault(frame.name, [0, 0])[index] += frame.self_value(metric)
+    diffs = [
+        FunctionDiff(function, values[0], values[1])
+        for function, values in totals.items()
+    ]
+    return sorted(diffs, key=lambda diff: -abs(diff.change))
@@ -0,0 +1,279 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from commercium.rpc import (
+    SYNC_EVENT,
+    QuoteClient,
+    get_amount_and_path_with_solver,
+    get_events,
+)
+from commercium.snapshot import Path, Router
+
+#################################
+#                               #
+#     Block-Aware Quote Cache   #
+#                               #
+#################################
+
+# Caches the hub quotes of a block, so that polling the same trade (or quoting before swapping it)
+# doesn't hit the node again. An entry is valid for the block it was read at. When a new block
+# arrives, entries either all go stale, or, if the pools are known, only those whose pairs were
+# touched by a Sync event. Entries that stayed valid move on to the new block.
+# Stale entries can still be served for a while (stale-while-revalidate) while they are re-read in the background.
+
+QuoteResult = Tuple[List[Router], List[Path], List[int], int]
+
+
+class QuoteKey(NamedTuple):
+    amount_in: int
+    token_in: int
+    token_out: int
+    solver_id: int
+
+
+@dataclass
+class CacheEntry:
+    result: QuoteResult
+    # Block the result is valid for
+    block_number: int
+    fetched_at: float
+    # Set once a newer block or an event invalidated the entry
+    invalidated_at: Optional[float] = None
+
+
+@dataclass
+class CacheMetrics:
+    hits: int = 0
+    # Stale entries served while they are revalidated
+    stale_hits: int = 0
+    misses: int = 0
+    # Misses that waited for a read of the same quote already in flight
+    coalesced: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    revalidations: int = 0
+    errors: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / lookups if lookups else 0.0
+
+    def to_json(self) -> Dict[str, float]:
+        return {**asdict(self), "hit_ratio": self.hit_ratio}
+
+
+class QuoteCache:
+    """LRU cache of Hub.get_amount_and_path_with_solver, both hub quote views are served from it.
+
+    The current block is polled at most every block_poll_interval seconds.
+    Give pools (pool address -> (token0, token1) of every pool of the router aggregator, e.g. from a
+    ReserveStore) to only invalidate the quotes whose pairs changed instead of every quote of the block.
+    A quote depends on every pair between its tokens and the routing_tokens (the high liquidity tokens
+    of the solvers), as those are all the pairs a solver reads.
+    """
+
+    def __init__(
+        self,
+        client: QuoteClient,
+        hub_address: int,
+        max_entries: int = 4096,
+        ttl: Optional[float] = None,
+        stale_while_revalidate: float = 0.0,
+        pools: Optional[Mapping[int, Tuple[int, int]]] = None,
+        routing_tokens: Sequence[int] = (),
+        block_poll_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.client = client
+        self.hub_address = hub_address
+        self.max_entries = max_entries
+        # Seconds after which an entry goes stale even without a new block
+        self.ttl = ttl
+        # Seconds during which a stale entry is still served
+        self.stale_while_revalidate = stale_while_revalidate
+        self.pools = pools
+        self.routing_tokens = frozenset(routing_tokens)
+        self.block_poll_interval = block_poll_interval
+        self.clock = clock
+
+        self.block_number: Optional[int] = None
+        self.metrics = CacheMetrics()
+        self._entries: "OrderedDict[QuoteKey, CacheEntry]" = OrderedDict()
+        self._in_flight: Dict[QuoteKey, asyncio.Task] = {}
+        self._last_poll: Optional[float] = None
+        self._block_lock: Optional[asyncio.Lock] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_amount_out_with_solver(
+        self, amount_in: int, token_in: int, token_out: int, solver_id: int
+    ) -> int:
+        _, _, _, amount_out = await self.get_amount_and_path_with_solver(
+            amount_in, token_in, token_out, solver_id
+        )
+        return amount_out
+
+    async def get_amount_and_path_with_solver(
+        self, amount_in: int, token_in: int, token_out: int, solver_id: int
+    ) -> QuoteResult:
+        await self.sync_block()
+        key = QuoteKey(amount_in, token_in, token_out, solver_id)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            now = self.clock()
+            stale_since = self._stale_since(entry)
+            if stale_since is None or now < stale_since:
+                self.metrics.hits += 1
+                return entry.result
+            if now - stale_since < self.stale_while_revalidate:
+                self.metrics.stale_hits += 1
+                if key not in self._in_flight:
+                    self.metrics.revalidations += 1
+                    self._read(key)
+                return entry.result
+
+        self.metrics.misses += 1
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.metrics.coalesced += 1
+        else:
+            task = self._read(key)
+        return await asyncio.shield(task)
+
+    # @notice Poll the block number and invalidate the entries a new block changes
+    async def sync_block(self):
+        if self._block_lock is None:
+            self._block_lock = asyncio.Lock()
+        async with self._block_lock:
+            now = self.clock()
+            if (
+                self._last_poll is not None
+                and now - self._last_poll < self.block_poll_interval
+            ):
+                return
+            self._last_poll = now
+
+            block_number = await self.client.block_number()
+            if self.block_number is None:
+                self.block_number = block_number
+                return
+            if block_number <= self.block_number:
+                return
+
+            touched_pairs = None
+            if self.pools is not None:
+                events = await get_events(
+                    self.client, self.block_number + 1, block_number, [SYNC_EVENT]
+                )
+                touched_pairs = [
+                    self.pools[address]
+                    for address in {int(event["from_address"], 16) for event in events}
+                    if address in self.pools
+                ]
+            self.on_new_block(block_number, touched_pairs)
+
+    # @notice Move the cache to a new block
+    # @param touched_pairs - Token pairs whose reserves changed since the last block, None if unknown
+    def on_new_block(
+        self,
+        block_number: int,
+        touched_pairs: Optional[Iterable[Tuple[int, int]]] = None,
+    ):
+        if touched_pairs is not None:
+            touched_pairs = list(touched_pairs)
+        for key, entry in self._entries.items():
+            if entry.block_number >= block_number or entry.invalidated_at is not None:
+                continue
+            if touched_pairs is None or any(
+                self.depends_on(key, *pair) for pair in touched_pairs
+            ):
+                self._invalidate(entry)
+            else:
+                entry.block_number = block_number
+        self.block_number = max(self.block_number or 0, block_number)
+
+    # @notice Invalidate the quotes that read a pair, e.g. on a Sync event seen before its block
+    def invalidate_pair(self, token_a: int, token_b: int):
+        for key, entry in self._entries.items():
+            if entry.invalidated_at is None and self.depends_on(key, token_a, token_b):
+                self._invalidate(entry)
+
+    def depends_on(self, key: QuoteKey, token_a: int, token_b: int) -> bool:
+        tokens = self.routing_tokens | {key.token_in, key.token_out}
+        return token_a in tokens and token_b in tokens
+
+    def clear(self):
+        self._entries.clear()
+
+    def _invalidate(self, entry: CacheEntry):
+        entry.invalidated_at = self.clock()
+        self.metrics.invalidations += 1
+
+    def _stale_since(self, entry: CacheEntry) -> Optional[float]:
+        expiries = [
+            moment
+            for moment in (
+                entry.invalidated_at,
+                None if self.ttl is None else entry.fetched_at + self.ttl,
+            )
+            if moment is not None
+        ]
+        return min(expiries) if expiries else None
+
+    # @notice Read a quote at the current block and store it, concurrent lookups share the read
+    def _read(self, key: QuoteKey) -> asyncio.Task:
+        async def read():
+            block_number = self.block_number
+            try:
+                result = await get_amount_and_path_with_solver(
+                    self.client,
+                    self.hub_address,
+                    *key,
+                    block_id=None
+                    if block_number is None
+                    else {"block_number": block_number},
+                )
+            except Exception:
+                self.metrics.errors += 1
+                raise
+            finally:
+                self._in_flight.pop(key, None)
+
+            entry = CacheEntry(result, block_number, self.clock())
+            if self.block_number is not None and (
+                block_number is None or block_number < self.block_number
+            ):
+                # The block moved on during the read
+                entry.invalidated_at = entry.fetched_at
+            self._store(key, entry)
+            return result
+
+        task = asyncio.ensure_future(read())
+        # Background revalidations nobody awaits must not log unretrieved exceptions
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._in_flight[key] = task
+        return task
+
+    def _store(self, key: QuoteKey, entry: CacheEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.metrics.evictions += 1
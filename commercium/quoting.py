@@ -0,0 +1,261 @@
+import asyncio
+import bisect
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from commercium.felt import CairoAssertionError
+from commercium.rpc import Call, QuoteClient, get_amount_and_path_with_solver
+from commercium.simulator import SOLVERS
+from commercium.snapshot import MarketSnapshot, Path, Router
+from commercium.trade_executor import simulate_multi_swap
+
+###############################
+#                             #
+#   Best-of-Solvers Quoting   #
+#                             #
+###############################
+
+# Quotes a trade with every solver at the same time and keeps the best one, instead of running
+# them one after the other (like Hub.get_multiple_solver_amounts does in a single view call).
+# Remote solvers are quoted through Hub.get_amount_and_path_with_solver, local solvers run the
+# python ports of commercium.solvers (in an executor, e.g. a process pool) on a MarketSnapshot.
+# Every solver has a deadline, late solvers are left out of the result.
+
+# Official solvers are registered below this id, unofficial ones from it on (see solver_registry.cairo)
+FIRST_UNOFFICIAL_SOLVER_ID = 100
+
+# Upper bounds in seconds of the latency buckets, the last bucket holds everything slower
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+DEADLINE_EXCEEDED = "deadline exceeded"
+
+
+@dataclass(frozen=True)
+class SolverQuote:
+    solver_id: int
+    amount_out: int = 0
+    routers: Tuple[Router, ...] = ()
+    path: Tuple[Path, ...] = ()
+    amounts: Tuple[int, ...] = ()
+    # Seconds from the start of the quote until the solver answered (or its deadline)
+    latency: float = 0
+    # Set instead of the result if the solver failed or missed its deadline
+    error: Optional[str] = None
+
+
+@dataclass
+class BestQuote:
+    # None if no solver returned a path in time
+    best: Optional[SolverQuote]
+    # Quote of every solver that was asked, failed and late ones included
+    quotes: Dict[int, SolverQuote]
+
+
+class LatencyHistogram:
+    """Latencies of one solver, counted in LATENCY_BUCKETS like a Prometheus histogram (not cumulative)"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.timeouts = 0
+        self.errors = 0
+
+    def observe(self, quote: SolverQuote):
+        self.counts[bisect.bisect_left(self.buckets, quote.latency)] += 1
+        self.count += 1
+        self.sum += quote.latency
+        if quote.error == DEADLINE_EXCEEDED:
+            self.timeouts += 1
+        elif quote.error is not None:
+            self.errors += 1
+
+    # @notice Upper bound of the bucket holding the q-quantile, inf if it is in the last bucket
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_json(self) -> Dict:
+        return {
+            "buckets": {
+                **{
+                    str(bound): count for bound, count in zip(self.buckets, self.counts)
+                },
+                "inf": self.counts[-1],
+            },
+            "count": self.count,
+            "sum": self.sum,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
+
+
+# @notice Run a python solver port and the trade it returns, in an executor process
+def quote_locally(
+    solver: str, snapshot: MarketSnapshot, amount_in: int, token_in: int, token_out: int
+) -> Tuple[List[Router], List[Path], List[int], int]:
+    routers, path, amounts = SOLVERS[solver](snapshot, amount_in, token_in, token_out)
+    if not path:
+        raise CairoAssertionError("no trading path found")
+    amount_out = simulate_multi_swap(snapshot, routers, path, amounts, amount_in)
+    return routers, path, amounts, amount_out
+
+
+class QuotingService:
+    """Quotes trades with every registered solver concurrently and returns the best one.
+
+    Give the client max_batch_size=1 so that a slow solver doesn't hold back the batch of the others.
+    Local solvers whose deadline passes keep running in their executor, only their result is dropped.
+    """
+
+    def __init__(
+        self,
+        client: QuoteClient,
+        hub_address: int,
+        solver_registry_address: Optional[int] = None,
+        deadline: float = 2.0,
+        solver_deadlines: Optional[Mapping[int, float]] = None,
+        local_solvers: Optional[Mapping[int, str]] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.client = client
+        self.hub_address = hub_address
+        self.solver_registry_address = solver_registry_address
+        self.deadline = deadline
+        self.solver_deadlines = dict(solver_deadlines or {})
+        # solver id -> name in commercium.simulator.SOLVERS, quoted without the node
+        self.local_solvers = dict(local_solvers or {})
+        self.executor = executor
+        self.histograms: Dict[int, LatencyHistogram] = {}
+
+    # @notice Ids of every solver with an address in the solver registry
+    async def get_solver_ids(self, block_id=None) -> List[int]:
+        if self.solver_registry_address is None:
+            raise ValueError("A solver registry is needed to list the solvers")
+        (next_id,) = await self.client.call(
+            Call(self.solver_registry_address, "get_next_id"), block_id
+        )
+        solver_ids = list(range(1, FIRST_UNOFFICIAL_SOLVER_ID)) + list(
+            range(FIRST_UNOFFICIAL_SOLVER_ID, next_id)
+        )
+        addresses = await self.client.call_many(
+            [
+                Call(self.solver_registry_address, "get_solver", (solver_id,))
+                for solver_id in solver_ids
+            ],
+            block_id,
+        )
+        return [
+            solver_id
+            for solver_id, (address, *_) in zip(solver_ids, addresses)
+            if address != 0
+        ]
+
+    # @notice Quote a trade with every solver and keep the one returning the most tokens
+    # @dev Returns once every solver answered or missed its deadline, ties go to the lowest solver id
+    # @param solver_ids - Defaults to every solver of the registry and the local solvers
+    # @param snapshot - Market the local solvers quote on, required if any local solver is asked
+    async def best_quote(
+        self,
+        amount_in: int,
+        token_in: int,
+        token_out: int,
+        solver_ids: Optional[Sequence[int]] = None,
+        snapshot: Optional[MarketSnapshot] = None,
+        block_id=None,
+    ) -> BestQuote:
+        if solver_ids is None:
+            solver_ids = sorted(
+                set(await self.get_solver_ids(block_id)) | set(self.local_solvers)
+            )
+        if snapshot is None and any(
+            solver_id in self.local_solvers for solver_id in solver_ids
+        ):
+            raise ValueError("Local solvers need a market snapshot")
+
+        start = time.monotonic()
+        quotes = await asyncio.gather(
+            *(
+                self._quote(
+                    solver_id, start, amount_in, token_in, token_out, snapshot, block_id
+                )
+                for solver_id in solver_ids
+            )
+        )
+
+        for quote in quotes:
+            self.histograms.setdefault(quote.solver_id, LatencyHistogram()).observe(
+                quote
+            )
+        answered = [quote for quote in quotes if quote.error is None]
+        best = max(
+            answered,
+            key=lambda quote: (quote.amount_out, -quote.solver_id),
+            default=None,
+        )
+        return BestQuote(best, {quote.solver_id: quote for quote in quotes})
+
+    def latency_report(self) -> Dict[int, Dict]:
+        return {
+            solver_id: histogram.to_json()
+            for solver_id, histogram in sorted(self.histograms.items())
+        }
+
+    async def _quote(
+        self,
+        solver_id: int,
+        start: float,
+        amount_in: int,
+        token_in: int,
+        token_out: int,
+        snapshot: Optional[MarketSnapshot],
+        block_id,
+    ) -> SolverQuote:
+        if solver_id in self.local_solvers:
+            quote = asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                quote_locally,
+                self.local_solvers[solver_id],
+                snapshot,
+                amount_in,
+                token_in,
+                token_out,
+            )
+        else:
+            quote = get_amount_and_path_with_solver(
+                self.client,
+                self.hub_address,
+                amount_in,
+                token_in,
+                token_out,
+                solver_id,
+                block_id,
+            )
+
+        deadline = self.solver_deadlines.get(solver_id, self.deadline)
+        try:
+            routers, path, amounts, amount_out = await asyncio.wait_for(quote, deadline)
+        except asyncio.TimeoutError:
+            return SolverQuote(solver_id, latency=deadline, error=DEADLINE_EXCEEDED)
+        except Exception as error:
+            return SolverQuote(
+                solver_id, latency=time.monotonic() - start, error=str(error)
+            )
+        return SolverQuote(
+            solver_id,
+            amount_out,
+            tuple(routers),
+            tuple(path),
+            tuple(amounts),
+            latency=time.monotonic() - start,
+        )
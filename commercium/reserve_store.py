@@ -0,0 +1,303 @@
+import ast
+import json
+import mmap
+import os
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Sequence, Tuple
+
+from commercium.snapshot import MarketSnapshot, Router
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed to get the columns as arrays
+    np = None
+
+###########################
+#                         #
+#      Reserve Store      #
+#                         #
+###########################
+
+# Pools of every registered (router, token pair) with their reserves, stored column by column on disk.
+# Each column is a .npy file (so numpy can np.load it with mmap_mode="r") that is memory-mapped on open,
+# nothing is parsed until a row is actually read.
+#
+# Felts and Uint256 are stored as 4 little-endian uint64 limbs (low limb first),
+# which is the same bytes as a 32 bytes little-endian integer.
+# Tokens are dictionary encoded: the pair columns hold indices into the tokens column.
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+# Length of the magic string + header length field
+NPY_PREFIX = len(NPY_MAGIC) + 2
+NPY_ALIGNMENT = 64
+
+INDEX_WIDTH = 4
+FELT_WIDTH = 32
+
+# name -> width in bytes of one row
+PAIR_COLUMNS = {
+    "router": INDEX_WIDTH,
+    "token0": INDEX_WIDTH,
+    "token1": INDEX_WIDTH,
+    "address": FELT_WIDTH,
+    "reserve0": FELT_WIDTH,
+    "reserve1": FELT_WIDTH,
+}
+TOKENS_COLUMN = "tokens"
+META_FILE = "meta.json"
+FORMAT_VERSION = 1
+
+
+class PairReserves(NamedTuple):
+    router: Router
+    # Pool address
+    address: int
+    # Tokens in the order of the pool, reserve0 is the reserve of token0
+    token0: int
+    token1: int
+    reserve0: int
+    reserve1: int
+
+
+def npy_header(width: int, length: int) -> bytes:
+    if width == INDEX_WIDTH:
+        descr, shape = "<u4", (length,)
+    else:
+        descr, shape = "<u8", (length, width // 8)
+    header = repr({"descr": descr, "fortran_order": False, "shape": shape})
+    # The header ends with a newline and the data starts on an aligned offset
+    padding = -(NPY_PREFIX + len(header) + 1) % NPY_ALIGNMENT
+    header = (header + " " * padding + "\n").encode("latin1")
+    return NPY_MAGIC + len(header).to_bytes(2, "little") + header
+
+
+# @notice Write a column of unsigned integers
+# @dev The file is written next to its destination and moved in place,
+#      readers that already mapped the previous file keep reading the previous version
+def write_column(path: str, values: Sequence[int], width: int):
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(npy_header(width, len(values)))
+        file.write(b"".join(value.to_bytes(width, "little") for value in values))
+    os.replace(temporary_path, path)
+
+
+class Column:
+    """Memory-mapped column of unsigned integers written by write_column"""
+
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        with open(path, "r+b" if writable else "rb") as file:
+            self._map = mmap.mmap(
+                file.fileno(),
+                0,
+                access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ,
+            )
+
+        if self._map[: len(NPY_MAGIC)] != NPY_MAGIC:
+            raise ValueError(f"{path} is not a version 1.0 npy file")
+        header_len = int.from_bytes(self._map[len(NPY_MAGIC) : NPY_PREFIX], "little")
+        header = ast.literal_eval(
+            self._map[NPY_PREFIX : NPY_PREFIX + header_len].decode("latin1")
+        )
+        shape = header["shape"]
+        self.offset = NPY_PREFIX + header_len
+        self.width = int(header["descr"][-1]) * (shape[1] if len(shape) > 1 else 1)
+        self.length = shape[0]
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> int:
+        start = self._position(index)
+        return int.from_bytes(self._map[start : start + self.width], "little")
+
+    def __setitem__(self, index: int, value: int):
+        start = self._position(index)
+        self._map[start : start + self.width] = value.to_bytes(self.width, "little")
+
+    def __iter__(self) -> Iterator[int]:
+        for index in range(self.length):
+            yield self[index]
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        self._map.close()
+
+    def _position(self, index: int) -> int:
+        if not 0 <= index < self.length:
+            raise IndexError(f"row {index} is out of range for {self.length} rows")
+        return self.offset + index * self.width
+
+
+class ReserveStore:
+    """Columnar on-disk copy of the pools known to the router aggregator at one block.
+
+    Use ReserveStore.write to create a store and ReserveStore.open to map an existing one,
+    update rewrites the reserves of single rows in place.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as file:
+            meta = json.load(file)
+        if meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported reserve store version {meta['version']}")
+
+        self.block_number = meta["block_number"]
+        self.routers = [Router(*router) for router in meta["routers"]]
+        self.high_liq_tokens = meta["high_liq_tokens"]
+        self.tokens = Column(self._column_path(TOKENS_COLUMN))
+        self.columns = {name: Column(self._column_path(name)) for name in PAIR_COLUMNS}
+        self._rows_by_address = None
+
+    @classmethod
+    def open(cls, directory: str) -> "ReserveStore":
+        return cls(directory)
+
+    # @notice Write a new store, replacing the one in directory if there is any
+    # @param pairs - Every pool of the snapshot
+    # @param block_number - The block the reserves were read at
+    # @param high_liq_tokens - Forwarded to the market snapshots built from the store
+    @classmethod
+    def write(
+        cls,
+        directory: str,
+        pairs: Sequence[PairReserves],
+        block_number: int,
+        routers: Sequence[Router],
+        high_liq_tokens: Sequence[int] = (),
+    ) -> "ReserveStore":
+        os.makedirs(directory, exist_ok=True)
+
+        router_ids = {router: index for index, router in enumerate(routers)}
+        token_ids: Dict[int, int] = {}
+        for pair in pairs:
+            token_ids.setdefault(pair.token0, len(token_ids))
+            token_ids.setdefault(pair.token1, len(token_ids))
+
+        columns = {
+            "router": [router_ids[pair.router] for pair in pairs],
+            "token0": [token_ids[pair.token0] for pair in pairs],
+            "token1": [token_ids[pair.token1] for pair in pairs],
+            "address": [pair.address for pair in pairs],
+            "reserve0": [pair.reserve0 for pair in pairs],
+            "reserve1": [pair.reserve1 for pair in pairs],
+        }
+        write_column(
+            os.path.join(directory, TOKENS_COLUMN + ".npy"), list(token_ids), FELT_WIDTH
+        )
+        for name, width in PAIR_COLUMNS.items():
+            write_column(os.path.join(directory, name + ".npy"), columns[name], width)
+
+        # Written last, the block number only moves once every column is in place
+        write_meta(
+            directory,
+            {
+                "version": FORMAT_VERSION,
+                "block_number": block_number,
+                "routers": [list(router) for router in routers],
+                "high_liq_tokens": list(high_liq_tokens),
+            },
+        )
+        return cls(directory)
+
+    def __len__(self) -> int:
+        return len(self.columns["address"])
+
+    def __getitem__(self, index: int) -> PairReserves:
+        columns = self.columns
+        return PairReserves(
+            self.routers[columns["router"][index]],
+            columns["address"][index],
+            self.tokens[columns["token0"][index]],
+            self.tokens[columns["token1"][index]],
+            columns["reserve0"][index],
+            columns["reserve1"][index],
+        )
+
+    def __iter__(self) -> Iterator[PairReserves]:
+        for index in range(len(self)):
+            yield self[index]
+
+    # @notice Rows of the pools with the given addresses
+    # @dev Addresses that are not pools of the store (tokens, routers...) are ignored
+    def find(self, addresses: Iterable[int]) -> List[int]:
+        if self._rows_by_address is None:
+            self._rows_by_address = {}
+            for index, address in enumerate(self.columns["address"]):
+                self._rows_by_address.setdefault(address, []).append(index)
+        rows = set()
+        for address in addresses:
+            rows.update(self._rows_by_address.get(address, ()))
+        return sorted(rows)
+
+    # @notice Overwrite the reserves of some rows and move the store to a later block
+    # @dev Rows are written in place, every mapping of the store sees the new reserves
+    # @param reserves - (reserve0, reserve1) of every updated row
+    def update(self, reserves: Mapping[int, Tuple[int, int]], block_number: int):
+        if block_number < self.block_number:
+            raise ValueError(
+                f"Store is at block {self.block_number}, can't update it to block {block_number}"
+            )
+
+        if reserves:
+            reserve0 = Column(self._column_path("reserve0"), writable=True)
+            reserve1 = Column(self._column_path("reserve1"), writable=True)
+            try:
+                for index, (pair_reserve0, pair_reserve1) in reserves.items():
+                    reserve0[index] = pair_reserve0
+                    reserve1[index] = pair_reserve1
+                reserve0.flush()
+                reserve1.flush()
+            finally:
+                reserve0.close()
+                reserve1.close()
+
+        with open(os.path.join(self.directory, META_FILE)) as file:
+            meta = json.load(file)
+        meta["block_number"] = block_number
+        write_meta(self.directory, meta)
+        self.block_number = block_number
+
+    # @notice Build the MarketSnapshot the solvers work on
+    # @dev Pools without liquidity are left out, as get_all_routers_and_reserves skips them
+    def to_market_snapshot(self) -> MarketSnapshot:
+        snapshot = MarketSnapshot(
+            high_liq_tokens=list(self.high_liq_tokens), block_number=self.block_number
+        )
+        for router in self.routers:
+            snapshot.add_router(*router)
+        for pair in self:
+            if pair.reserve0 == 0 or pair.reserve1 == 0:
+                continue
+            snapshot.set_reserves(
+                pair.router.address,
+                pair.token0,
+                pair.token1,
+                pair.reserve0,
+                pair.reserve1,
+            )
+        return snapshot
+
+    # @notice Read-only numpy view of a column, (rows,) for indices and (rows, 4) uint64 limbs for felts
+    def array(self, name: str):
+        if np is None:
+            raise ImportError("numpy is required to read the columns as arrays")
+        return np.load(self._column_path(name), mmap_mode="r")
+
+    def close(self):
+        self.tokens.close()
+        for column in self.columns.values():
+            column.close()
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.directory, name + ".npy")
+
+
+def write_meta(directory: str, meta: dict):
+    path = os.path.join(directory, META_FILE)
+    with open(path + ".tmp", "w") as file:
+        json.dump(meta, file)
+    os.replace(path + ".tmp", path)
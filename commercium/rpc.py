@@ -0,0 +1,808 @@
+import asyncio
+import itertools
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import aiohttp
+
+from commercium.constants import JediSwap, TenK
+from commercium.reserve_store import PairReserves, ReserveStore
+from commercium.snapshot import MarketSnapshot, Path, Router, Trade
+from commercium.solvers.live_spf import LiveMarket
+
+##########################
+#                        #
+#     JSON-RPC Client    #
+#                        #
+##########################
+
+# Concurrent, batched and pooled read access to a StarkNet node (devnet exposes it on /rpc).
+# Every call is queued, queued calls are sent as a single JSON-RPC batch request
+# and the number of requests in flight is bounded by a semaphore.
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+# @notice Entry point selector of a function (starknet_keccak of its name)
+@lru_cache(maxsize=None)
+def get_selector(function_name: str) -> int:
+    from starkware.starknet.public.abi import get_selector_from_name
+
+    return get_selector_from_name(function_name)
+
+
+@dataclass(frozen=True)
+class Call:
+    contract_address: int
+    # Function name or entry point selector
+    function: Union[str, int]
+    calldata: Tuple[int, ...] = ()
+
+    def to_request(self) -> Dict[str, Any]:
+        selector = (
+            self.function
+            if isinstance(self.function, int)
+            else get_selector(self.function)
+        )
+        return {
+            "contract_address": hex(self.contract_address),
+            "entry_point_selector": hex(selector),
+            "calldata": [hex(value) for value in self.calldata],
+        }
+
+
+class QuoteClient:
+    """Async JSON-RPC client that coalesces concurrent calls into batch requests.
+
+    Use it as an async context manager, the underlying HTTP connections are pooled
+    for the lifetime of the client.
+    """
+
+    def __init__(
+        self,
+        node_url: str,
+        max_batch_size: int = 50,
+        max_concurrent_requests: int = 8,
+        batch_window: float = 0.002,
+        block_id: Union[str, Dict[str, int]] = "latest",
+        timeout: float = 30,
+    ):
+        self.node_url = node_url
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.block_id = block_id
+        self.timeout = timeout
+        self.max_concurrent_requests = max_concurrent_requests
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._ids = itertools.count()
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._requests: set = set()
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self):
+        if self._session is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+            connector = aiohttp.TCPConnector(limit=self.max_concurrent_requests)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+
+    async def close(self):
+        self._flush()
+        if self._requests:
+            await asyncio.gather(*self._requests, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    # @notice Queue a JSON-RPC request, it is sent with the next batch
+    # @return result - The result field of the response
+    async def request(self, method: str, params: Any) -> Any:
+        if self._session is None:
+            await self.open()
+
+        future = asyncio.get_running_loop().create_future()
+        payload = {
+            "jsonrpc": "2.0",
+            "id": next(self._ids),
+            "method": method,
+            "params": params,
+        }
+        self._pending.append((payload, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.batch_window, self._flush
+            )
+
+        return await future
+
+    # @notice Call a view function
+    # @return result - Returned felts
+    async def call(self, call: Call, block_id=None) -> List[int]:
+        params = {"request": call.to_request(), "block_id": block_id or self.block_id}
+        result = await self.request("starknet_call", params)
+        return [int(value, 16) for value in result]
+
+    # @notice Call many view functions concurrently
+    async def call_many(self, calls: Sequence[Call], block_id=None) -> List[List[int]]:
+        return list(
+            await asyncio.gather(*(self.call(call, block_id) for call in calls))
+        )
+
+    async def block_number(self) -> int:
+        return await self.request("starknet_blockNumber", [])
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size :]
+            task = asyncio.ensure_future(self._send(batch))
+            self._requests.add(task)
+            task.add_done_callback(self._requests.discard)
+
+    async def _send(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        futures = {payload["id"]: future for payload, future in batch}
+        try:
+            async with self._semaphore:
+                async with self._session.post(
+                    self.node_url, json=[payload for payload, _ in batch]
+                ) as response:
+                    response.raise_for_status()
+                    responses = await response.json(content_type=None)
+        except Exception as error:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        # A node answers a batch with an array, but a single error object if the batch itself is invalid
+        if isinstance(responses, dict):
+            responses = [responses]
+
+        for response in responses:
+            future = futures.pop(response.get("id"), None)
+            if future is None or future.done():
+                continue
+            if "error" in response:
+                error = response["error"]
+                future.set_exception(
+                    RpcError(error.get("code"), error.get("message"), error.get("data"))
+                )
+            else:
+                future.set_result(response.get("result"))
+
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(RpcError(-32603, "Missing response in batch"))
+
+
+#######################
+#                     #
+#     Hub Queries     #
+#                     #
+#######################
+
+
+def to_uint256(value: int) -> Tuple[int, int]:
+    return value % 2**128, value // 2**128
+
+
+def from_uint256(low: int, high: int) -> int:
+    return low + high * 2**128
+
+
+# @notice Quote every (amount, solver) combination of a trade with a single round trip
+# @return amounts_out - amounts_out[(amount_in, solver_id)] token_out amount returned by the hub
+async def get_amounts_out_with_solvers(
+    client: QuoteClient,
+    hub_address: int,
+    amounts_in: Sequence[int],
+    token_in: int,
+    token_out: int,
+    solver_ids: Sequence[int],
+    block_id=None,
+) -> Dict[Tuple[int, int], int]:
+    keys = [
+        (amount_in, solver_id) for amount_in in amounts_in for solver_id in solver_ids
+    ]
+    calls = [
+        Call(
+            hub_address,
+            "get_amount_out_with_solver",
+            (*to_uint256(amount_in), token_in, token_out, solver_id),
+        )
+        for amount_in, solver_id in keys
+    ]
+    results = await client.call_many(calls, block_id)
+    return {key: from_uint256(*result[:2]) for key, result in zip(keys, results)}
+
+
+# @notice Decode the (routers, path, amounts, amount_out) returned by get_amount_and_path_with_solver
+def decode_amount_and_path(
+    result: Sequence[int],
+) -> Tuple[List[Router], List[Path], List[int], int]:
+    routers_len = result[0]
+    routers = [
+        Router(*result[1 + 2 * index : 3 + 2 * index]) for index in range(routers_len)
+    ]
+    offset = 1 + 2 * routers_len
+    path = [
+        Path(*result[offset + 1 + 2 * index : offset + 3 + 2 * index])
+        for index in range(result[offset])
+    ]
+    offset += 1 + 2 * len(path)
+    amounts = list(result[offset + 1 : offset + 1 + result[offset]])
+    offset += 1 + len(amounts)
+    return routers, path, amounts, from_uint256(*result[offset : offset + 2])
+
+
+# @notice Trading path and amount out of one solver, as the hub would execute it
+async def get_amount_and_path_with_solver(
+    client: QuoteClient,
+    hub_address: int,
+    amount_in: int,
+    token_in: int,
+    token_out: int,
+    solver_id: int,
+    block_id=None,
+) -> Tuple[List[Router], List[Path], List[int], int]:
+    call = Call(
+        hub_address,
+        "get_amount_and_path_with_solver",
+        (*to_uint256(amount_in), token_in, token_out, solver_id),
+    )
+    return decode_amount_and_path(await client.call(call, block_id))
+
+
+# @notice Calldata of Hub.swap_with_path for a route returned by get_amount_and_path_with_solver
+# @dev Hub.swap_with_path doesn't check the route against the quote, min_amount_out should leave room for
+#      the route going stale until the swap is included
+def swap_with_path_calldata(
+    routers: Sequence[Router],
+    path: Sequence[Path],
+    amounts: Sequence[int],
+    amount_in: int,
+    min_amount_out: int,
+) -> List[int]:
+    return [
+        len(routers),
+        *itertools.chain.from_iterable(routers),
+        len(path),
+        *itertools.chain.from_iterable(path),
+        len(amounts),
+        *amounts,
+        *to_uint256(amount_in),
+        *to_uint256(min_amount_out),
+    ]
+
+
+@dataclass(frozen=True)
+class CommittedPath:
+    """Trading path of a solver with the commitment that Hub.swap_with_commitment checks it against"""
+
+    routers: Tuple[Router, ...]
+    path: Tuple[Path, ...]
+    amounts: Tuple[int, ...]
+    amount_out: int
+    solver_id: int
+    # Account the commitment was quoted for, only it can swap the path
+    account: int
+    # Block the path was computed at
+    block_number: int
+    commitment: int
+
+    # @notice Calldata of Hub.swap_with_commitment
+    # @dev Has to be sent by self.account. min_amount_out should leave room for the path going stale until
+    #      the swap is included
+    def swap_calldata(self, amount_in: int, min_amount_out: int, to: int) -> List[int]:
+        return [
+            len(self.routers),
+            *itertools.chain.from_iterable(self.routers),
+            len(self.path),
+            *itertools.chain.from_iterable(self.path),
+            len(self.amounts),
+            *self.amounts,
+            *to_uint256(amount_in),
+            *to_uint256(min_amount_out),
+            to,
+            self.solver_id,
+            self.block_number,
+            self.commitment,
+        ]
+
+
+# @notice Python port of Hub.path_commitment
+def path_commitment(
+    routers: Sequence[Router],
+    path: Sequence[Path],
+    amounts: Sequence[int],
+    solver_id: int,
+    block_number: int,
+    account: int,
+    nonce: int,
+    key: int,
+) -> int:
+    from starkware.cairo.common.hash_state import compute_hash_on_elements
+
+    return compute_hash_on_elements(
+        [
+            key,
+            account,
+            nonce,
+            solver_id,
+            block_number,
+            len(routers),
+            *itertools.chain.from_iterable(routers),
+            len(path),
+            *itertools.chain.from_iterable(path),
+            len(amounts),
+            *amounts,
+        ]
+    )
+
+
+# @notice Trading path of one solver with a commitment, to be swapped by account without running the solver again
+async def get_amount_and_path_with_commitment(
+    client: QuoteClient,
+    hub_address: int,
+    amount_in: int,
+    token_in: int,
+    token_out: int,
+    solver_id: int,
+    account: int,
+    block_id=None,
+) -> CommittedPath:
+    call = Call(
+        hub_address,
+        "get_amount_and_path_with_commitment",
+        (*to_uint256(amount_in), token_in, token_out, solver_id, account),
+    )
+    result = await client.call(call, block_id)
+    routers, path, amounts, amount_out = decode_amount_and_path(result)
+    block_number, commitment = result[-2:]
+    return CommittedPath(
+        tuple(routers),
+        tuple(path),
+        tuple(amounts),
+        amount_out,
+        solver_id,
+        account,
+        block_number,
+        commitment,
+    )
+
+
+# @notice Fetch ERC20 balances of an account for several tokens with a single round trip
+async def get_balances(
+    client: QuoteClient, token_addresses: Sequence[int], owner: int, block_id=None
+) -> List[int]:
+    calls = [
+        Call(token_address, "balanceOf", (owner,)) for token_address in token_addresses
+    ]
+    results = await client.call_many(calls, block_id)
+    return [from_uint256(*result[:2]) for result in results]
+
+
+############################
+#                          #
+#     Aggregator Queries   #
+#                          #
+############################
+
+
+def encode_trades(trades: Sequence[Trade]) -> List[int]:
+    calldata = [len(trades)]
+    for trade in trades:
+        calldata.extend((trade.token_in, trade.token_out, *to_uint256(trade.amount_in)))
+    return calldata
+
+
+def encode_pairs(pairs: Sequence[Path]) -> List[int]:
+    calldata = [len(pairs)]
+    for pair in pairs:
+        calldata.extend(pair)
+    return calldata
+
+
+# @notice Decode the (amounts_out, routers) arrays returned by get_single_best_router_batch
+# @return best_routers - (amount_out, router) of every trade
+def decode_best_routers(result: Sequence[int]) -> List[Tuple[int, Router]]:
+    amounts_len = result[0]
+    amounts = [
+        from_uint256(*result[1 + 2 * index : 3 + 2 * index])
+        for index in range(amounts_len)
+    ]
+    routers_start = 2 + 2 * amounts_len
+    routers = [
+        Router(*result[routers_start + 2 * index : routers_start + 2 + 2 * index])
+        for index in range(result[routers_start - 1])
+    ]
+    return list(zip(amounts, routers))
+
+
+# @notice Decode the arrays returned by get_all_routers_and_reserves_batch
+# @dev The reserves and routers of all pairs are concatenated, counts holds the number of routers of each pair
+# @return reserves - (reserves_a, reserves_b, routers) of every pair, same as get_all_routers_and_reserves
+def decode_reserves_batch(result: Sequence[int]):
+    counts_len = result[0]
+    counts = result[1 : 1 + counts_len]
+    offset = 1 + counts_len
+
+    def read_array(offset: int, to_item):
+        length = result[offset]
+        items = [
+            to_item(*result[offset + 1 + 2 * index : offset + 3 + 2 * index])
+            for index in range(length)
+        ]
+        return items, offset + 1 + 2 * length
+
+    reserves_a, offset = read_array(offset, from_uint256)
+    reserves_b, offset = read_array(offset, from_uint256)
+    routers, _ = read_array(offset, Router)
+
+    pairs = []
+    start = 0
+    for count in counts:
+        stop = start + count
+        pairs.append(
+            (reserves_a[start:stop], reserves_b[start:stop], routers[start:stop])
+        )
+        start = stop
+    return pairs
+
+
+# @notice Best router and amount of many trades with a single aggregator call
+async def get_single_best_router_batch(
+    client: QuoteClient,
+    router_aggregator_address: int,
+    trades: Sequence[Trade],
+    block_id=None,
+) -> List[Tuple[int, Router]]:
+    call = Call(
+        router_aggregator_address,
+        "get_single_best_router_batch",
+        tuple(encode_trades(trades)),
+    )
+    return decode_best_routers(await client.call(call, block_id))
+
+
+# @notice Reserves of every router for many token pairs with a single aggregator call
+async def get_all_routers_and_reserves_batch(
+    client: QuoteClient,
+    router_aggregator_address: int,
+    pairs: Sequence[Path],
+    block_id=None,
+):
+    call = Call(
+        router_aggregator_address,
+        "get_all_routers_and_reserves_batch",
+        tuple(encode_pairs(pairs)),
+    )
+    return decode_reserves_batch(await client.call(call, block_id))
+
+
+# @notice Build a MarketSnapshot of every pair between the given tokens
+# @dev Routers and reserves are read at the same block, all reserves come from one aggregator call
+async def fetch_market_snapshot(
+    client: QuoteClient,
+    router_aggregator_address: int,
+    tokens: Sequence[int],
+    block_id=None,
+) -> MarketSnapshot:
+    routers_len_call = Call(router_aggregator_address, "get_router_index_len")
+    if block_id is None:
+        block_number, (routers_len,) = await asyncio.gather(
+            client.block_number(), client.call(routers_len_call)
+        )
+        block_id = {"block_number": block_number}
+    else:
+        block_number = (
+            block_id.get("block_number") if isinstance(block_id, dict) else None
+        )
+        (routers_len,) = await client.call(routers_len_call, block_id)
+
+    pairs = [
+        Path(token_a, token_b)
+        for index, token_a in enumerate(tokens)
+        for token_b in tokens[index + 1 :]
+    ]
+    router_calls = [
+        Call(router_aggregator_address, "get_router", (index,))
+        for index in range(routers_len)
+    ]
+    routers, reserves = await asyncio.gather(
+        client.call_many(router_calls, block_id),
+        get_all_routers_and_reserves_batch(
+            client, router_aggregator_address, pairs, block_id
+        ),
+    )
+
+    snapshot = MarketSnapshot(block_number=block_number)
+    for router in routers:
+        snapshot.add_router(*router[:2])
+    for pair, (reserves_a, reserves_b, pair_routers) in zip(pairs, reserves):
+        for reserve_a, reserve_b, router in zip(reserves_a, reserves_b, pair_routers):
+            snapshot.set_reserves(
+                router.address, pair.token_in, pair.token_out, reserve_a, reserve_b
+            )
+    return snapshot
+
+
+###########################
+#                         #
+#      Reserve Store      #
+#                         #
+###########################
+
+# Reserves view of each pool type, only the router types the aggregator resolves pairs for
+POOL_RESERVES = {JediSwap: "get_reserves", TenK: "getReserves"}
+
+
+# @notice Decode get_reserves (Uint256 reserves) or getReserves (felt reserves) of a pool
+# @return reserves - (reserve0, reserve1) in the token order of the pool
+def decode_pool_reserves(router_type: int, result: Sequence[int]) -> Tuple[int, int]:
+    if router_type == JediSwap:
+        return from_uint256(*result[0:2]), from_uint256(*result[2:4])
+    return result[0], result[1]
+
+
+# @notice Read the reserves of many pools with a single round trip
+# @param pools - (router, pool address) of every pool
+async def get_pool_reserves(
+    client: QuoteClient, pools: Sequence[Tuple[Router, int]], block_id=None
+) -> List[Tuple[int, int]]:
+    calls = [Call(address, POOL_RESERVES[router.type]) for router, address in pools]
+    results = await client.call_many(calls, block_id)
+    return [
+        decode_pool_reserves(router.type, result)
+        for (router, _), result in zip(pools, results)
+    ]
+
+
+# @notice Write a ReserveStore of every pool the aggregator knows between the given tokens
+# @dev Pools are resolved with get_pair_info and read directly, everything is read at the same block
+#      with one batched round trip per step (block, routers, pools, reserves)
+# @param block_id - {"block_number": n} as the store records its block, defaults to the latest block
+async def crawl_reserve_store(
+    client: QuoteClient,
+    router_aggregator_address: int,
+    tokens: Sequence[int],
+    directory: str,
+    high_liq_tokens: Sequence[int] = (),
+    block_id=None,
+) -> ReserveStore:
+    if block_id is None:
+        block_id = {"block_number": await client.block_number()}
+    block_number = block_id["block_number"]
+
+    (routers_len,) = await client.call(
+        Call(router_aggregator_address, "get_router_index_len"), block_id
+    )
+    routers = [
+        Router(*router[:2])
+        for router in await client.call_many(
+            [
+                Call(router_aggregator_address, "get_router", (index,))
+                for index in range(routers_len)
+            ],
+            block_id,
+        )
+    ]
+
+    keys = [
+        (router, token_a, token_b)
+        for router in routers
+        if router.type in POOL_RESERVES
+        for index, token_a in enumerate(tokens)
+        for token_b in tokens[index + 1 :]
+    ]
+    pair_infos = await client.call_many(
+        [
+            Call(
+                router_aggregator_address, "get_pair_info", (*router, token_a, token_b)
+            )
+            for router, token_a, token_b in keys
+        ],
+        block_id,
+    )
+    pools = [
+        (router, token_a, token_b, address, token0)
+        for (router, token_a, token_b), (address, token0, *_) in zip(keys, pair_infos)
+        if address != 0
+    ]
+    reserves = await get_pool_reserves(
+        client, [(router, address) for router, _, _, address, _ in pools], block_id
+    )
+
+    pairs = [
+        PairReserves(
+            router,
+            address,
+            token0,
+            token_b if token0 == token_a else token_a,
+            reserve0,
+            reserve1,
+        )
+        for (router, token_a, token_b, address, token0), (reserve0, reserve1) in zip(
+            pools, reserves
+        )
+    ]
+    return ReserveStore.write(directory, pairs, block_number, routers, high_liq_tokens)
+
+
+# @notice Contracts whose storage changed in a range of blocks
+async def get_changed_contracts(
+    client: QuoteClient, from_block: int, to_block: int
+) -> Set[int]:
+    updates = await asyncio.gather(
+        *(
+            client.request(
+                "starknet_getStateUpdate", {"block_id": {"block_number": block}}
+            )
+            for block in range(from_block, to_block + 1)
+        )
+    )
+    return {
+        int(diff["address"], 16)
+        for update in updates
+        for diff in update["state_diff"]["storage_diffs"]
+    }
+
+
+# @notice Bring a ReserveStore to a later block, only the pools whose storage changed are read again
+# @dev Pools created after the store was crawled are not picked up, crawl the store again for those
+# @param block_id - {"block_number": n}, defaults to the latest block
+# @return store - The updated store
+async def refresh_reserve_store(
+    client: QuoteClient, directory: str, block_id=None
+) -> ReserveStore:
+    store = ReserveStore.open(directory)
+    if block_id is None:
+        block_id = {"block_number": await client.block_number()}
+    block_number = block_id["block_number"]
+    if block_number <= store.block_number:
+        return store
+
+    changed = await get_changed_contracts(client, store.block_number + 1, block_number)
+    rows = store.find(changed)
+    reserves = await get_pool_reserves(
+        client,
+        [(store[row].router, store[row].address) for row in rows],
+        block_id,
+    )
+    store.update(dict(zip(rows, reserves)), block_number)
+    return store
+
+
+##########################
+#                        #
+#      Live Market       #
+#                        #
+##########################
+
+# Emitted by the JediSwap and 10kSwap pairs with their new reserves, after every swap, mint and burn
+SYNC_EVENT = "Sync"
+
+
+# @notice Fetch the events with the given names emitted in a range of blocks, following the pagination
+async def get_events(
+    client: QuoteClient,
+    from_block: int,
+    to_block: int,
+    event_names: Sequence[str],
+    chunk_size: int = 1000,
+) -> List[Dict[str, Any]]:
+    event_filter = {
+        "from_block": {"block_number": from_block},
+        "to_block": {"block_number": to_block},
+        "keys": [hex(get_selector(name)) for name in event_names],
+        "chunk_size": chunk_size,
+    }
+    events = []
+    while True:
+        page = await client.request("starknet_getEvents", {"filter": event_filter})
+        events.extend(page["events"])
+        if not page.get("continuation_token"):
+            return events
+        event_filter = {
+            **event_filter,
+            "continuation_token": page["continuation_token"],
+        }
+
+
+# @notice USD prices of many tokens with a single aggregator call
+async def get_global_prices(
+    client: QuoteClient,
+    router_aggregator_address: int,
+    tokens: Sequence[int],
+    block_id=None,
+) -> List[int]:
+    call = Call(router_aggregator_address, "get_global_prices", (len(tokens), *tokens))
+    result = await client.call(call, block_id)
+    return [
+        from_uint256(*result[1 + 2 * index : 3 + 2 * index])
+        for index in range(result[0])
+    ]
+
+
+# @notice Apply the Sync events and prices of a range of blocks to a LiveMarket
+# @dev Sync carries the new reserves, the Swap events of the same transactions are not needed
+# @param price_tokens - Tokens whose aggregator price is read at to_block
+# @return applied - Number of Sync events of known pools
+async def update_live_market(
+    client: QuoteClient,
+    market: LiveMarket,
+    router_aggregator_address: int,
+    from_block: int,
+    to_block: int,
+    price_tokens: Sequence[int] = (),
+) -> int:
+    block_id = {"block_number": to_block}
+    events, prices = await asyncio.gather(
+        get_events(client, from_block, to_block, [SYNC_EVENT]),
+        get_global_prices(client, router_aggregator_address, price_tokens, block_id)
+        if price_tokens
+        else asyncio.sleep(0, []),
+    )
+
+    applied = 0
+    for event in events:
+        address = int(event["from_address"], 16)
+        pool = market.pools.get(address)
+        if pool is None:
+            continue
+        data = [int(value, 16) for value in event["data"]]
+        market.apply_sync(address, *decode_pool_reserves(pool[0].type, data))
+        applied += 1
+    for token, price in zip(price_tokens, prices):
+        market.apply_price(token, price)
+    market.snapshot.block_number = to_block
+    return applied
+
+
+# @notice Keep a LiveMarket up to date with every new block, runs until it is cancelled
+async def follow_live_market(
+    client: QuoteClient,
+    market: LiveMarket,
+    router_aggregator_address: int,
+    from_block: int,
+    price_tokens: Sequence[int] = (),
+    poll_interval: float = 1.0,
+):
+    next_block = from_block
+    while True:
+        block_number = await client.block_number()
+        if next_block <= block_number:
+            await update_live_market(
+                client,
+                market,
+                router_aggregator_address,
+                next_block,
+                block_number,
+                price_tokens,
+            )
+            next_block = block_number + 1
+        await asyncio.sleep(poll_interval)
@@ -0,0 +1,363 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from commercium.felt import CairoAssertionError
+from commercium.snapshot import MarketSnapshot, Path, Router, Trade, get_amount_out
+from commercium.solvers import graddesc, spf, split
+from commercium.trade_executor import multi_swap, simulate_multi_swap
+
+###############################
+#                             #
+#     AMM Market Simulator    #
+#                             #
+###############################
+
+# Python models of the contracts in src/mocks (pairs, routers and the price oracle) with the same
+# integer semantics, so solver output can be executed without protostar or a devnet.
+# Unlike the mocks, a swap moves the reserves of the pools it trades through, like the real AMMs.
+
+
+@dataclass
+class Pool:
+    token0: int
+    token1: int
+    reserve0: int
+    reserve1: int
+
+    # @notice The reserves of the sold and of the bought token
+    def get_reserves(self, token_in: int) -> Tuple[int, int]:
+        if token_in == self.token0:
+            return self.reserve0, self.reserve1
+        return self.reserve1, self.reserve0
+
+    def get_amount_out(self, amount_in: int, token_in: int) -> int:
+        reserve_in, reserve_out = self.get_reserves(token_in)
+        return get_amount_out(amount_in, reserve_in, reserve_out)
+
+    # @notice Sell amount_in of token_in and move the reserves accordingly
+    # @return amount_out - The number of tokens bought
+    def swap(self, amount_in: int, token_in: int) -> int:
+        amount_out = self.get_amount_out(amount_in, token_in)
+        if token_in == self.token0:
+            self.reserve0 += amount_in
+            self.reserve1 -= amount_out
+        else:
+            self.reserve1 += amount_in
+            self.reserve0 -= amount_out
+        return amount_out
+
+
+@dataclass
+class AmmRouter:
+    """Model of mock_jedi_router / mock_TenK_router, one constant product pool per token pair"""
+
+    router: Router
+    pools: Dict[Tuple[int, int], Pool] = field(default_factory=dict)
+
+    def set_reserves(self, token_a: int, token_b: int, reserve_a: int, reserve_b: int):
+        if token_a < token_b:
+            self.pools[(token_a, token_b)] = Pool(
+                token_a, token_b, reserve_a, reserve_b
+            )
+        else:
+            self.pools[(token_b, token_a)] = Pool(
+                token_b, token_a, reserve_b, reserve_a
+            )
+
+    def get_pool(self, token_a: int, token_b: int) -> Optional[Pool]:
+        return self.pools.get((min(token_a, token_b), max(token_a, token_b)))
+
+    def get_reserves(self, token_a: int, token_b: int) -> Tuple[int, int]:
+        pool = self.get_pool(token_a, token_b)
+        if pool is None:
+            return 0, 0
+        return pool.get_reserves(token_a)
+
+    # @notice Equivalent of get_amounts_out / getAmountsOut
+    def get_amounts_out(self, amount_in: int, path: Sequence[int]) -> List[int]:
+        amounts = [amount_in]
+        for token_in, token_out in zip(path, path[1:]):
+            amounts.append(
+                self._pool(token_in, token_out).get_amount_out(amounts[-1], token_in)
+            )
+        return amounts
+
+    # @notice Equivalent of swap_exact_tokens_for_tokens / swapExactTokensForTokens
+    # @return amounts - The amount of every token along the path
+    def swap_exact_tokens_for_tokens(
+        self, amount_in: int, path: Sequence[int]
+    ) -> List[int]:
+        amounts = [amount_in]
+        for token_in, token_out in zip(path, path[1:]):
+            amounts.append(self._pool(token_in, token_out).swap(amounts[-1], token_in))
+        return amounts
+
+    def _pool(self, token_in: int, token_out: int) -> Pool:
+        pool = self.get_pool(token_in, token_out)
+        if pool is None or pool.reserve0 == 0:
+            raise CairoAssertionError(
+                f"Token Pair has no Liquidity. Token1 {token_in} Token2 {token_out}"
+            )
+        return pool
+
+
+@dataclass
+class PriceOracle:
+    """Model of mock_price_oracle"""
+
+    prices: Dict[int, Tuple[int, int]] = field(default_factory=dict)
+
+    def set_token_price(self, key: int, price: int, decimals: int):
+        self.prices[key] = (price, decimals)
+
+    # @return value, decimals, last_updated_timestamp, num_sources_aggregated
+    def get_spot_median(self, key: int) -> Tuple[int, int, int, int]:
+        value, decimals = self.prices.get(key, (0, 0))
+        return value, decimals, 0, 0
+
+
+@dataclass
+class AmmMarket:
+    """The routers, pools and oracle a MarketSnapshot is read from"""
+
+    routers: List[AmmRouter] = field(default_factory=list)
+    oracle: PriceOracle = field(default_factory=PriceOracle)
+    # token -> oracle key, like RouterAggregator.price_feed
+    price_feeds: Dict[int, int] = field(default_factory=dict)
+    high_liq_tokens: List[int] = field(default_factory=list)
+    block_number: Optional[int] = None
+
+    @classmethod
+    def from_snapshot(cls, snapshot: MarketSnapshot) -> "AmmMarket":
+        market = cls(
+            high_liq_tokens=list(snapshot.high_liq_tokens),
+            block_number=snapshot.block_number,
+        )
+        routers = {}
+        for router in snapshot.routers:
+            routers[router.address] = market.add_router(router.address, router.type)
+        for (address, token_a, token_b), reserves in snapshot.reserves.items():
+            if token_a < token_b and address in routers:
+                routers[address].set_reserves(token_a, token_b, *reserves)
+        # Snapshot prices are already scaled to 1e18
+        for token, price in snapshot.prices.items():
+            market.set_price(token, price, 18)
+        return market
+
+    def add_router(self, address: int, router_type: int) -> AmmRouter:
+        router = AmmRouter(Router(address, router_type))
+        self.routers.append(router)
+        return router
+
+    def get_router(self, router: Router) -> AmmRouter:
+        for amm_router in self.routers:
+            if amm_router.router == router:
+                return amm_router
+        raise CairoAssertionError(f"Router {router.address} doesn't exist")
+
+    def set_reserves(
+        self,
+        router_address: int,
+        token_a: int,
+        token_b: int,
+        reserve_a: int,
+        reserve_b: int,
+    ):
+        for router in self.routers:
+            if router.router.address == router_address:
+                router.set_reserves(token_a, token_b, reserve_a, reserve_b)
+                return
+        raise CairoAssertionError(f"Router {router_address} doesn't exist")
+
+    # @notice Register the oracle price of a token, the token address is used as the feed key
+    def set_price(self, token: int, value: int, decimals: int = 18):
+        self.price_feeds[token] = token
+        self.oracle.set_token_price(token, value, decimals)
+
+    def swap_exact_tokens_for_tokens(
+        self, router: Router, amount_in: int, path: Sequence[int]
+    ) -> List[int]:
+        return self.get_router(router).swap_exact_tokens_for_tokens(amount_in, path)
+
+    # @notice Freeze the current state into the snapshot the solvers read
+    def snapshot(self) -> MarketSnapshot:
+        snapshot = MarketSnapshot(
+            routers=[router.router for router in self.routers],
+            high_liq_tokens=list(self.high_liq_tokens),
+            block_number=self.block_number,
+        )
+        for router in self.routers:
+            for pool in router.pools.values():
+                snapshot.set_reserves(
+                    router.router.address,
+                    pool.token0,
+                    pool.token1,
+                    pool.reserve0,
+                    pool.reserve1,
+                )
+        for token, key in self.price_feeds.items():
+            value, decimals, _, _ = self.oracle.get_spot_median(key)
+            snapshot.set_price(token, value, decimals)
+        return snapshot
+
+    # @notice Execute a trading path the way Hub.swap_with_path and multi_swap_exact_in do
+    # @return received_amount - The number of path[-1].token_out tokens received
+    def execute(
+        self,
+        routers: Sequence[Router],
+        path: Sequence[Path],
+        amounts: Sequence[int],
+        amount_in: int,
+    ) -> int:
+        token_balances = multi_swap(self, routers, path, amounts, amount_in)
+        return token_balances.get(path[-1].token_out, 0)
+
+
+##########################
+#                        #
+#     Backtesting        #
+#                        #
+##########################
+
+# A solver takes a snapshot and (amount_in, token_in, token_out) and returns (routers, path, amounts).
+# Solvers have to be module level functions so that they can be sent to the worker processes.
+Solver = Callable[[MarketSnapshot, int, int, int], tuple]
+
+SOLVERS: Dict[str, Solver] = {
+    "spf": spf.get_results,
+    "graddesc": graddesc.get_results,
+    "split": split.get_results,
+}
+
+
+@dataclass(frozen=True)
+class BacktestResult:
+    state: int
+    trade: int
+    solver: str
+    # Amount of token_out the solver's path was quoted at (simulate_multi_swap on the snapshot)
+    quoted: int = 0
+    # Amount of token_out received when executing the path against the state
+    executed: int = 0
+    hops: int = 0
+    error: Optional[str] = None
+
+
+# @notice Quote and execute every trade with every solver on one market state
+# @dev Every trade is executed on a fresh copy of the state, so the trades don't influence each other
+def run_state(
+    state: int,
+    snapshot: MarketSnapshot,
+    trades: Sequence[Trade],
+    solvers: Sequence[str],
+) -> List[BacktestResult]:
+    results = []
+    for trade_nr, trade in enumerate(trades):
+        for name in solvers:
+            try:
+                routers, path, amounts = SOLVERS[name](
+                    snapshot, trade.amount_in, trade.token_in, trade.token_out
+                )
+                if not path:
+                    raise CairoAssertionError("no trading path found")
+                quoted = simulate_multi_swap(
+                    snapshot, routers, path, amounts, trade.amount_in
+                )
+                executed = AmmMarket.from_snapshot(snapshot).execute(
+                    routers, path, amounts, trade.amount_in
+                )
+            except CairoAssertionError as error:
+                results.append(BacktestResult(state, trade_nr, name, error=str(error)))
+                continue
+            results.append(
+                BacktestResult(state, trade_nr, name, quoted, executed, len(path))
+            )
+    return results
+
+
+def _run_state(args) -> List[BacktestResult]:
+    return run_state(*args)
+
+
+# @notice Run every solver on every trade for every market state
+# @param states - The market states to replay (historical or see synthetic_states)
+# @param trades - The trades to quote and execute on each state
+# @param solvers - Names of the solvers in SOLVERS
+# @param processes - Number of worker processes, 1 runs everything in this process
+# @return results - One result per (state, trade, solver), ordered like the inputs
+def backtest(
+    states: Iterable[MarketSnapshot],
+    trades: Sequence[Trade],
+    solvers: Sequence[str] = tuple(SOLVERS),
+    processes: Optional[int] = None,
+    chunksize: int = 16,
+) -> List[BacktestResult]:
+    for name in solvers:
+        if name not in SOLVERS:
+            raise ValueError(f"Unknown solver {name}, expected one of {list(SOLVERS)}")
+
+    jobs = [(state, snapshot, trades, solvers) for state, snapshot in enumerate(states)]
+    if processes == 1:
+        batches = map(_run_state, jobs)
+        return [result for batch in batches for result in batch]
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        batches = executor.map(_run_state, jobs, chunksize=chunksize)
+        return [result for batch in batches for result in batch]
+
+
+# @notice Generate market states by randomly moving the reserves of every pool of a base state
+# @param volatility - Maximum relative change of each reserve (0.1 = +-10%)
+def synthetic_states(
+    base: MarketSnapshot, count: int, volatility: float = 0.1, seed: int = 0
+) -> Iterable[MarketSnapshot]:
+    rng = random.Random(seed)
+    for _ in range(count):
+        snapshot = MarketSnapshot(
+            routers=list(base.routers),
+            prices=dict(base.prices),
+            high_liq_tokens=list(base.high_liq_tokens),
+            block_number=base.block_number,
+        )
+        for (address, token_a, token_b), (
+            reserve_a,
+            reserve_b,
+        ) in base.reserves.items():
+            if token_a < token_b:
+                snapshot.set_reserves(
+                    address,
+                    token_a,
+                    token_b,
+                    int(reserve_a * (1 + rng.uniform(-volatility, volatility))),
+                    int(reserve_b * (1 + rng.uniform(-volatility, volatility))),
+                )
+        yield snapshot
+
+
+# @notice Aggregate backtest results per solver
+# @return summary - solver -> number of trades, failures, wins (highest executed amount of a trade,
+#         ties count for every solver), total executed amount and total quote - execution difference
+def summarize(results: Sequence[BacktestResult]) -> Dict[str, Dict[str, int]]:
+    best: Dict[Tuple[int, int], int] = {}
+    for result in results:
+        if result.error is None:
+            key = (result.state, result.trade)
+            best[key] = max(best.get(key, 0), result.executed)
+
+    summary: Dict[str, Dict[str, int]] = {}
+    for result in results:
+        stats = summary.setdefault(
+            result.solver,
+            {"trades": 0, "failures": 0, "wins": 0, "executed": 0, "slippage": 0},
+        )
+        stats["trades"] += 1
+        if result.error is not None:
+            stats["failures"] += 1
+            continue
+        stats["executed"] += result.executed
+        stats["slippage"] += result.quoted - result.executed
+        if result.executed == best[(result.state, result.trade)]:
+            stats["wins"] += 1
+    return summary
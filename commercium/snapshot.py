@@ -0,0 +1,147 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from commercium.constants import BASE, BASE_8, FEE_DENOMINATOR, FEE_NUMERATOR
+from commercium.felt import felt_fmul, uint256_add, uint256_mul
+
+###########################
+#                         #
+#     Market Snapshot     #
+#                         #
+###########################
+
+
+# Same layout as the Router/Path structs in src/lib/utils.cairo
+class Router(NamedTuple):
+    address: int
+    type: int
+
+
+class Path(NamedTuple):
+    token_in: int
+    token_out: int
+
+
+class Trade(NamedTuple):
+    token_in: int
+    token_out: int
+    amount_in: int
+
+
+# @notice Transform an Empiric oracle answer the same way RouterAggregator.get_global_price does
+# @param value - The price returned by get_spot_median (None if no feed is registered for the token)
+# @param decimals - The number of decimals of value
+# @return price - USD token price scaled to 1e18
+def price_from_feed(value: Optional[int], decimals: int = 0) -> int:
+    if value is None:
+        return 100 * BASE_8
+    if decimals == 8:
+        return felt_fmul(value, BASE, BASE_8)
+    return value
+
+
+# @notice Constant product formula used by the supported routers (get_amounts_out)
+def get_amount_out(amount_in: int, reserve_in: int, reserve_out: int) -> int:
+    if reserve_in == 0 or reserve_out == 0:
+        return 0
+    feed_amount = uint256_mul(amount_in, FEE_NUMERATOR)
+    numerator = uint256_mul(feed_amount, reserve_out)
+    denominator = uint256_add(uint256_mul(reserve_in, FEE_DENOMINATOR), feed_amount)
+    return numerator // denominator
+
+
+@dataclass
+class MarketSnapshot:
+    """Everything the solvers read from the router aggregator, frozen at one point in time.
+
+    routers are kept in the same order as the router aggregator storage (router id == list index),
+    reserves are stored for both token orderings so that lookups never have to check token0.
+    """
+
+    routers: List[Router] = field(default_factory=list)
+    reserves: Dict[Tuple[int, int, int], Tuple[int, int]] = field(default_factory=dict)
+    prices: Dict[int, int] = field(default_factory=dict)
+    high_liq_tokens: List[int] = field(default_factory=list)
+    block_number: Optional[int] = None
+
+    def add_router(self, address: int, router_type: int) -> int:
+        self.routers.append(Router(address, router_type))
+        return len(self.routers) - 1
+
+    def set_reserves(
+        self,
+        router_address: int,
+        token_a: int,
+        token_b: int,
+        reserve_a: int,
+        reserve_b: int,
+    ):
+        self.reserves[(router_address, token_a, token_b)] = (reserve_a, reserve_b)
+        self.reserves[(router_address, token_b, token_a)] = (reserve_b, reserve_a)
+
+    def set_price(self, token: int, value: Optional[int], decimals: int = 18):
+        self.prices[token] = price_from_feed(value, decimals)
+
+    # @notice Equivalent of IRouterAggregator.get_global_price (without the decimals)
+    def get_global_price(self, token: int) -> int:
+        price = self.prices.get(token)
+        if price is None:
+            return price_from_feed(None)
+        return price
+
+    # @notice Equivalent of RouterAggregator.get_router_reserves
+    def get_router_reserves(
+        self, token_a: int, token_b: int, router: Router
+    ) -> Tuple[int, int]:
+        return self.reserves.get((router.address, token_a, token_b), (0, 0))
+
+    # @notice Equivalent of RouterAggregator.get_router_amount
+    def get_router_amount(
+        self, amount_in: int, token_in: int, token_out: int, router: Router
+    ) -> int:
+        reserve_in, reserve_out = self.get_router_reserves(token_in, token_out, router)
+        return get_amount_out(amount_in, reserve_in, reserve_out)
+
+    # @notice Equivalent of IRouterAggregator.get_single_best_router
+    # @dev Routers are iterated from the last id to the first one and ties go to the later iteration,
+    #      exactly like RouterAggregator.find_best_router
+    def get_single_best_router(
+        self, amount_in: int, token_in: int, token_out: int
+    ) -> Tuple[int, Router]:
+        best_amount, best_router = 0, Router(0, 0)
+        for router in reversed(self.routers):
+            amount = self.get_router_amount(amount_in, token_in, token_out, router)
+            if best_amount <= amount:
+                best_amount, best_router = amount, router
+        return best_amount, best_router
+
+    # @notice Equivalent of IRouterAggregator.get_all_routers_and_reserves
+    # @dev Routers with an empty reserve are skipped, the order is the reversed storage order
+    def get_all_routers_and_reserves(self, token_a: int, token_b: int):
+        reserves_a, reserves_b, routers = [], [], []
+        for router in reversed(self.routers):
+            reserve_a, reserve_b = self.get_router_reserves(token_a, token_b, router)
+            if reserve_a == 0 or reserve_b == 0:
+                continue
+            reserves_a.append(reserve_a)
+            reserves_b.append(reserve_b)
+            routers.append(router)
+        return reserves_a, reserves_b, routers
+
+    # @notice Equivalent of IRouterAggregator.get_single_best_router_batch
+    def get_single_best_router_batch(
+        self, trades: Sequence[Trade]
+    ) -> List[Tuple[int, Router]]:
+        return [
+            self.get_single_best_router(
+                trade.amount_in, trade.token_in, trade.token_out
+            )
+            for trade in trades
+        ]
+
+    # @notice Equivalent of IRouterAggregator.get_all_routers_and_reserves_batch
+    def get_all_routers_and_reserves_batch(self, pairs: Sequence[Path]):
+        return [
+            self.get_all_routers_and_reserves(pair.token_in, pair.token_out)
+            for pair in pairs
+        ]
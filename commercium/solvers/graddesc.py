@@ -0,0 +1,499 @@
+from math import isqrt
+from typing import List, NamedTuple, Sequence, Tuple
+
+from commercium.constants import BASE, FEE_DENOMINATOR, FEE_NUMERATOR, PRIME, RC_BOUND
+from commercium.felt import (
+    CairoAssertionError,
+    felt,
+    felt_fdiv,
+    felt_fmul,
+    is_le,
+    sqrt_felt,
+    uint256_low,
+    unsigned_div_rem,
+)
+from commercium.snapshot import MarketSnapshot, Path, Router
+
+try:
+    import numpy as np
+except ImportError:  # get_results_batch falls back to one get_results call per amount
+    np = None
+
+#############################################################################
+#                                                                           #
+#   Off-chain reference implementation of src/solvers/graddesc_solver.cairo #
+#                                                                           #
+#############################################################################
+
+# Same values (and names) as the contract
+MAX_ITTERATIONS = 12
+STEP_SIZE = 50000000000000000  # 0.1
+MAX_STEP_REDUCTION = 3
+STEP_DECREASE_FACTOR = 5
+KICK_THRESHOLD = 80000000000000000  # 8%
+
+# Used to shrink big gradients before squaring them
+SHRINK_FACTOR = 1000000000
+
+
+class PreCalc(NamedTuple):
+    feed_reserve: int  # fee * reserve_out
+    based_reserve: int  # fee_base * reserve_in
+    gradient_nominator: int  # feed_reserve * based_reserve
+
+
+def set_pre_calculations(
+    reserves_in: Sequence[int], reserves_out: Sequence[int]
+) -> List[PreCalc]:
+    pre_calcs = []
+    for reserve_in, reserve_out in zip(reserves_in, reserves_out):
+        feed_reserve = felt(FEE_NUMERATOR * uint256_low(reserve_out))
+        based_reserve = felt(FEE_DENOMINATOR * uint256_low(reserve_in))
+        pre_calcs.append(
+            PreCalc(feed_reserve, based_reserve, felt(feed_reserve * based_reserve))
+        )
+    return pre_calcs
+
+
+def get_amount_out(pre_calc: PreCalc, amount_in: int) -> int:
+    numerator = felt(amount_in * pre_calc.feed_reserve)
+    denominator = felt(pre_calc.based_reserve + amount_in * FEE_NUMERATOR)
+    amount_out, _ = unsigned_div_rem(numerator, denominator)
+    return amount_out
+
+
+def objective_func(pre_calcs: Sequence[PreCalc], amounts: Sequence[int]) -> int:
+    total_received_token_amount = 0
+    for pre_calc, amount in zip(pre_calcs, amounts):
+        total_received_token_amount = felt(
+            total_received_token_amount + get_amount_out(pre_calc, amount)
+        )
+    return total_received_token_amount
+
+
+def sum_amounts_and_fees(amounts: Sequence[int]) -> int:
+    return felt(sum(amount * FEE_NUMERATOR for amount in amounts))
+
+
+# @return gradient - absolute value of the gradient
+# @return symbol - 1 if the gradient is positive, 0 if it is negative
+def gradient_x(
+    pre_calc_x: PreCalc, pre_calc_last: PreCalc, amount: int, amounts_sum: int
+) -> Tuple[int, int]:
+    # Right Side
+    denominator_right = felt(
+        (FEE_NUMERATOR + pre_calc_last.based_reserve + amounts_sum) ** 2
+    )
+    division, _ = unsigned_div_rem(denominator_right, BASE)
+    division2, _ = unsigned_div_rem(pre_calc_last.gradient_nominator, BASE)
+    gradient_right = felt_fdiv(division2, division, BASE)
+
+    # Left Side
+    denominator_left = felt((FEE_NUMERATOR * amount + pre_calc_x.based_reserve) ** 2)
+    division3, _ = unsigned_div_rem(denominator_left, BASE)
+    division4, _ = unsigned_div_rem(pre_calc_x.gradient_nominator, BASE)
+    gradient_left = felt_fdiv(division4, division3, BASE)
+
+    # Preventing underflows, whilst continuing to use uint instead of int
+    if is_le(gradient_right, gradient_left):
+        return felt(gradient_left - gradient_right), 1
+    return felt(gradient_right - gradient_left), 0
+
+
+# @notice Gradients of every router except the last one, which absorbs the missing weight
+def gradient(
+    pre_calcs: Sequence[PreCalc], amounts: Sequence[int]
+) -> Tuple[List[int], List[int]]:
+    amounts_sum = sum_amounts_and_fees(amounts)
+    gradients, symbols = [], []
+    for router_index in range(len(amounts) - 1):
+        new_gradient, symbol = gradient_x(
+            pre_calcs[router_index], pre_calcs[-1], amounts[router_index], amounts_sum
+        )
+        gradients.append(new_gradient)
+        symbols.append(symbol)
+    return gradients, symbols
+
+
+def calc_inverse_norm(input_amount: int, gradients: Sequence[int]) -> int:
+    gradients_sum = 0
+    for gradient_value in gradients:
+        if is_le(BASE, gradient_value):
+            small_gradient, _ = unsigned_div_rem(gradient_value, SHRINK_FACTOR)
+            gradients_sum = felt(gradients_sum + small_gradient**2)
+        else:
+            gradients_sum = felt(gradients_sum + gradient_value**2)
+    norm = felt(sqrt_felt(gradients_sum) * SHRINK_FACTOR)
+    return felt_fdiv(input_amount, norm, BASE)
+
+
+def calc_new_amounts(
+    gradients: Sequence[int],
+    symbols: Sequence[int],
+    inverse_norm: int,
+    amounts: Sequence[int],
+    input_amount: int,
+    kick_amount: int,
+    step_size: int,
+) -> List[int]:
+    new_amounts = []
+    for gradient_value, symbol, amount in zip(gradients, symbols, amounts):
+        new_gradient = felt_fmul(inverse_norm, gradient_value, BASE)
+        delta_factor = felt_fmul(new_gradient, step_size, BASE)
+        new_amount = step_amount(symbol, amount, delta_factor, kick_amount)
+        # Max possible amount to be traded on one router is what the previous routers left of the input amount,
+        # otherwise the missing weight of the last router would underflow
+        if is_le(input_amount, new_amount):
+            new_amount = input_amount
+        new_amounts.append(new_amount)
+        input_amount = felt(input_amount - new_amount)
+    return new_amounts
+
+
+def step_amount(symbol: int, amount: int, delta_factor: int, kick_amount: int) -> int:
+    if symbol:
+        return felt(amount + delta_factor)
+    # Fix lower bound to 0
+    if is_le(amount - delta_factor, kick_amount):
+        return 0
+    return felt(amount - delta_factor)
+
+
+def missing_weight(input_amount: int, new_amounts: Sequence[int]) -> int:
+    return felt(input_amount - sum(new_amounts))
+
+
+# @notice Iterative version of the recursive gradient_descent of the contract
+# @return amounts - final trade amount of every router
+# @return out_amount - objective function value of the final amounts
+def gradient_descent(
+    pre_calcs: Sequence[PreCalc],
+    input_amount: int,
+    out_amount: int,
+    amounts: List[int],
+    kick_amount: int,
+) -> Tuple[List[int], int]:
+    step_size = STEP_SIZE
+    decrease_step_counter = MAX_STEP_REDUCTION
+
+    # A single router already trades the whole amount, its gradient norm would be 0
+    if len(amounts) == 1:
+        return amounts, out_amount
+
+    for _ in range(MAX_ITTERATIONS):
+        gradients, symbols = gradient(pre_calcs, amounts)
+        inverse_norm = calc_inverse_norm(input_amount, gradients)
+        new_amounts = calc_new_amounts(
+            gradients,
+            symbols,
+            inverse_norm,
+            amounts,
+            input_amount,
+            kick_amount,
+            step_size,
+        )
+        new_amounts.append(missing_weight(input_amount, new_amounts))
+
+        new_out_amount = objective_func(pre_calcs, new_amounts)
+
+        if is_le(out_amount, new_out_amount):
+            amounts, out_amount = new_amounts, new_out_amount
+        elif decrease_step_counter != 0:
+            # If less efficient, redo with last result and smaller stepsize
+            step_size, _ = unsigned_div_rem(step_size, STEP_DECREASE_FACTOR)
+            decrease_step_counter -= 1
+        else:
+            break
+
+    return amounts, out_amount
+
+
+def kick_zeros_and_build_output(
+    amounts: Sequence[int], routers: Sequence[Router], token_in: int, token_out: int
+) -> Tuple[List[Router], List[Path], List[int], int]:
+    kicked_routers, path, kicked_amounts = [], [], []
+    amounts_sum = 0
+    for amount, router in zip(amounts, routers):
+        if amount == 0:
+            continue
+        kicked_routers.append(router)
+        path.append(Path(token_in, token_out))
+        kicked_amounts.append(amount)
+        amounts_sum = felt(amounts_sum + amount)
+    return kicked_routers, path, kicked_amounts, amounts_sum
+
+
+def amounts_to_shares(amounts: Sequence[int], amounts_sum: int) -> List[int]:
+    if not amounts:
+        raise CairoAssertionError("GRADDESC: every trade amount was kicked")
+    shares = []
+    for amount in amounts[:-1]:
+        shares.append(felt_fmul(amount, BASE, amounts_sum))
+        amounts_sum = felt(amounts_sum - amount)
+    # The last share is always 100%
+    shares.append(BASE)
+    return shares
+
+
+def _build_results(amounts, routers, token_in, token_out):
+    kicked_routers, path, kicked_amounts, amounts_sum = kick_zeros_and_build_output(
+        amounts, routers, token_in, token_out
+    )
+    return kicked_routers, path, amounts_to_shares(kicked_amounts, amounts_sum)
+
+
+def _get_pre_calcs(snapshot: MarketSnapshot, token_in: int, token_out: int):
+    reserves_in, reserves_out, routers = snapshot.get_all_routers_and_reserves(
+        token_in, token_out
+    )
+    if not routers:
+        raise CairoAssertionError("GRADDESC: no router with liquidity for the pair")
+    return set_pre_calculations(reserves_in, reserves_out), routers
+
+
+# @notice Split a trade between every router trading the pair, like the graddesc solver contract
+# @param amount_in - Number of tokens to be sold
+# @param token_in - Address of the token to be sold
+# @param token_out - Address of the token to be bought
+# @return routers - Array of routers that are used in the trading path
+# @return path - Array of token pairs that are used in the trading path
+# @return amounts - Array of token amount that are used in the trading path
+def get_results(
+    snapshot: MarketSnapshot, amount_in: int, token_in: int, token_out: int
+):
+    pre_calcs, routers = _get_pre_calcs(snapshot, token_in, token_out)
+    input_amount = uint256_low(amount_in)
+
+    # Calculate minimum amount at which it is still viable to perform a trade at a DEX
+    kick_amount = felt_fmul(input_amount, KICK_THRESHOLD, BASE)
+
+    # Set starting weights
+    init_amount, _ = unsigned_div_rem(input_amount, len(routers))
+    amounts = [init_amount] * len(routers)
+    out_amount = objective_func(pre_calcs, amounts)
+
+    final_amounts, _ = gradient_descent(
+        pre_calcs, input_amount, out_amount, amounts, kick_amount
+    )
+    return _build_results(final_amounts, routers, token_in, token_out)
+
+
+#######################
+#                     #
+#   Batched Variant   #
+#                     #
+#######################
+
+# Element wise versions of the felt helpers, operating on numpy object arrays (exact python ints).
+# Instead of raising, they return a mask of the elements for which the contract would revert.
+
+
+def _felt(x):
+    return x % PRIME
+
+
+def _unsigned_div_rem(value, div):
+    value = _felt(value)
+    reverted = (div <= 0) | (div > PRIME // RC_BOUND)
+    quotient = value // np.where(reverted, 1, div)
+    reverted = np.asarray(reverted | (quotient >= RC_BOUND), dtype=bool)
+    return np.where(reverted, 0, quotient), reverted
+
+
+def _is_le(a, b):
+    return np.asarray(_felt(b - a) < RC_BOUND, dtype=bool)
+
+
+def _row_mask(mask, rows_len):
+    mask = (
+        np.broadcast_to(mask, (rows_len,) + mask.shape[1:])
+        if mask.ndim
+        else np.full(rows_len, bool(mask))
+    )
+    return mask.reshape(rows_len, -1).any(axis=1)
+
+
+def _objective_func(feed_reserves, based_reserves, amounts):
+    numerators = _felt(amounts * feed_reserves)
+    denominators = _felt(based_reserves + amounts * FEE_NUMERATOR)
+    amounts_out, reverted = _unsigned_div_rem(numerators, denominators)
+    return _felt(amounts_out.sum(axis=1)), _row_mask(reverted, len(amounts))
+
+
+# @notice Runs gradient_descent for many input amounts over the same routers at once
+# @dev Every row follows exactly the same control flow as its scalar counterpart,
+#      rows that stopped improving (or would revert) are masked out of the following iterations
+# @param pre_calcs - PreCalc of every router (shared by all the rows)
+# @param input_amounts - Amount of tokens sold, one per row
+# @return amounts - (len(input_amounts), len(pre_calcs)) array of trade amounts
+# @return out_amounts - objective function value of every row
+# @return reverted - True for the rows on which the contract would revert
+def gradient_descent_batch(pre_calcs: Sequence[PreCalc], input_amounts: Sequence[int]):
+    feed_reserves = np.array(
+        [pre_calc.feed_reserve for pre_calc in pre_calcs], dtype=object
+    )
+    based_reserves = np.array(
+        [pre_calc.based_reserve for pre_calc in pre_calcs], dtype=object
+    )
+    nominators = np.array(
+        [pre_calc.gradient_nominator for pre_calc in pre_calcs], dtype=object
+    )
+    routers_len = len(pre_calcs)
+    rows_len = len(input_amounts)
+
+    input_amounts = np.array(
+        [uint256_low(amount) for amount in input_amounts], dtype=object
+    )
+    kick_amounts, reverted = _unsigned_div_rem(input_amounts * KICK_THRESHOLD, BASE)
+
+    init_amounts, _ = _unsigned_div_rem(input_amounts, routers_len)
+    amounts = np.repeat(init_amounts[:, None], routers_len, axis=1)
+    out_amounts, objective_reverted = _objective_func(
+        feed_reserves, based_reserves, amounts
+    )
+    reverted |= objective_reverted
+
+    step_sizes = np.full(rows_len, STEP_SIZE, dtype=object)
+    decrease_step_counters = np.full(rows_len, MAX_STEP_REDUCTION, dtype=object)
+    # A single router already trades the whole amount, its gradient norm would be 0
+    active = ~reverted if routers_len > 1 else np.zeros(rows_len, dtype=bool)
+
+    # Only depend on the reserves, the contract recomputes them for every row and iteration
+    division2, division2_reverted = _unsigned_div_rem(nominators[-1:], BASE)
+    division4, division4_reverted = _unsigned_div_rem(nominators[:-1], BASE)
+    _isqrt = np.frompyfunc(isqrt, 1, 1)
+
+    for _ in range(MAX_ITTERATIONS):
+        rows = np.flatnonzero(active)
+        if rows.size == 0:
+            break
+        current = amounts[rows]
+        input_amount = input_amounts[rows][:, None]
+        rows_reverted = np.zeros(rows.size, dtype=bool)
+
+        # Gradients
+        if routers_len > 1:
+            rows_reverted |= bool(division2_reverted.any() or division4_reverted.any())
+        amounts_sum = _felt((current * FEE_NUMERATOR).sum(axis=1))[:, None]
+        denominator_right = _felt(
+            (FEE_NUMERATOR + based_reserves[-1] + amounts_sum) ** 2
+        )
+        division, mask = _unsigned_div_rem(denominator_right, BASE)
+        rows_reverted |= _row_mask(mask, rows.size)
+        gradient_right, mask = _unsigned_div_rem(division2 * BASE, division)
+        rows_reverted |= _row_mask(mask, rows.size)
+
+        denominator_left = _felt(
+            (FEE_NUMERATOR * current[:, :-1] + based_reserves[:-1]) ** 2
+        )
+        division3, mask = _unsigned_div_rem(denominator_left, BASE)
+        rows_reverted |= _row_mask(mask, rows.size)
+        gradient_left, mask = _unsigned_div_rem(division4 * BASE, division3)
+        rows_reverted |= _row_mask(mask, rows.size)
+
+        symbols = _is_le(gradient_right, gradient_left)
+        gradients = np.where(
+            symbols,
+            _felt(gradient_left - gradient_right),
+            _felt(gradient_right - gradient_left),
+        )
+
+        # Inverse norm
+        needs_to_be_shrunk = _is_le(BASE, gradients)
+        small_gradients, mask = _unsigned_div_rem(
+            np.where(needs_to_be_shrunk, gradients, 0), SHRINK_FACTOR
+        )
+        rows_reverted |= _row_mask(mask, rows.size)
+        small_gradients = np.where(needs_to_be_shrunk, small_gradients, gradients)
+        gradients_sum = _felt((small_gradients**2).sum(axis=1))
+        sqrt_reverted = np.asarray(gradients_sum >= 2**250, dtype=bool)
+        rows_reverted |= sqrt_reverted
+        norm = _felt(_isqrt(np.where(sqrt_reverted, 0, gradients_sum)) * SHRINK_FACTOR)[
+            :, None
+        ]
+        inverse_norm, mask = _unsigned_div_rem(input_amount * BASE, norm)
+        rows_reverted |= _row_mask(mask, rows.size)
+
+        # New amounts
+        new_gradients, mask = _unsigned_div_rem(inverse_norm * gradients, BASE)
+        rows_reverted |= _row_mask(mask, rows.size)
+        delta_factors, mask = _unsigned_div_rem(
+            new_gradients * step_sizes[rows][:, None], BASE
+        )
+        rows_reverted |= _row_mask(mask, rows.size)
+        increased = _felt(current[:, :-1] + delta_factors)
+        decreased = np.where(
+            _is_le(current[:, :-1] - delta_factors, kick_amounts[rows][:, None]),
+            0,
+            _felt(current[:, :-1] - delta_factors),
+        )
+        stepped = np.where(symbols, increased, decreased)
+        # Every router is capped at what the previous routers left, one column at a time
+        new_amounts = np.empty_like(current)
+        remaining = input_amount[:, 0]
+        for router_index in range(routers_len - 1):
+            new_amounts[:, router_index] = np.where(
+                _is_le(remaining, stepped[:, router_index]),
+                remaining,
+                stepped[:, router_index],
+            )
+            remaining = _felt(remaining - new_amounts[:, router_index])
+        new_amounts[:, -1] = remaining
+
+        new_out_amounts, mask = _objective_func(
+            feed_reserves, based_reserves, new_amounts
+        )
+        rows_reverted |= mask
+
+        # Same decision as the scalar version, applied row by row
+        improved = _is_le(out_amounts[rows], new_out_amounts) & ~rows_reverted
+        can_decrease = (
+            np.asarray(decrease_step_counters[rows] != 0, dtype=bool) & ~rows_reverted
+        )
+
+        accepted = rows[improved]
+        amounts[accepted] = new_amounts[improved]
+        out_amounts[accepted] = new_out_amounts[improved]
+
+        retried = rows[~improved & can_decrease]
+        step_sizes[retried] = step_sizes[retried] // STEP_DECREASE_FACTOR
+        decrease_step_counters[retried] = decrease_step_counters[retried] - 1
+
+        reverted[rows[rows_reverted]] = True
+        active[rows[~improved & ~can_decrease]] = False
+
+    return amounts, out_amounts, reverted
+
+
+# @notice get_results for many input amounts of the same pair (e.g. to build price impact curves)
+# @return results - One (routers, path, amounts) tuple per input amount, identical to get_results.
+#                   None for the amounts on which the contract would revert
+def get_results_batch(
+    snapshot: MarketSnapshot, amounts_in: Sequence[int], token_in: int, token_out: int
+):
+    if np is None:
+        results = []
+        for amount_in in amounts_in:
+            try:
+                results.append(get_results(snapshot, amount_in, token_in, token_out))
+            except CairoAssertionError:
+                results.append(None)
+        return results
+
+    if not amounts_in:
+        return []
+    try:
+        pre_calcs, routers = _get_pre_calcs(snapshot, token_in, token_out)
+    except CairoAssertionError:
+        return [None] * len(amounts_in)
+
+    final_amounts, _, reverted = gradient_descent_batch(pre_calcs, amounts_in)
+    results = []
+    for amounts, row_reverted in zip(final_amounts, reverted):
+        if row_reverted or not any(amounts):
+            results.append(None)
+        else:
+            results.append(
+                _build_results(amounts.tolist(), routers, token_in, token_out)
+            )
+    return results
@@ -0,0 +1,245 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from commercium.constants import BASE, EXTRA_BASE
+from commercium.felt import CairoAssertionError, fdiv, fmul
+from commercium.snapshot import MarketSnapshot, Path, Router, get_amount_out
+from commercium.solvers.spf import (
+    MAX_HOPS,
+    Edge,
+    Source,
+    construct_vertices,
+    get_weight,
+    path_from_predecessors,
+    shortest_path_faster,
+)
+from commercium.trade_executor import simulate_multi_swap
+
+#################################################################################
+#                                                                               #
+#   SPF graphs that are kept up to date with the market instead of rebuilt.     #
+#   Reserve and price updates only recompute the edges they touch.              #
+#                                                                               #
+#################################################################################
+
+
+class LiveSpfGraph:
+    """SPF graph of one trade (amount_in, token_in, token_out) that follows a MarketSnapshot.
+
+    Call update_pair after reserves of a pair changed in the snapshot and update_price after a price changed.
+    Only the edges depending on the update are recomputed (reserve reads and return amounts of every router),
+    the SPF relaxation then runs again over the cached edges on the next quote.
+    The relaxation isn't repaired incrementally: most weights are 0 (see get_weight) and the contract picks
+    between equally short paths by the order its queue visits them, which only a full run reproduces.
+    """
+
+    def __init__(
+        self,
+        snapshot: MarketSnapshot,
+        amount_in: int,
+        token_in: int,
+        token_out: int,
+        max_hops: int = MAX_HOPS,
+    ):
+        self.snapshot = snapshot
+        self.amount_in = amount_in
+        self.max_hops = max_hops
+        self.tokens = construct_vertices(token_in, token_out, snapshot.high_liq_tokens)
+        self.vertex_ids = {token: index for index, token in enumerate(self.tokens)}
+        self.rebuild()
+
+    # @notice Compute every edge from scratch
+    def rebuild(self):
+        vertices = len(self.tokens)
+        self.prices = [self.snapshot.get_global_price(token) for token in self.tokens]
+        self.amount_in_usd = fmul(self.prices[0], self.amount_in, BASE)
+        self.amounts_in = [
+            fdiv(self.amount_in_usd, price, BASE) for price in self.prices[:-1]
+        ] + [0]
+
+        # edges[src][dst] is None where SpfSolver.build_graph has no edge
+        self.edges: List[List[Optional[Edge]]] = [
+            [self.get_edge(src_nr, dst) for dst in range(vertices)]
+            for src_nr in range(vertices)
+        ]
+        # (predecessors, hops) of the last SPF run, see shortest_path_faster
+        self.spf_result: Optional[Tuple[Dict[int, int], int]] = None
+
+    # @notice Edge from vertex src_nr to vertex dst, with the best router for the amount sold on it
+    # @dev Mirrors SpfSolver.build_graph, the lowest router id wins between equal amounts
+    def get_edge(self, src_nr: int, dst: int) -> Optional[Edge]:
+        last_vertex = len(self.tokens) - 1
+        if src_nr == last_vertex or dst == 0 or src_nr == dst:
+            return None
+
+        best_amount, best_router = 0, None
+        for router in self.snapshot.routers:
+            reserve_in, reserve_out = self.snapshot.get_router_reserves(
+                self.tokens[src_nr], self.tokens[dst], router
+            )
+            amount = get_amount_out(self.amounts_in[src_nr], reserve_in, reserve_out)
+            if best_amount < amount:
+                best_amount, best_router = amount, router
+        if best_amount == 0:
+            return None
+
+        weight = get_weight(self.amount_in_usd, best_amount, self.prices[dst])
+        if src_nr == 0:
+            weight += EXTRA_BASE
+        return Edge(dst, best_router, weight)
+
+    # @notice Recompute the edges between two tokens after their reserves changed
+    def update_pair(self, token_a: int, token_b: int):
+        vertex_a = self.vertex_ids.get(token_a)
+        vertex_b = self.vertex_ids.get(token_b)
+        if vertex_a is None or vertex_b is None:
+            return
+        self.update_edges([(vertex_a, vertex_b), (vertex_b, vertex_a)])
+
+    # @notice Recompute the edges that depend on the price of a token after it changed
+    # @dev The price of token_in sets the USD value of the trade, which every weight depends on
+    def update_price(self, token: int):
+        vertex = self.vertex_ids.get(token)
+        if vertex is None:
+            return
+        if vertex == 0:
+            self.rebuild()
+            return
+
+        self.prices[vertex] = self.snapshot.get_global_price(token)
+        if vertex != len(self.tokens) - 1:
+            self.amounts_in[vertex] = fdiv(
+                self.amount_in_usd, self.prices[vertex], BASE
+            )
+        vertices = range(len(self.tokens))
+        self.update_edges(
+            [(vertex, other) for other in vertices]
+            + [(other, vertex) for other in vertices]
+        )
+
+    # @notice Recompute some edges
+    # @param pairs - (src, dst) vertex ids of the edges that may have changed
+    def update_edges(self, pairs: Iterable[Tuple[int, int]]):
+        for src_nr, dst in pairs:
+            edge = self.get_edge(src_nr, dst)
+            if edge != self.edges[src_nr][dst]:
+                self.edges[src_nr][dst] = edge
+                self.spf_result = None
+
+    # @notice Run the SPF algorithm over the cached edges, unless they didn't change since the last run
+    # @dev Edges are listed in the same order as SpfSolver.build_graph, so that SPF picks the same predecessors
+    def shortest_paths(self) -> Tuple[Dict[int, int], int]:
+        if self.spf_result is None:
+            src: List[Source] = []
+            edges: List[Edge] = []
+            for src_nr in range(len(self.tokens) - 1):
+                start = len(edges)
+                edges.extend(edge for edge in self.edges[src_nr] if edge is not None)
+                src.append(Source(start, len(edges) - start))
+            self.spf_result = shortest_path_faster(
+                len(self.tokens), src, edges, self.max_hops
+            )
+        return self.spf_result
+
+    # @notice Same result as SpfSolver.get_results on the current snapshot
+    def get_results(self) -> Tuple[List[Router], List[Path], List[int]]:
+        predecessors, hops = self.shortest_paths()
+        token_ids = path_from_predecessors(predecessors, len(self.tokens), hops)
+
+        routers = []
+        path = []
+        for token_from, token_to in zip(token_ids, token_ids[1:]):
+            edge = self.edges[token_from][token_to]
+            if edge is None:
+                raise CairoAssertionError(
+                    f"SPF: no edge between vertex {token_from} and vertex {token_to}"
+                )
+            routers.append(edge.router)
+            path.append(Path(self.tokens[token_from], self.tokens[token_to]))
+        amounts = [BASE] * len(path)
+
+        return routers, path, amounts
+
+    def get_amount_and_path(self):
+        routers, path, amounts = self.get_results()
+        amount_out = simulate_multi_swap(
+            self.snapshot, routers, path, amounts, self.amount_in
+        )
+        return routers, path, amounts, amount_out
+
+
+class LiveMarket:
+    """MarketSnapshot kept up to date from pool Sync events and oracle prices, with a live graph per quoted trade.
+
+    Graphs are created on the first quote of a (amount_in, token_in, token_out) and the least recently quoted
+    ones are dropped once there are more than max_graphs.
+    """
+
+    def __init__(
+        self,
+        snapshot: MarketSnapshot,
+        max_hops: int = MAX_HOPS,
+        max_graphs: int = 256,
+    ):
+        self.snapshot = snapshot
+        self.max_hops = max_hops
+        self.max_graphs = max_graphs
+        # pool address -> (router, token0, token1)
+        self.pools: Dict[int, Tuple[Router, int, int]] = {}
+        self._graphs: "OrderedDict[Tuple[int, int, int], LiveSpfGraph]" = OrderedDict()
+
+    # @notice Start from the pools and reserves of a ReserveStore
+    @classmethod
+    def from_reserve_store(cls, store, **kwargs) -> "LiveMarket":
+        market = cls(store.to_market_snapshot(), **kwargs)
+        for pair in store:
+            market.add_pool(pair.address, pair.router, pair.token0, pair.token1)
+        return market
+
+    def add_pool(self, address: int, router: Router, token0: int, token1: int):
+        self.pools[address] = (router, token0, token1)
+
+    # @notice Apply the Sync event of a pool
+    # @return applied - False if the pool is unknown
+    def apply_sync(self, pool_address: int, reserve0: int, reserve1: int) -> bool:
+        pool = self.pools.get(pool_address)
+        if pool is None:
+            return False
+        router, token0, token1 = pool
+        if self.snapshot.get_router_reserves(token0, token1, router) == (
+            reserve0,
+            reserve1,
+        ):
+            return True
+
+        self.snapshot.set_reserves(router.address, token0, token1, reserve0, reserve1)
+        for graph in self._graphs.values():
+            graph.update_pair(token0, token1)
+        return True
+
+    # @notice Apply a new USD price of a token
+    # @param price - Price scaled to 1e18, as returned by get_global_price
+    def apply_price(self, token: int, price: int):
+        if self.snapshot.prices.get(token) == price:
+            return
+        self.snapshot.set_price(token, price)
+        for graph in self._graphs.values():
+            graph.update_price(token)
+
+    def graph(self, amount_in: int, token_in: int, token_out: int) -> LiveSpfGraph:
+        key = (amount_in, token_in, token_out)
+        graph = self._graphs.get(key)
+        if graph is None:
+            graph = LiveSpfGraph(
+                self.snapshot, amount_in, token_in, token_out, self.max_hops
+            )
+            self._graphs[key] = graph
+            if len(self._graphs) > self.max_graphs:
+                self._graphs.popitem(last=False)
+        else:
+            self._graphs.move_to_end(key)
+        return graph
+
+    # @notice Equivalent of SpfSolver.get_amount_and_path on the current market
+    def quote(self, amount_in: int, token_in: int, token_out: int):
+        return self.graph(amount_in, token_in, token_out).get_amount_and_path()
@@ -0,0 +1,347 @@
+from collections import deque
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+from commercium.constants import (
+    BASE,
+    EXTRA_BASE,
+    FEE_DENOMINATOR,
+    FEE_NUMERATOR,
+    MAX_FELT,
+    UINT256,
+)
+from commercium.felt import (
+    CairoAssertionError,
+    fdiv,
+    felt,
+    fmul,
+    is_le_felt,
+    uint256_low,
+)
+from commercium.snapshot import MarketSnapshot, Path, Router
+from commercium.trade_executor import simulate_multi_swap
+
+try:
+    import numpy as np
+except ImportError:  # numpy only speeds up the edge construction, results are identical without it
+    np = None
+
+###################################################################################################
+#                                                                                                 #
+#   Off-chain reference implementation of src/solvers/spf_solver.cairo and src/lib/graph.cairo.  #
+#     Produces the exact same (routers, path, amounts) as the contract for a given snapshot.      #
+#                                                                                                 #
+###################################################################################################
+
+# Default maximum number of trades in a path (DEFAULT_MAX_HOPS), the search never goes further
+MAX_HOPS = 4
+
+
+class Source(NamedTuple):
+    start: int
+    stop: int
+
+
+class Edge(NamedTuple):
+    dst: int
+    router: Router
+    weight: int
+
+
+# @notice From a given input and output token we construct an array of relevant tokens/vertices
+# @dev Mirrors GraphConstructor.construct_vertices, high_liq_tokens is read until the first empty entry
+def construct_vertices(
+    token_in: int, token_out: int, high_liq_tokens: Sequence[int]
+) -> List[int]:
+    tokens = [token_in]
+    for high_liq_token in high_liq_tokens:
+        if high_liq_token == 0:
+            break
+        if high_liq_token == token_in or high_liq_token == token_out:
+            continue
+        tokens.append(high_liq_token)
+    tokens.append(token_out)
+    return tokens
+
+
+# @notice determine the weight of an edge from the value that is received from trading that specific edge
+# @param amount_in_usd - USD value of token being sold
+# @param amount_out - Number of tokens received from the trade
+# @param out_token_usd - The USD value of a single out_token
+def get_weight(amount_in_usd: int, amount_out: int, out_token_usd: int) -> int:
+    value_out = fmul(amount_out, out_token_usd, BASE)
+    if amount_in_usd <= value_out:
+        return uint256_low(fdiv(value_out, amount_in_usd, BASE))
+    # We don't use negative weights atm, so min amount is 0
+    return 0
+
+
+# @notice Constant product return amounts for every (router, src, dst) of the graph in one batch
+# @param reserves_in - reserves_in[r][s][d] is the reserve of tokens[s] in the tokens[s]/tokens[d] pair of router r
+# @param reserves_out - Same layout, reserve of tokens[d]
+# @param amounts_in - amounts_in[s] is the amount of tokens[s] sold on every edge leaving s
+# @return amounts_out - amounts_out[s][d] best return amount over all routers
+# @return router_ids - router_ids[s][d] index of the router returning amounts_out[s][d]
+def best_router_amounts(reserves_in, reserves_out, amounts_in: Sequence[int]):
+    routers_len = len(reserves_in)
+    vertices = len(amounts_in)
+
+    if routers_len == 0:
+        zeros = [[0] * vertices for _ in range(vertices)]
+        return zeros, [row[:] for row in zeros]
+
+    if np is not None:
+        feed_amounts = np.array(
+            [(amount * FEE_NUMERATOR) % UINT256 for amount in amounts_in], dtype=object
+        )
+        feed_amounts = feed_amounts[None, :, None]
+        has_liquidity = ((reserves_in != 0) & (reserves_out != 0)).astype(bool)
+        numerators = (feed_amounts * reserves_out) % UINT256
+        denominators = (reserves_in * FEE_DENOMINATOR + feed_amounts) % UINT256
+        amounts_out = np.where(
+            has_liquidity, numerators // np.where(has_liquidity, denominators, 1), 0
+        )
+        # argmax returns the lowest router id among equal amounts, just like find_best_router
+        router_ids = amounts_out.argmax(axis=0)
+        best_amounts = np.take_along_axis(amounts_out, router_ids[None, :, :], axis=0)[
+            0
+        ]
+        return best_amounts.tolist(), router_ids.tolist()
+
+    amounts_out = [[0] * vertices for _ in range(vertices)]
+    router_ids = [[0] * vertices for _ in range(vertices)]
+    for src in range(vertices):
+        feed_amount = (amounts_in[src] * FEE_NUMERATOR) % UINT256
+        for dst in range(vertices):
+            best_amount, best_id = 0, 0
+            for router_id in range(routers_len):
+                reserve_in = reserves_in[router_id][src][dst]
+                reserve_out = reserves_out[router_id][src][dst]
+                if reserve_in == 0 or reserve_out == 0:
+                    continue
+                numerator = (feed_amount * reserve_out) % UINT256
+                denominator = (reserve_in * FEE_DENOMINATOR + feed_amount) % UINT256
+                amount = numerator // denominator
+                if best_amount < amount:
+                    best_amount, best_id = amount, router_id
+            amounts_out[src][dst] = best_amount
+            router_ids[src][dst] = best_id
+    return amounts_out, router_ids
+
+
+# @notice Run the SPF algorithm on the graph
+# @dev Hop bounded like the contract: states are (hops, vertex) pairs keyed by hops * vertices + vertex,
+#      a state is only relaxed into states with one more hop and states with max_hops hops aren't expanded
+# @param vertices - number of vertices in the graph
+# @param src - array of Edge ranges. Used to map edges to a vertex
+# @param edges - array of graph Edges
+# @param max_hops - Maximum number of trades of a path
+# @return predecessors - the best predecessor vertex of each reached state
+# @return hops - number of trades of the shortest path to the last vertex, 0 if it can't be reached
+def shortest_path_faster(
+    vertices: int,
+    src: Sequence[Source],
+    edges: Sequence[Edge],
+    max_hops: int = MAX_HOPS,
+) -> Tuple[Dict[int, int], int]:
+    last_vertex = vertices - 1
+    distances = {0: 0}
+    predecessors: Dict[int, int] = {}
+    # The queue holds the states in order of their hops, so every state is queued at most once
+    was_queued = {0}
+    queue = deque([0])
+
+    while queue:
+        state = queue.popleft()
+        hops, src_nr = divmod(state, vertices)
+        # Every state that is left in the queue has used up all hops
+        if hops == max_hops:
+            break
+
+        start, stop = src[src_nr]
+        current_distance = distances[state]
+        next_layer = (hops + 1) * vertices
+
+        for edge in edges[start : start + stop]:
+            is_dst_end = is_le_felt(last_vertex, edge.dst)
+            if is_dst_end:
+                # Moving towards the goal token should always improve the distance
+                new_distance = felt(current_distance - EXTRA_BASE + edge.weight)
+            else:
+                new_distance = felt(current_distance + edge.weight)
+
+            dst_state = next_layer + edge.dst
+            if is_le_felt(distances.get(dst_state, MAX_FELT), new_distance):
+                continue
+
+            distances[dst_state] = new_distance
+            predecessors[dst_state] = src_nr
+
+            if dst_state not in was_queued and is_dst_end == 0:
+                queue.append(dst_state)
+                was_queued.add(dst_state)
+
+    # Paths with fewer hops win ties
+    best_hops, best_distance = 0, MAX_FELT
+    for hops in range(1, max_hops + 1):
+        distance = distances.get(hops * vertices + last_vertex, MAX_FELT)
+        if not is_le_felt(best_distance, distance):
+            best_hops, best_distance = hops, distance
+
+    return predecessors, best_hops
+
+
+# @notice Walk the predecessors back from the last vertex to the origin
+# @dev Mirrors GraphConstructor.write_path
+# @param predecessors - the best predecessor vertex of each state, as returned by shortest_path_faster
+# @param vertices - number of vertices in the graph
+# @param hops - number of trades of the path
+# @return token_ids - vertex ids of the path, starting with the origin (0) and ending with the last vertex,
+#                     no trades (only the last vertex) if hops is 0
+def path_from_predecessors(
+    predecessors: Dict[int, int], vertices: int, hops: int
+) -> List[int]:
+    token_ids = [vertices - 1]
+    for hops_left in range(hops, 0, -1):
+        token_ids.append(predecessors[hops_left * vertices + token_ids[-1]])
+    token_ids.reverse()
+    return token_ids
+
+
+# @notice For a given token trading pair we find the relevant edge and return its router
+# @dev Like GraphConstructor.get_router_from_edge the search isn't bounded by the stop of the source
+def get_router_from_edge(
+    src: Sequence[Source], edges: Sequence[Edge], token_from: int, token_to: int
+) -> Router:
+    for edge in edges[src[token_from].start :]:
+        if edge.dst == token_to:
+            return edge.router
+    raise CairoAssertionError(
+        f"SPF: no edge between vertex {token_from} and vertex {token_to}"
+    )
+
+
+class SpfSolver:
+    """Quote engine replicating the SPF solver contract against a MarketSnapshot.
+
+    Reserve lookups are cached per vertex set, so quoting many amounts for the same pair
+    only pays for the batched return amount computation and the SPF relaxation.
+    max_hops mirrors the limit set with set_max_hops on the contract.
+    """
+
+    def __init__(self, snapshot: MarketSnapshot, max_hops: int = MAX_HOPS):
+        self.snapshot = snapshot
+        self.max_hops = max_hops
+        self._reserves: Dict[Tuple[int, ...], tuple] = {}
+
+    def reserve_tensors(self, tokens: Sequence[int]):
+        key = tuple(tokens)
+        if key not in self._reserves:
+            vertices = len(tokens)
+            routers = self.snapshot.routers
+            reserves_in = [[[0] * vertices for _ in range(vertices)] for _ in routers]
+            reserves_out = [[[0] * vertices for _ in range(vertices)] for _ in routers]
+            for router_id, router in enumerate(routers):
+                for src in range(vertices - 1):
+                    for dst in range(1, vertices):
+                        if src == dst:
+                            continue
+                        reserve_in, reserve_out = self.snapshot.get_router_reserves(
+                            tokens[src], tokens[dst], router
+                        )
+                        reserves_in[router_id][src][dst] = reserve_in
+                        reserves_out[router_id][src][dst] = reserve_out
+            if np is not None and routers:
+                reserves_in = np.array(reserves_in, dtype=object)
+                reserves_out = np.array(reserves_out, dtype=object)
+            self._reserves[key] = (reserves_in, reserves_out)
+        return self._reserves[key]
+
+    # @notice Generate the graph that will be used for the spf algorithm
+    # @param amount_in_usd - The USD value of the token being sold (is used to set weights)
+    # @param tokens - array of tokens/vertices that make up the graph
+    # @param prices - USD price of every vertex, scaled by 1e18
+    # @return src - array of Edge ranges, one per vertex except the last one
+    # @return edges - array of graph Edges
+    def build_graph(
+        self, amount_in_usd: int, tokens: Sequence[int], prices: Sequence[int]
+    ) -> Tuple[List[Source], List[Edge]]:
+        vertices = len(tokens)
+        routers = self.snapshot.routers
+
+        # Number of tokens of each source vertex that represent the value of amount_in_usd
+        amounts_in = [
+            fdiv(amount_in_usd, prices[src_nr], BASE) for src_nr in range(vertices - 1)
+        ] + [0]
+
+        reserves_in, reserves_out = self.reserve_tensors(tokens)
+        amounts_out, router_ids = best_router_amounts(
+            reserves_in, reserves_out, amounts_in
+        )
+
+        src: List[Source] = []
+        edges: List[Edge] = []
+        for src_nr in range(vertices - 1):
+            start = len(edges)
+            for dst in range(1, vertices):
+                if dst == src_nr or amounts_out[src_nr][dst] == 0:
+                    continue
+                weight = get_weight(
+                    amount_in_usd, amounts_out[src_nr][dst], prices[dst]
+                )
+                if src_nr == 0:
+                    weight += EXTRA_BASE
+                edges.append(Edge(dst, routers[router_ids[src_nr][dst]], weight))
+            src.append(Source(start, len(edges) - start))
+
+        return src, edges
+
+    # @notice Find the optimal trading path using the SPF algorithm
+    # @param amount_in - Number of tokens to be sold
+    # @param token_in - Address of the token to be sold
+    # @param token_out - Address of the token to be bought
+    # @return routers - Array of routers that are used in the trading path
+    # @return path - Array of token pairs that are used in the trading path
+    # @return amounts - Array of token amount that are used in the trading path
+    def get_results(
+        self, amount_in: int, token_in: int, token_out: int
+    ) -> Tuple[List[Router], List[Path], List[int]]:
+        tokens = construct_vertices(token_in, token_out, self.snapshot.high_liq_tokens)
+        vertices = len(tokens)
+
+        prices = [self.snapshot.get_global_price(token) for token in tokens]
+        amount_in_usd = fmul(prices[0], amount_in, BASE)
+
+        src, edges = self.build_graph(amount_in_usd, tokens, prices)
+        predecessors, hops = shortest_path_faster(vertices, src, edges, self.max_hops)
+        token_ids = path_from_predecessors(predecessors, vertices, hops)
+
+        routers = []
+        path = []
+        for token_from, token_to in zip(token_ids, token_ids[1:]):
+            routers.append(get_router_from_edge(src, edges, token_from, token_to))
+            path.append(Path(tokens[token_from], tokens[token_to]))
+        amounts = [BASE] * len(path)
+
+        return routers, path, amounts
+
+    # @notice Equivalent of Hub.get_solver_amount_and_path for the SPF solver
+    def get_amount_and_path(self, amount_in: int, token_in: int, token_out: int):
+        routers, path, amounts = self.get_results(amount_in, token_in, token_out)
+        amount_out = simulate_multi_swap(
+            self.snapshot, routers, path, amounts, amount_in
+        )
+        return routers, path, amounts, amount_out
+
+    # @notice Quote a batch of (amount_in, token_in, token_out) trades against the same snapshot
+    def quote_many(self, trades: Sequence[Tuple[int, int, int]]):
+        return [
+            self.get_amount_and_path(amount_in, token_in, token_out)
+            for amount_in, token_in, token_out in trades
+        ]
+
+
+# @notice Find the optimal trading path using the SPF algorithm
+def get_results(
+    snapshot: MarketSnapshot, amount_in: int, token_in: int, token_out: int
+):
+    return SpfSolver(snapshot).get_results(amount_in, token_in, token_out)
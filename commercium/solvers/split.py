@@ -0,0 +1,104 @@
+from typing import List, NamedTuple, Sequence, Tuple
+
+from commercium.constants import FEE_DENOMINATOR, FEE_NUMERATOR
+from commercium.felt import (
+    CairoAssertionError,
+    felt,
+    is_le_felt,
+    sqrt_felt,
+    uint256_low,
+    unsigned_div_rem,
+)
+from commercium.snapshot import MarketSnapshot, Router
+from commercium.solvers.graddesc import amounts_to_shares, kick_zeros_and_build_output
+
+##########################################################################
+#                                                                        #
+#   Off-chain reference implementation of src/solvers/split_solver.cairo #
+#                                                                        #
+##########################################################################
+
+
+class Pool(NamedTuple):
+    router: Router
+    based_reserve: int  # fee_base * reserve_in
+    depth: int  # sqrt(fee * fee_base * reserve_in * reserve_out)
+
+
+# @notice Build the pools and sort them by increasing based_reserve / depth, like the insertion sort of the contract
+def sort_pools(
+    routers: Sequence[Router], reserves_in: Sequence[int], reserves_out: Sequence[int]
+) -> List[Pool]:
+    pools: List[Pool] = []
+    for router, reserve_in, reserve_out in zip(routers, reserves_in, reserves_out):
+        based_reserve = felt(FEE_DENOMINATOR * uint256_low(reserve_in))
+        depth = sqrt_felt(FEE_NUMERATOR * based_reserve * uint256_low(reserve_out))
+        pool = Pool(router, based_reserve, depth)
+
+        index = 0
+        while index < len(pools) and is_le_felt(
+            pools[index].based_reserve * depth, based_reserve * pools[index].depth
+        ):
+            index += 1
+        pools.insert(index, pool)
+    return pools
+
+
+# @notice Add pools to the split while their marginal price beats the common one of the pools already in it
+# @return active_len - The number of (sorted) pools that get a part of the trade
+# @return numerator - 997 * amount_in + the sum of based_reserve of those pools
+# @return denominator - The sum of depth of those pools
+def fill_pools(pools: Sequence[Pool], amount_in: int) -> Tuple[int, int, int]:
+    numerator = felt(FEE_NUMERATOR * amount_in + pools[0].based_reserve)
+    denominator = pools[0].depth
+    active_len = 1
+    for pool in pools[1:]:
+        if is_le_felt(pool.depth * numerator, pool.based_reserve * denominator):
+            break
+        numerator = felt(numerator + pool.based_reserve)
+        denominator = felt(denominator + pool.depth)
+        active_len += 1
+    return active_len, numerator, denominator
+
+
+# @return amounts - Trade amount of every pool that gets a part of the trade
+def split_amounts(pools: Sequence[Pool], numerator: int, denominator: int) -> List[int]:
+    amounts = []
+    for pool in pools:
+        amount, _ = unsigned_div_rem(
+            pool.depth * numerator - pool.based_reserve * denominator,
+            FEE_NUMERATOR * denominator,
+        )
+        amounts.append(amount)
+    return amounts
+
+
+# @notice Split a trade between every router trading the pair, like the split solver contract
+# @param amount_in - Number of tokens to be sold
+# @param token_in - Address of the token to be sold
+# @param token_out - Address of the token to be bought
+# @return routers - Array of routers that are used in the trading path
+# @return path - Array of token pairs that are used in the trading path
+# @return amounts - Array of token amount that are used in the trading path
+def get_results(
+    snapshot: MarketSnapshot, amount_in: int, token_in: int, token_out: int
+):
+    reserves_in, reserves_out, routers = snapshot.get_all_routers_and_reserves(
+        token_in, token_out
+    )
+    if not routers:
+        raise CairoAssertionError("SPLIT: no router with liquidity for the pair")
+
+    pools = sort_pools(routers, reserves_in, reserves_out)
+    active_len, numerator, denominator = fill_pools(pools, uint256_low(amount_in))
+    active_pools = pools[:active_len]
+
+    kicked_routers, path, kicked_amounts, amounts_sum = kick_zeros_and_build_output(
+        split_amounts(active_pools, numerator, denominator),
+        [pool.router for pool in active_pools],
+        token_in,
+        token_out,
+    )
+    if not kicked_amounts:
+        raise CairoAssertionError("SPLIT: trade amount is too small to be split")
+    return kicked_routers, path, amounts_to_shares(kicked_amounts, amounts_sum)
@@ -0,0 +1,124 @@
+from typing import Dict, List, Sequence
+
+from commercium.constants import BASE, JediSwap, TenK
+from commercium.felt import (
+    CairoAssertionError,
+    felt,
+    felt_fmul,
+    uint256_add,
+    uint256_low,
+)
+from commercium.snapshot import MarketSnapshot, Path, Router
+
+############################################################################
+#                                                                          #
+#   Off-chain counterpart of the simulation views of trade_executor.cairo  #
+#                                                                          #
+############################################################################
+
+# Router types whose swap accepts paths longer than two tokens
+MULTI_HOP_ROUTER_TYPES = (JediSwap, TenK)
+
+
+# @notice Simulate how many tokens one would receive when performing multiple specified swaps
+# @param snapshot - Market state the swaps are simulated against
+# @param routers - An array of routers to be used for the trades
+# @param path - An array of token pairs to trade
+# @param amounts - An array of token amounts (in %) to sell
+# @param amount_in - The initial token to sell
+# @return amount_out - The amount of the final token that would be received
+def simulate_multi_swap(
+    snapshot: MarketSnapshot,
+    routers: Sequence[Router],
+    path: Sequence[Path],
+    amounts: Sequence[int],
+    amount_in: int,
+) -> int:
+    token_balances: Dict[int, int] = {path[0].token_in: uint256_low(amount_in)}
+    token_out = path[-1].token_out
+    amount_out_sum = 0
+
+    for router, pair, amount in zip(routers, path, amounts):
+        current_balance = token_balances.get(pair.token_in, 0)
+        trade_amount = felt_fmul(current_balance, amount, BASE)
+        token_balances[pair.token_in] = felt(current_balance - trade_amount)
+
+        amount_out = snapshot.get_router_amount(
+            trade_amount, pair.token_in, pair.token_out, router
+        )
+
+        token_balances[pair.token_out] = felt(
+            token_balances.get(pair.token_out, 0) + uint256_low(amount_out)
+        )
+        if pair.token_out == token_out:
+            amount_out_sum = uint256_add(amount_out_sum, amount_out)
+
+    return amount_out_sum
+
+
+# @notice Count the consecutive hops that multi_swap performs with a single router call
+# @dev Mirrors _coalesce_hops: a hop is merged if it uses the same router, sells 100% of the token
+#      bought by the previous hop and that token had no tracked balance before
+# @return hops - The number of merged hops (at least 1)
+def coalesce_hops(
+    routers: Sequence[Router],
+    path: Sequence[Path],
+    amounts: Sequence[int],
+    token_balances: Dict[int, int],
+) -> int:
+    hops = 1
+    while hops < len(routers):
+        router, next_router = routers[hops - 1], routers[hops]
+        if (
+            next_router != router
+            or path[hops].token_in != path[hops - 1].token_out
+            or amounts[hops] != BASE
+            or token_balances.get(path[hops - 1].token_out, 0) != 0
+            or router.type not in MULTI_HOP_ROUTER_TYPES
+        ):
+            break
+        hops += 1
+    return hops
+
+
+# @notice Perform multiple token swaps on a market the way multi_swap does
+# @param market - Anything with a swap_exact_tokens_for_tokens(router, amount_in, path) method
+#        returning the amounts along the path (see commercium.simulator.AmmMarket)
+# @param routers - An array of routers to be used for the trades
+# @param path - An array of token pairs to trade
+# @param amounts - An array of token amounts (in %) to sell
+# @param amount_in - The balance of the first token when the trades start
+# @return token_balances - The tracked balance of every traded token after the trades
+def multi_swap(
+    market,
+    routers: Sequence[Router],
+    path: Sequence[Path],
+    amounts: Sequence[int],
+    amount_in: int,
+) -> Dict[int, int]:
+    token_balances: Dict[int, int] = {path[0].token_in: uint256_low(amount_in)}
+
+    hop = 0
+    while hop < len(routers):
+        pair = path[hop]
+        current_balance = token_balances.get(pair.token_in, 0)
+        trade_amount = felt_fmul(current_balance, amounts[hop], BASE)
+        token_balances[pair.token_in] = felt(current_balance - trade_amount)
+
+        hops = coalesce_hops(routers[hop:], path[hop:], amounts[hop:], token_balances)
+        swap_path: List[int] = [pair.token_in] + [
+            merged.token_out for merged in path[hop : hop + hops]
+        ]
+        if routers[hop].type not in MULTI_HOP_ROUTER_TYPES:
+            raise CairoAssertionError("TRADE EXECUTIONER: Router type doesn't exist")
+        amounts_out = market.swap_exact_tokens_for_tokens(
+            routers[hop], trade_amount, swap_path
+        )
+
+        token_bought = swap_path[-1]
+        token_balances[token_bought] = felt(
+            token_balances.get(token_bought, 0) + uint256_low(amounts_out[-1])
+        )
+        hop += hops
+
+    return token_balances
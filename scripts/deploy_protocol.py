@@ -1,7 +1,7 @@
-from starknet_py.net.account.account_client import (AccountClient)
 from starknet_py.contract import Contract
 from pathlib import Path
 from asyncio import run
+from commercium.deploy import DeploymentPlan, Manifest, Orchestrator, StarknetBackend
 
 from global_info import (
     client, 
@@ -18,147 +18,94 @@ from global_info import (
     USDC_Contract
 )
 
-contractAddresses = {
-    "hub": int("0x3c51eaee2f497d50531f1a70a6fe1bcb9f79c9f69d26a0b4319a682a77c03c8",16),
-    "solver_registry": int("0x4d8edc13563793804f7101015e3a10cee06c25654760159ea5ecba6371eb67e",16),
-    "router_aggregator": int("0x060aac7c99f9026e40b8d6575a4d5aa6eb5a1d662dac97f2e282a21767aaeb8a",16),
-    "single_swap_solver": int("0x743d9c17636b66f1a70db84f18c6084be5ca54b56e2f88e327f27da2b787887",16),
-    "graddesc_solver": int("0x49c1f8637aa4919ba0a4613322989f40b66212bbd7b271767347b07104bae91",16),
-    "spf_solver": int("0x3b75c61db56925781da2b7af0af5bedec529b2a635d8d34833e9ad8f27b17ac",16),
-}
-
-
-async def deployContracts():
-
-    if contractAddresses["hub"] == 0 :
-        
-        print("Declaring Contracts ... ")
-
-        # Declare Trade Executor Contract
-        declare_transaction = await client.sign_declare_transaction(
-            compiled_contract=Path("./build/", "trade-executor.json").read_text("utf-8"), max_fee=int(1e16)
-        )
-        resp = await client.declare(transaction=declare_transaction)
-        await client.wait_for_tx(resp.transaction_hash)
-        execution_contract_hash = resp.class_hash
-
-        # Declare Router Aggregator Contract
-        declare_transaction = await client.sign_declare_transaction(
-            compiled_contract=Path("./build/", "router-aggregator.json").read_text("utf-8"), max_fee=int(1e16)
-        )
-        resp = await client.declare(transaction=declare_transaction)
-        await client.wait_for_tx(resp.transaction_hash)
-        router_aggregator_contract_hash = resp.class_hash
-
-        # Deploy Hub
-        compiled_contract = Path("./build/", "hub.json").read_text("utf-8")
-        contract_address = await deployContract(client=client,compiled_contract=compiled_contract,calldata=[account_address,execution_contract_hash])
-        contractAddresses["hub"] = int(contract_address,16)
-        print("✅ Hub: ",contract_address)
-
-        # Deploy Solver Registry
-        compiled_contract = Path("./build/", "solver-registry.json").read_text("utf-8")
-        contract_address = await deployContract(client=client,compiled_contract=compiled_contract,calldata=[account_address])
-        contractAddresses["solver_registry"] = int(contract_address,16)
-        print("✅ Solver Registry: ",contract_address)
-
-        # Deploy Router Aggregator
-        compiled_contract = Path("./build/", "router-aggregator-proxy.json").read_text("utf-8")
-        contract_address = await deployContract(client=client,compiled_contract=compiled_contract,calldata=[router_aggregator_contract_hash,account_address,account_address])
-        contractAddresses["router_aggregator"] = int(contract_address,16)
-        print("✅ Router Aggregator: ",contract_address)
-
-        # Deploy Single Swap Solver
-        compiled_contract = Path("./build/", "single-swap-solver.json").read_text("utf-8")
-        contract_address = await deployContract(client=client,compiled_contract=compiled_contract,calldata=[contractAddresses["router_aggregator"]])
-        contractAddresses["single_swap_solver"] = int(contract_address,16)
-        print("✅ Single Swap Solver: ",contract_address)
-
-        # Deploy Graddesc Solver
-        compiled_contract = Path("./build/", "graddesc-solver.json").read_text("utf-8")
-        contract_address = await deployContract(client=client,compiled_contract=compiled_contract,calldata=[contractAddresses["router_aggregator"]])
-        contractAddresses["graddesc_solver"] = int(contract_address,16)
-        print("✅ Gradient Descent Solver: ",contract_address)
-
-        # Deploy SPF Solver
-        compiled_contract = Path("./build/", "spf-solver.json").read_text("utf-8")
-        contract_address = await deployContract(client=client,compiled_contract=compiled_contract,calldata=[account_address,contractAddresses["router_aggregator"]])
-        contractAddresses["spf_solver"] = int(contract_address,16)
-        print("✅ SPF Solver: ",contract_address)
-    
-    ##########################
-    #                        #
-    #   CONFIGURE CONTRACTS  #
-    #                        #
-    ##########################   
-    print("Configuring Contracts ...")
-
-    hubContract = await Contract.from_address(address=contractAddresses["hub"],client=client)
-    routerAggregatorContract = Contract(address=contractAddresses["router_aggregator"], abi=router_aggregator_abi, client=client)
-    solverRegistryContract = await Contract.from_address(contractAddresses["solver_registry"],client)
-    singleSwapSolverContract = await Contract.from_address(contractAddresses["single_swap_solver"],client)
-    graddescSolverContract = await Contract.from_address(contractAddresses["graddesc_solver"],client)
-    spfSolverContract = await Contract.from_address(contractAddresses["spf_solver"],client)
-
-    protocol_contracts = {
-        "hub": hubContract,
-        "solver_registry": solverRegistryContract,
-        "router_aggregator": routerAggregatorContract,
-        "single_swap_solver": singleSwapSolverContract
-    }
+#Deployed addresses and class hashes are persisted here, finished steps are skipped
+manifest_path = Path("./scripts/deployments/", "mainnet.json")
+
+
+def protocol_plan() -> DeploymentPlan:
+    plan = DeploymentPlan()
+
+    #Declare Contracts
+    trade_executor_class = plan.declare("trade_executor_class", Path("./build/", "trade-executor.json"))
+    router_aggregator_class = plan.declare("router_aggregator_class", Path("./build/", "router-aggregator.json"))
+    hub_class = plan.declare("hub_class", Path("./build/", "hub.json"))
+    solver_registry_class = plan.declare("solver_registry_class", Path("./build/", "solver-registry.json"))
+    proxy_class = plan.declare("router_aggregator_proxy_class", Path("./build/", "router-aggregator-proxy.json"))
+    single_swap_solver_class = plan.declare("single_swap_solver_class", Path("./build/", "single-swap-solver.json"))
+    graddesc_solver_class = plan.declare("graddesc_solver_class", Path("./build/", "graddesc-solver.json"))
+    spf_solver_class = plan.declare("spf_solver_class", Path("./build/", "spf-solver.json"))
+
+    #Deploy Contracts
+    #The contracts in mainnet.json predate solver infos, ranges and auto solvers (the hub never asks the registry
+    #for a solver, the router aggregator and the solvers lack the new views), so new ones replace them.
+    #Every call to them is sent again
+    hub = plan.deploy("hub_v2", hub_class, [account_address, trade_executor_class])
+    solver_registry = plan.deploy("solver_registry_v2", solver_registry_class, [account_address])
+    router_aggregator = plan.deploy("router_aggregator_v2", proxy_class, [router_aggregator_class, account_address, account_address])
+    single_swap_solver = plan.deploy("single_swap_solver_v2", single_swap_solver_class, [router_aggregator])
+    graddesc_solver = plan.deploy("graddesc_solver_v2", graddesc_solver_class, [router_aggregator])
+    spf_solver = plan.deploy("spf_solver_v2", spf_solver_class, [account_address, router_aggregator])
 
     #Configure Hub
-    #Set Solver Registry
-    invocation = await hubContract.functions["set_solver_registry"].invoke(solverRegistryContract.address,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
+    plan.invoke("hub.set_solver_registry", hub, "set_solver_registry", [solver_registry])
 
     #Configure Router Aggregator
     #Set Price Feeds
-    invocation = await routerAggregatorContract.functions["set_global_price"].invoke(ETH_Contract.address,ETH_USD_Key,EMPIRIC_ORACLE_ADDRESS,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
-    invocation = await routerAggregatorContract.functions["set_global_price"].invoke(DAI_Contract.address,DAI_USD_Key,EMPIRIC_ORACLE_ADDRESS,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
-    invocation = await routerAggregatorContract.functions["set_global_price"].invoke(USDC_Contract.address,USDC_USD_Key,EMPIRIC_ORACLE_ADDRESS,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
-    
-    #Add Routers
-    invocation = await routerAggregatorContract.functions["add_router"].invoke(JediSwapRouter,0,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()        
-    invocation = await routerAggregatorContract.functions["add_router"].invoke(TenKRouter,1,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
+    plan.invoke("router_aggregator.set_global_price.eth", router_aggregator, "set_global_price", [ETH_Contract.address, ETH_USD_Key, EMPIRIC_ORACLE_ADDRESS])
+    plan.invoke("router_aggregator.set_global_price.dai", router_aggregator, "set_global_price", [DAI_Contract.address, DAI_USD_Key, EMPIRIC_ORACLE_ADDRESS])
+    plan.invoke("router_aggregator.set_global_price.usdc", router_aggregator, "set_global_price", [USDC_Contract.address, USDC_USD_Key, EMPIRIC_ORACLE_ADDRESS])
+    #Add Routers (router ids follow the order of the calls)
+    add_jediswap = plan.invoke("router_aggregator.add_router.jediswap", router_aggregator, "add_router", [JediSwapRouter, 0])
+    plan.invoke("router_aggregator.add_router.tenk", router_aggregator, "add_router", [TenKRouter, 1], depends_on=[add_jediswap])
 
     #Configure Solver Registry
-    #Add Single Swap Solver to Registry
-    invocation = await solverRegistryContract.functions["set_solver"].invoke(1,singleSwapSolverContract.address,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance() 
-    invocation = await solverRegistryContract.functions["set_solver"].invoke(2,graddescSolverContract.address,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance() 
-    invocation = await solverRegistryContract.functions["set_solver"].invoke(3,spfSolverContract.address,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
+    plan.invoke("solver_registry.set_solver.1", solver_registry, "set_solver", [1, single_swap_solver])
+    plan.invoke("solver_registry.set_solver.2", solver_registry, "set_solver", [2, graddesc_solver])
+    plan.invoke("solver_registry.set_solver.3", solver_registry, "set_solver", [3, spf_solver])
+    #Solver metadata (complexity class, step budget from ./benchmarks/baseline.json)
+    plan.invoke("solver_registry.set_solver_info.1", solver_registry, "set_solver_info", [1, 1, 8000])
+    plan.invoke("solver_registry.set_solver_info.2", solver_registry, "set_solver_info", [2, 2, 27000])
+    plan.invoke("solver_registry.set_solver_info.3", solver_registry, "set_solver_info", [3, 3, 90000])
+    #swap_exact_tokens_for_tokens uses the single swap solver for small trades and graddesc above these sizes
+    #Ranges are (solver id, token in, token out, min amount (low, high), max amount (low, high))
+    plan.invoke("solver_registry.set_solver_range.1.eth", solver_registry, "set_solver_range", [1, ETH_Contract.address, 0, 0, 0, 10**18, 0])
+    plan.invoke("solver_registry.set_solver_range.1.dai", solver_registry, "set_solver_range", [1, DAI_Contract.address, 0, 0, 0, 2000 * 10**18, 0])
+    plan.invoke("solver_registry.set_solver_range.1.usdc", solver_registry, "set_solver_range", [1, USDC_Contract.address, 0, 0, 0, 2000 * 10**6, 0])
+    plan.invoke("solver_registry.set_auto_solver.0", solver_registry, "set_auto_solver", [0, 1])
+    plan.invoke("solver_registry.set_auto_solver.1", solver_registry, "set_auto_solver", [1, 2])
 
     #Configure Solvers
     #Set high liq tokens for spf solver
-    invocation = await spfSolverContract.functions["set_high_liq_tokens"].invoke("0",ETH_Contract.address,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
-    invocation = await spfSolverContract.functions["set_high_liq_tokens"].invoke("1",DAI_Contract.address,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
-    invocation = await spfSolverContract.functions["set_high_liq_tokens"].invoke("2",USDC_Contract.address,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
+    plan.invoke("spf_solver.set_high_liq_tokens.0", spf_solver, "set_high_liq_tokens", [0, ETH_Contract.address])
+    plan.invoke("spf_solver.set_high_liq_tokens.1", spf_solver, "set_high_liq_tokens", [1, DAI_Contract.address])
+    plan.invoke("spf_solver.set_high_liq_tokens.2", spf_solver, "set_high_liq_tokens", [2, USDC_Contract.address])
 
-    print("✅ Configured Contracts")
+    return plan
 
-    return protocol_contracts
 
-async def deployContract(client: AccountClient,compiled_contract: str, calldata) -> (str):
-    declare_result = await Contract.declare(
-        account=client, compiled_contract=compiled_contract, max_fee=int(1e16)
-    )
-    await declare_result.wait_for_acceptance()
+async def deployContracts():
 
-    deploy_result = await declare_result.deploy(max_fee=int(1e16), constructor_args=calldata)
-    await deploy_result.wait_for_acceptance()
-    contract = deploy_result.deployed_contract
-    return hex(contract.address)
+    print("Deploying and Configuring Contracts ... ")
+
+    manifest = Manifest(manifest_path)
+    result = await Orchestrator(StarknetBackend(client, max_fee=int(1e16)), manifest).run(protocol_plan())
+    contractAddresses = result.contracts
+
+    hubContract = await Contract.from_address(address=contractAddresses["hub_v2"],client=client)
+    routerAggregatorContract = Contract(address=contractAddresses["router_aggregator_v2"], abi=router_aggregator_abi, client=client)
+    solverRegistryContract = await Contract.from_address(contractAddresses["solver_registry_v2"],client)
+    singleSwapSolverContract = await Contract.from_address(contractAddresses["single_swap_solver_v2"],client)
+
+    protocol_contracts = {
+        "hub": hubContract,
+        "solver_registry": solverRegistryContract,
+        "router_aggregator": routerAggregatorContract,
+        "single_swap_solver": singleSwapSolverContract
+    }
+
+    print(f"✅ Configured Contracts ({result.transactions} transactions)")
+
+    return protocol_contracts
 
 if __name__ == "__main__":
     run(deployContracts())
\ No newline at end of file
@@ -1,59 +1,62 @@
+import argparse
+import sys
+from asyncio import run
 from pathlib import Path
-from starknet_py.net import AccountClient
-from starknet_py.net.client import Client
-from starknet_py.net.signer.stark_curve_signer import (StarkCurveSigner,KeyPair)
-from starknet_py.contract import Contract
-from starknet_py.net.networks import TESTNET
-from starknet_py.net.models import StarknetChainId
-from starkware.crypto.signature.signature import (pedersen_hash, private_to_stark_key, sign)
-
-private_key = 143500174905254755091859955060282197780
-public_key = private_to_stark_key(private_key)
-client = AccountClient(net="http://127.0.0.1:5050/", chain=StarknetChainId.TESTNET,n_retries=1,address="0x59af1c39047436311fedccc35d048103b6d63ae6958c10524b24cf5e1c8dd95",key_pair=KeyPair(private_key,public_key))
-
-compiled = Path("../", "build/spf_solver.json").read_text("utf-8")
-deployment_result = await Contract.deploy(
-    client, compiled_contract=compiled, constructor_args=[]
-)
-#Deploy Contract
-print("Deploying Contract...")
-await deployment_result.wait_for_acceptance()
-contract = deployment_result.deployed_contract
-print(contract.address)
-contractAddress = contract.address  
-
-address = "0x00178130dd6286a9a0e031e4c73b2bd04ffa92804264a25c1c08c1612559f458"
-
-client = Client(TESTNET)
-contract = await Contract.from_address(address, client)
-
-# Using only positional arguments
-invocation = await contract.functions["transferFrom"].invoke(
-    sender, recipient, 10000, max_fee=0
-)
 
-# Using only keyword arguments
-invocation = await contract.functions["transferFrom"].invoke(
-    sender=sender, recipient=recipient, amount=10000, max_fee=0
-)
-
-# Mixing positional with keyword arguments
-invocation = await contract.functions["transferFrom"].invoke(
-    sender, recipient, amount=10000, max_fee=0
-)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-# Creating a PreparedFunctionCall - creates a function call with arguments - useful for signing transactions and
-# specifying additional options
-transfer = contract.functions["transferFrom"].prepare(
-    sender, recipient, amount=10000, max_fee=0
+from commercium.benchmark import (
+    SOLVERS,
+    Scenario,
+    compare,
+    load_baseline,
+    run_benchmarks,
+    save_results,
+    update_baseline,
 )
-await transfer.invoke()
-
-# Wait for tx
-await invocation.wait_for_acceptance()
-
-(balance,) = await contract.functions["balanceOf"].call(recipient)
 
-# You can also use key access, call returns NamedTuple
-result = await contract.functions["balanceOf"].call(recipient)
-balance = result.balance
\ No newline at end of file
+#Quotes every solver through the hub for a grid of token/router counts and records
+#steps, builtins, storage reads and calls of each quote.
+#Example: python scripts/gas_estimation.py --tokens 3 4 5 --routers 1 2 --baseline benchmarks/baseline.json
+
+parser = argparse.ArgumentParser(description="Cairo step/gas benchmarks of the solvers")
+parser.add_argument("--tokens", type=int, nargs="+", default=[3, 4, 5], help="Number of tokens (2 traded + high liq tokens)")
+parser.add_argument("--routers", type=int, nargs="+", default=[1, 2, 3], help="Number of mock routers")
+parser.add_argument("--solvers", nargs="+", default=list(SOLVERS), choices=list(SOLVERS))
+parser.add_argument("--output", default="build/benchmarks.json", help="Where the results are written")
+parser.add_argument("--baseline", help="Fail if a result regressed compared to this file")
+parser.add_argument("--tolerance", type=float, help="Allowed relative growth, overrides the baseline tolerance")
+parser.add_argument("--update-baseline", action="store_true", help="Write the results to the baseline file instead")
+
+
+async def main():
+    args = parser.parse_args()
+    scenarios = [Scenario(tokens, routers) for tokens in args.tokens for routers in args.routers]
+
+    measurements = await run_benchmarks(scenarios, args.solvers)
+    save_results(args.output, measurements)
+    print(f"📄 Results written to {args.output}")
+
+    if args.baseline is None:
+        return 0
+
+    if args.update_baseline:
+        update_baseline(args.baseline, measurements, args.tolerance)
+        print(f"📄 Baseline updated: {args.baseline}")
+        # Failing entries make every later comparison fail, fix them before committing the baseline
+        failed = [measurement for measurement in measurements if measurement.error is not None]
+        for measurement in failed:
+            print(f"❌ {measurement.key} error: {measurement.error}")
+        return 1 if failed else 0
+
+    regressions = compare(measurements, load_baseline(args.baseline), args.tolerance)
+    for regression in regressions:
+        print(f"❌ {regression}")
+    if regressions:
+        return 1
+    print("✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run(main()))
@@ -0,0 +1,74 @@
+import argparse
+import sys
+from asyncio import run
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from commercium.benchmark import SOLVERS, Scenario, write_json
+from commercium.constants import BASE
+from commercium.profiler import (
+    Labels,
+    diff_collapsed,
+    diff_functions,
+    format_collapsed,
+    format_diff_collapsed,
+    load_profile,
+    profile_solver,
+    profile_transaction,
+    save_profile,
+    to_collapsed,
+    to_speedscope,
+)
+
+#Profiles a hub call per contract function and writes <output>.json (the profile, for --diff),
+#<output>.folded (collapsed stacks for flamegraph.pl/inferno) and <output>.speedscope.json (https://www.speedscope.app).
+#Example: python scripts/profile_call.py --solver spf --function swap --output build/profiles/spf
+#         python scripts/profile_call.py --solver spf --output build/profiles/spf_new --diff build/profiles/spf.json
+#         python scripts/profile_call.py --devnet http://127.0.0.1:5050 --transaction 0x123 --output build/profiles/tx
+
+parser = argparse.ArgumentParser(description="Per contract function profile of a hub call")
+parser.add_argument("--solver", default="spf", choices=list(SOLVERS))
+parser.add_argument("--function", default="swap", choices=["quote", "swap"], help="get_amount_out_with_solver or swap_exact_tokens_for_tokens_with_solver")
+parser.add_argument("--tokens", type=int, default=4, help="Number of tokens (2 traded + high liq tokens)")
+parser.add_argument("--routers", type=int, default=2, help="Number of mock routers")
+parser.add_argument("--amount", type=int, default=10, help="Number of whole tokens sold")
+parser.add_argument("--devnet", help="Profile a transaction of this devnet instead of deploying the protocol")
+parser.add_argument("--transaction", type=lambda value: int(value, 0), help="Hash of the devnet transaction")
+parser.add_argument("--metric", default="n_steps", help="n_steps, n_memory_holes, storage_reads, storage_keys or a builtin name")
+parser.add_argument("--output", default="build/profiles/profile", help="Path prefix of the written files")
+parser.add_argument("--diff", help="Profile (.json) of another build to compare against")
+
+
+async def main():
+    args = parser.parse_args()
+    if args.devnet:
+        if args.transaction is None:
+            parser.error("--devnet needs --transaction")
+        root = profile_transaction(args.devnet, args.transaction, Labels())
+    else:
+        scenario = Scenario(args.tokens, args.routers)
+        root = await profile_solver(scenario, args.solver, args.function, args.amount * BASE)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    save_profile(f"{output}.json", root)
+    Path(f"{output}.folded").write_text(format_collapsed(to_collapsed(root, args.metric)), "utf-8")
+    write_json(f"{output}.speedscope.json", to_speedscope(root, [args.metric], output.name))
+    print(f"📄 {root.name}: {root.total(args.metric)} {args.metric}, profile written to {output}.*")
+
+    if args.diff is None:
+        return 0
+
+    before = load_profile(args.diff)
+    Path(f"{output}.diff.folded").write_text(format_diff_collapsed(diff_collapsed(before, root, args.metric)), "utf-8")
+    print(f"{args.metric}: {before.total(args.metric)} -> {root.total(args.metric)}")
+    for diff in diff_functions(before, root, args.metric):
+        if diff.change:
+            print(f"{diff.change:+10} {diff.function} ({diff.before} -> {diff.after})")
+    print(f"📄 Differential stacks written to {output}.diff.folded")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run(main()))
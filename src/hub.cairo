@@ -19,7 +19,7 @@ from openzeppelin.token.erc20.IERC20 import IERC20
 from openzeppelin.access.ownable.library import Ownable
 from openzeppelin.security.reentrancyguard.library import ReentrancyGuard
 from openzeppelin.security.safemath.library import SafeUint256
-from src.lib.utils import Router, Path
+from src.lib.utils import Router, Path, Order
 from src.lib.hub import Hub, Hub_trade_executor
 
 /////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
@@ -38,6 +38,10 @@ from src.lib.hub import Hub, Hub_trade_executor
 func swap_executed(solver_used: felt, amount_traded: Uint256, token_sold: felt) {
 }
 
+@event
+func batch_swap_executed(solver_used: felt, orders_count: felt) {
+}
+
 /////////////////////////////
 //       Constructor       //
 /////////////////////////////
@@ -79,6 +83,18 @@ func trade_executor{
     return (trade_executor,);
 }
 
+// @notice get the address of the router aggregator used to fetch shared market snapshots
+// @return router aggregator address
+@view
+func router_aggregator{
+        syscall_ptr: felt*, 
+        pedersen_ptr: HashBuiltin*, 
+        range_check_ptr
+    }() -> (router_aggregator: felt) {
+    let (router_aggregator) = Hub.router_aggregator();
+    return (router_aggregator,);
+}
+
 // @notice Use this function to receive the token amount that would be returned given a specific trade and solver 
 // @param _amount_in the number of tokens that are supposed to be sold
 // @param _token_in the address of the token that would be sold
@@ -142,7 +158,87 @@ func get_amount_and_path_with_solver{
     return (routers_len, routers, path_len, path, amounts_len, amounts, amount_out);
 }
 
-// @notice This function returns the expected return amount for a given trade when using the default solver
+// @notice Use this function to receive the trading route of a solver together with a commitment,
+//         which allows swapping the route with swap_with_commitment without running the solver again
+// @param _amount_in - The number of tokens that are supposed to be sold
+// @param _token_in - The address of the token that would be sold
+// @param _token_out - The address of the token that would be bought
+// @param _solver_id - The id of the solver/algorithm that will be used to dertermine the trading route 
+// @param _account - The account that will swap the route, the commitment is only valid for it
+// @return routers - The router address and router type that would be used for each trading step
+// @return path - The token address of the token being sold and bought for each trading step
+// @return amounts - The amount of tokens (in %) sold for each trading step 
+// @return amount_out - The number of _token_out that would be received if this trade was executed
+// @return block_number - The block the route was computed at
+// @return commitment - Keyed hash of the route, the solver ID, the block number, the account and its nonce
+@view
+func get_amount_and_path_with_commitment{
+        syscall_ptr: felt*, 
+        pedersen_ptr: HashBuiltin*, 
+        range_check_ptr
+    }(
+        _amount_in: Uint256, 
+        _token_in: felt, 
+        _token_out: felt, 
+        _solver_id: felt,
+        _account: felt,
+    ) -> (
+        routers_len: felt,
+        routers: Router*,
+        path_len: felt,
+        path: Path*,
+        amounts_len: felt,
+        amounts: felt*,
+        amount_out: Uint256,
+        block_number: felt,
+        commitment: felt,
+    ){
+    let (
+        routers_len: felt,
+        routers: Router*,
+        path_len: felt,
+        path: Path*,
+        amounts_len: felt,
+        amounts: felt*,
+        amount_out: Uint256,
+        block_number: felt,
+        commitment: felt,
+    ) = Hub.get_solver_amount_path_and_commitment(
+        _amount_in, _token_in, _token_out, _solver_id, _account
+    );
+
+    return (
+        routers_len, routers, path_len, path, amounts_len, amounts, amount_out, block_number, commitment
+    );
+}
+
+// @notice Get the number of blocks a path commitment stays valid
+// @return max_age - Number of blocks, 0 for no limit
+@view
+func commitment_max_age{
+        syscall_ptr: felt*, 
+        pedersen_ptr: HashBuiltin*, 
+        range_check_ptr
+    }() -> (max_age: felt) {
+    let (max_age) = Hub.commitment_max_age();
+    return (max_age,);
+}
+
+// @notice Get the number of path commitments an account has swapped
+// @param _account - Address of the account
+// @return nonce - The nonce that new commitments of the account are bound to
+@view
+func commitment_nonce{
+        syscall_ptr: felt*, 
+        pedersen_ptr: HashBuiltin*, 
+        range_check_ptr
+    }(_account: felt) -> (nonce: felt) {
+    let (nonce) = Hub.commitment_nonce(_account);
+    return (nonce,);
+}
+
+// @notice This function returns the expected return amount for a given trade when using the solver
+//         that swap_exact_tokens_for_tokens would select for it
 // @param _amount_in - The number of tokens that are supposed to be sold
 // @param _token_in - The address of the token that would be sold
 // @param _token_out - The address of the token that would be bought
@@ -157,14 +253,35 @@ func get_amount_out{
         _token_in: felt,
         _token_out: felt
     ) -> (amount: Uint256) {
+    alloc_locals;
 
+    let (local solver_id) = Hub.select_solver(_amount_in, _token_in, _token_out);
     let (amount_out) = Hub.get_solver_amount(
-        _amount_in=_amount_in, _token_in=_token_in, _token_out=_token_out, _solver_id=1
+        _amount_in=_amount_in, _token_in=_token_in, _token_out=_token_out, _solver_id=solver_id
     );
 
     return (amount_out,);
 }
 
+// @notice Get the solver that swap_exact_tokens_for_tokens would use for a trade
+// @param _amount_in - The number of tokens that are supposed to be sold
+// @param _token_in - The address of the token that would be sold
+// @param _token_out - The address of the token that would be bought
+// @return solver_id - The ID of the selected solver
+@view
+func get_solver_for_trade{
+        syscall_ptr: felt*, 
+        pedersen_ptr: HashBuiltin*, 
+        range_check_ptr
+    }(
+        _amount_in: Uint256, 
+        _token_in: felt,
+        _token_out: felt
+    ) -> (solver_id: felt) {
+    let (solver_id) = Hub.select_solver(_amount_in, _token_in, _token_out);
+    return (solver_id,);
+}
+
 // @notice Receive multiple solver results with one query
 // @param _amount_in - The number of tokens that are supposed to be sold
 // @param _token_in - The address of the token that would be sold
@@ -198,7 +315,8 @@ func get_multiple_solver_amounts{
 ////////////////////////////
 
 // @notice Swap an exact amount of a token for largest possible amount of another token.
-//         This function makes use of the default solver
+//         The solver is picked by trade size and pair (see get_solver_for_trade),
+//         so small trades don't pay for the graph construction of the expensive solvers
 // @param _amount_in - The number of tokens that are supposed to be sold
 // @param _amount_out_min - The minimum number of _token_out that have to be bought (fails if not reached)
 // @param _token_in - The address of the token that would be sold
@@ -217,12 +335,14 @@ func swap_exact_tokens_for_tokens{
         _token_out: felt,
         _to: felt
     ) -> (amount_out: Uint256) {
-    // Execute swap with solver 1 as the default
-    let (received_amount: Uint256) = Hub.swap_with_solver(
-        _token_in, _token_out, _amount_in, _amount_out_min, _to, 1
+    alloc_locals;
+
+    let (local solver_id) = Hub.select_solver(_amount_in, _token_in, _token_out);
+    let (local received_amount: Uint256) = Hub.swap_with_solver(
+        _token_in, _token_out, _amount_in, _amount_out_min, _to, solver_id
     );
     // Log swap
-    swap_executed.emit(solver_used=0, amount_traded=_amount_in, token_sold=_token_in);
+    swap_executed.emit(solver_used=solver_id, amount_traded=_amount_in, token_sold=_token_in);
 
     return (received_amount,);
 }
@@ -298,6 +418,88 @@ func swap_with_path{
 }
 
 
+// @notice Swap along a route returned by get_amount_and_path_with_commitment.
+//         The solver isn't run again, _min_amount_out protects against a route that went stale since its block
+// @dev The commitment has to be quoted for the caller and is used up by the swap
+// @param _routers - An array of routers to be used for the trades
+// @param _path - An array of token pairs to trade
+// @param _amounts - An array of token amounts (in %) to sell
+// @param _amount_in - The initial token to sell
+// @param _min_amount_out - The minimum amount of tokens to receive (fails if not reached)
+// @param _to - The receiver address of the bought tokens
+// @param _solver_id - The ID of the solver that computed the route
+// @param _block_number - The block the route was computed at
+// @param _commitment - The commitment returned with the route
+// @return received_amount - The number of tokens received
+@external
+func swap_with_commitment{
+        syscall_ptr: felt*, 
+        pedersen_ptr: HashBuiltin*, 
+        range_check_ptr
+    }(
+        _routers_len: felt,
+        _routers: Router*,
+        _path_len: felt,
+        _path: Path*,
+        _amounts_len: felt,
+        _amounts: felt*,
+        _amount_in: Uint256,
+        _min_amount_out: Uint256,
+        _to: felt,
+        _solver_id: felt,
+        _block_number: felt,
+        _commitment: felt,
+    ) -> (received_amount: Uint256) {
+    alloc_locals;
+
+    let (local received_amount: Uint256) = Hub.swap_with_commitment(
+        _routers_len=_routers_len,
+        _routers=_routers,
+        _path_len=_path_len,
+        _path=_path,
+        _amounts_len=_amounts_len,
+        _amounts=_amounts,
+        _amount_in=_amount_in,
+        _min_amount_out=_min_amount_out,
+        _to=_to,
+        _solver_id=_solver_id,
+        _block_number=_block_number,
+        _commitment=_commitment,
+    );
+    // Log swap
+    swap_executed.emit(solver_used=_solver_id, amount_traded=_amount_in, token_sold=_path[0].token_in);
+
+    return (received_amount,);
+}
+
+
+// @notice Execute many orders with one transaction. Opposite orders on the same pair are matched
+//         against each other at the oracle prices, only the residual is traded through one solver run per pair.
+//         The caller pays the sold tokens of all orders, the proceeds of each pair side are split pro rata.
+// @param _orders - The orders to execute, each with its own minimum amount out and receiver
+// @param _solver_id - The ID of the solver that routes the residuals, 0 to select one per pair
+// @return amounts_out - The amount of tokens received by each order
+@external
+func swap_batch{
+        syscall_ptr: felt*, 
+        pedersen_ptr: HashBuiltin*, 
+        range_check_ptr
+    }(
+        _orders_len: felt,
+        _orders: Order*,
+        _solver_id: felt,
+    ) -> (amounts_out_len: felt, amounts_out: Uint256*) {
+    alloc_locals;
+
+    let (local amounts_out: Uint256*) = alloc();
+    Hub.swap_batch(_orders_len, _orders, _solver_id, amounts_out);
+    // Log swap
+    batch_swap_executed.emit(solver_used=_solver_id, orders_count=_orders_len);
+
+    return (_orders_len, amounts_out);
+}
+
+
 ////////////////////////
 //       Admin        //
 ////////////////////////
@@ -313,6 +515,52 @@ func set_solver_registry{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_c
     return ();
 }
 
+// @notice Set the router aggregator that is used to fetch one market snapshot for all compared solvers
+// @param _router_aggregator - The address of the router aggregator (0 disables the shared snapshot)
+@external
+func set_router_aggregator{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _router_aggregator: felt
+) -> () {
+    Ownable.assert_only_owner();
+    Hub.set_router_aggregator(_router_aggregator);
+    return ();
+}
+
+// @notice Flag a solver that implements IMarketSolver, so it receives the shared market snapshot
+// @param _solver_id - The ID of the solver
+// @param _is_market_solver - 1 if the solver accepts market snapshots, 0 otherwise
+@external
+func set_market_solver{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _solver_id: felt, _is_market_solver: felt
+) -> () {
+    Ownable.assert_only_owner();
+    Hub.set_market_solver(_solver_id, _is_market_solver);
+    return ();
+}
+
+// @notice Set the number of blocks a path commitment stays valid for swap_with_commitment
+// @param _max_age - Number of blocks, 0 for no limit
+@external
+func set_commitment_max_age{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _max_age: felt
+) -> () {
+    Ownable.assert_only_owner();
+    Hub.set_commitment_max_age(_max_age);
+    return ();
+}
+
+// @notice Set the key that path commitments are hashed with
+// @dev Invalidates every commitment that hasn't been swapped yet
+// @param _key - The new key
+@external
+func set_commitment_key{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _key: felt
+) -> () {
+    Ownable.assert_only_owner();
+    Hub.set_commitment_key(_key);
+    return ();
+}
+
 // @notice Set the new execution logic for trades
 // @param _execution_hash - The class hash of the new transaction execution logic
 @external
@@ -3,6 +3,7 @@
 from starkware.cairo.common.uint256 import Uint256
 from src.lib.utils import Router
 from src.lib.utils import Path
+from src.lib.utils import Order
 
 @contract_interface
 namespace IHub {
@@ -12,6 +13,9 @@ namespace IHub {
     func trade_executor() -> (trade_executor: felt) {
     }
 
+    func router_aggregator() -> (router_aggregator: felt) {
+    }
+
     func get_amount_out_with_solver(
         _amount_in: Uint256, _token_in: felt, _token_out: felt, _solver_id: felt
     ) -> (amount_out: Uint256) {
@@ -30,11 +34,37 @@ namespace IHub {
     ) {
     }
 
+    func get_amount_and_path_with_commitment(
+        _amount_in: Uint256, _token_in: felt, _token_out: felt, _solver_id: felt, _account: felt
+    ) -> (
+        routers_len: felt,
+        routers: Router*,
+        path_len: felt,
+        path: Path*,
+        amounts_len: felt,
+        amounts: felt*,
+        amount_out: Uint256,
+        block_number: felt,
+        commitment: felt,
+    ) {
+    }
+
+    func commitment_max_age() -> (max_age: felt) {
+    }
+
+    func commitment_nonce(_account: felt) -> (nonce: felt) {
+    }
+
     func get_amount_out(_amount_in: Uint256, _token_in: felt, _token_out: felt) -> (
         amount: Uint256
     ) {
     }
 
+    func get_solver_for_trade(_amount_in: Uint256, _token_in: felt, _token_out: felt) -> (
+        solver_id: felt
+    ) {
+    }
+
     func get_multiple_solver_amounts(
         _amount_in: Uint256,
         _token_in: felt,
@@ -71,9 +101,42 @@ namespace IHub {
     ) -> (received_amount: Uint256) {
     }
 
+    func swap_with_commitment(
+        _routers_len: felt,
+        _routers: Router*,
+        _path_len: felt,
+        _path: Path*,
+        _amounts_len: felt,
+        _amounts: felt*,
+        _amount_in: Uint256,
+        _min_amount_out: Uint256,
+        _to: felt,
+        _solver_id: felt,
+        _block_number: felt,
+        _commitment: felt,
+    ) -> (received_amount: Uint256) {
+    }
+
+    func swap_batch(_orders_len: felt, _orders: Order*, _solver_id: felt) -> (
+        amounts_out_len: felt, amounts_out: Uint256*
+    ) {
+    }
+
     func set_solver_registry(_new_registry: felt) -> () {
     }
 
+    func set_router_aggregator(_router_aggregator: felt) -> () {
+    }
+
+    func set_market_solver(_solver_id: felt, _is_market_solver: felt) -> () {
+    }
+
+    func set_commitment_max_age(_max_age: felt) -> () {
+    }
+
+    func set_commitment_key(_key: felt) -> () {
+    }
+
     func set_executor(_executor_hash: felt) {
     }
 
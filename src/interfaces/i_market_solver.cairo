@@ -0,0 +1,46 @@
+%lang starknet
+
+from starkware.cairo.common.uint256 import Uint256
+from src.lib.utils import Router
+from src.lib.utils import Path
+
+// Solvers that can find a trading path on a market snapshot that was fetched by the caller
+@contract_interface
+namespace IMarketSolver {
+    func get_results(_amount_in: Uint256, _token_in: felt, _token_out: felt) -> (
+        routers_len: felt,
+        routers: Router*,
+        path_len: felt,
+        path: Path*,
+        amounts_len: felt,
+        amounts: felt*,
+    ) {
+    }
+
+    func get_vertices(_token_in: felt, _token_out: felt) -> (tokens_len: felt, tokens: felt*) {
+    }
+
+    func get_results_with_market(
+        _amount_in: Uint256,
+        _tokens_len: felt,
+        _tokens: felt*,
+        _prices_len: felt,
+        _prices: Uint256*,
+        _counts_len: felt,
+        _counts: felt*,
+        _reserves_a_len: felt,
+        _reserves_a: Uint256*,
+        _reserves_b_len: felt,
+        _reserves_b: Uint256*,
+        _routers_len: felt,
+        _routers: Router*,
+    ) -> (
+        routers_len: felt,
+        routers: Router*,
+        path_len: felt,
+        path: Path*,
+        amounts_len: felt,
+        amounts: felt*,
+    ) {
+    }
+}
@@ -1,7 +1,7 @@
 %lang starknet
 
-from src.lib.router_aggregator import Feed
-from src.lib.utils import Router
+from src.lib.router_aggregator import Feed, PairInfo, PriceSnapshot
+from src.lib.utils import Router, Path, Trade
 from starkware.cairo.common.uint256 import Uint256
 
 @contract_interface
@@ -52,6 +52,42 @@ namespace IRouterAggregator {
     func get_global_price(_token: felt) -> (price: Uint256, decimals: felt) {
     }
 
+    func get_global_prices(_tokens_len: felt, _tokens: felt*) -> (
+        prices_len: felt, prices: Uint256*
+    ) {
+    }
+
+    func get_price_snapshot(_token: felt) -> (snapshot: PriceSnapshot) {
+    }
+
+    func get_price_snapshot_window() -> (blocks: felt) {
+    }
+
+    func refresh_prices(_tokens_len: felt, _tokens: felt*) {
+    }
+
+    func get_single_best_router_batch(_trades_len: felt, _trades: Trade*) -> (
+        amounts_out_len: felt, amounts_out: Uint256*, routers_len: felt, routers: Router*
+    ) {
+    }
+
+    func get_all_routers_and_reserves_batch(_pairs_len: felt, _pairs: Path*) -> (
+        counts_len: felt,
+        counts: felt*,
+        reserves_a_len: felt,
+        reserves_a: Uint256*,
+        reserves_b_len: felt,
+        reserves_b: Uint256*,
+        routers_len: felt,
+        routers: Router*,
+    ) {
+    }
+
+    func get_pair_info(_router_address: felt, _router_type: felt, _token_a: felt, _token_b: felt) -> (
+        pair: PairInfo
+    ) {
+    }
+
     func add_router(_router_address: felt, _router_type: felt) {
     }
 
@@ -61,6 +97,17 @@ namespace IRouterAggregator {
     func remove_router(_index: felt) {
     }
 
+    func register_pairs(
+        _router_id: felt,
+        _tokens_a_len: felt,
+        _tokens_a: felt*,
+        _tokens_b_len: felt,
+        _tokens_b: felt*,
+        _pairs_len: felt,
+        _pairs: felt*,
+    ) {
+    }
+
     func add_top_router(_router_address: felt, _router_type: felt) {
     }
 
@@ -72,4 +119,7 @@ namespace IRouterAggregator {
 
     func set_global_price(_token: felt, _key: felt, _oracle_address: felt) {
     }
+
+    func set_price_snapshot_window(_blocks: felt) {
+    }
 }
@@ -1,5 +1,8 @@
 %lang starknet
 
+from starkware.cairo.common.uint256 import Uint256
+from src.lib.utils import SolverInfo, AmountRange
+
 @contract_interface
 namespace ISolverRegistry {
     func get_solver(_solver_id: felt) -> (solver_address: felt) {
@@ -8,9 +11,34 @@ namespace ISolverRegistry {
     func get_next_id() -> (solver_id: felt) {
     }
 
+    func get_solver_info(_solver_id: felt) -> (info: SolverInfo) {
+    }
+
+    func get_solver_range(_solver_id: felt, _token_in: felt, _token_out: felt) -> (
+        range: AmountRange
+    ) {
+    }
+
+    func get_auto_solver(_index: felt) -> (solver_id: felt) {
+    }
+
+    func get_solver_for_trade(_amount_in: Uint256, _token_in: felt, _token_out: felt) -> (
+        solver_id: felt
+    ) {
+    }
+
     func add_solver(_solver_address: felt) -> (id: felt) {
     }
 
     func set_solver(_solver_id: felt, _solver_address: felt) {
     }
+
+    func set_solver_info(_solver_id: felt, _info: SolverInfo) {
+    }
+
+    func set_solver_range(_solver_id: felt, _token_in: felt, _token_out: felt, _range: AmountRange) {
+    }
+
+    func set_auto_solver(_index: felt, _solver_id: felt) {
+    }
 }
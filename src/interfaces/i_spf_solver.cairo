@@ -16,6 +16,39 @@ namespace ISpfSolver {
     ) {
     }
 
+    func get_vertices(_token_in: felt, _token_out: felt) -> (tokens_len: felt, tokens: felt*) {
+    }
+
+    func get_results_with_market(
+        _amount_in: Uint256,
+        _tokens_len: felt,
+        _tokens: felt*,
+        _prices_len: felt,
+        _prices: Uint256*,
+        _counts_len: felt,
+        _counts: felt*,
+        _reserves_a_len: felt,
+        _reserves_a: Uint256*,
+        _reserves_b_len: felt,
+        _reserves_b: Uint256*,
+        _routers_len: felt,
+        _routers: Router*,
+    ) -> (
+        routers_len: felt,
+        routers: Router*,
+        path_len: felt,
+        path: Path*,
+        amounts_len: felt,
+        amounts: felt*,
+    ) {
+    }
+
+    func get_max_hops() -> (max_hops: felt) {
+    }
+
     func set_high_liq_tokens(_index: felt, _high_liq_tokens: felt) {
     }
+
+    func set_max_hops(_max_hops: felt) {
+    }
 }
@@ -17,6 +17,21 @@ namespace ITradeExecutor {
     ) -> (amount_out: Uint256) {
     }
 
+    func simulate_multi_swap_with_reserves(
+        _routers_len: felt,
+        _routers: Router*,
+        _path_len: felt,
+        _path: Path*,
+        _amounts_len: felt,
+        _amounts: felt*,
+        _reserves_in_len: felt,
+        _reserves_in: Uint256*,
+        _reserves_out_len: felt,
+        _reserves_out: Uint256*,
+        _amount_in: Uint256,
+    ) -> (amount_out: Uint256) {
+    }
+
     func multi_swap(
         _routers_len: felt,
         _routers: Router*,
@@ -27,4 +42,16 @@ namespace ITradeExecutor {
         _receiver_address: felt,
     ) {
     }
+
+    func multi_swap_exact_in(
+        _routers_len: felt,
+        _routers: Router*,
+        _path_len: felt,
+        _path: Path*,
+        _amounts_len: felt,
+        _amounts: felt*,
+        _amount_in: Uint256,
+        _receiver_address: felt,
+    ) {
+    }
 }
@@ -3,14 +3,28 @@
 %lang starknet
 
 from starkware.cairo.common.cairo_builtins import HashBuiltin
-from starkware.cairo.common.uint256 import Uint256, uint256_eq, uint256_le
+from starkware.cairo.common.uint256 import (
+    Uint256,
+    uint256_eq,
+    uint256_le,
+    uint256_add,
+    uint256_mul,
+    uint256_unsigned_div_rem,
+)
 from starkware.cairo.common.bool import TRUE
+from starkware.cairo.common.math_cmp import is_le_felt
+from starkware.cairo.common.math import assert_not_zero
+from starkware.cairo.common.alloc import alloc
+from starkware.cairo.common.dict import dict_read
+from starkware.cairo.common.dict_access import DictAccess
 
-from src.lib.utils import Router, Utils
+from src.lib.utils import Router, Path, Utils
 from src.interfaces.i_router_aggregator import IRouterAggregator
 from src.lib.constants import BASE
 
 const EXTRA_BASE = BASE * 100;
+// Number of trades a path may have when no limit has been set
+const DEFAULT_MAX_HOPS = 4;
 
 from openzeppelin.access.ownable.library import Ownable
 
@@ -41,6 +55,10 @@ func router_aggregator() -> (router_aggregator_address: felt) {
 func high_liq_tokens(index: felt) -> (token: felt) {
 }
 
+@storage_var
+func max_hops() -> (hops: felt) {
+}
+
 struct Source {
     start: felt,
     stop: felt,
@@ -52,6 +70,15 @@ struct Edge {
     weight: felt,
 }
 
+// Reserves of every router with liquidity for a token pair.
+// reserves_a belong to the token with the lower vertex index.
+struct PairReserves {
+    routers_len: felt,
+    routers: Router*,
+    reserves_a: Uint256*,
+    reserves_b: Uint256*,
+}
+
 namespace GraphConstructor {
     // ///////////////////////////
     //       Constructor       //
@@ -65,11 +92,29 @@ namespace GraphConstructor {
         return ();
     }
 
+    // //////////////////////
+    //       Views        //
+    // //////////////////////
+
+    // @notice Maximum number of trades a path extracted from the graph may have
+    // @return hops - The stored limit, DEFAULT_MAX_HOPS if none has been set
+    func get_max_hops{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() -> (
+        hops: felt
+    ) {
+        let (hops) = max_hops.read();
+        if (hops == 0) {
+            return (DEFAULT_MAX_HOPS,);
+        }
+        return (hops,);
+    }
+
     // ///////////////////////
     //       Interals      //
     // ///////////////////////
 
     // @notice Generate graph that will be used for the spf algorithm
+    // @dev Edge amounts are calculated locally (x*y=k) from the reserves of every token pair
+    // @param _pairs - The reserves of every vertex pair (see get_all_pair_reserves)
     // @param _amount_in - The amount of the token that a user wants to sell
     // @param _amount_in_usd - The amount of the token that a user wants to sell (is used to set weights)
     // @param _vertices - number of vercies/routers in the graph
@@ -80,6 +125,152 @@ namespace GraphConstructor {
     // @param _src_counter - counter used to iterate through the source vertices/tokens
     // @param _total_counter - counter used to find the correct start of each vertex in the Edge array
     func build_graph{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _pairs: PairReserves*,
+        _amount_in: Uint256,
+        _amount_in_usd: Uint256,
+        _vertices: felt,
+        _tokens: felt*,
+        _src_len: felt,
+        _src: Source*,
+        _prices: Uint256*,
+        _edge_len: felt,
+        _edge: Edge*,
+        _dst_counter: felt,
+        _src_counter: felt,
+        _total_counter: felt,
+    ) -> () {
+        build_edges(
+            _pairs,
+            _amount_in,
+            _amount_in_usd,
+            _vertices,
+            _tokens,
+            _src_len,
+            _src,
+            _prices,
+            _edge_len,
+            _edge,
+            _dst_counter,
+            _src_counter,
+            _total_counter,
+        );
+
+        return ();
+    }
+
+    // @notice Fetch the reserves of every vertex pair with one call to the router aggregator
+    // @param _router_aggregator - Address of the router aggregator
+    // @param _vertices - number of vercies/routers in the graph
+    // @param _tokens - array of tokens/vertices that make up the graph
+    // @return pairs - PairReserves of every (low, high) vertex pair, ordered by low and then high vertex
+    func get_all_pair_reserves{syscall_ptr: felt*, range_check_ptr}(
+        _router_aggregator: felt, _vertices: felt, _tokens: felt*
+    ) -> (pairs: PairReserves*) {
+        alloc_locals;
+
+        let (local vertex_pairs: Path*) = alloc();
+        let pairs_len = list_vertex_pairs(_vertices, _tokens, vertex_pairs, 0, 1, 0);
+
+        let (
+            counts_len: felt,
+            counts: felt*,
+            reserves_a_len: felt,
+            reserves_a: Uint256*,
+            reserves_b_len: felt,
+            reserves_b: Uint256*,
+            routers_len: felt,
+            routers: Router*,
+        ) = IRouterAggregator.get_all_routers_and_reserves_batch(
+            _router_aggregator, pairs_len, vertex_pairs
+        );
+
+        let (local pairs: PairReserves*) = alloc();
+        split_pair_reserves(counts_len, counts, routers, reserves_a, reserves_b, pairs);
+        return (pairs,);
+    }
+
+    // @notice List the token pairs of every (low, high) vertex pair
+    // @param _pairs - An empty array of token pairs that will be filled by this function
+    // @param _low - Index of the lower vertex
+    // @param _high - Index of the higher vertex
+    // @param _pairs_len - Number of pairs written so far
+    // @return pairs_len - Total number of pairs
+    func list_vertex_pairs(
+        _vertices: felt, _tokens: felt*, _pairs: Path*, _low: felt, _high: felt, _pairs_len: felt
+    ) -> felt {
+        if (_low == _vertices - 1) {
+            return (_pairs_len);
+        }
+        if (_high == _vertices) {
+            let pairs_len = list_vertex_pairs(
+                _vertices, _tokens, _pairs, _low + 1, _low + 2, _pairs_len
+            );
+            return (pairs_len);
+        }
+
+        assert _pairs[0] = Path(_tokens[_low], _tokens[_high]);
+        let pairs_len = list_vertex_pairs(
+            _vertices, _tokens, _pairs + Path.SIZE, _low, _high + 1, _pairs_len + 1
+        );
+        return (pairs_len);
+    }
+
+    // @notice Split the reserves of a market snapshot into one PairReserves per vertex pair
+    // @dev The snapshot has to list the pairs like list_vertex_pairs
+    // @param _vertices - number of vercies/routers in the graph
+    // @param _counts - Number of routers of each pair
+    // @return pairs - PairReserves of every (low, high) vertex pair
+    func get_market_pair_reserves(
+        _vertices: felt,
+        _counts_len: felt,
+        _counts: felt*,
+        _routers: Router*,
+        _reserves_a: Uint256*,
+        _reserves_b: Uint256*,
+    ) -> (pairs: PairReserves*) {
+        alloc_locals;
+
+        with_attr error_message("GRAPH: Market doesn't contain every token pair") {
+            assert _counts_len * 2 = _vertices * (_vertices - 1);
+        }
+
+        let (local pairs: PairReserves*) = alloc();
+        split_pair_reserves(_counts_len, _counts, _routers, _reserves_a, _reserves_b, pairs);
+        return (pairs,);
+    }
+
+    // @notice Split the concatenated result of get_all_routers_and_reserves_batch into one PairReserves per pair
+    // @param _counts - Number of routers of each pair
+    // @param _pairs - An empty array of PairReserves that will be filled by this function
+    func split_pair_reserves(
+        _counts_len: felt,
+        _counts: felt*,
+        _routers: Router*,
+        _reserves_a: Uint256*,
+        _reserves_b: Uint256*,
+        _pairs: PairReserves*,
+    ) {
+        if (_counts_len == 0) {
+            return ();
+        }
+
+        assert _pairs[0] = PairReserves(_counts[0], _routers, _reserves_a, _reserves_b);
+        split_pair_reserves(
+            _counts_len - 1,
+            _counts + 1,
+            _routers + _counts[0] * Router.SIZE,
+            _reserves_a + _counts[0] * Uint256.SIZE,
+            _reserves_b + _counts[0] * Uint256.SIZE,
+            _pairs + PairReserves.SIZE,
+        );
+        return ();
+    }
+
+    // @notice Recursively add the edges of each source vertex to the graph
+    // @param _pairs - The reserves of every vertex pair (see get_all_pair_reserves)
+    // @dev See build_graph for the other parameters
+    func build_edges{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _pairs: PairReserves*,
         _amount_in: Uint256,
         _amount_in_usd: Uint256,
         _vertices: felt,
@@ -116,14 +307,11 @@ namespace GraphConstructor {
             tempvar range_check_ptr = range_check_ptr;
             assert we_are_not_advancing = 0;
         } else {
-            let (router_aggregator_address) = router_aggregator.read();
             // Determine the number of amount_in tokens that represent the value of _amount_in_usd
             let (src_amount_in: Uint256) = Utils.fdiv(_amount_in_usd,_prices[_src_counter],Uint256(BASE,0));
             // Get the best router for the provided trade
-            let (
-                local amount_out: Uint256, local router: Router
-            ) = IRouterAggregator.get_single_best_router(
-                router_aggregator_address, src_amount_in, _tokens[_src_counter], _tokens[_dst_counter]
+            let (local amount_out: Uint256, local router: Router) = get_best_router_amount(
+                _pairs, src_amount_in, _vertices, _src_counter, _dst_counter
             );
             let (amount_is_zero) = uint256_eq(amount_out, Uint256(0, 0));
             if (amount_is_zero == 1) {
@@ -154,7 +342,8 @@ namespace GraphConstructor {
             tempvar next_dst = we_are_not_advancing + is_same_token;
             if (next_dst != 0) {
                 assert _src[0] = Source(_total_counter, _edge_len);
-                build_graph(
+                build_edges(
+                    _pairs,
                     _amount_in,
                     _amount_in_usd,
                     _vertices,
@@ -173,7 +362,8 @@ namespace GraphConstructor {
                 tempvar range_check_ptr = range_check_ptr;
             } else {
                 assert _src[0] = Source(_total_counter, _edge_len + 1);
-                build_graph(
+                build_edges(
+                    _pairs,
                     _amount_in,
                     _amount_in_usd,
                     _vertices,
@@ -195,7 +385,8 @@ namespace GraphConstructor {
             tempvar next_dst = we_are_not_advancing + is_same_token;
             if (next_dst != 0) {
                 // We are not advancing the edge erray
-                build_graph(
+                build_edges(
+                    _pairs,
                     _amount_in,
                     _amount_in_usd,
                     _vertices,
@@ -214,7 +405,8 @@ namespace GraphConstructor {
                 tempvar range_check_ptr = range_check_ptr;
             } else {
                 // We are advancing the edge array
-                build_graph(
+                build_edges(
+                    _pairs,
                     _amount_in,
                     _amount_in_usd,
                     _vertices,
@@ -240,6 +432,143 @@ namespace GraphConstructor {
         return ();
     }
 
+    // @notice Find the router with the best return amount for a trade between two vertices
+    // @dev Amounts are calculated from the pair reserves instead of querying each router
+    // @param _pairs - The reserves of every vertex pair (see get_all_pair_reserves)
+    // @param _amount_in - The amount of the source token that is sold
+    // @param _vertices - number of vercies/routers in the graph
+    // @param _src - Index of the vertex that is sold
+    // @param _dst - Index of the vertex that is bought
+    // @return amount_out - The best return amount, 0 if no router has liquidity for the pair
+    // @return router - The router that returns amount_out
+    func get_best_router_amount{range_check_ptr}(
+        _pairs: PairReserves*, _amount_in: Uint256, _vertices: felt, _src: felt, _dst: felt
+    ) -> (amount_out: Uint256, router: Router) {
+        alloc_locals;
+
+        let (pair: PairReserves*, is_flipped) = get_pair_reserves(_pairs, _vertices, _src, _dst);
+
+        if (is_flipped == 0) {
+            let (amount_out: Uint256, router: Router) = find_best_reserves(
+                _amount_in,
+                pair.routers_len,
+                pair.routers,
+                pair.reserves_a,
+                pair.reserves_b,
+                Uint256(0, 0),
+                Router(0, 0),
+            );
+            return (amount_out, router);
+        } else {
+            let (amount_out: Uint256, router: Router) = find_best_reserves(
+                _amount_in,
+                pair.routers_len,
+                pair.routers,
+                pair.reserves_b,
+                pair.reserves_a,
+                Uint256(0, 0),
+                Router(0, 0),
+            );
+            return (amount_out, router);
+        }
+    }
+
+    // @notice Get the reserves of a vertex pair
+    // @param _pairs - The reserves of every vertex pair (see get_all_pair_reserves)
+    // @param _vertices - number of vercies/routers in the graph
+    // @param _src - Index of the vertex that is sold
+    // @param _dst - Index of the vertex that is bought
+    // @return pair - The routers and reserves of the pair, reserves_a belong to the lower vertex index
+    // @return is_flipped - 1 if _src is the higher vertex index (reserves_b are the input reserves)
+    func get_pair_reserves{range_check_ptr}(
+        _pairs: PairReserves*, _vertices: felt, _src: felt, _dst: felt
+    ) -> (pair: PairReserves*, is_flipped: felt) {
+        alloc_locals;
+
+        let is_flipped = is_le_felt(_dst, _src);
+        local low_vertex;
+        local high_vertex;
+        if (is_flipped == 0) {
+            assert low_vertex = _src;
+            assert high_vertex = _dst;
+        } else {
+            assert low_vertex = _dst;
+            assert high_vertex = _src;
+        }
+
+        // Pairs of the vertices below low_vertex come first, low * (low + 1) is always even
+        tempvar index = low_vertex * _vertices - low_vertex * (low_vertex + 1) / 2 + high_vertex - low_vertex - 1;
+        return (_pairs + index * PairReserves.SIZE, is_flipped);
+    }
+
+    // @notice Find the router with the best return amount from an array of router reserves
+    // @dev Ties go to the entry that comes later in the array (same as RouterAggregator.find_best_router)
+    // @param _amount_in - The amount of tokens that is sold
+    // @param _routers_len - Number of routers
+    // @param _routers - Array of routers
+    // @param _reserves_in - Reserves of the sold token for each router
+    // @param _reserves_out - Reserves of the bought token for each router
+    // @param _best_amount - Amount used to track which router yields the best amount
+    // @param _best_router - Used to track the best router
+    func find_best_reserves{range_check_ptr}(
+        _amount_in: Uint256,
+        _routers_len: felt,
+        _routers: Router*,
+        _reserves_in: Uint256*,
+        _reserves_out: Uint256*,
+        _best_amount: Uint256,
+        _best_router: Router,
+    ) -> (amount_out: Uint256, router: Router) {
+        alloc_locals;
+
+        if (_routers_len == 0) {
+            return (_best_amount, _best_router);
+        }
+
+        let (amount: Uint256) = get_amount_out(_amount_in, _reserves_in[0], _reserves_out[0]);
+
+        let (is_new_amount_better) = uint256_le(_best_amount, amount);
+        if (is_new_amount_better == TRUE) {
+            let (res_amount: Uint256, res_router: Router) = find_best_reserves(
+                _amount_in,
+                _routers_len - 1,
+                _routers + 2,
+                _reserves_in + 2,
+                _reserves_out + 2,
+                amount,
+                _routers[0],
+            );
+            return (res_amount, res_router);
+        }
+
+        let (res_amount: Uint256, res_router: Router) = find_best_reserves(
+            _amount_in,
+            _routers_len - 1,
+            _routers + 2,
+            _reserves_in + 2,
+            _reserves_out + 2,
+            _best_amount,
+            _best_router,
+        );
+        return (res_amount, res_router);
+    }
+
+    // @notice Constant product (x*y=k) return amount of a pool with a 0.3% fee
+    // @param _amount_in - The amount of tokens that is sold
+    // @param _reserve_in - Pool reserves of the sold token
+    // @param _reserve_out - Pool reserves of the bought token
+    // @return amount_out - The amount of tokens that is received
+    func get_amount_out{range_check_ptr}(
+        _amount_in: Uint256, _reserve_in: Uint256, _reserve_out: Uint256
+    ) -> (amount_out: Uint256) {
+        let (amount_in_with_fee: Uint256, _) = uint256_mul(_amount_in, Uint256(997, 0));
+        let (numerator: Uint256, _) = uint256_mul(amount_in_with_fee, _reserve_out);
+        let (scaled_reserve_in: Uint256, _) = uint256_mul(_reserve_in, Uint256(1000, 0));
+        let (denominator: Uint256, _) = uint256_add(scaled_reserve_in, amount_in_with_fee);
+        let (amount_out: Uint256, _) = uint256_unsigned_div_rem(numerator, denominator);
+        return (amount_out,);
+    }
+
     // @notice From a given input and output token we construct an array of relevant tokens/vertices that will
     //         be considered when building the graph
     // @param _token_in - Token sold / Origin vertex
@@ -278,6 +607,70 @@ namespace GraphConstructor {
         return (total_vertices,);
     }
     
+    // @notice Walk the predecessors back from a vertex to the origin and write the trading path
+    // @dev Recurses down to the origin before writing, so the trades end up in trading order.
+    //      Every trade sells the full balance of the traded token (amount = BASE).
+    // @param predecessors - dict that contains the best predecessor of each (hops, vertex) state,
+    //                       keyed by hops * _vertices + vertex
+    // @param _src - array of Edge ranges. Used to map edges to a vertice
+    // @param _edge - array of graph Edges
+    // @param _tokens - array of tokens/vertices that make up the graph
+    // @param _vertices - number of vertices in the graph
+    // @param _vertex - The vertex the path ends in (the last vertex for the complete path)
+    // @param _hops - Number of trades of the path that ends in _vertex, 0 writes nothing
+    // @param _routers - An (empty) array of routers that we fill in this function
+    // @param _path - An (empty) array of token pairs that we fill in this function
+    // @param _amounts - An (empty) array of amounts that we fill in this function
+    // @return hops - Number of trades that were written
+    func write_path{predecessors: DictAccess*}(
+        _src: Source*,
+        _edge: Edge*,
+        _tokens: felt*,
+        _vertices: felt,
+        _vertex: felt,
+        _hops: felt,
+        _routers: Router*,
+        _path: Path*,
+        _amounts: felt*,
+    ) -> (hops: felt) {
+        alloc_locals;
+
+        if (_hops == 0) {
+            return (0,);
+        }
+
+        let (local predecessor) = dict_read{dict_ptr=predecessors}(key=_hops * _vertices + _vertex);
+        let (hop) = write_path(
+            _src, _edge, _tokens, _vertices, predecessor, _hops - 1, _routers, _path, _amounts
+        );
+
+        let (router: Router) = get_router_from_edge(_src, _edge, predecessor, _vertex, 0);
+        assert _routers[hop] = router;
+        assert _path[hop] = Path(_tokens[predecessor], _tokens[_vertex]);
+        assert _amounts[hop] = BASE;
+
+        return (hop + 1,);
+    }
+
+    // @notice For a given token trading pair we find the relevant edge and return its router
+    // @param _src - An array of Edge ranges. Used to map edges to a vertice
+    // @param _edge - An array of graph Edges
+    // @param _src_nr - Vertex that is sold
+    // @param _dst - Vertex that is bought
+    // @param _counter - Position of the edge within the edges of _src_nr
+    func get_router_from_edge(
+        _src: Source*, _edge: Edge*, _src_nr: felt, _dst: felt, _counter: felt
+    ) -> (router: Router) {
+        let edge_position = _src[_src_nr].start + _counter;
+
+        if (_edge[edge_position].dst == _dst) {
+            return (_edge[edge_position].router,);
+        }
+
+        let (router: Router) = get_router_from_edge(_src, _edge, _src_nr, _dst, _counter + 1);
+        return (router,);
+    }
+
     // @notice determine the weight of a an edge from the value that is received from trading that specific edge
     // @param _amount_in_usd - USD value of token being sold
     // @param _amount_out - Number of tokens received from the trade
@@ -313,4 +706,16 @@ namespace GraphConstructor {
         high_liq_tokens.write(_index, _high_liq_tokens);
         return ();
     }
-}
\ No newline at end of file
+
+    // @notice Set the maximum number of trades a path extracted from the graph may have
+    // @dev Longer paths can be more efficient, but every trade adds steps to executing them and the
+    //      solvers run one relaxation round per hop, so the limit also bounds the steps of a quote
+    // @param _max_hops - The new limit, 0 resets it to DEFAULT_MAX_HOPS
+    func set_max_hops{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _max_hops: felt
+    ) {
+        Ownable.assert_only_owner();
+        max_hops.write(_max_hops);
+        return ();
+    }
+}
@@ -0,0 +1,213 @@
+// SPDX-License-Identifier: MIT
+%lang starknet
+
+from starkware.cairo.common.math import assert_not_zero, unsigned_div_rem
+from starkware.cairo.common.math_cmp import is_le_felt
+from starkware.cairo.common.dict import dict_read, dict_write
+from starkware.cairo.common.dict_access import DictAccess
+
+// ///////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
+//                                                                                                                             //
+//                          Binary min-heap of values (e.g. vertices) ordered by a felt priority                               //
+//                                                                                                                             //
+// ///////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
+
+// ///////////////////
+//  Storage Setup  //
+// ///////////////////
+//
+//  The heap is kept in three dicts that the caller creates with default_dict_new(default_value=0)
+//  and squashes with default_dict_finalize once it's done:
+//
+//  heap_elements:   position -> value
+//  heap_positions:  value -> position + 1 (0 if the value isn't in the heap)
+//  heap_priorities: value -> priority
+//
+//  heap_priorities isn't cleared when a value is popped, so it can double as the distances of a
+//  shortest path search. The number of elements in the heap is passed around explicitly.
+
+namespace MinHeap {
+    // @notice Add a value to the heap
+    // @param _heap_len - Number of elements in the heap
+    // @param _value - The value that is added, must not be in the heap yet
+    // @param _priority - Priority of the value, the lowest priority is popped first
+    // @return heap_len - Number of elements in the heap after the push
+    func push{
+        range_check_ptr,
+        heap_elements: DictAccess*,
+        heap_positions: DictAccess*,
+        heap_priorities: DictAccess*,
+    }(_heap_len: felt, _value: felt, _priority: felt) -> (heap_len: felt) {
+        dict_write{dict_ptr=heap_priorities}(key=_value, new_value=_priority);
+        sift_up(_heap_len, _value, _priority);
+        return (_heap_len + 1,);
+    }
+
+    // @notice Remove the value with the lowest priority from the heap
+    // @param _heap_len - Number of elements in the heap, must not be 0
+    // @return heap_len - Number of elements in the heap after the pop
+    // @return value - The removed value
+    // @return priority - The priority of the removed value
+    func pop_min{
+        range_check_ptr,
+        heap_elements: DictAccess*,
+        heap_positions: DictAccess*,
+        heap_priorities: DictAccess*,
+    }(_heap_len: felt) -> (heap_len: felt, value: felt, priority: felt) {
+        alloc_locals;
+
+        let (local value) = dict_read{dict_ptr=heap_elements}(key=0);
+        let (local priority) = dict_read{dict_ptr=heap_priorities}(key=value);
+        dict_write{dict_ptr=heap_positions}(key=value, new_value=0);
+
+        if (_heap_len == 1) {
+            return (0, value, priority);
+        }
+
+        // Move the last element to the root and restore the heap order
+        let (last) = dict_read{dict_ptr=heap_elements}(key=_heap_len - 1);
+        let (last_priority) = dict_read{dict_ptr=heap_priorities}(key=last);
+        sift_down(0, last, last_priority, _heap_len - 1);
+
+        return (_heap_len - 1, value, priority);
+    }
+
+    // @notice Lower the priority of a value that is in the heap
+    // @param _value - The value in question
+    // @param _priority - The new priority, must not be higher than the current one
+    func decrease_key{
+        range_check_ptr,
+        heap_elements: DictAccess*,
+        heap_positions: DictAccess*,
+        heap_priorities: DictAccess*,
+    }(_value: felt, _priority: felt) {
+        let (position) = dict_read{dict_ptr=heap_positions}(key=_value);
+        with_attr error_message("HEAP: Value isn't in the heap") {
+            assert_not_zero(position);
+        }
+        dict_write{dict_ptr=heap_priorities}(key=_value, new_value=_priority);
+        sift_up(position - 1, _value, _priority);
+        return ();
+    }
+
+    // @notice Check whether a value is currently in the heap
+    // @return is_in_heap - 1 if the value is in the heap, 0 otherwise
+    func contains{heap_positions: DictAccess*}(_value: felt) -> (is_in_heap: felt) {
+        let (position) = dict_read{dict_ptr=heap_positions}(key=_value);
+        if (position == 0) {
+            return (0,);
+        }
+        return (1,);
+    }
+
+    // ///////////////////////
+    //       Interals      //
+    // ///////////////////////
+
+    // @notice Move a value up from a position until its parent has a lower or equal priority
+    // @param _position - Position the value would be placed at
+    // @param _value - The value that is placed
+    // @param _priority - Priority of the value
+    func sift_up{
+        range_check_ptr,
+        heap_elements: DictAccess*,
+        heap_positions: DictAccess*,
+        heap_priorities: DictAccess*,
+    }(_position: felt, _value: felt, _priority: felt) {
+        alloc_locals;
+
+        if (_position == 0) {
+            place(0, _value);
+            return ();
+        }
+
+        let (local parent_position, _) = unsigned_div_rem(_position - 1, 2);
+        let (local parent) = dict_read{dict_ptr=heap_elements}(key=parent_position);
+        let (parent_priority) = dict_read{dict_ptr=heap_priorities}(key=parent);
+        let is_parent_lower = is_le_felt(parent_priority, _priority);
+
+        if (is_parent_lower == 1) {
+            place(_position, _value);
+            return ();
+        }
+
+        // Move the parent down and continue one level higher
+        place(_position, parent);
+        sift_up(parent_position, _value, _priority);
+        return ();
+    }
+
+    // @notice Move a value down from a position until its children have a higher or equal priority
+    // @param _position - Position the value would be placed at
+    // @param _value - The value that is placed
+    // @param _priority - Priority of the value
+    // @param _heap_len - Number of elements in the heap
+    func sift_down{
+        range_check_ptr,
+        heap_elements: DictAccess*,
+        heap_positions: DictAccess*,
+        heap_priorities: DictAccess*,
+    }(_position: felt, _value: felt, _priority: felt, _heap_len: felt) {
+        alloc_locals;
+
+        local left_position = _position * 2 + 1;
+        let has_no_children = is_le_felt(_heap_len, left_position);
+
+        if (has_no_children == 1) {
+            place(_position, _value);
+            return ();
+        }
+
+        let (local child_position, local child, local child_priority) = lower_child(
+            left_position, _heap_len
+        );
+        let is_value_lower = is_le_felt(_priority, child_priority);
+
+        if (is_value_lower == 1) {
+            place(_position, _value);
+            return ();
+        }
+
+        // Move the child up and continue one level lower
+        place(_position, child);
+        sift_down(child_position, _value, _priority, _heap_len);
+        return ();
+    }
+
+    // @notice Find the child with the lower priority
+    // @param _left_position - Position of the left child, the right child is the next one
+    // @param _heap_len - Number of elements in the heap
+    func lower_child{
+        range_check_ptr,
+        heap_elements: DictAccess*,
+        heap_positions: DictAccess*,
+        heap_priorities: DictAccess*,
+    }(_left_position: felt, _heap_len: felt) -> (position: felt, value: felt, priority: felt) {
+        alloc_locals;
+
+        let (local left) = dict_read{dict_ptr=heap_elements}(key=_left_position);
+        let (local left_priority) = dict_read{dict_ptr=heap_priorities}(key=left);
+
+        if (_left_position + 1 == _heap_len) {
+            return (_left_position, left, left_priority);
+        }
+
+        let (local right) = dict_read{dict_ptr=heap_elements}(key=_left_position + 1);
+        let (local right_priority) = dict_read{dict_ptr=heap_priorities}(key=right);
+        let is_left_lower = is_le_felt(left_priority, right_priority);
+
+        if (is_left_lower == 1) {
+            return (_left_position, left, left_priority);
+        }
+        return (_left_position + 1, right, right_priority);
+    }
+
+    // @notice Store a value at a position
+    func place{heap_elements: DictAccess*, heap_positions: DictAccess*}(
+        _position: felt, _value: felt
+    ) {
+        dict_write{dict_ptr=heap_elements}(key=_position, new_value=_value);
+        dict_write{dict_ptr=heap_positions}(key=_value, new_value=_position + 1);
+        return ();
+    }
+}
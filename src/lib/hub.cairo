@@ -4,15 +4,34 @@
 %lang starknet
 
 from starkware.cairo.common.cairo_builtins import HashBuiltin
-from starkware.cairo.common.uint256 import Uint256, uint256_le
-from starkware.cairo.common.math import assert_not_equal
+from starkware.cairo.common.alloc import alloc
+from starkware.cairo.common.uint256 import Uint256, uint256_le, uint256_eq
+from starkware.cairo.common.math import assert_le, assert_not_equal
+from starkware.cairo.common.math_cmp import is_le_felt
 from starkware.cairo.common.bool import TRUE, FALSE
-from starkware.starknet.common.syscalls import get_contract_address, get_caller_address
+from starkware.cairo.common.pow import pow
+from starkware.cairo.common.hash_state import (
+    hash_init,
+    hash_update,
+    hash_update_single,
+    hash_finalize,
+)
+from starkware.starknet.common.syscalls import (
+    get_contract_address,
+    get_caller_address,
+    get_block_number,
+)
 
 from src.interfaces.i_solver import ISolver
+from src.interfaces.i_market_solver import IMarketSolver
+from src.interfaces.i_router_aggregator import IRouterAggregator
 from src.interfaces.i_solver_registry import ISolverRegistry
 from src.interfaces.i_trade_executor import ITradeExecutor
-from src.lib.utils import Router, Path
+from src.interfaces.i_empiric_oracle import IEmpiricOracle
+from src.lib.utils import Utils, Router, Path, Order
+from src.lib.constants import BASE, BASE_8
+from src.lib.router_aggregator import Feed
+from src.lib.graph import GraphConstructor
 
 from openzeppelin.security.reentrancyguard.library import ReentrancyGuard
 from openzeppelin.security.safemath.library import SafeUint256
@@ -33,6 +52,44 @@ func Hub_trade_executor() -> (trade_executor_address: felt) {
 func Hub_solver_registry() -> (registry_address: felt) {
 }
 
+@storage_var
+func Hub_router_aggregator() -> (router_aggregator_address: felt) {
+}
+
+@storage_var
+func Hub_market_solvers(solver_id: felt) -> (is_market_solver: felt) {
+}
+
+// Number of blocks a path commitment stays valid, 0 for no limit
+@storage_var
+func Hub_commitment_max_age() -> (blocks: felt) {
+}
+
+// Key that every path commitment is hashed with, replacing it invalidates all open commitments.
+// It isn't a secret, storage can be read by anyone
+@storage_var
+func Hub_commitment_key() -> (key: felt) {
+}
+
+// Number of commitments an account has swapped, every commitment can only be swapped once
+@storage_var
+func Hub_commitment_nonce(account: felt) -> (nonce: felt) {
+}
+
+// Snapshot of the market that is fetched once and shared between the compared solvers
+// The pairs are listed like GraphConstructor.list_vertex_pairs, counts holds the number of routers of each pair
+struct Market {
+    tokens_len: felt,
+    tokens: felt*,
+    prices: Uint256*,
+    pairs_len: felt,
+    counts: felt*,
+    reserves_len: felt,
+    reserves_a: Uint256*,
+    reserves_b: Uint256*,
+    routers: Router*,
+}
+
 namespace Hub {
     // ////////////////////////
     //  Don't Effect State  //
@@ -56,6 +113,35 @@ namespace Hub {
         return (trade_executor,);
     }
 
+    // @notice Fetch the address of the router aggregator used to build market snapshots
+    // @return router_aggregator - Address of the router aggregator
+    func router_aggregator{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() -> (
+        router_aggregator: felt
+    ) {
+        let (router_aggregator) = Hub_router_aggregator.read();
+        return (router_aggregator,);
+    }
+
+    // @notice Pick the solver for a trade that doesn't specify one
+    // @dev Small trades get cheap solvers and large trades splitting ones, as configured in the solver registry.
+    //      Falls back to the default solver (1) if no solver of the registry fits the trade.
+    // @param _amount_in - Amount of tokens to sell
+    // @param _token_in - Address of the token to be sold
+    // @param _token_out - Address of the token to be bought
+    // @return solver_id - ID of the solver to be used
+    func select_solver{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _amount_in: Uint256, _token_in: felt, _token_out: felt
+    ) -> (solver_id: felt) {
+        let (solver_registry) = Hub.solver_registry();
+        let (solver_id) = ISolverRegistry.get_solver_for_trade(
+            solver_registry, _amount_in, _token_in, _token_out
+        );
+        if (solver_id == 0) {
+            return (1,);
+        }
+        return (solver_id,);
+    }
+
     // @notice Fetch the return amount of a specified solver
     // @param _amount_in - Amount of tokens to sell
     // @param _token_in - Address of the token to be sold
@@ -83,24 +169,18 @@ namespace Hub {
             amounts: felt*,
         ) = ISolver.get_results(solver_address, _amount_in, _token_in, _token_out);
 
-        let (trade_executor_hash) = Hub_trade_executor.read();
-
-        // Execute Trades
-        let (amount_out: Uint256) = ITradeExecutor.library_call_simulate_multi_swap(
-            trade_executor_hash,
-            routers_len,
-            routers,
-            path_len,
-            path,
-            amounts_len,
-            amounts,
-            _amount_in,
+        // Simulate Trades
+        let (market: Market) = Hub.empty_market();
+        let (amount_out: Uint256) = Hub.simulate_path(
+            routers_len, routers, path_len, path, amounts_len, amounts, _amount_in, market
         );
 
         return (amount_out,);
     }
 
     // @notice This method allows to query multiple solver results at once
+    // @dev The market is fetched for the first market solver and handed to the following market solvers
+    //      that use the same vertices. Other solvers fetch the market themselves
     // @param _amount_in - Amount of _token_in to be sold
     // @param _token_in - Address of the token to be sold
     // @param _token_out - Address of the token to be bought
@@ -116,28 +196,233 @@ namespace Hub {
         _solver_ids: felt*,
         _amounts_out: Uint256*,
     ) {
+        let (market: Market) = Hub.empty_market();
+
+        get_market_solver_amounts(
+            _amount_in, _token_in, _token_out, _solver_ids_len, _solver_ids, _amounts_out, market
+        );
+
+        return ();
+    }
+
+    // @notice Fetch the return amounts of multiple solvers on a shared market snapshot
+    // @param _amount_in - Amount of _token_in to be sold
+    // @param _token_in - Address of the token to be sold
+    // @param _token_out - Address of the token to be bought
+    // @param _solver_ids - An array of the solver IDs to get the out amounts from 
+    // @param _amounts_out - An empty array of result amounts that will be filled by this method. 
+    // @param _market - The last fetched market snapshot, empty if no market solver was queried yet
+    func get_market_solver_amounts{
+        syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr
+    }(
+        _amount_in: Uint256,
+        _token_in: felt,
+        _token_out: felt,
+        _solver_ids_len: felt,
+        _solver_ids: felt*,
+        _amounts_out: Uint256*,
+        _market: Market,
+    ) {
+        alloc_locals;
+
         if (_solver_ids_len == 0) {
             return ();
         }
 
-        let (amounts_out: Uint256) = Hub.get_solver_amount(
-            _amount_in, _token_in, _token_out, _solver_ids[0]
+        let (local market: Market) = Hub.get_solver_market(
+            _token_in, _token_out, _solver_ids[0], _market
+        );
+        let (amounts_out: Uint256) = Hub.get_solver_amount_with_market(
+            _amount_in, _token_in, _token_out, _solver_ids[0], market
         );
 
         assert _amounts_out[0] = amounts_out;
 
-        get_multiple_solver_amounts(
+        get_market_solver_amounts(
             _amount_in,
             _token_in,
             _token_out,
             _solver_ids_len - 1,
             _solver_ids + 1,
             _amounts_out + 2,
+            market,
         );
 
         return ();
     }
 
+    // @notice Fetch the market snapshot for the vertices of a market solver
+    // @dev Non market solvers or a Hub without router aggregator get the given market back.
+    //      The given market is reused if it was fetched for the same vertices
+    // @param _token_in - Address of the token to be sold
+    // @param _token_out - Address of the token to be bought
+    // @param _solver_id - ID of the solver the market is fetched for
+    // @param _market - The last fetched market snapshot, possibly empty
+    // @return market - The market snapshot to hand to the solver
+    func get_solver_market{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _token_in: felt, _token_out: felt, _solver_id: felt, _market: Market
+    ) -> (market: Market) {
+        alloc_locals;
+
+        let (is_market_solver) = Hub_market_solvers.read(_solver_id);
+        if (is_market_solver == FALSE) {
+            return (_market,);
+        }
+
+        let (local router_aggregator_address) = Hub_router_aggregator.read();
+        if (router_aggregator_address == 0) {
+            return (_market,);
+        }
+
+        let (solver_registry) = Hub.solver_registry();
+        let (solver_address) = ISolverRegistry.get_solver(solver_registry, _solver_id);
+        with_attr error_message("solver ID invalid") {
+            assert_not_equal(solver_address, FALSE);
+        }
+
+        // The vertices depend on the high liquidity tokens configured in each solver
+        let (local tokens_len: felt, local tokens: felt*) = IMarketSolver.get_vertices(
+            solver_address, _token_in, _token_out
+        );
+
+        if (tokens_len == _market.tokens_len) {
+            let (is_same) = is_same_tokens(tokens_len, tokens, _market.tokens);
+            if (is_same == TRUE) {
+                return (_market,);
+            }
+        }
+
+        let (market: Market) = Hub.get_market(router_aggregator_address, tokens_len, tokens);
+        return (market,);
+    }
+
+    // @notice Check whether two arrays of tokens are equal
+    // @param _tokens_len - Length of both arrays
+    // @return is_same - TRUE if every token is equal
+    func is_same_tokens(_tokens_len: felt, _tokens_a: felt*, _tokens_b: felt*) -> (
+        is_same: felt
+    ) {
+        if (_tokens_len == 0) {
+            return (TRUE,);
+        }
+        if (_tokens_a[0] != _tokens_b[0]) {
+            return (FALSE,);
+        }
+        let (is_same) = is_same_tokens(_tokens_len - 1, _tokens_a + 1, _tokens_b + 1);
+        return (is_same,);
+    }
+
+    // @notice Fetch the return amount of a specified solver, market solvers use the given market snapshot
+    // @param _amount_in - Amount of tokens to sell
+    // @param _token_in - Address of the token to be sold
+    // @param _token_out - Address of the token to be bought
+    // @param _solver_id - ID of the solver to be used
+    // @param _market - The market snapshot, solvers fetch the market themselves if it's empty
+    // @return amount_out - The amount of _token_out that where bought
+    func get_solver_amount_with_market{
+        syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr
+    }(_amount_in: Uint256, _token_in: felt, _token_out: felt, _solver_id: felt, _market: Market) -> (
+        amount_out: Uint256
+    ) {
+        alloc_locals;
+
+        let (is_market_solver) = Hub_market_solvers.read(_solver_id);
+        if (_market.tokens_len == 0) {
+            let (amount_out: Uint256) = Hub.get_solver_amount(
+                _amount_in, _token_in, _token_out, _solver_id
+            );
+            return (amount_out,);
+        }
+        if (is_market_solver == FALSE) {
+            let (amount_out: Uint256) = Hub.get_solver_amount(
+                _amount_in, _token_in, _token_out, _solver_id
+            );
+            return (amount_out,);
+        }
+
+        let (solver_registry) = Hub.solver_registry();
+        let (local solver_address) = ISolverRegistry.get_solver(solver_registry, _solver_id);
+        with_attr error_message("solver ID invalid") {
+            assert_not_equal(solver_address, FALSE);
+        }
+
+        // Get trading path from the selected solver without fetching the market again
+        let (
+            routers_len: felt,
+            routers: Router*,
+            path_len: felt,
+            path: Path*,
+            amounts_len: felt,
+            amounts: felt*,
+        ) = IMarketSolver.get_results_with_market(
+            solver_address,
+            _amount_in,
+            _market.tokens_len,
+            _market.tokens,
+            _market.tokens_len,
+            _market.prices,
+            _market.pairs_len,
+            _market.counts,
+            _market.reserves_len,
+            _market.reserves_a,
+            _market.reserves_len,
+            _market.reserves_b,
+            _market.reserves_len,
+            _market.routers,
+        );
+
+        // Simulate Trades on the same market
+        let (amount_out: Uint256) = Hub.simulate_path(
+            routers_len, routers, path_len, path, amounts_len, amounts, _amount_in, _market
+        );
+
+        return (amount_out,);
+    }
+
+    // @notice Fetch the prices and reserves of every pair of the market tokens with one call each
+    // @param _router_aggregator_address - Address of the router aggregator
+    // @param _tokens - The market tokens, token in first and token out last like the solvers order their vertices
+    // @return market - The market snapshot
+    func get_market{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _router_aggregator_address: felt, _tokens_len: felt, _tokens: felt*
+    ) -> (market: Market) {
+        alloc_locals;
+
+        let (_, prices: Uint256*) = IRouterAggregator.get_global_prices(
+            _router_aggregator_address, _tokens_len, _tokens
+        );
+
+        let (local pairs: Path*) = alloc();
+        let pairs_len = GraphConstructor.list_vertex_pairs(_tokens_len, _tokens, pairs, 0, 1, 0);
+
+        let (
+            counts_len: felt,
+            counts: felt*,
+            reserves_a_len: felt,
+            reserves_a: Uint256*,
+            reserves_b_len: felt,
+            reserves_b: Uint256*,
+            routers_len: felt,
+            routers: Router*,
+        ) = IRouterAggregator.get_all_routers_and_reserves_batch(
+            _router_aggregator_address, pairs_len, pairs
+        );
+
+        return (
+            Market(
+                tokens_len=_tokens_len,
+                tokens=_tokens,
+                prices=prices,
+                pairs_len=counts_len,
+                counts=counts,
+                reserves_len=routers_len,
+                reserves_a=reserves_a,
+                reserves_b=reserves_b,
+                routers=routers,
+            ),
+        );
+    }
+
     // @notice This method allows to query multiple solver results at once
     // @param _amount_in - Amount of _token_in to be sold
     // @param _token_in - Address of the token to be sold
@@ -173,130 +458,1121 @@ namespace Hub {
             amounts: felt*,
         ) = ISolver.get_results(solver_address, _amount_in, _token_in, _token_out);
 
-        let (trade_executor_hash) = Hub_trade_executor.read();
-
-        // Execute Trades
-        let (amount_out: Uint256) = ITradeExecutor.library_call_simulate_multi_swap(
-            trade_executor_hash,
-            routers_len,
-            routers,
-            path_len,
-            path,
-            amounts_len,
-            amounts,
-            _amount_in,
+        // Simulate Trades
+        let (market: Market) = Hub.empty_market();
+        let (amount_out: Uint256) = Hub.simulate_path(
+            routers_len, routers, path_len, path, amounts_len, amounts, _amount_in, market
         );
 
         return (routers_len, routers, path_len, path, amounts_len, amounts, amount_out);
     }
 
-    // //////////////////
-    //  Effect State  //
-    // //////////////////
+    // @notice Fetch the number of blocks a path commitment stays valid
+    // @return max_age - Number of blocks, 0 for no limit
+    func commitment_max_age{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() -> (
+        max_age: felt
+    ) {
+        let (max_age) = Hub_commitment_max_age.read();
+        return (max_age,);
+    }
 
-    // @notice Perform a swap with a specified solver
+    // @notice Fetch the number of path commitments an account has swapped
+    // @param _account - Address of the account
+    // @return nonce - The nonce the next commitment of the account is bound to
+    func commitment_nonce{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _account: felt
+    ) -> (nonce: felt) {
+        let (nonce) = Hub_commitment_nonce.read(_account);
+        return (nonce,);
+    }
+
+    // @notice Fetch the trading path of a solver with a commitment that allows swapping it without re-solving
+    // @param _amount_in - Amount of tokens to sell
     // @param _token_in - Address of the token to be sold
     // @param _token_out - Address of the token to be bought
-    // @param _amount_in - Amount of _token_in to be sold
-    // @param _min_amount_out - Minimum amount of _token_out ot be sold
-    // @param _to - The receiver of the bought _token_in tokens
-    // @param _solver_id - The id of the solver to be used to perform the trade
-    func swap_with_solver{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
-        _token_in: felt,
-        _token_out: felt,
-        _amount_in: Uint256,
-        _min_amount_out: Uint256,
-        _to: felt,
-        _solver_id: felt,
-    ) -> (received_amount: Uint256) {
+    // @param _solver_id - ID of the solver to be used
+    // @param _account - The account that will swap the path, nobody else can use the commitment
+    // @return block_number - The block the path was computed at
+    // @return commitment - The commitment of the path (see path_commitment)
+    func get_solver_amount_path_and_commitment{
+        syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr
+    }(
+        _amount_in: Uint256, _token_in: felt, _token_out: felt, _solver_id: felt, _account: felt
+    ) -> (
+        routers_len: felt,
+        routers: Router*,
+        path_len: felt,
+        path: Path*,
+        amounts_len: felt,
+        amounts: felt*,
+        amount_out: Uint256,
+        block_number: felt,
+        commitment: felt,
+    ) {
         alloc_locals;
 
-        ReentrancyGuard.start();
-
-        // Get Solver address that will be used
-        let (solver_registry) = Hub.solver_registry();
-        let (solver_address) = ISolverRegistry.get_solver(solver_registry, _solver_id);
-        with_attr error_message("solver ID invalid") {
-            assert_not_equal(solver_address, FALSE);
-        }
-
-        // Get Caller Address
-        let (caller_address) = get_caller_address();
-        // Get Hub Address
-        let (this_address) = get_contract_address();
-        // Send tokens_in to the hub
-        IERC20.transferFrom(_token_in, caller_address, this_address, _amount_in);
-
-        // Check current token balance
-        // (Used to determine received amount)
-        let (original_balance: Uint256) = IERC20.balanceOf(_token_out, this_address);
-
-        // Get trading path from the selected solver
         let (
-            routers_len: felt,
-            routers: Router*,
-            path_len: felt,
-            path: Path*,
-            amounts_len: felt,
-            amounts: felt*,
-        ) = ISolver.get_results(solver_address, _amount_in, _token_in, _token_out);
+            local routers_len: felt,
+            local routers: Router*,
+            local path_len: felt,
+            local path: Path*,
+            local amounts_len: felt,
+            local amounts: felt*,
+            local amount_out: Uint256,
+        ) = Hub.get_solver_amount_and_path(_amount_in, _token_in, _token_out, _solver_id);
 
-        // Get trade executor class hash
-        let (trade_executor_hash) = Hub_trade_executor.read();
-
-        // Delegate Call: Execute transactions
-        ITradeExecutor.library_call_multi_swap(
-            trade_executor_hash,
+        let (local block_number) = get_block_number();
+        let (commitment) = Hub.path_commitment(
             routers_len,
             routers,
             path_len,
             path,
             amounts_len,
             amounts,
-            this_address,
+            _solver_id,
+            block_number,
+            _account,
         );
 
-        // Check received Amount
-        // We do not naively transfer out the entire balance of that token, as the hub might be holding more
-        // tokens that it received as rewards or that where mistakenly sent here
-        let (new_amount: Uint256) = IERC20.balanceOf(_token_out, this_address);
-        let (received_amount: Uint256) = SafeUint256.sub_le(new_amount, original_balance);
+        return (
+            routers_len,
+            routers,
+            path_len,
+            path,
+            amounts_len,
+            amounts,
+            amount_out,
+            block_number,
+            commitment,
+        );
+    }
 
-        // Check that tokens received by solver at at least as much as the min_amount_out
-        let (is_min_amount_received) = uint256_le(_min_amount_out, received_amount);
-        with_attr error_message("Minimum amount not received") {
-            assert is_min_amount_received = TRUE;
-        }
+    // @notice Hash a trading path together with the solver, the block it was computed at and the account swapping it
+    // @dev Hub_commitment_key is public contract storage, anyone can compute a commitment. The only protections are
+    //      the account, which has to be the caller of swap_with_commitment, and its nonce, which the swap uses up.
+    //      The array lengths are hashed too, so the same felts can't be split into other arrays
+    // @return commitment - Pedersen hash chain (like hash_state) of [key, account, nonce, solver_id, block_number,
+    //         routers_len, *routers, path_len, *path, amounts_len, *amounts]
+    func path_commitment{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _routers_len: felt,
+        _routers: Router*,
+        _path_len: felt,
+        _path: Path*,
+        _amounts_len: felt,
+        _amounts: felt*,
+        _solver_id: felt,
+        _block_number: felt,
+        _account: felt,
+    ) -> (commitment: felt) {
+        alloc_locals;
 
-        // Transfer _token_out back to caller
-        IERC20.transfer(_token_out, _to, received_amount);
+        let (local key) = Hub_commitment_key.read();
+        let (local nonce) = Hub_commitment_nonce.read(_account);
 
-        ReentrancyGuard.end();
+        let hash_ptr = pedersen_ptr;
+        with hash_ptr {
+            let (hash_state_ptr) = hash_init();
+            let (hash_state_ptr) = hash_update_single(hash_state_ptr, key);
+            let (hash_state_ptr) = hash_update_single(hash_state_ptr, _account);
+            let (hash_state_ptr) = hash_update_single(hash_state_ptr, nonce);
+            let (hash_state_ptr) = hash_update_single(hash_state_ptr, _solver_id);
+            let (hash_state_ptr) = hash_update_single(hash_state_ptr, _block_number);
+            let (hash_state_ptr) = hash_update_single(hash_state_ptr, _routers_len);
+            let (hash_state_ptr) = hash_update(
+                hash_state_ptr, cast(_routers, felt*), _routers_len * Router.SIZE
+            );
+            let (hash_state_ptr) = hash_update_single(hash_state_ptr, _path_len);
+            let (hash_state_ptr) = hash_update(
+                hash_state_ptr, cast(_path, felt*), _path_len * Path.SIZE
+            );
+            let (hash_state_ptr) = hash_update_single(hash_state_ptr, _amounts_len);
+            let (hash_state_ptr) = hash_update(hash_state_ptr, _amounts, _amounts_len);
+            let (commitment) = hash_finalize(hash_state_ptr);
+        }
+        let pedersen_ptr = hash_ptr;
+        return (commitment,);
+    }
 
-        return (received_amount,);
+    // @notice A market without tokens, solvers and simulations fetch the market themselves
+    // @return market - The empty market
+    func empty_market() -> (market: Market) {
+        let (tokens: felt*) = alloc();
+        let (prices: Uint256*) = alloc();
+        let (counts: felt*) = alloc();
+        let (reserves: Uint256*) = alloc();
+        let (routers: Router*) = alloc();
+        return (
+            Market(
+                tokens_len=0,
+                tokens=tokens,
+                prices=prices,
+                pairs_len=0,
+                counts=counts,
+                reserves_len=0,
+                reserves_a=reserves,
+                reserves_b=reserves,
+                routers=routers,
+            ),
+        );
     }
 
-    // @notice Swap between two tokens by providing the exact routers and token address to be used. Aka the exat path to take.
+    // @notice Simulate a trading path, evaluating the trades locally from pool reserves where possible
+    // @dev The reserves are taken from the market, else fetched for all hops with one router aggregator call.
+    //      If a hop's router has no reserves there (or no router aggregator is set) the routers are asked instead.
     // @param _routers - An array of routers to be used for the trades
     // @param _path - An array of token pairs to trade
     // @param _amounts - An array of token amounts (in %) to sell
     // @param _amount_in - The initial token to sell
-    // @param _min_amount_out - The minimum amount of tokens to receive (will be the path.token_out of the last item in the path array)
-    // @return received_amount - The token return amounts for each solver
-    func swap_with_path{
-            syscall_ptr: felt*, 
-            pedersen_ptr: HashBuiltin*, 
-            range_check_ptr
-        }(
-            _routers_len: felt,
-            _routers: Router*,
-            _path_len: felt,
-            _path: Path*,
-            _amounts_len: felt,
-            _amounts: felt*,
-            _amount_in: Uint256,
-            _min_amount_out: Uint256,
-        ) -> (received_amount: Uint256) {
+    // @param _market - A market snapshot that contains the hops, can be empty
+    // @return amount_out - The expected amount of the last token of the path
+    func simulate_path{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _routers_len: felt,
+        _routers: Router*,
+        _path_len: felt,
+        _path: Path*,
+        _amounts_len: felt,
+        _amounts: felt*,
+        _amount_in: Uint256,
+        _market: Market,
+    ) -> (amount_out: Uint256) {
+        alloc_locals;
+
+        if (_market.tokens_len == 0) {
+            let (amount_out: Uint256) = simulate_path_with_fetched_reserves(
+                _routers_len, _routers, _path_len, _path, _amounts_len, _amounts, _amount_in
+            );
+            return (amount_out,);
+        }
+
+        let (local reserves_in: Uint256*) = alloc();
+        let (local reserves_out: Uint256*) = alloc();
+        let is_complete = market_hop_reserves(
+            _routers_len, _routers, _path, _market, reserves_in, reserves_out
+        );
+
+        if (is_complete == FALSE) {
+            let (amount_out: Uint256) = simulate_path_with_fetched_reserves(
+                _routers_len, _routers, _path_len, _path, _amounts_len, _amounts, _amount_in
+            );
+            return (amount_out,);
+        }
+
+        let (trade_executor_hash) = Hub_trade_executor.read();
+        let (amount_out: Uint256) = ITradeExecutor.library_call_simulate_multi_swap_with_reserves(
+            trade_executor_hash,
+            _routers_len,
+            _routers,
+            _path_len,
+            _path,
+            _amounts_len,
+            _amounts,
+            _routers_len,
+            reserves_in,
+            _routers_len,
+            reserves_out,
+            _amount_in,
+        );
+        return (amount_out,);
+    }
+
+    // @notice Simulate a trading path with the reserves of all hops fetched in one router aggregator call
+    // @dev Falls back to asking the routers if no router aggregator is set or a hop's router has no reserves
+    func simulate_path_with_fetched_reserves{
+        syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr
+    }(
+        _routers_len: felt,
+        _routers: Router*,
+        _path_len: felt,
+        _path: Path*,
+        _amounts_len: felt,
+        _amounts: felt*,
+        _amount_in: Uint256,
+    ) -> (amount_out: Uint256) {
+        alloc_locals;
+
+        let (local trade_executor_hash) = Hub_trade_executor.read();
+        let (router_aggregator_address) = Hub_router_aggregator.read();
+
+        if (router_aggregator_address == 0) {
+            let (amount_out: Uint256) = ITradeExecutor.library_call_simulate_multi_swap(
+                trade_executor_hash,
+                _routers_len,
+                _routers,
+                _path_len,
+                _path,
+                _amounts_len,
+                _amounts,
+                _amount_in,
+            );
+            return (amount_out,);
+        }
+
+        // The reserves of every router of every hop's pair, reserves_a are the reserves of the hop's token_in
+        let (
+            counts_len: felt,
+            counts: felt*,
+            reserves_a_len: felt,
+            reserves_a: Uint256*,
+            reserves_b_len: felt,
+            reserves_b: Uint256*,
+            pair_routers_len: felt,
+            pair_routers: Router*,
+        ) = IRouterAggregator.get_all_routers_and_reserves_batch(
+            router_aggregator_address, _path_len, _path
+        );
+
+        let (local reserves_in: Uint256*) = alloc();
+        let (local reserves_out: Uint256*) = alloc();
+        let is_complete = path_hop_reserves(
+            _routers_len,
+            _routers,
+            counts,
+            pair_routers,
+            reserves_a,
+            reserves_b,
+            reserves_in,
+            reserves_out,
+        );
+
+        if (is_complete == FALSE) {
+            let (amount_out: Uint256) = ITradeExecutor.library_call_simulate_multi_swap(
+                trade_executor_hash,
+                _routers_len,
+                _routers,
+                _path_len,
+                _path,
+                _amounts_len,
+                _amounts,
+                _amount_in,
+            );
+            return (amount_out,);
+        }
+
+        let (amount_out: Uint256) = ITradeExecutor.library_call_simulate_multi_swap_with_reserves(
+            trade_executor_hash,
+            _routers_len,
+            _routers,
+            _path_len,
+            _path,
+            _amounts_len,
+            _amounts,
+            _routers_len,
+            reserves_in,
+            _routers_len,
+            reserves_out,
+            _amount_in,
+        );
+        return (amount_out,);
+    }
+
+    // @notice Write the reserves of each hop's router, taken from the reserves fetched for each hop's pair
+    // @param _hops - Number of hops left
+    // @param _routers - The router of each hop
+    // @param _counts - Number of routers with liquidity of each hop's pair
+    // @param _pair_routers - The routers with liquidity, grouped by pair
+    // @param _reserves_a - The reserves of the hop's token_in, grouped by pair
+    // @param _reserves_b - The reserves of the hop's token_out, grouped by pair
+    // @param _reserves_in - An (empty) array of token_in reserves of each hop
+    // @param _reserves_out - An (empty) array of token_out reserves of each hop
+    // @return is_complete - TRUE if the reserves of every hop were found
+    func path_hop_reserves(
+        _hops: felt,
+        _routers: Router*,
+        _counts: felt*,
+        _pair_routers: Router*,
+        _reserves_a: Uint256*,
+        _reserves_b: Uint256*,
+        _reserves_in: Uint256*,
+        _reserves_out: Uint256*,
+    ) -> felt {
+        if (_hops == 0) {
+            return (TRUE);
+        }
+
+        let (is_found, reserve_a: Uint256, reserve_b: Uint256) = find_router_reserves(
+            _routers[0], _counts[0], _pair_routers, _reserves_a, _reserves_b
+        );
+        if (is_found == FALSE) {
+            return (FALSE);
+        }
+
+        assert _reserves_in[0] = reserve_a;
+        assert _reserves_out[0] = reserve_b;
+
+        let is_complete = path_hop_reserves(
+            _hops - 1,
+            _routers + Router.SIZE,
+            _counts + 1,
+            _pair_routers + _counts[0] * Router.SIZE,
+            _reserves_a + _counts[0] * Uint256.SIZE,
+            _reserves_b + _counts[0] * Uint256.SIZE,
+            _reserves_in + Uint256.SIZE,
+            _reserves_out + Uint256.SIZE,
+        );
+        return (is_complete);
+    }
+
+    // @notice Write the reserves of each hop's router, taken from a market snapshot
+    // @param _hops - Number of hops left
+    // @param _routers - The router of each hop
+    // @param _path - The token pair of each hop
+    // @param _market - The market snapshot
+    // @param _reserves_in - An (empty) array of token_in reserves of each hop
+    // @param _reserves_out - An (empty) array of token_out reserves of each hop
+    // @return is_complete - TRUE if the reserves of every hop were found
+    func market_hop_reserves{range_check_ptr}(
+        _hops: felt,
+        _routers: Router*,
+        _path: Path*,
+        _market: Market,
+        _reserves_in: Uint256*,
+        _reserves_out: Uint256*,
+    ) -> felt {
+        alloc_locals;
+
+        if (_hops == 0) {
+            return (TRUE);
+        }
+
+        let index = find_token_index(_market.tokens_len, _market.tokens, _path[0].token_in, 0);
+        local index_in = index;
+        let index = find_token_index(_market.tokens_len, _market.tokens, _path[0].token_out, 0);
+        local index_out = index;
+        if (index_in == _market.tokens_len) {
+            return (FALSE);
+        }
+        if (index_out == _market.tokens_len) {
+            return (FALSE);
+        }
+
+        // Pairs are listed by low and then high token index (see GraphConstructor.list_vertex_pairs)
+        let is_le = is_le_felt(index_in, index_out);
+        local is_in_low = is_le;
+        local low;
+        local high;
+        if (is_in_low == TRUE) {
+            assert low = index_in;
+            assert high = index_out;
+        } else {
+            assert low = index_out;
+            assert high = index_in;
+        }
+        local pair_index = low * (2 * _market.tokens_len - low - 1) / 2 + high - low - 1;
+        let offset = sum_counts(pair_index, _market.counts, 0);
+
+        let (is_found, reserve_a: Uint256, reserve_b: Uint256) = find_router_reserves(
+            _routers[0],
+            _market.counts[pair_index],
+            _market.routers + offset * Router.SIZE,
+            _market.reserves_a + offset * Uint256.SIZE,
+            _market.reserves_b + offset * Uint256.SIZE,
+        );
+        if (is_found == FALSE) {
+            return (FALSE);
+        }
+
+        // reserves_a are the reserves of the lower token
+        if (is_in_low == TRUE) {
+            assert _reserves_in[0] = reserve_a;
+            assert _reserves_out[0] = reserve_b;
+        } else {
+            assert _reserves_in[0] = reserve_b;
+            assert _reserves_out[0] = reserve_a;
+        }
+
+        let is_complete = market_hop_reserves(
+            _hops - 1,
+            _routers + Router.SIZE,
+            _path + Path.SIZE,
+            _market,
+            _reserves_in + Uint256.SIZE,
+            _reserves_out + Uint256.SIZE,
+        );
+        return (is_complete);
+    }
+
+    // @notice Find the reserves of a router among the routers of a pair
+    // @param _router - The router in question
+    // @param _count - Number of routers of the pair
+    // @param _pair_routers - The routers of the pair
+    // @param _reserves_a - The reserves of the first token of the pair
+    // @param _reserves_b - The reserves of the second token of the pair
+    // @return is_found - TRUE if the router has reserves for the pair
+    func find_router_reserves(
+        _router: Router,
+        _count: felt,
+        _pair_routers: Router*,
+        _reserves_a: Uint256*,
+        _reserves_b: Uint256*,
+    ) -> (is_found: felt, reserve_a: Uint256, reserve_b: Uint256) {
+        if (_count == 0) {
+            return (FALSE, Uint256(0, 0), Uint256(0, 0));
+        }
+
+        if (_pair_routers[0].address == _router.address) {
+            if (_pair_routers[0].type == _router.type) {
+                return (TRUE, _reserves_a[0], _reserves_b[0]);
+            }
+        }
+
+        let (is_found, reserve_a: Uint256, reserve_b: Uint256) = find_router_reserves(
+            _router,
+            _count - 1,
+            _pair_routers + Router.SIZE,
+            _reserves_a + Uint256.SIZE,
+            _reserves_b + Uint256.SIZE,
+        );
+        return (is_found, reserve_a, reserve_b);
+    }
+
+    // @notice Find the index of a token in an array of tokens
+    // @return index - The index of the token, _tokens_len if it isn't in the array
+    func find_token_index(_tokens_len: felt, _tokens: felt*, _token: felt, _index: felt) -> felt {
+        if (_index == _tokens_len) {
+            return (_index);
+        }
+        if (_tokens[_index] == _token) {
+            return (_index);
+        }
+        let index = find_token_index(_tokens_len, _tokens, _token, _index + 1);
+        return (index);
+    }
+
+    // @notice Sum up the first entries of an array of counts
+    // @param _len - Number of entries to sum up
+    // @return sum - The sum of the entries
+    func sum_counts(_len: felt, _counts: felt*, _sum: felt) -> felt {
+        if (_len == 0) {
+            return (_sum);
+        }
+        let sum = sum_counts(_len - 1, _counts + 1, _sum + _counts[0]);
+        return (sum);
+    }
+
+    // //////////////////
+    //  Effect State  //
+    // //////////////////
+
+    // @notice Perform a swap with a specified solver
+    // @param _token_in - Address of the token to be sold
+    // @param _token_out - Address of the token to be bought
+    // @param _amount_in - Amount of _token_in to be sold
+    // @param _min_amount_out - Minimum amount of _token_out ot be sold
+    // @param _to - The receiver of the bought _token_in tokens
+    // @param _solver_id - The id of the solver to be used to perform the trade
+    func swap_with_solver{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _token_in: felt,
+        _token_out: felt,
+        _amount_in: Uint256,
+        _min_amount_out: Uint256,
+        _to: felt,
+        _solver_id: felt,
+    ) -> (received_amount: Uint256) {
+        alloc_locals;
+
+        ReentrancyGuard.start();
+
+        // Get Solver address that will be used
+        let (solver_registry) = Hub.solver_registry();
+        let (solver_address) = ISolverRegistry.get_solver(solver_registry, _solver_id);
+        with_attr error_message("solver ID invalid") {
+            assert_not_equal(solver_address, FALSE);
+        }
+
+        // Get Caller Address
+        let (caller_address) = get_caller_address();
+        // Get Hub Address
+        let (this_address) = get_contract_address();
+        // Send tokens_in to the hub
+        IERC20.transferFrom(_token_in, caller_address, this_address, _amount_in);
+
+        let (received_amount: Uint256) = Hub.route_amount(
+            solver_address, _token_in, _token_out, _amount_in
+        );
+
+        // Check that tokens received by solver at at least as much as the min_amount_out
+        let (is_min_amount_received) = uint256_le(_min_amount_out, received_amount);
+        with_attr error_message("Minimum amount not received") {
+            assert is_min_amount_received = TRUE;
+        }
+
+        // Transfer _token_out back to caller
+        IERC20.transfer(_token_out, _to, received_amount);
+
+        ReentrancyGuard.end();
+
+        return (received_amount,);
+    }
+
+    // @notice Trade tokens held by the hub along the path of a solver
+    // @param _solver_address - Address of the solver that finds the trading path
+    // @param _token_in - Address of the token to be sold
+    // @param _token_out - Address of the token to be bought
+    // @param _amount_in - Amount of _token_in to be sold, nothing is traded if it's 0
+    // @return amount_out - The amount of _token_out the hub received
+    func route_amount{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _solver_address: felt, _token_in: felt, _token_out: felt, _amount_in: Uint256
+    ) -> (amount_out: Uint256) {
+        alloc_locals;
+
+        let (is_empty) = uint256_eq(_amount_in, Uint256(0, 0));
+        if (is_empty == TRUE) {
+            return (Uint256(0, 0),);
+        }
+
+        // Get Hub Address
+        let (this_address) = get_contract_address();
+
+        // Check current token balance
+        // (Used to determine received amount)
+        let (original_balance: Uint256) = IERC20.balanceOf(_token_out, this_address);
+
+        // Get trading path from the selected solver
+        let (
+            routers_len: felt,
+            routers: Router*,
+            path_len: felt,
+            path: Path*,
+            amounts_len: felt,
+            amounts: felt*,
+        ) = ISolver.get_results(_solver_address, _amount_in, _token_in, _token_out);
+
+        // Get trade executor class hash
+        let (trade_executor_hash) = Hub_trade_executor.read();
+
+        // Delegate Call: Execute transactions
+        // Only _amount_in is sold, the hub may hold more _token_in (e.g. the other side of a batch)
+        ITradeExecutor.library_call_multi_swap_exact_in(
+            trade_executor_hash,
+            routers_len,
+            routers,
+            path_len,
+            path,
+            amounts_len,
+            amounts,
+            _amount_in,
+            this_address,
+        );
+
+        // Check received Amount
+        // We do not naively transfer out the entire balance of that token, as the hub might be holding more
+        // tokens that it received as rewards or that where mistakenly sent here
+        let (new_amount: Uint256) = IERC20.balanceOf(_token_out, this_address);
+        let (amount_out: Uint256) = SafeUint256.sub_le(new_amount, original_balance);
+
+        return (amount_out,);
+    }
+
+    // @notice Execute many orders of the caller at once
+    // @dev Orders are grouped by pair. Opposite orders of a pair are matched against each other at the
+    //      oracle prices of the router aggregator, only the residual of the larger side is traded through
+    //      one solver run. Each side's proceeds are split pro rata to the amounts sold.
+    // @param _orders - The orders, the caller pays the tokens sold by all of them
+    // @param _solver_id - ID of the solver routing the residuals, 0 selects one per pair (see select_solver)
+    // @param _amounts_out - An empty array that is filled with the amount received by each order
+    func swap_batch{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _orders_len: felt, _orders: Order*, _solver_id: felt, _amounts_out: Uint256*
+    ) {
+        alloc_locals;
+
+        ReentrancyGuard.start();
+
+        let (local pairs: Path*) = alloc();
+        let (pairs_len) = list_order_pairs(_orders_len, _orders, pairs, 0);
+
+        settle_pairs(pairs_len, pairs, _orders_len, _orders, _solver_id, _amounts_out);
+
+        ReentrancyGuard.end();
+
+        return ();
+    }
+
+    // @notice List every pair traded by the orders once, oriented like the first order of the pair
+    // @param _pairs - An (empty) array of pairs that will be filled by this function
+    // @param _pairs_len - Number of pairs listed so far
+    // @return pairs_len - Total number of pairs
+    func list_order_pairs(_orders_len: felt, _orders: Order*, _pairs: Path*, _pairs_len: felt) -> (
+        pairs_len: felt
+    ) {
+        if (_orders_len == 0) {
+            return (_pairs_len,);
+        }
+
+        with_attr error_message("order sells and buys the same token") {
+            assert_not_equal(_orders[0].token_in, _orders[0].token_out);
+        }
+
+        let is_listed = is_pair_listed(
+            _pairs_len, _pairs, _orders[0].token_in, _orders[0].token_out
+        );
+        if (is_listed == TRUE) {
+            let (pairs_len) = list_order_pairs(
+                _orders_len - 1, _orders + Order.SIZE, _pairs, _pairs_len
+            );
+            return (pairs_len,);
+        }
+
+        assert _pairs[_pairs_len] = Path(
+            token_in=_orders[0].token_in, token_out=_orders[0].token_out
+        );
+        let (pairs_len) = list_order_pairs(
+            _orders_len - 1, _orders + Order.SIZE, _pairs, _pairs_len + 1
+        );
+        return (pairs_len,);
+    }
+
+    // @notice Check if a pair is listed in either direction
+    // @return is_listed - 1 if the pair is listed, 0 otherwise
+    func is_pair_listed(_pairs_len: felt, _pairs: Path*, _token_a: felt, _token_b: felt) -> felt {
+        if (_pairs_len == 0) {
+            return FALSE;
+        }
+        if (_pairs[0].token_in == _token_a) {
+            if (_pairs[0].token_out == _token_b) {
+                return TRUE;
+            }
+        }
+        if (_pairs[0].token_in == _token_b) {
+            if (_pairs[0].token_out == _token_a) {
+                return TRUE;
+            }
+        }
+        let is_listed = is_pair_listed(_pairs_len - 1, _pairs + Path.SIZE, _token_a, _token_b);
+        return is_listed;
+    }
+
+    // @notice Settle the orders of each pair
+    // @param _pairs - The pairs of the orders (see list_order_pairs)
+    func settle_pairs{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _pairs_len: felt,
+        _pairs: Path*,
+        _orders_len: felt,
+        _orders: Order*,
+        _solver_id: felt,
+        _amounts_out: Uint256*,
+    ) {
+        if (_pairs_len == 0) {
+            return ();
+        }
+
+        settle_pair(
+            _pairs[0].token_in, _pairs[0].token_out, _orders_len, _orders, _solver_id, _amounts_out
+        );
+
+        settle_pairs(
+            _pairs_len - 1, _pairs + Path.SIZE, _orders_len, _orders, _solver_id, _amounts_out
+        );
+        return ();
+    }
+
+    // @notice Collect the tokens of both sides of a pair, net them and pay out the orders of the pair
+    // @param _token_a - Token sold by the first order of the pair
+    // @param _token_b - Token bought by the first order of the pair
+    func settle_pair{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _token_a: felt,
+        _token_b: felt,
+        _orders_len: felt,
+        _orders: Order*,
+        _solver_id: felt,
+        _amounts_out: Uint256*,
+    ) {
+        alloc_locals;
+
+        let (local sum_a: Uint256) = sum_orders(_orders_len, _orders, _token_a, _token_b);
+        let (local sum_b: Uint256) = sum_orders(_orders_len, _orders, _token_b, _token_a);
+
+        // One transfer per side instead of one per order
+        let (caller_address) = get_caller_address();
+        let (this_address) = get_contract_address();
+        IERC20.transferFrom(_token_a, caller_address, this_address, sum_a);
+        IERC20.transferFrom(_token_b, caller_address, this_address, sum_b);
+
+        let (local proceeds_a: Uint256, local proceeds_b: Uint256) = net_and_route(
+            _token_a, _token_b, sum_a, sum_b, _solver_id
+        );
+
+        pay_orders(_orders_len, _orders, _token_a, _token_b, sum_a, proceeds_a, _amounts_out);
+        pay_orders(_orders_len, _orders, _token_b, _token_a, sum_b, proceeds_b, _amounts_out);
+
+        return ();
+    }
+
+    // @notice Sum up the amounts sold by the orders of one direction of a pair
+    // @return sum - The total amount of _token_in sold
+    func sum_orders{range_check_ptr}(
+        _orders_len: felt, _orders: Order*, _token_in: felt, _token_out: felt
+    ) -> (sum: Uint256) {
+        alloc_locals;
+
+        if (_orders_len == 0) {
+            return (Uint256(0, 0),);
+        }
+
+        let (local sum: Uint256) = sum_orders(
+            _orders_len - 1, _orders + Order.SIZE, _token_in, _token_out
+        );
+        let is_order_of_side = is_order_of(_orders[0], _token_in, _token_out);
+        if (is_order_of_side == TRUE) {
+            let (total: Uint256) = SafeUint256.add(sum, _orders[0].amount_in);
+            return (total,);
+        }
+        return (sum,);
+    }
+
+    // @notice Check if an order sells _token_in for _token_out
+    // @return is_order_of - 1 if it does, 0 otherwise
+    func is_order_of(_order: Order, _token_in: felt, _token_out: felt) -> felt {
+        if (_order.token_in == _token_in) {
+            if (_order.token_out == _token_out) {
+                return TRUE;
+            }
+        }
+        return FALSE;
+    }
+
+    // @notice Match the two sides of a pair and trade the residual of the larger side
+    // @param _sum_a - Amount of _token_a sold by the orders of side A
+    // @param _sum_b - Amount of _token_b sold by the orders of side B
+    // @return proceeds_a - Amount of _token_b received by side A
+    // @return proceeds_b - Amount of _token_a received by side B
+    func net_and_route{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _token_a: felt, _token_b: felt, _sum_a: Uint256, _sum_b: Uint256, _solver_id: felt
+    ) -> (proceeds_a: Uint256, proceeds_b: Uint256) {
+        alloc_locals;
+
+        // Nothing to match if one side is empty
+        let (is_b_empty) = uint256_eq(_sum_b, Uint256(0, 0));
+        if (is_b_empty == TRUE) {
+            let (amount_out: Uint256) = route_with_solver(_token_a, _token_b, _sum_a, _solver_id);
+            return (amount_out, Uint256(0, 0));
+        }
+        let (is_a_empty) = uint256_eq(_sum_a, Uint256(0, 0));
+        if (is_a_empty == TRUE) {
+            let (amount_out: Uint256) = route_with_solver(_token_b, _token_a, _sum_b, _solver_id);
+            return (Uint256(0, 0), amount_out);
+        }
+
+        // Value of side B in _token_a
+        let (local b_in_a: Uint256) = convert_amount(_sum_b, _token_b, _token_a);
+        let (is_a_larger) = uint256_le(b_in_a, _sum_a);
+        if (is_a_larger == TRUE) {
+            // Side B is filled by side A, the rest of side A is traded
+            let (residual: Uint256) = SafeUint256.sub_le(_sum_a, b_in_a);
+            let (amount_out: Uint256) = route_with_solver(_token_a, _token_b, residual, _solver_id);
+            let (proceeds_a: Uint256) = SafeUint256.add(_sum_b, amount_out);
+            return (proceeds_a, b_in_a);
+        }
+
+        // Side A is filled by side B, the rest of side B is traded
+        let (local a_in_b: Uint256) = convert_amount(_sum_a, _token_a, _token_b);
+        let (residual: Uint256) = SafeUint256.sub_le(_sum_b, a_in_b);
+        let (amount_out: Uint256) = route_with_solver(_token_b, _token_a, residual, _solver_id);
+        let (proceeds_b: Uint256) = SafeUint256.add(_sum_a, amount_out);
+        return (a_in_b, proceeds_b);
+    }
+
+    // @notice Convert an amount of a token into another token at the oracle prices of the router aggregator
+    // @dev The prices are USD per whole token, so the decimals of both tokens are taken into account.
+    //      Orders are matched at live oracle prices only, see oracle_price
+    // @return amount_out - The amount of _token_out worth _amount_in of _token_in (rounded down)
+    func convert_amount{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _amount_in: Uint256, _token_in: felt, _token_out: felt
+    ) -> (amount_out: Uint256) {
+        alloc_locals;
+
+        let (router_aggregator_address) = Hub_router_aggregator.read();
+        with_attr error_message("router aggregator needed to match orders") {
+            assert_not_equal(router_aggregator_address, 0);
+        }
+
+        let (local price_in: Uint256) = oracle_price(router_aggregator_address, _token_in);
+        let (local price_out: Uint256) = oracle_price(router_aggregator_address, _token_out);
+        let (local decimals_in) = IERC20.decimals(_token_in);
+        let (decimals_out) = IERC20.decimals(_token_out);
+        let (local unit_out) = pow(10, decimals_out);
+        let (unit_in) = pow(10, decimals_in);
+
+        let (value: Uint256) = SafeUint256.mul(_amount_in, price_in);
+        let (local scaled_value: Uint256) = SafeUint256.mul(value, Uint256(unit_out, 0));
+        let (scaled_price_out: Uint256) = SafeUint256.mul(price_out, Uint256(unit_in, 0));
+
+        let (amount_out: Uint256, _) = SafeUint256.div_rem(scaled_value, scaled_price_out);
+        return (amount_out,);
+    }
+
+    // @notice Query the oracle of a token for its USD price
+    // @dev Unlike get_global_price of the router aggregator, tokens without a price feed revert instead of
+    //      getting a placeholder price and price snapshots are never used, they can be up to a window old
+    // @param _router_aggregator_address - Address of the router aggregator holding the price feeds
+    // @param _token - Address of the token
+    // @return price - USD token price scaled to 1e18
+    func oracle_price{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _router_aggregator_address: felt, _token: felt
+    ) -> (price: Uint256) {
+        let (feed: Feed) = IRouterAggregator.get_price_feed(_router_aggregator_address, _token);
+        with_attr error_message("no oracle price feed for token {_token}") {
+            assert_not_equal(feed.address, 0);
+        }
+
+        let (price, decimals, _, _) = IEmpiricOracle.get_spot_median(feed.address, feed.key);
+        with_attr error_message("no oracle price for token {_token}") {
+            assert_not_equal(price, 0);
+        }
+
+        // Scaled like RouterAggregator.get_oracle_price
+        if (decimals == 8) {
+            let transformed_price = Utils.felt_fmul(price, BASE, BASE_8);
+            return (Uint256(transformed_price, 0),);
+        }
+        return (Uint256(price, 0),);
+    }
+
+    // @notice Trade tokens held by the hub with a solver, the solver is selected if _solver_id is 0
+    // @return amount_out - The amount of _token_out the hub received
+    func route_with_solver{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _token_in: felt, _token_out: felt, _amount_in: Uint256, _solver_id: felt
+    ) -> (amount_out: Uint256) {
+        alloc_locals;
+
+        let (is_empty) = uint256_eq(_amount_in, Uint256(0, 0));
+        if (is_empty == TRUE) {
+            return (Uint256(0, 0),);
+        }
+
+        local solver_id;
+        if (_solver_id == 0) {
+            let (selected_id) = Hub.select_solver(_amount_in, _token_in, _token_out);
+            assert solver_id = selected_id;
+            tempvar syscall_ptr = syscall_ptr;
+            tempvar pedersen_ptr = pedersen_ptr;
+            tempvar range_check_ptr = range_check_ptr;
+        } else {
+            assert solver_id = _solver_id;
+            tempvar syscall_ptr = syscall_ptr;
+            tempvar pedersen_ptr = pedersen_ptr;
+            tempvar range_check_ptr = range_check_ptr;
+        }
+
+        let (solver_registry) = Hub.solver_registry();
+        let (solver_address) = ISolverRegistry.get_solver(solver_registry, solver_id);
+        with_attr error_message("solver ID invalid") {
+            assert_not_equal(solver_address, FALSE);
+        }
+
+        let (amount_out: Uint256) = Hub.route_amount(
+            solver_address, _token_in, _token_out, _amount_in
+        );
+        return (amount_out,);
+    }
+
+    // @notice Pay each order of one direction of a pair its share of the proceeds
+    // @param _sum_in - Amount sold by all orders of the direction
+    // @param _proceeds - Amount of _token_out received by the direction
+    // @param _amounts_out - Filled with the amount received at the index of each paid order
+    func pay_orders{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _orders_len: felt,
+        _orders: Order*,
+        _token_in: felt,
+        _token_out: felt,
+        _sum_in: Uint256,
+        _proceeds: Uint256,
+        _amounts_out: Uint256*,
+    ) {
+        alloc_locals;
+
+        if (_orders_len == 0) {
+            return ();
+        }
+
+        let is_order_of_side = is_order_of(_orders[0], _token_in, _token_out);
+        if (is_order_of_side == FALSE) {
+            pay_orders(
+                _orders_len - 1,
+                _orders + Order.SIZE,
+                _token_in,
+                _token_out,
+                _sum_in,
+                _proceeds,
+                _amounts_out + Uint256.SIZE,
+            );
+            return ();
+        }
+
+        // Rounded down, the dust stays in the hub
+        let (local amount_out: Uint256) = pro_rata_share(_orders[0].amount_in, _sum_in, _proceeds);
+        let (is_min_amount_received) = uint256_le(_orders[0].min_amount_out, amount_out);
+        with_attr error_message("Minimum amount not received") {
+            assert is_min_amount_received = TRUE;
+        }
+        IERC20.transfer(_token_out, _orders[0].to, amount_out);
+        assert _amounts_out[0] = amount_out;
+
+        pay_orders(
+            _orders_len - 1,
+            _orders + Order.SIZE,
+            _token_in,
+            _token_out,
+            _sum_in,
+            _proceeds,
+            _amounts_out + Uint256.SIZE,
+        );
+        return ();
+    }
+
+    // @notice Share of the proceeds of an order selling _amount_in out of _sum_in
+    // @return share - _proceeds * _amount_in / _sum_in, 0 for orders selling nothing
+    func pro_rata_share{range_check_ptr}(
+        _amount_in: Uint256, _sum_in: Uint256, _proceeds: Uint256
+    ) -> (share: Uint256) {
+        let (is_empty) = uint256_eq(_amount_in, Uint256(0, 0));
+        if (is_empty == TRUE) {
+            return (Uint256(0, 0),);
+        }
+        let (product: Uint256) = SafeUint256.mul(_proceeds, _amount_in);
+        let (share: Uint256, _) = SafeUint256.div_rem(product, _sum_in);
+        return (share,);
+    }
+
+    // @notice Swap between two tokens by providing the exact routers and token address to be used. Aka the exat path to take.
+    // @param _routers - An array of routers to be used for the trades
+    // @param _path - An array of token pairs to trade
+    // @param _amounts - An array of token amounts (in %) to sell
+    // @param _amount_in - The initial token to sell
+    // @param _min_amount_out - The minimum amount of tokens to receive (will be the path.token_out of the last item in the path array)
+    // @return received_amount - The token return amounts for each solver
+    func swap_with_path{
+            syscall_ptr: felt*, 
+            pedersen_ptr: HashBuiltin*, 
+            range_check_ptr
+        }(
+            _routers_len: felt,
+            _routers: Router*,
+            _path_len: felt,
+            _path: Path*,
+            _amounts_len: felt,
+            _amounts: felt*,
+            _amount_in: Uint256,
+            _min_amount_out: Uint256,
+        ) -> (received_amount: Uint256) {
+        // Get Caller Address
+        let (caller_address) = get_caller_address();
+
+        let (received_amount: Uint256) = Hub.execute_path(
+            _routers_len,
+            _routers,
+            _path_len,
+            _path,
+            _amounts_len,
+            _amounts,
+            _amount_in,
+            _min_amount_out,
+            caller_address,
+        );
+
+        return (received_amount,);
+    }
+
+    // @notice Swap along a path returned by get_solver_amount_path_and_commitment without running the solver again
+    // @dev The commitment has to be for the caller and its current nonce, which is used up by the swap.
+    //      _min_amount_out protects against paths that went stale
+    // @param _routers - An array of routers to be used for the trades
+    // @param _path - An array of token pairs to trade
+    // @param _amounts - An array of token amounts (in %) to sell
+    // @param _amount_in - The initial token to sell
+    // @param _min_amount_out - The minimum amount of tokens to receive
+    // @param _to - The receiver address of the bought tokens
+    // @param _solver_id - The ID of the solver that computed the path
+    // @param _block_number - The block the path was computed at
+    // @param _commitment - The commitment returned with the path
+    // @return received_amount - The amount of tokens bought
+    func swap_with_commitment{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _routers_len: felt,
+        _routers: Router*,
+        _path_len: felt,
+        _path: Path*,
+        _amounts_len: felt,
+        _amounts: felt*,
+        _amount_in: Uint256,
+        _min_amount_out: Uint256,
+        _to: felt,
+        _solver_id: felt,
+        _block_number: felt,
+        _commitment: felt,
+    ) -> (received_amount: Uint256) {
+        alloc_locals;
+
+        ReentrancyGuard.start();
+
+        let (local caller_address) = get_caller_address();
+        let (commitment) = Hub.path_commitment(
+            _routers_len,
+            _routers,
+            _path_len,
+            _path,
+            _amounts_len,
+            _amounts,
+            _solver_id,
+            _block_number,
+            caller_address,
+        );
+        with_attr error_message("path commitment invalid") {
+            assert commitment = _commitment;
+        }
+
+        let (local block_number) = get_block_number();
+        let (local max_age) = Hub_commitment_max_age.read();
+        with_attr error_message("path commitment from a future block") {
+            assert_le(_block_number, block_number);
+        }
+        if (max_age != 0) {
+            with_attr error_message("path commitment expired") {
+                assert_le(block_number, _block_number + max_age);
+            }
+            tempvar range_check_ptr = range_check_ptr;
+        } else {
+            tempvar range_check_ptr = range_check_ptr;
+        }
+
+        // Use up the commitment
+        let (nonce) = Hub_commitment_nonce.read(caller_address);
+        Hub_commitment_nonce.write(caller_address, nonce + 1);
+
+        let (received_amount: Uint256) = Hub.execute_path(
+            _routers_len,
+            _routers,
+            _path_len,
+            _path,
+            _amounts_len,
+            _amounts,
+            _amount_in,
+            _min_amount_out,
+            _to,
+        );
+
+        ReentrancyGuard.end();
+
+        return (received_amount,);
+    }
+
+    // @notice Execute a trading path with the tokens of the caller
+    // @param _routers - An array of routers to be used for the trades
+    // @param _path - An array of token pairs to trade
+    // @param _amounts - An array of token amounts (in %) to sell
+    // @param _amount_in - The initial token to sell
+    // @param _min_amount_out - The minimum amount of tokens to receive (will be the path.token_out of the last item in the path array)
+    // @param _to - The receiver address of the bought tokens
+    // @return received_amount - The amount of tokens bought
+    func execute_path{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _routers_len: felt,
+        _routers: Router*,
+        _path_len: felt,
+        _path: Path*,
+        _amounts_len: felt,
+        _amounts: felt*,
+        _amount_in: Uint256,
+        _min_amount_out: Uint256,
+        _to: felt,
+    ) -> (received_amount: Uint256) {
         alloc_locals;
 
         // Get Caller Address
@@ -315,7 +1591,7 @@ namespace Hub {
         IERC20.transferFrom(_path[0].token_in, caller_address, this_address, _amount_in);
 
         // Execute Trades
-        ITradeExecutor.library_call_multi_swap(
+        ITradeExecutor.library_call_multi_swap_exact_in(
             trade_executor_hash,
             _routers_len,
             _routers,
@@ -323,7 +1599,8 @@ namespace Hub {
             _path,
             _amounts_len,
             _amounts,
-            this_address
+            _amount_in,
+            this_address,
         );
 
         // Get new Balance of out_token
@@ -333,10 +1610,12 @@ namespace Hub {
 
         // Check that tokens received by solver at at least as much as the min_amount_out
         let (min_amount_received) = uint256_le(_min_amount_out, received_amount);
-        assert min_amount_received = TRUE;
+        with_attr error_message("Minimum amount not received") {
+            assert min_amount_received = TRUE;
+        }
 
-        // Transfer _token_out back to caller
-        IERC20.transfer(_path[_path_len - 1].token_out, caller_address, received_amount);
+        // Transfer _token_out back to the receiver
+        IERC20.transfer(_path[_path_len - 1].token_out, _to, received_amount);
 
         return (received_amount,);
     }
@@ -349,4 +1628,42 @@ namespace Hub {
         Hub_solver_registry.write(_new_registry);
         return ();
     }
+
+    // @notice Store the address of the router aggregator used to build market snapshots
+    // @param _router_aggregator - Address of the router aggregator, 0 disables the shared market
+    func set_router_aggregator{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _router_aggregator: felt
+    ) -> () {
+        Hub_router_aggregator.write(_router_aggregator);
+        return ();
+    }
+
+    // @notice Flag whether a solver implements IMarketSolver and should receive the market snapshot
+    // @param _solver_id - ID of the solver
+    // @param _is_market_solver - TRUE if the solver accepts market snapshots
+    func set_market_solver{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _solver_id: felt, _is_market_solver: felt
+    ) -> () {
+        Hub_market_solvers.write(_solver_id, _is_market_solver);
+        return ();
+    }
+
+    // @notice Set the number of blocks a path commitment stays valid
+    // @param _max_age - Number of blocks, 0 for no limit
+    func set_commitment_max_age{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _max_age: felt
+    ) -> () {
+        Hub_commitment_max_age.write(_max_age);
+        return ();
+    }
+
+    // @notice Set the key that path commitments are hashed with
+    // @dev Every commitment that hasn't been swapped yet becomes invalid
+    // @param _key - The new key
+    func set_commitment_key{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _key: felt
+    ) -> () {
+        Hub_commitment_key.write(_key);
+        return ();
+    }
 }
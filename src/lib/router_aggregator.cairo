@@ -4,9 +4,12 @@
 %lang starknet
 
 from starkware.cairo.common.cairo_builtins import HashBuiltin
+from starkware.cairo.common.math import assert_not_equal, assert_not_zero
 from starkware.cairo.common.math_cmp import is_le_felt
 from starkware.cairo.common.uint256 import Uint256, uint256_le
 from starkware.cairo.common.alloc import alloc
+from starkware.cairo.common.bool import FALSE
+from starkware.starknet.common.syscalls import get_block_number
 
 from src.interfaces.i_router import (
     IAlphaRouter,
@@ -17,14 +20,30 @@ from src.interfaces.i_router import (
 )
 from src.interfaces.i_factory import IJediFactory, ITenKFactory
 from src.interfaces.i_pool import IJediPool, ITenKPool
-from src.lib.utils import Router
-from src.lib.constants import JediSwap, TenK, TenKFactory
+from src.interfaces.i_empiric_oracle import IEmpiricOracle
+from src.lib.utils import Utils, Router, Path, Trade
+from src.lib.constants import BASE, BASE_8, JediSwap, TenK, TenKFactory
 
 struct Feed {
     key: felt,
     address: felt,
 }
 
+// @notice Registered pool of a router for a token pair
+// @dev token0 is stored so that reserves can be ordered without calling the pool
+struct PairInfo {
+    address: felt,
+    token0: felt,
+}
+
+// @notice Oracle price of a token as stored by refresh_prices
+// @dev price is already scaled to 1e18, decimals are the decimals of the oracle answer
+struct PriceSnapshot {
+    price: felt,
+    decimals: felt,
+    block_number: felt,
+}
+
 // //////////////////////////
 //        Storage         //
 // //////////////////////////
@@ -49,6 +68,27 @@ func top_routers(index: felt) -> (router: Router) {
 func top_router_index_len() -> (len: felt) {
 }
 
+// Pairs are stored per router under both token orders
+// Increasing the epoch of a router invalidates all of its registered pairs
+@storage_var
+func pair_registry(router_address: felt, epoch: felt, token_a: felt, token_b: felt) -> (
+    pair: PairInfo
+) {
+}
+
+@storage_var
+func pair_registry_epoch(router_address: felt) -> (epoch: felt) {
+}
+
+@storage_var
+func price_snapshot(token: felt) -> (snapshot: PriceSnapshot) {
+}
+
+// Number of blocks a price snapshot may be used for after it was taken, 0 disables the snapshots
+@storage_var
+func price_snapshot_window() -> (blocks: felt) {
+}
+
 namespace RouterAggregator {
     // @notice Fetch the best single DEX router for a given trade
     // @param _amount_in - The amount of _token_in to be sold
@@ -278,6 +318,211 @@ namespace RouterAggregator {
         return (final_router_len);
     }
 
+    // @notice Read every registered router from storage
+    // @dev Routers are written in reversed storage order, the order in which find_best_router visits them
+    // @param _routers_len - Number of routers registered with the aggregator
+    // @param _routers - An empty array of routers that will be filled by this function
+    func read_routers{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _routers_len: felt, _routers: Router*
+    ) {
+        if (_routers_len == 0) {
+            return ();
+        }
+
+        let (router: Router) = routers.read(_routers_len - 1);
+        assert _routers[0] = router;
+
+        read_routers(_routers_len - 1, _routers + 2);
+        return ();
+    }
+
+    // @notice Fetch the best router and return amount for each trade
+    // @param _trades - An array of trades (token_in, token_out, amount_in)
+    // @param _routers - Routers to compare, read once for all trades (see read_routers)
+    // @param _amounts_out - An empty array of return amounts that will be filled by this function
+    // @param _best_routers - An empty array of routers that will be filled by this function
+    func best_routers_for_trades{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _trades_len: felt,
+        _trades: Trade*,
+        _routers_len: felt,
+        _routers: Router*,
+        _amounts_out: Uint256*,
+        _best_routers: Router*,
+    ) {
+        if (_trades_len == 0) {
+            return ();
+        }
+
+        let (amount: Uint256, router: Router) = find_best_provided_router(
+            _trades[0].amount_in,
+            _trades[0].token_in,
+            _trades[0].token_out,
+            Uint256(0, 0),
+            Router(0, 0),
+            _routers_len,
+            _routers,
+        );
+        assert _amounts_out[0] = amount;
+        assert _best_routers[0] = router;
+
+        best_routers_for_trades(
+            _trades_len - 1,
+            _trades + Trade.SIZE,
+            _routers_len,
+            _routers,
+            _amounts_out + 2,
+            _best_routers + 2,
+        );
+        return ();
+    }
+
+    // @notice Fetch the best router out of a provided array of routers
+    // @dev Ties go to the router that comes later in the array, like find_best_router
+    // @param _best_amount - Amount used to track which router yields the best amount
+    // @param _router - Used to track the best router
+    func find_best_provided_router{
+        syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr
+    }(
+        _amount_in: Uint256,
+        _token_in: felt,
+        _token_out: felt,
+        _best_amount: Uint256,
+        _router: Router,
+        _routers_len: felt,
+        _routers: Router*,
+    ) -> (amount_out: Uint256, router: Router) {
+        alloc_locals;
+
+        if (_routers_len == 0) {
+            return (_best_amount, _router);
+        }
+
+        let (amount: Uint256) = get_router_amount(_amount_in, _token_in, _token_out, _routers[0]);
+
+        let (is_new_amount_better) = uint256_le(_best_amount, amount);
+        if (is_new_amount_better == 1) {
+            let (res_amount, res_router) = find_best_provided_router(
+                _amount_in, _token_in, _token_out, amount, _routers[0], _routers_len - 1, _routers + 2
+            );
+            return (res_amount, res_router);
+        }
+
+        let (res_amount, res_router) = find_best_provided_router(
+            _amount_in, _token_in, _token_out, _best_amount, _router, _routers_len - 1, _routers + 2
+        );
+        return (res_amount, res_router);
+    }
+
+    // @notice For each token pair, get the reserves and router of every DEX with liquidity
+    // @dev The results of all pairs are concatenated, _counts holds the number of routers of each pair
+    // @param _pairs - An array of token pairs
+    // @param _routers - Routers to read the reserves from, read once for all pairs (see read_routers)
+    // @param _counts - An empty array that will be filled with the number of routers of each pair
+    // @param _reserves_a - An empty array of token_in reserves, that will be filled by this function
+    // @param _reserves_b - An empty array of token_out reserves, that will be filled by this function
+    // @param _pair_routers - An empty array of routers, that will be filled by this function
+    // @param _total - Used to count the number of entries written so far
+    // @return total - The length of the _reserves_a, _reserves_b and _pair_routers arrays
+    func reserves_for_pairs{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _pairs_len: felt,
+        _pairs: Path*,
+        _routers_len: felt,
+        _routers: Router*,
+        _counts: felt*,
+        _reserves_a: Uint256*,
+        _reserves_b: Uint256*,
+        _pair_routers: Router*,
+        _total: felt,
+    ) -> felt {
+        if (_pairs_len == 0) {
+            return (_total);
+        }
+
+        let count = provided_routers_and_reserves(
+            _pairs[0].token_in,
+            _pairs[0].token_out,
+            _reserves_a,
+            _reserves_b,
+            _routers_len,
+            _routers,
+            _pair_routers,
+            _router_counter=0,
+        );
+        assert _counts[0] = count;
+
+        let total = reserves_for_pairs(
+            _pairs_len - 1,
+            _pairs + Path.SIZE,
+            _routers_len,
+            _routers,
+            _counts + 1,
+            _reserves_a + count * Uint256.SIZE,
+            _reserves_b + count * Uint256.SIZE,
+            _pair_routers + count * Router.SIZE,
+            _total + count,
+        );
+        return (total);
+    }
+
+    // @notice Same as all_routers_and_reserves, for a provided array of routers
+    // @param _routers - The routers to read the reserves from
+    // @param _pair_routers - An empty array of the routers with liquidity, that will be filled by this function
+    func provided_routers_and_reserves{
+        syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr
+    }(
+        _token_in: felt,
+        _token_out: felt,
+        _reserves_a: Uint256*,
+        _reserves_b: Uint256*,
+        _routers_len: felt,
+        _routers: Router*,
+        _pair_routers: Router*,
+        _router_counter: felt,
+    ) -> felt {
+        alloc_locals;
+
+        if (0 == _routers_len) {
+            return (_router_counter);
+        }
+
+        let (local reserve_a: Uint256, local reserve_b: Uint256) = get_router_reserves(
+            _token_in, _token_out, _routers[0]
+        );
+
+        // If either of the reserves are 0, we don't return that router
+        let is_reserve_a_zero = is_le_felt(reserve_a.low, 0);
+        let is_reserve_b_zero = is_le_felt(reserve_b.low, 0);
+        if (is_reserve_a_zero + is_reserve_b_zero != 0) {
+            let final_router_len = provided_routers_and_reserves(
+                _token_in,
+                _token_out,
+                _reserves_a,
+                _reserves_b,
+                _routers_len - 1,
+                _routers + 2,
+                _pair_routers,
+                _router_counter,
+            );
+            return (final_router_len);
+        }
+
+        assert _pair_routers[0] = _routers[0];
+        assert _reserves_a[0] = reserve_a;
+        assert _reserves_b[0] = reserve_b;
+
+        let final_router_len = provided_routers_and_reserves(
+            _token_in,
+            _token_out,
+            _reserves_a + 2,
+            _reserves_b + 2,
+            _routers_len - 1,
+            _routers + 2,
+            _pair_routers + 2,
+            _router_counter + 1,
+        );
+        return (final_router_len);
+    }
+
     // @notice Fetch the number of tokens recieved for a specifc trade using a specified router/DEX
     // @param _amount_in - The amount of tokens to be sold
     // @param _token_in - The address of the token to be sold
@@ -286,32 +531,45 @@ namespace RouterAggregator {
     // @return amount_out - The amount of _token_out received for selling token_in
     func get_router_amount{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
         _amount_in: Uint256, _token_in: felt, _token_out: felt, _router: Router
+    ) -> (amount_out: Uint256) {
+        alloc_locals;
+        let (pair_address) = get_pair_address(_token_in, _token_out, _router);
+        if (pair_address == 0) {
+            return (Uint256(0, 0),);
+        }
+        let (amount_out: Uint256) = quote_router(_amount_in, _token_in, _token_out, _router);
+        return (amount_out,);
+    }
+
+    // @notice Same as get_router_amount, but the pair is always looked up through the factory
+    // @dev Used by code that runs as a library call of another contract (e.g. the trade executor),
+    //      where the pair registry would be read from and written to the storage of that contract
+    func get_factory_router_amount{syscall_ptr: felt*, range_check_ptr}(
+        _amount_in: Uint256, _token_in: felt, _token_out: felt, _router: Router
+    ) -> (amount_out: Uint256) {
+        let (pair_address) = get_pair_from_factory(_token_in, _token_out, _router);
+        if (pair_address == 0) {
+            return (Uint256(0, 0),);
+        }
+        let (amount_out: Uint256) = quote_router(_amount_in, _token_in, _token_out, _router);
+        return (amount_out,);
+    }
+
+    // @notice Fetch the return amount of a trade from the router, the pair has to exist
+    func quote_router{syscall_ptr: felt*, range_check_ptr}(
+        _amount_in: Uint256, _token_in: felt, _token_out: felt, _router: Router
     ) -> (amount_out: Uint256) {
         alloc_locals;
         let (path: felt*) = alloc();
+        assert path[0] = _token_in;
+        assert path[1] = _token_out;
         if (_router.type == JediSwap) {
-            let (factory_address) = IJediRouter.factory(_router.address);
-            let (pair_address) = IJediFactory.get_pair(factory_address, _token_in, _token_out);
-            if (pair_address == 0) {
-                return (Uint256(0, 0),);
-            }
-            assert path[0] = _token_in;
-            assert path[1] = _token_out;
             let (amounts_len: felt, amounts: Uint256*) = IJediRouter.get_amounts_out(
                 _router.address, _amount_in, 2, path
             );
             return (amounts[1],);
         }
         if (_router.type == TenK) {
-            // Surely that will change in the future
-            // let (factory_address) = ITenKRouter.factory(_router.address);
-            // let (pair_address) = ITenKFactory.getPair(factory_address, _token_in, _token_out);
-            let (pair_address) = ITenKFactory.getPair(TenKFactory,_token_in,_token_out);
-            if (pair_address == 0) {
-                return (Uint256(0, 0),);
-            }
-            assert path[0] = _token_in;
-            assert path[1] = _token_out;
             let (amounts_len: felt, amounts: Uint256*) = ITenKRouter.getAmountsOut(
                 _router.address, _amount_in, 2, path
             );
@@ -321,7 +579,6 @@ namespace RouterAggregator {
                 assert 1 = 2;
             }
             tempvar syscall_ptr = syscall_ptr;
-            tempvar pedersen_ptr = pedersen_ptr;
             tempvar range_check_ptr = range_check_ptr;
             return (Uint256(0, 0),);
         }
@@ -337,48 +594,282 @@ namespace RouterAggregator {
         _token_a: felt, _token_b: felt, _router: Router
     ) -> (reserve_a: Uint256, reserve_b: Uint256) {
         alloc_locals;
+        let (local pair: PairInfo) = get_pair(_token_a, _token_b, _router);
+        if (pair.address == 0) {
+            return (Uint256(0, 0), Uint256(0, 0));
+        }
         if (_router.type == JediSwap) {
-            let (local factory_address) = IJediRouter.factory(_router.address);
-            let (pair_address) = IJediFactory.get_pair(factory_address, _token_a, _token_b);
-            if (pair_address == 0) {
-                return (Uint256(0, 0), Uint256(0, 0));
-            }
-            let (reserve_a: Uint256, reserve_b: Uint256,_) = IJediPool.get_reserves(pair_address);
+            let (reserve_a: Uint256, reserve_b: Uint256, _) = IJediPool.get_reserves(pair.address);
 
-            //Ensure that reserves_a are the actual reserves of _token_a
-            let (token_a) = IJediPool.token0(pair_address);
-
-            if (token_a == _token_b) {
+            // Ensure that reserves_a are the actual reserves of _token_a
+            if (pair.token0 == _token_b) {
                 return (reserve_b, reserve_a);
             }
             return (reserve_a, reserve_b);
         }
         if (_router.type == TenK) {
-            // Surely that will change in the future
-            // let (factory_address) = ITenKRouter.factory(_router.address);
-            // let (pair_address) = ITenKFactory.getPair(factory_address, _token_a, _token_b);
-            let (pair_address) = ITenKFactory.getPair(TenKFactory,_token_a,_token_b);
-            if (pair_address == 0) {
-                return (Uint256(0, 0), Uint256(0, 0));
+            let (reserve_a_felt, reserve_b_felt, _) = ITenKPool.getReserves(pair.address);
+
+            // Ensure that reserves_a are the actual reserves of _token_a
+            if (pair.token0 == _token_b) {
+                return (Uint256(reserve_b_felt, 0), Uint256(reserve_a_felt, 0));
+            }
+            return (Uint256(reserve_a_felt, 0), Uint256(reserve_b_felt, 0));
+        } else {
+            with_attr error_message("TRADE EXECUTIONER: Router type doesn't exist") {
+                assert 1 = 2;
             }
-            let (reserve_a_felt, reserve_b_felt, _) = ITenKPool.getReserves(pair_address);
+            tempvar syscall_ptr = syscall_ptr;
+            tempvar pedersen_ptr = pedersen_ptr;
+            tempvar range_check_ptr = range_check_ptr;
+            return (Uint256(0, 0), Uint256(0, 0));
+        }
+    }
 
-            //Ensure that reserves_a are the actual reserves of _token_a
-            let (token_a) = ITenKPool.token0(pair_address);
+    // @notice Fetch the pool of a router for a token pair
+    // @dev Registered pairs skip the factory calls, unknown pairs are looked up through the factory on every call
+    // @dev Nothing is written here, as views use it too. Pairs are registered with register_pairs
+    // @param _token_a - The address of token A
+    // @param _token_b - The address of token B
+    // @param _router - The address and router type of a DEX router
+    // @return pair - The pool address and its token0, address is 0 if the pair doesn't exist
+    func get_pair{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _token_a: felt, _token_b: felt, _router: Router
+    ) -> (pair: PairInfo) {
+        alloc_locals;
+        let (local epoch) = pair_registry_epoch.read(_router.address);
+        let (pair: PairInfo) = pair_registry.read(_router.address, epoch, _token_a, _token_b);
+        if (pair.address != 0) {
+            return (pair,);
+        }
+
+        let (pair_address) = get_pair_from_factory(_token_a, _token_b, _router);
+        if (pair_address == 0) {
+            return (PairInfo(0, 0),);
+        }
+        let (token0) = get_token0(pair_address, _router.type);
+        return (PairInfo(pair_address, token0),);
+    }
+
+    // @notice Fetch the pool address of a router for a token pair
+    // @dev Same as get_pair without the token0 of unknown pairs, quotes don't need it
+    // @param _token_a - The address of token A
+    // @param _token_b - The address of token B
+    // @param _router - The address and router type of a DEX router
+    // @return pair_address - The pool address, 0 if the pair doesn't exist
+    func get_pair_address{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _token_a: felt, _token_b: felt, _router: Router
+    ) -> (pair_address: felt) {
+        alloc_locals;
+        let (local epoch) = pair_registry_epoch.read(_router.address);
+        let (pair: PairInfo) = pair_registry.read(_router.address, epoch, _token_a, _token_b);
+        if (pair.address != 0) {
+            return (pair.address,);
+        }
 
-            if (token_a == _token_b) {
-                return (Uint256(reserve_b_felt,0),Uint256(reserve_a_felt,0));
+        let (pair_address) = get_pair_from_factory(_token_a, _token_b, _router);
+        return (pair_address,);
+    }
+
+    // @notice Register the pools of a router for a list of token pairs
+    // @dev Each pool has to match the one the factory returns for its pair, its token0 is fetched from the pool
+    // @param _router - The address and router type of a DEX router
+    // @param _tokens_a - The first token of each pair
+    // @param _tokens_b - The second token of each pair
+    // @param _pairs - The pool address of each pair
+    func register_pairs{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _router: Router, _pairs_len: felt, _tokens_a: felt*, _tokens_b: felt*, _pairs: felt*
+    ) {
+        alloc_locals;
+        if (_pairs_len == 0) {
+            return ();
+        }
+
+        let (factory_pair) = get_pair_from_factory(_tokens_a[0], _tokens_b[0], _router);
+        with_attr error_message("ROUTER AGGREGATOR: Pair doesn't match the factory") {
+            assert_not_zero(_pairs[0]);
+            assert factory_pair = _pairs[0];
+        }
+
+        let (epoch) = pair_registry_epoch.read(_router.address);
+        let (token0) = get_token0(_pairs[0], _router.type);
+        write_pair(_router.address, epoch, _tokens_a[0], _tokens_b[0], PairInfo(_pairs[0], token0));
+
+        register_pairs(_router, _pairs_len - 1, _tokens_a + 1, _tokens_b + 1, _pairs + 1);
+        return ();
+    }
+
+    // @notice Drop all registered pairs of a router
+    // @param _router_address - The address of the router
+    func invalidate_pairs{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _router_address: felt
+    ) {
+        let (epoch) = pair_registry_epoch.read(_router_address);
+        pair_registry_epoch.write(_router_address, epoch + 1);
+        return ();
+    }
+
+    func get_pair_from_factory{syscall_ptr: felt*, range_check_ptr}(
+        _token_a: felt, _token_b: felt, _router: Router
+    ) -> (pair_address: felt) {
+        if (_router.type == JediSwap) {
+            let (factory_address) = IJediRouter.factory(_router.address);
+            let (pair_address) = IJediFactory.get_pair(factory_address, _token_a, _token_b);
+            return (pair_address,);
+        }
+        if (_router.type == TenK) {
+            // Surely that will change in the future
+            // let (factory_address) = ITenKRouter.factory(_router.address);
+            // let (pair_address) = ITenKFactory.getPair(factory_address, _token_a, _token_b);
+            let (pair_address) = ITenKFactory.getPair(TenKFactory, _token_a, _token_b);
+            return (pair_address,);
+        } else {
+            with_attr error_message("TRADE EXECUTIONER: Router type doesn't exist") {
+                assert 1 = 2;
             }
+            tempvar syscall_ptr = syscall_ptr;
+            tempvar range_check_ptr = range_check_ptr;
+            return (0,);
+        }
+    }
 
-            return (Uint256(reserve_a_felt,0), Uint256(reserve_b_felt,0));
+    func get_token0{syscall_ptr: felt*, range_check_ptr}(_pair_address: felt, _router_type: felt) -> (
+        token0: felt
+    ) {
+        if (_router_type == JediSwap) {
+            let (token0) = IJediPool.token0(_pair_address);
+            return (token0,);
+        }
+        if (_router_type == TenK) {
+            let (token0) = ITenKPool.token0(_pair_address);
+            return (token0,);
         } else {
             with_attr error_message("TRADE EXECUTIONER: Router type doesn't exist") {
                 assert 1 = 2;
             }
             tempvar syscall_ptr = syscall_ptr;
-            tempvar pedersen_ptr = pedersen_ptr;
             tempvar range_check_ptr = range_check_ptr;
-            return (Uint256(0, 0), Uint256(0, 0));
+            return (0,);
+        }
+    }
+
+    func write_pair{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _router_address: felt, _epoch: felt, _token_a: felt, _token_b: felt, _pair: PairInfo
+    ) {
+        pair_registry.write(_router_address, _epoch, _token_a, _token_b, _pair);
+        pair_registry.write(_router_address, _epoch, _token_b, _token_a, _pair);
+        return ();
+    }
+
+    // @notice Read the price snapshot window together with the current block number
+    // @dev The block number is only fetched when snapshots are enabled
+    // @return window - Number of blocks a snapshot may be used for, 0 if snapshots are disabled
+    // @return block_number - The current block number, 0 if snapshots are disabled
+    func get_price_window{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() -> (
+        window: felt, block_number: felt
+    ) {
+        let (window) = price_snapshot_window.read();
+        if (window == 0) {
+            return (0, 0);
         }
+        let (block_number) = get_block_number();
+        return (window, block_number);
+    }
+
+    // @notice For a given token, provide the price in USD
+    // @dev The price snapshot of the token is used if it was taken within the last _window blocks,
+    //      the oracle is queried otherwise
+    // @param _token - Address of token to get the USD price for
+    // @param _window - Number of blocks a snapshot may be used for, 0 to always query the oracle
+    // @param _block_number - The current block number
+    // @return price - USD token price scaled to 1e18
+    // @return decimals - Number of decimals of the oracle answer
+    func get_price{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _token: felt, _window: felt, _block_number: felt
+    ) -> (price: Uint256, decimals: felt) {
+        alloc_locals;
+
+        if (_window == 0) {
+            let (price: Uint256, decimals) = get_oracle_price(_token);
+            return (price, decimals);
+        }
+
+        let (local snapshot: PriceSnapshot) = price_snapshot.read(_token);
+        let is_fresh = is_le_felt(_block_number, snapshot.block_number + _window);
+        if (snapshot.price != 0) {
+            if (is_fresh == 1) {
+                return (Uint256(snapshot.price, 0), snapshot.decimals);
+            }
+        }
+
+        let (price: Uint256, decimals) = get_oracle_price(_token);
+        return (price, decimals);
+    }
+
+    // @notice Fill an array with the USD prices of the provided tokens
+    // @param _tokens - Addresses of the tokens
+    // @param _prices - An (empty) array of prices that we fill in this function
+    // @param _window - Number of blocks a snapshot may be used for, 0 to always query the oracle
+    // @param _block_number - The current block number
+    func get_prices{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _tokens_len: felt, _tokens: felt*, _prices: Uint256*, _window: felt, _block_number: felt
+    ) {
+        if (_tokens_len == 0) {
+            return ();
+        }
+
+        let (price: Uint256, _) = get_price(_tokens[0], _window, _block_number);
+        assert _prices[0] = price;
+
+        get_prices(_tokens_len - 1, _tokens + 1, _prices + 2, _window, _block_number);
+        return ();
+    }
+
+    // @notice Query the oracle for the USD price of a token
+    // @param _token - Address of token to get the USD price for
+    // @return price - USD token price scaled to 1e18
+    // @return decimals - Number of decimals of the oracle answer
+    func get_oracle_price{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _token: felt
+    ) -> (price: Uint256, decimals: felt) {
+        alloc_locals;
+
+        let (feed: Feed) = price_feed.read(_token);
+        if (feed.address == 0) {
+            // let (res_amount: Uint256,_) = get_single_best_router(1*BASE,_token,ETH)
+            return (Uint256(100 * BASE_8, 0), 0);
+        }
+        let (price, decimals, _, _) = IEmpiricOracle.get_spot_median(feed.address, feed.key);
+
+        with_attr error_message("price_feed result invalid, token: {_token}") {
+            assert_not_equal(price, FALSE);
+        }
+
+        // We only have 8 decimals atm
+        if (decimals == 8) {
+            let transformed_price = Utils.felt_fmul(price, BASE, BASE_8);
+            tempvar final_price = Uint256(transformed_price, 0);
+            return (final_price, decimals);
+        } else {
+            tempvar final_price = Uint256(price, 0);
+            return (final_price, decimals);
+        }
+    }
+
+    // @notice Store the current oracle price of each provided token
+    // @param _tokens - Addresses of the tokens
+    // @param _block_number - The current block number
+    func refresh_prices{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+        _tokens_len: felt, _tokens: felt*, _block_number: felt
+    ) {
+        if (_tokens_len == 0) {
+            return ();
+        }
+
+        let (price: Uint256, decimals) = get_oracle_price(_tokens[0]);
+        price_snapshot.write(_tokens[0], PriceSnapshot(price.low, decimals, _block_number));
+
+        refresh_prices(_tokens_len - 1, _tokens + 1, _block_number);
+        return ();
     }
 }
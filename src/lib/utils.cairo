@@ -33,6 +33,36 @@ struct Path {
     token_out: felt,
 }
 
+struct Trade {
+    token_in: felt,
+    token_out: felt,
+    amount_in: Uint256,
+}
+
+// Order of a batch swap, the tokens are paid by the caller of the batch
+struct Order {
+    token_in: felt,
+    token_out: felt,
+    amount_in: Uint256,
+    min_amount_out: Uint256,
+    // Receiver of the bought tokens
+    to: felt,
+}
+
+// Cost of a solver, used to pick one for trades that don't specify a solver
+struct SolverInfo {
+    // Cheaper classes are preferred, e.g. 1: single swap, 2: splitting, 3: graph search
+    complexity: felt,
+    // Expected number of steps of a get_results call
+    step_budget: felt,
+}
+
+// Trade sizes (in the sold token) a solver pays off for, a max_amount of 0 has no upper limit
+struct AmountRange {
+    min_amount: Uint256,
+    max_amount: Uint256,
+}
+
 namespace Utils {
     func not_equal{}(x: felt, y: felt) -> (z: felt) {
         if (x != y) {
@@ -14,33 +14,47 @@ struct Reserves {
 }
 
 @storage_var
-func token0() -> (token0_address: felt) {
+func token0_address() -> (token0_address: felt) {
 }
 
 @storage_var
 func reserves() -> (reserves: Reserves) {
 }
 
+// Same event as the actual pairs, so that off-chain services can follow the reserves
+@event
+func Sync(reserve0: felt, reserve1: felt) {
+}
+
 @external
 func set_reserves{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
     _reserve_1: Uint256, _reserve_2: Uint256
 ) {
     reserves.write(Reserves(_reserve_1, _reserve_2));
+    Sync.emit(_reserve_1.low, _reserve_2.low);
     return ();
 }
 
 @external
-func set_token0{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(token0_address) {
-    token0.write(token0_address);
+func set_token0{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(_token0_address) {
+    token0_address.write(_token0_address);
     return ();
 }
 
+@view
+func token0{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() -> (
+    token0: felt
+) {
+    let (address) = token0_address.read();
+    return (address,);
+}
+
 @view
 func getToken0{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() -> (
     token0: felt
 ) {
-    let (token0_address) = token0.read();
-    return (token0_address,);
+    let (address) = token0_address.read();
+    return (address,);
 }
 
 @view
@@ -95,9 +95,7 @@ func get_reserves{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_pt
     let (pair_address) = pairs.read(Pair(_token_in, _token_out));
     let (reserve_1: felt, reserve_2: felt, _) = ITenKPool.getReserves(pair_address);
 
-    let (token_reserves: Reserves) = reserves.read(Pair(_token_in, _token_out));
-
-    return (Uint256(reserve_1,0), Uint256(reserve_2,0));
+    return (Uint256(reserve_1, 0), Uint256(reserve_2, 0));
 }
 
 @view
@@ -132,14 +130,27 @@ func swapExactTokensForTokens{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, ra
     _deadline: felt,
 ) -> (amounts_len: felt, amounts: Uint256*) {
     alloc_locals;
-    let (amount_out: Uint256) = get_amount_out(_amount_in, _path[0], _path[1]);
+    let (local amounts: Uint256*) = alloc();
+    assert amounts[0] = _amount_in;
+    get_amounts_along_path(_path_len, _path, amounts);
     let (caller_address) = get_caller_address();
     let (this_address) = get_contract_address();
     IERC20.transferFrom(_path[0], caller_address, this_address, _amount_in);
-    IERC20.transfer(_path[1], caller_address, amount_out);
-    let (amounts: Uint256*) = alloc();
-    assert amounts[0] = amount_out;
-    return (1, amounts);
+    IERC20.transfer(_path[_path_len - 1], caller_address, amounts[_path_len - 1]);
+    return (_path_len, amounts);
+}
+
+// Swap through every pair of the path, like the real router does for paths longer than two tokens
+func get_amounts_along_path{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _path_len: felt, _path: felt*, _amounts: Uint256*
+) {
+    if (_path_len == 1) {
+        return ();
+    }
+    let (amount_out: Uint256) = get_amount_out(_amounts[0], _path[0], _path[1]);
+    assert _amounts[1] = amount_out;
+    get_amounts_along_path(_path_len - 1, _path + 1, _amounts + Uint256.SIZE);
+    return ();
 }
 
 //
@@ -157,9 +168,9 @@ func getPair{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
         return (0,);
     }
 
-    let (token_reserve_1: Uint256, _, _) = ITenKPool.getReserves(pair_address);
+    let (token_reserve_1, _, _) = ITenKPool.getReserves(pair_address);
 
-    if (token_reserve_1.low == 0) {
+    if (token_reserve_1 == 0) {
         return (0,);
     }
     return (pair_address,);
@@ -77,7 +77,7 @@ func get_amounts_out{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check
 
     let (pair_address) = pairs.read(Pair(path[0], path[1]));
 
-    let (reserve_1: Uint256, reserve_2: Uint256) = IJediPool.get_reserves(pair_address);
+    let (reserve_1: Uint256, reserve_2: Uint256, _) = IJediPool.get_reserves(pair_address);
 
     if (reserve_1.low == 0) {
         local token1 = path[0];
@@ -106,7 +106,7 @@ func get_reserves{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_pt
 ) -> (reserve1: Uint256, reserve2: Uint256) {
     let (pair_address) = pairs.read(Pair(_token_in, _token_out));
 
-    let (reserve_1: Uint256, reserve_2: Uint256) = IJediPool.get_reserves(pair_address);
+    let (reserve_1: Uint256, reserve_2: Uint256, _) = IJediPool.get_reserves(pair_address);
 
     return (reserve_1, reserve_2);
 }
@@ -143,14 +143,27 @@ func swap_exact_tokens_for_tokens{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*
     _deadline: felt,
 ) -> (amounts_len: felt, amounts: Uint256*) {
     alloc_locals;
-    let (amount_out: Uint256) = get_amount_out(_amount_in, _path[0], _path[1]);
+    let (local amounts: Uint256*) = alloc();
+    assert amounts[0] = _amount_in;
+    get_amounts_along_path(_path_len, _path, amounts);
     let (caller_address) = get_caller_address();
     let (this_address) = get_contract_address();
     IERC20.transferFrom(_path[0], caller_address, this_address, _amount_in);
-    IERC20.transfer(_path[1], caller_address, amount_out);
-    let (amounts: Uint256*) = alloc();
-    assert amounts[0] = amount_out;
-    return (1, amounts);
+    IERC20.transfer(_path[_path_len - 1], caller_address, amounts[_path_len - 1]);
+    return (_path_len, amounts);
+}
+
+// Swap through every pair of the path, like the real router does for paths longer than two tokens
+func get_amounts_along_path{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _path_len: felt, _path: felt*, _amounts: Uint256*
+) {
+    if (_path_len == 1) {
+        return ();
+    }
+    let (amount_out: Uint256) = get_amount_out(_amounts[0], _path[0], _path[1]);
+    assert _amounts[1] = amount_out;
+    get_amounts_along_path(_path_len - 1, _path + 1, _amounts + Uint256.SIZE);
+    return ();
 }
 
 //
@@ -168,7 +181,7 @@ func get_pair{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
         return (0,);
     }
 
-    let (token_reserve_1: Uint256, _) = IJediPool.get_reserves(pair_address);
+    let (token_reserve_1: Uint256, _, _) = IJediPool.get_reserves(pair_address);
 
     if (token_reserve_1.low == 0) {
         return (0,);
@@ -96,7 +96,7 @@ func get_reserves{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_pt
     _token_in: felt, _token_out: felt
 ) -> (reserve1: Uint256, reserve2: Uint256) {
     let (pair_address) = pairs.read(Pair(_token_in, _token_out));
-    let (reserve_1: Uint256, reserve_2: Uint256) = ISithPool.getReserves(pair_address);
+    let (reserve_1: Uint256, reserve_2: Uint256, _) = ISithPool.getReserves(pair_address);
 
     return (reserve_1, reserve_2);
 }
@@ -161,7 +161,7 @@ func pairFor{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
         return (0,);
     }
 
-    let (token_reserve_1: Uint256, _) = ISithPool.getReserves(pair_address);
+    let (token_reserve_1: Uint256, _, _) = ISithPool.getReserves(pair_address);
 
     if (token_reserve_1.low == 0) {
         return (0,);
@@ -4,19 +4,21 @@
 
 from starkware.cairo.common.cairo_builtins import HashBuiltin
 from starkware.cairo.common.uint256 import Uint256, uint256_sub
-from starkware.cairo.common.bool import FALSE
-from starkware.cairo.common.math import assert_not_equal
+from starkware.cairo.common.math import assert_not_zero
 from starkware.cairo.common.alloc import alloc
 from starkware.cairo.common.math_cmp import is_le_felt
+from starkware.starknet.common.syscalls import get_block_number
 
 from openzeppelin.access.ownable.library import Ownable
-from src.interfaces.i_empiric_oracle import IEmpiricOracle
-from src.lib.utils import Utils, Router
-from src.lib.constants import BASE, BASE_8
+from src.lib.utils import Router, Path, Trade
 from src.lib.router_aggregator import (
     RouterAggregator,
     Feed,
+    PairInfo,
+    PriceSnapshot,
     price_feed,
+    price_snapshot,
+    price_snapshot_window,
     routers,
     router_index_len,
     top_routers,
@@ -201,7 +203,87 @@ func get_all_routers_and_reserves{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*
     );
 }
 
+// @notice For each trade return the best return amount and router known to the aggregator
+// @dev Routers are read from storage once for all trades
+// @param _trades - An array of trades (token_in, token_out, amount_in)
+// @return amounts_out - The amount returned by the best router of each trade
+// @return routers - The best router address and type of each trade
+@view
+func get_single_best_router_batch{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _trades_len: felt, _trades: Trade*
+) -> (amounts_out_len: felt, amounts_out: Uint256*, routers_len: felt, routers: Router*) {
+    alloc_locals;
+
+    let (router_len) = router_index_len.read();
+    let (local all_routers: Router*) = alloc();
+    RouterAggregator.read_routers(router_len, all_routers);
+
+    let (amounts_out: Uint256*) = alloc();
+    let (best_routers: Router*) = alloc();
+    RouterAggregator.best_routers_for_trades(
+        _trades_len, _trades, router_len, all_routers, amounts_out, best_routers
+    );
+
+    return (_trades_len, amounts_out, _trades_len, best_routers);
+}
+
+// @notice For each token pair return all routers that have liquidity for that pair as well as their reserves
+// @dev Routers are read from storage once for all pairs. The results of all pairs are concatenated,
+//      counts[i] is the number of routers returned for _pairs[i]
+// @param _pairs - An array of token pairs (token_a, token_b)
+// @return counts - The number of routers with liquidity of each pair
+// @return reserves_a - The token_a reserves of each router with liquidity
+// @return reserves_b - The token_b reserves of each router with liquidity
+// @return routers - The addresses and types of the routers with liquidity
+@view
+func get_all_routers_and_reserves_batch{
+    syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr
+}(_pairs_len: felt, _pairs: Path*) -> (
+    counts_len: felt,
+    counts: felt*,
+    reserves_a_len: felt,
+    reserves_a: Uint256*,
+    reserves_b_len: felt,
+    reserves_b: Uint256*,
+    routers_len: felt,
+    routers: Router*,
+) {
+    alloc_locals;
+
+    let (router_len) = router_index_len.read();
+    let (local all_routers: Router*) = alloc();
+    RouterAggregator.read_routers(router_len, all_routers);
+
+    let (counts: felt*) = alloc();
+    let (reserves_a: Uint256*) = alloc();
+    let (reserves_b: Uint256*) = alloc();
+    let (routers: Router*) = alloc();
+    let total = RouterAggregator.reserves_for_pairs(
+        _pairs_len, _pairs, router_len, all_routers, counts, reserves_a, reserves_b, routers, 0
+    );
+
+    return (_pairs_len, counts, total, reserves_a, total, reserves_b, total, routers);
+}
+
+// @notice Returns the pool of a router for a token pair
+// @dev Falls back to the factory for pairs that have not been registered with register_pairs
+// @param _router_address - The address of the router
+// @param _router_type - The type of the router (see lib/constants)
+// @param _token_a - The address of token A
+// @param _token_b - The address of token B
+// @return pair - The pool address and its token0, address is 0 if the pair doesn't exist
+@view
+func get_pair_info{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _router_address: felt, _router_type: felt, _token_a: felt, _token_b: felt
+) -> (pair: PairInfo) {
+    let (pair: PairInfo) = RouterAggregator.get_pair(
+        _token_a, _token_b, Router(_router_address, _router_type)
+    );
+    return (pair,);
+}
+
 // @notice For a given token, provide the price in USD
+// @dev Served from the price snapshot of the token if it is within the snapshot window
 // @param _token - Address of token to get the USD price for
 // @return price - USD token price scaled to 1e18
 // @return decimals - Number of decimals for the provided price (should always be scaled by the router to 1e18)
@@ -209,28 +291,62 @@ func get_all_routers_and_reserves{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*
 func get_global_price{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
     _token: felt
 ) -> (price: Uint256, decimals: felt) {
+    let (window, block_number) = RouterAggregator.get_price_window();
+    let (price: Uint256, decimals) = RouterAggregator.get_price(_token, window, block_number);
+    return (price, decimals);
+}
+
+// @notice For each provided token, provide the price in USD
+// @dev Served from the price snapshots of the tokens if they are within the snapshot window
+// @param _tokens - Addresses of the tokens to get the USD price for
+// @return prices - USD price of each token scaled to 1e18
+@view
+func get_global_prices{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _tokens_len: felt, _tokens: felt*
+) -> (prices_len: felt, prices: Uint256*) {
     alloc_locals;
 
-    let (feed: Feed) = price_feed.read(_token);
-    if (feed.address == 0) {
-        // let (res_amount: Uint256,_) = get_single_best_router(1*BASE,_token,ETH)
-        return (Uint256(100 * BASE_8, 0), 0);
-    }
-    let (price, decimals, _, _) = IEmpiricOracle.get_spot_median(feed.address, feed.key);
+    let (window, block_number) = RouterAggregator.get_price_window();
+    let (local prices: Uint256*) = alloc();
+    RouterAggregator.get_prices(_tokens_len, _tokens, prices, window, block_number);
 
-    with_attr error_message("price_feed result invalid, token: {_token}") {
-        assert_not_equal(price, FALSE);
-    }
+    return (_tokens_len, prices);
+}
 
-    // We only have 8 decimals atm
-    if (decimals == 8) {
-        let transformed_price = Utils.felt_fmul(price, BASE, BASE_8);
-        tempvar final_price = Uint256(transformed_price, 0);
-        return (final_price, decimals);
-    } else {
-        tempvar final_price = Uint256(price, 0);
-        return (final_price, decimals);
-    }
+// @notice Returns the stored price snapshot of a token
+// @param _token - Address of the token
+// @return snapshot - The price (scaled to 1e18), oracle decimals and block number of the last refresh
+@view
+func get_price_snapshot{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _token: felt
+) -> (snapshot: PriceSnapshot) {
+    let (snapshot: PriceSnapshot) = price_snapshot.read(_token);
+    return (snapshot,);
+}
+
+// @notice Returns the number of blocks a price snapshot may be used for
+// @return blocks - The snapshot window, 0 if snapshots are disabled
+@view
+func get_price_snapshot_window{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    ) -> (blocks: felt) {
+    let (blocks) = price_snapshot_window.read();
+    return (blocks,);
+}
+
+// //////////////////////
+//     Externals      //
+// //////////////////////
+
+// @notice Store the current oracle price of each provided token
+// @dev Can be called by anyone (e.g. a keeper), the prices are always read from the oracles
+// @param _tokens - Addresses of the tokens to refresh
+@external
+func refresh_prices{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _tokens_len: felt, _tokens: felt*
+) {
+    let (block_number) = get_block_number();
+    RouterAggregator.refresh_prices(_tokens_len, _tokens, block_number);
+    return ();
 }
 
 // //////////////////////
@@ -266,6 +382,9 @@ func update_router{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_p
     let (router_len) = router_index_len.read();
     let is_under_len = is_le_felt(_id, router_len);
     assert is_under_len = 1;
+    let (old_router: Router) = routers.read(_id);
+    RouterAggregator.invalidate_pairs(old_router.address);
+    RouterAggregator.invalidate_pairs(_router_address);
     routers.write(_id, Router(_router_address, _router_type));
     // EMIT ADD EVENT
     return ();
@@ -278,14 +397,45 @@ func update_router{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_p
 func remove_router{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(_id: felt) {
     Ownable.assert_only_owner();
     let (router_len) = router_index_len.read();
-    let (last_router: Router) = routers.read(router_len);
+    let (removed_router: Router) = routers.read(_id);
+    RouterAggregator.invalidate_pairs(removed_router.address);
+    let (last_router: Router) = routers.read(router_len - 1);
     routers.write(_id, last_router);
-    routers.write(router_len, Router(0, 0));
+    routers.write(router_len - 1, Router(0, 0));
     router_index_len.write(router_len - 1);
     // EMIT REMOVE EVENT
     return ();
 }
 
+// @notice Register the pools of a router for a list of token pairs
+// @dev Quotes skip the factory lookups for registered pairs, each pool is checked against the factory first
+// @param _router_id - The id of a registered router
+// @param _tokens_a - The first token of each pair
+// @param _tokens_b - The second token of each pair
+// @param _pairs - The pool address of each pair
+@external
+func register_pairs{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _router_id: felt,
+    _tokens_a_len: felt,
+    _tokens_a: felt*,
+    _tokens_b_len: felt,
+    _tokens_b: felt*,
+    _pairs_len: felt,
+    _pairs: felt*,
+) {
+    Ownable.assert_only_owner();
+    with_attr error_message("ROUTER AGGREGATOR: Token and pair arrays need to have the same length") {
+        assert _tokens_a_len = _pairs_len;
+        assert _tokens_b_len = _pairs_len;
+    }
+    let (router: Router) = routers.read(_router_id);
+    with_attr error_message("ROUTER AGGREGATOR: Router doesn't exist") {
+        assert_not_zero(router.address);
+    }
+    RouterAggregator.register_pairs(router, _pairs_len, _tokens_a, _tokens_b, _pairs);
+    return ();
+}
+
 // @notice Add a high liquidity (top) router to the router aggregator
 // @dev put a router on the top of the list and increase the router list length
 // @param _router_address - Address of the router to be added
@@ -338,6 +488,7 @@ func remove_top_router{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_che
 }
 
 // @notice Store an Emperic USD price oracle for a provided token address
+// @dev Drops the price snapshot of the token, so that quotes use the new oracle right away
 // @param _token - Token address that the oracle will be mapped to
 // @param _key - Epheric key of the _token-USD price oracle
 // @param _oracle_address - The contract address of the Emperic oracle
@@ -347,6 +498,19 @@ func set_global_price{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_chec
 ) {
     Ownable.assert_only_owner();
     price_feed.write(_token, Feed(_key, _oracle_address));
+    price_snapshot.write(_token, PriceSnapshot(0, 0, 0));
     // EMIT ADD PRICE FEED EVENT
     return ();
 }
+
+// @notice Set the number of blocks a price snapshot may be used for
+// @dev Snapshots have to be refreshed with refresh_prices within the window, otherwise the oracle is queried
+// @param _blocks - The new window, 0 disables the snapshots
+@external
+func set_price_snapshot_window{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _blocks: felt
+) {
+    Ownable.assert_only_owner();
+    price_snapshot_window.write(_blocks);
+    return ();
+}
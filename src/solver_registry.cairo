@@ -4,9 +4,13 @@
 %lang starknet
 
 from starkware.cairo.common.cairo_builtins import HashBuiltin
+from starkware.cairo.common.uint256 import Uint256, uint256_le
+from starkware.cairo.common.math_cmp import is_le
+from starkware.cairo.common.bool import TRUE, FALSE
 from openzeppelin.access.ownable.library import Ownable
 from starkware.cairo.common.math import assert_le, assert_not_equal
 from src.lib.constants import MAX_FELT
+from src.lib.utils import SolverInfo, AmountRange
 
 /////////////////////////////////////////////////////
 //                                                 //
@@ -22,6 +26,10 @@ func unofficial_solver_added(solver_address: felt, solver_id: felt) {
 func official_solver_added(solver_address: felt, solver_id: felt) {
 }
 
+@event
+func solver_info_updated(solver_id: felt, complexity: felt, step_budget: felt) {
+}
+
 //
 // Storage
 //
@@ -34,6 +42,25 @@ func solvers(index: felt) -> (solver_address: felt) {
 func solvers_len() -> (len: felt) {
 }
 
+@storage_var
+func solver_infos(solver_id: felt) -> (info: SolverInfo) {
+}
+
+// Token 0 matches any token, (0, 0) holds the default range of a solver
+@storage_var
+func solver_ranges(solver_id: felt, token_in: felt, token_out: felt) -> (range: AmountRange) {
+}
+
+@storage_var
+func solver_has_range(solver_id: felt, token_in: felt, token_out: felt) -> (has_range: felt) {
+}
+
+// Solvers the automatic selection chooses from
+// Used as an array, the first empty index ends the list
+@storage_var
+func auto_solvers(index: felt) -> (solver_id: felt) {
+}
+
 //////////////////////////////
 //       Constructor        //
 //////////////////////////////
@@ -73,6 +100,70 @@ func get_next_id{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr
     return (solver_id,);
 }
 
+// @notice Fetch the cost metadata of a solver
+// @param _solver_id - The ID of the solver
+// @return info - The complexity class and step budget of the solver (0 if none was set)
+@view
+func get_solver_info{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _solver_id: felt
+) -> (info: SolverInfo) {
+    let (info: SolverInfo) = solver_infos.read(_solver_id);
+    return (info,);
+}
+
+// @notice Fetch the trade sizes a solver pays off for on a pair
+// @dev Falls back to the range of the sold token and then to the default range of the solver
+// @param _solver_id - The ID of the solver
+// @param _token_in - The address of the token that would be sold
+// @param _token_out - The address of the token that would be bought
+// @return range - The trade size range of the solver
+@view
+func get_solver_range{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _solver_id: felt, _token_in: felt, _token_out: felt
+) -> (range: AmountRange) {
+    let (has_pair_range) = solver_has_range.read(_solver_id, _token_in, _token_out);
+    if (has_pair_range == TRUE) {
+        let (range: AmountRange) = solver_ranges.read(_solver_id, _token_in, _token_out);
+        return (range,);
+    }
+
+    let (has_token_range) = solver_has_range.read(_solver_id, _token_in, 0);
+    if (has_token_range == TRUE) {
+        let (range: AmountRange) = solver_ranges.read(_solver_id, _token_in, 0);
+        return (range,);
+    }
+
+    let (range: AmountRange) = solver_ranges.read(_solver_id, 0, 0);
+    return (range,);
+}
+
+// @notice Fetch the solver at an index of the automatic selection list
+// @param _index - The index in the list
+// @return solver_id - The ID of the solver (0 past the end of the list)
+@view
+func get_auto_solver{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _index: felt
+) -> (solver_id: felt) {
+    let (solver_id) = auto_solvers.read(_index);
+    return (solver_id,);
+}
+
+// @notice Pick the cheapest solver of the automatic selection list whose trade size range contains the trade
+// @dev Solvers are compared by complexity class and then by step budget, ties go to the first listed solver
+// @param _amount_in - The number of tokens that would be sold
+// @param _token_in - The address of the token that would be sold
+// @param _token_out - The address of the token that would be bought
+// @return solver_id - The ID of the selected solver, 0 if no solver fits the trade
+@view
+func get_solver_for_trade{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _amount_in: Uint256, _token_in: felt, _token_out: felt
+) -> (solver_id: felt) {
+    let (solver_id) = select_solver(
+        _amount_in, _token_in, _token_out, 0, 0, SolverInfo(complexity=0, step_budget=0)
+    );
+    return (solver_id,);
+}
+
 
 ///////////////////////////
 //       External        //
@@ -117,3 +208,156 @@ func set_solver{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}
     official_solver_added.emit(solver_address=_solver_address, solver_id=_solver_id);
     return ();
 }
+
+// @notice Set the cost metadata of a solver
+// @param _solver_id - The ID of the solver
+// @param _info - The complexity class (not 0) and the expected step budget of the solver
+@external
+func set_solver_info{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _solver_id: felt, _info: SolverInfo
+) {
+    Ownable.assert_only_owner();
+    // A complexity class of 0 marks solvers without metadata
+    with_attr error_message("complexity class can't be 0") {
+        assert_not_equal(_info.complexity, 0);
+    }
+
+    solver_infos.write(_solver_id, _info);
+
+    solver_info_updated.emit(
+        solver_id=_solver_id, complexity=_info.complexity, step_budget=_info.step_budget
+    );
+    return ();
+}
+
+// @notice Set the trade sizes a solver pays off for
+// @dev Token 0 matches any token, e.g. (token, 0) sets the range for every trade selling token
+// @param _solver_id - The ID of the solver
+// @param _token_in - The address of the token sold
+// @param _token_out - The address of the token bought
+// @param _range - The trade size range, a max_amount of 0 has no upper limit
+@external
+func set_solver_range{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _solver_id: felt, _token_in: felt, _token_out: felt, _range: AmountRange
+) {
+    alloc_locals;
+    Ownable.assert_only_owner();
+
+    if (_range.max_amount.low + _range.max_amount.high != 0) {
+        let (is_valid) = uint256_le(_range.min_amount, _range.max_amount);
+        with_attr error_message("min amount exceeds max amount") {
+            assert is_valid = TRUE;
+        }
+        tempvar range_check_ptr = range_check_ptr;
+    } else {
+        tempvar range_check_ptr = range_check_ptr;
+    }
+
+    solver_ranges.write(_solver_id, _token_in, _token_out, _range);
+    solver_has_range.write(_solver_id, _token_in, _token_out, TRUE);
+    return ();
+}
+
+// @notice Set the solver at an index of the automatic selection list
+// @dev Setting 0 ends the list at that index
+// @param _index - The index in the list
+// @param _solver_id - The ID of the solver
+@external
+func set_auto_solver{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _index: felt, _solver_id: felt
+) {
+    Ownable.assert_only_owner();
+    auto_solvers.write(_index, _solver_id);
+    return ();
+}
+
+//////////////////////////
+//       Internal       //
+//////////////////////////
+
+// @notice Walk the automatic selection list and keep the cheapest solver fitting the trade
+// @param _index - Index of the next solver of the list
+// @param _best_id - The cheapest fitting solver so far, 0 if none
+// @param _best_info - The metadata of the cheapest fitting solver so far
+// @return solver_id - The ID of the cheapest fitting solver
+func select_solver{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _amount_in: Uint256,
+    _token_in: felt,
+    _token_out: felt,
+    _index: felt,
+    _best_id: felt,
+    _best_info: SolverInfo,
+) -> (solver_id: felt) {
+    alloc_locals;
+
+    let (local solver_id) = auto_solvers.read(_index);
+    if (solver_id == 0) {
+        return (_best_id,);
+    }
+
+    let (fits) = fits_trade(solver_id, _amount_in, _token_in, _token_out);
+    if (fits == FALSE) {
+        let (best_id) = select_solver(
+            _amount_in, _token_in, _token_out, _index + 1, _best_id, _best_info
+        );
+        return (best_id,);
+    }
+
+    let (local info: SolverInfo) = solver_infos.read(solver_id);
+    let is_cheaper = is_cheaper_than(info, _best_id, _best_info);
+    if (is_cheaper == TRUE) {
+        let (best_id) = select_solver(
+            _amount_in, _token_in, _token_out, _index + 1, solver_id, info
+        );
+        return (best_id,);
+    }
+
+    let (best_id) = select_solver(
+        _amount_in, _token_in, _token_out, _index + 1, _best_id, _best_info
+    );
+    return (best_id,);
+}
+
+// @notice Check if a solver is registered, has metadata and a trade size range containing the trade
+// @return fits - 1 if the solver can be selected for the trade, 0 otherwise
+func fits_trade{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _solver_id: felt, _amount_in: Uint256, _token_in: felt, _token_out: felt
+) -> (fits: felt) {
+    alloc_locals;
+
+    let (solver_address) = solvers.read(_solver_id);
+    if (solver_address == 0) {
+        return (FALSE,);
+    }
+    let (info: SolverInfo) = solver_infos.read(_solver_id);
+    if (info.complexity == 0) {
+        return (FALSE,);
+    }
+
+    let (local range: AmountRange) = get_solver_range(_solver_id, _token_in, _token_out);
+    let (is_above_min) = uint256_le(range.min_amount, _amount_in);
+    if (is_above_min == FALSE) {
+        return (FALSE,);
+    }
+    if (range.max_amount.low + range.max_amount.high == 0) {
+        return (TRUE,);
+    }
+    let (is_below_max) = uint256_le(_amount_in, range.max_amount);
+    return (is_below_max,);
+}
+
+// @notice Compare the metadata of a solver to the cheapest solver so far
+// @return is_cheaper - 1 if the solver has a lower complexity class (or the same and a lower step budget)
+func is_cheaper_than{range_check_ptr}(
+    _info: SolverInfo, _best_id: felt, _best_info: SolverInfo
+) -> felt {
+    if (_best_id == 0) {
+        return TRUE;
+    }
+    if (_info.complexity == _best_info.complexity) {
+        let is_cheaper = is_le(_info.step_budget + 1, _best_info.step_budget);
+        return is_cheaper;
+    }
+    let is_cheaper = is_le(_info.complexity + 1, _best_info.complexity);
+    return is_cheaper;
+}
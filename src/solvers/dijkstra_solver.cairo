@@ -5,10 +5,18 @@
 
 from starkware.cairo.common.uint256 import Uint256
 from starkware.cairo.common.cairo_builtins import HashBuiltin
-
-from src.lib.graph import GraphConstructor, Source, Edge
-from src.lib.utils import Router, Path
-from openzeppelin.access.ownable.library import Ownable
+from starkware.cairo.common.math import unsigned_div_rem
+from starkware.cairo.common.math_cmp import is_le_felt
+from starkware.cairo.common.alloc import alloc
+from starkware.cairo.common.default_dict import default_dict_new, default_dict_finalize
+from starkware.cairo.common.dict import dict_read, dict_write
+from starkware.cairo.common.dict_access import DictAccess
+
+from src.lib.graph import GraphConstructor, Source, Edge, PairReserves, router_aggregator
+from src.lib.heap import MinHeap
+from src.lib.utils import Utils, Router, Path
+from src.lib.constants import MAX_FELT, BASE
+from src.interfaces.i_router_aggregator import IRouterAggregator
 
 // ///////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
 //                                                                                                                             //
@@ -16,11 +24,6 @@ from openzeppelin.access.ownable.library import Ownable
 //                                                                                                                             //
 // ///////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
 
-struct Heap {
-    value: felt,
-    nodes: felt*,
-}
-
 // ///////////////////////////
 //       Constructor       //
 // ///////////////////////////
@@ -29,11 +32,21 @@ struct Heap {
 func constructor{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
     _owner: felt, _router_aggregator: felt
 ) {
-    Ownable.initializer(_owner);
-    router_aggregator.write(_router_aggregator);
+    GraphConstructor.init(_owner, _router_aggregator);
     return ();
 }
 
+// //////////////////////
+//       Views        //
+// //////////////////////
+
+// @notice Find the optimal trading path using the Dijkstra algorithm
+// @param _amount_in - Number of tokens to be sold
+// @param _token_in - Address of the token to be sold
+// @param _token_out - Address of the token to be bougth
+// @return routers - Array of routers that are used in the trading path
+// @return path - Array of token pairs that are used in the trading path
+// @return amounts - Array of token amount that are used in the trading path
 @view
 func get_results{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
     _amount_in: Uint256, _token_in: felt, _token_out: felt
@@ -50,30 +63,149 @@ func get_results{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr
     // Generate Vertices
     let (tokens: felt*) = alloc();
     assert tokens[0] = _token_in;
-    let (Vertices) = GraphConstructor.construct_vertices(
+    let (vertices_len) = GraphConstructor.construct_vertices(
+        _token_in=_token_in, _token_out=_token_out, _tokens=tokens + 1, _liq_counter=0, _counter=2
+    );
+
+    // get router aggregator address
+    let (router_aggregator_address) = router_aggregator.read();
+
+    // Fetch prices (USD) of all relevant tokens
+    let (_, prices: Uint256*) = IRouterAggregator.get_global_prices(
+        router_aggregator_address, vertices_len, tokens
+    );
+
+    // Fetch the reserves of every vertex pair with one call
+    let (pairs: PairReserves*) = GraphConstructor.get_all_pair_reserves(
+        router_aggregator_address, vertices_len, tokens
+    );
+
+    let (
+        routers_len: felt,
+        routers: Router*,
+        path_len: felt,
+        path: Path*,
+        amounts_len: felt,
+        amounts: felt*,
+    ) = find_path(_amount_in, vertices_len, tokens, prices, pairs);
+
+    return (routers_len, routers, path_len, path, amounts_len, amounts);
+}
+
+// @notice List the vertices the solver builds its graph on: token_in, the high liquidity tokens and token_out
+// @dev Callers that fetch the market for get_results_with_market use these tokens
+// @param _token_in - Address of the token to be sold
+// @param _token_out - Address of the token to be bought
+// @return tokens - Array of tokens/vertices, token_in first and token_out last
+@view
+func get_vertices{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _token_in: felt, _token_out: felt
+) -> (tokens_len: felt, tokens: felt*) {
+    alloc_locals;
+
+    let (local tokens: felt*) = alloc();
+    assert tokens[0] = _token_in;
+    let (tokens_len) = GraphConstructor.construct_vertices(
         _token_in=_token_in, _token_out=_token_out, _tokens=tokens + 1, _liq_counter=0, _counter=2
     );
 
+    return (tokens_len, tokens);
+}
+
+// @notice Find the optimal trading path using the Dijkstra algorithm on a market snapshot
+// @dev The snapshot tokens are used as vertices (token_in first, token_out last), nothing is fetched
+// @param _amount_in - Number of tokens to be sold
+// @param _tokens - Tokens of the market, token_in first and token_out last
+// @param _prices - USD price of each token, scaled by 1e18
+// @param _counts - Number of routers with liquidity of each (low, high) token pair
+// @param _reserves_a - The reserves of the lower token of each router with liquidity
+// @param _reserves_b - The reserves of the higher token of each router with liquidity
+// @param _routers - The routers with liquidity
+// @return routers - Array of routers that are used in the trading path
+// @return path - Array of token pairs that are used in the trading path
+// @return amounts - Array of token amount that are used in the trading path
+@view
+func get_results_with_market{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _amount_in: Uint256,
+    _tokens_len: felt,
+    _tokens: felt*,
+    _prices_len: felt,
+    _prices: Uint256*,
+    _counts_len: felt,
+    _counts: felt*,
+    _reserves_a_len: felt,
+    _reserves_a: Uint256*,
+    _reserves_b_len: felt,
+    _reserves_b: Uint256*,
+    _routers_len: felt,
+    _routers: Router*,
+) -> (
+    routers_len: felt,
+    routers: Router*,
+    path_len: felt,
+    path: Path*,
+    amounts_len: felt,
+    amounts: felt*,
+) {
+    let (pairs: PairReserves*) = GraphConstructor.get_market_pair_reserves(
+        _tokens_len, _counts_len, _counts, _routers, _reserves_a, _reserves_b
+    );
+
+    let (
+        routers_len: felt,
+        routers: Router*,
+        path_len: felt,
+        path: Path*,
+        amounts_len: felt,
+        amounts: felt*,
+    ) = find_path(_amount_in, _tokens_len, _tokens, _prices, pairs);
+
+    return (routers_len, routers, path_len, path, amounts_len, amounts);
+}
+
+// @notice Build the graph and run the Dijkstra algorithm on it
+// @param _amount_in - Number of tokens to be sold
+// @param _vertices_len - Number of vertices, token_in is the first and token_out the last one
+// @param _tokens - array of tokens/vertices that make up the graph
+// @param _prices - USD price of each vertex, scaled by 1e18
+// @param _pairs - The reserves of every vertex pair
+// @return routers - Array of routers that are used in the trading path
+// @return path - Array of token pairs that are used in the trading path
+// @return amounts - Array of token amount that are used in the trading path
+func find_path{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _amount_in: Uint256,
+    _vertices_len: felt,
+    _tokens: felt*,
+    _prices: Uint256*,
+    _pairs: PairReserves*,
+) -> (
+    routers_len: felt,
+    routers: Router*,
+    path_len: felt,
+    path: Path*,
+    amounts_len: felt,
+    amounts: felt*,
+) {
+    alloc_locals;
+
     // Declare Arrays that make up the Graph
     let (src: Source*) = alloc();
     let (edge: Edge*) = alloc();
 
     // transform input amount to USD amount (Used for determining edge weights)
-    let (router_aggregator_address) = router_aggregator.read();
     // Price is scaled by 1e18
-    let (price: Uint256, _) = IRouterAggregator.get_global_price(
-        router_aggregator_address, tokens[0]
-    );
-    let (amount_in_usd: Uint256) = Utils.fmul(price, _amount_in, Uint256(BASE, 0));
+    let (amount_in_usd: Uint256) = Utils.fmul(_prices[0], _amount_in, Uint256(BASE, 0));
 
     // Build the graph
     GraphConstructor.build_graph(
+        _pairs,
         _amount_in,
         amount_in_usd,
-        Vertices,
-        tokens,
-        Vertices,
+        _vertices_len,
+        _tokens,
+        _vertices_len,
         src,
+        _prices,
         _edge_len=0,
         _edge=edge,
         _dst_counter=1,
@@ -82,376 +214,228 @@ func get_results{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr
     );
 
     // Initialize Parameters required for Dijkstra algorithm
-    let (distances: felt*) = alloc();
-    let (predecessors: felt*) = alloc();
-    let (was_visited: felt*) = alloc();
-    let (queue: Heap*) = alloc();
-    init_arrays(
-        _distances_len=Vertices,
-        _distances=distances,
-        _predecessors=predecessors,
-        _was_visited=was_visited,
-        _queue=queue,
-        _counter=0,
-    );
-
-    // Build token arr (determine vertices)
-
-    // Build Edges
-    // build_edges(edges)
-
-    // Generate Graph
-    // let (graph: Graph) = GraphMethods.build_directed_graph_from_edges(edges_len: felt, edges: Edge*)
+    // The search runs on (hops, vertex) states, keyed by hops * vertices + vertex, so that states
+    // with max_hops hops aren't expanded. The heap priorities double as the distances of the states
+    let (local max_hops) = GraphConstructor.get_max_hops();
+    let (local distances_start: DictAccess*) = default_dict_new(default_value=MAX_FELT);
+    let (local predecessors_start: DictAccess*) = default_dict_new(default_value=0);
+    let (local was_visited_start: DictAccess*) = default_dict_new(default_value=0);
+    let (local heap_elements_start: DictAccess*) = default_dict_new(default_value=0);
+    let (local heap_positions_start: DictAccess*) = default_dict_new(default_value=0);
+    let distances = distances_start;
+    let predecessors = predecessors_start;
+    let was_visited = was_visited_start;
+    let heap_elements = heap_elements_start;
+    let heap_positions = heap_positions_start;
+
+    // The origin (with 0 hops) is the only state in the heap
+    with heap_elements, heap_positions {
+        let (heap_len) = MinHeap.push{heap_priorities=distances}(
+            _heap_len=0, _value=0, _priority=0
+        );
+    }
 
     // Run Dijkstra
-    // let (graph: Graph, predecessors: felt*, distances: felt*) = Dijkstra.run(graph, start_identifier);
+    // (Getting the best predecessor of each state and the hops of the shortest path)
+    let (local hops) = dijkstra{
+        distances=distances,
+        predecessors=predecessors,
+        was_visited=was_visited,
+        heap_elements=heap_elements,
+        heap_positions=heap_positions,
+    }(_heap_len=heap_len, _vertices=_vertices_len, _max_hops=max_hops, _src=src, _edge=edge);
+    local distances_end: DictAccess* = distances;
+    local was_visited_end: DictAccess* = was_visited;
+    local heap_elements_end: DictAccess* = heap_elements;
+    local heap_positions_end: DictAccess* = heap_positions;
+
+    // Determining the Final path we should be taking for the trade
+    let (routers: Router*) = alloc();
+    let (final_tokens: Path*) = alloc();
+    let (amounts: felt*) = alloc();
+    GraphConstructor.write_path{predecessors=predecessors}(
+        _src=src,
+        _edge=edge,
+        _tokens=_tokens,
+        _vertices=_vertices_len,
+        _vertex=_vertices_len - 1,
+        _hops=hops,
+        _routers=routers,
+        _path=final_tokens,
+        _amounts=amounts,
+    );
 
-    return (1, routers, 1, path, 1, amounts);
+    default_dict_finalize(predecessors_start, predecessors, 0);
+    default_dict_finalize(distances_start, distances_end, MAX_FELT);
+    default_dict_finalize(was_visited_start, was_visited_end, 0);
+    default_dict_finalize(heap_elements_start, heap_elements_end, 0);
+    default_dict_finalize(heap_positions_start, heap_positions_end, 0);
+
+    return (
+        routers_len=hops,
+        routers=routers,
+        path_len=hops,
+        path=final_tokens,
+        amounts_len=hops,
+        amounts=amounts,
+    );
 }
 
-// @notice Initialize all relevant Arrays used by the SPF algorithm
-// @param _distances - An array of "distance" for each vertex to the origin
-// @param _predecessors - An Array that contains the vertices of the shortest path
-// @param _is_in_queue - An array of bools that is used to determine whether a vertex is currently in the spf queue
-// @param _queue - An array of tokens that makes up the spf queue
-// @param _counter - A counter used to track the number of iterations
-func init_arrays{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
-    _distances_len: felt,
-    _distances: felt*,
-    _predecessors: felt*,
-    _was_visited: felt*,
-    _queue: Heap*,
-    _counter: felt,
-) -> () {
-    if (_counter == _distances_len) {
-        return ();
-    }
-
-    if (_counter == 0) {
-        assert _distances[0] = 0;
-        assert _queue[0] = Heap(0, 0);  // value = 0, nodes = origin
-        assert _predecessors[0] = 0;
-        assert _was_visited[0] = 0;
-        init_arrays(
-            _distances_len,
-            _distances + 1,
-            _predecessors + 1,
-            _was_visited + 1,
-            _queue,
-            _counter + 1,
-        );
-        return ();
-    } else {
-        assert _distances[0] = MAX_FELT;
-        assert _predecessors[0] = 0;
-        assert _was_visited[0] = 0;
-        init_arrays(
-            _distances_len,
-            _distances + 1,
-            _predecessors + 1,
-            _is_in_queue + 1,
-            _queue,
-            _counter + 1,
-        );
-        return ();
-    }
+// @notice Maximum number of trades a path found by the solver may have
+// @return max_hops - The configured limit
+@view
+func get_max_hops{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() -> (
+    max_hops: felt
+) {
+    let (max_hops) = GraphConstructor.get_max_hops();
+    return (max_hops,);
 }
 
 // @notice Dijkstra algortihm logic
-// @param _distances - An array of "distance" for each vertex to the origin
-// @param _is_in_queue - An array of bools that is used to determine whether a vertex is currently in the spf queue
-// @param _queue - An array of tokens that makes up the spf queue
+// @dev Every state (hops, vertex) is settled once, when it is popped from the heap with its final distance.
+//      A state is only relaxed into states with hops + 1 and states with max_hops hops aren't expanded.
+//      The search stops as soon as a state of the last vertex (token_out) is settled.
+// @param distances - dict of the "distance" of each state to the origin (heap priorities)
+// @param predecessors - dict that contains the best predecessor vertex of each state
+// @param was_visited - dict of bools that is used to determine whether a state was already settled
+// @param heap_elements - heap position -> state
+// @param heap_positions - state -> heap position + 1
+// @param _heap_len - Number of states in the heap
 // @param _vertices - number of vercies/routers in the graph
+// @param _max_hops - Maximum number of hops of a path
 // @param _src - array of Edge ranges. Used to map edges to a vertice
 // @param _edge - array of graph Edges
-// @param _predecessors - array that contains the vertices of the shortest path
+// @return hops - Number of hops of the shortest path to the last vertex, 0 if it can't be reached
 func dijkstra{
-    syscall_ptr: felt*, bitwise_ptr: BitwiseBuiltin*, pedersen_ptr: HashBuiltin*, range_check_ptr
-}(
-    _distances_len: felt,
-    _distances: felt*,
-    _was_visited_len: felt,
-    _was_visited: felt*,
-    _queue_len: felt,
-    _queue: Heap*,
-    _vertices: felt,
-    _src: Source*,
-    _edge: Edge*,
-    _predecessors_len: felt,
-    _predecessors: felt*,
-) -> (final_distances: felt*) {
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr,
+    distances: DictAccess*,
+    predecessors: DictAccess*,
+    was_visited: DictAccess*,
+    heap_elements: DictAccess*,
+    heap_positions: DictAccess*,
+}(_heap_len: felt, _vertices: felt, _max_hops: felt, _src: Source*, _edge: Edge*) -> (
+    hops: felt
+) {
     alloc_locals;
 
-    // If there is no destination left in the queue we can stop the procedure
-    if (_queue_len == 0) {
-        return (_predecessors,);
+    // If there is no state left in the heap we can stop the procedure
+    if (_heap_len == 0) {
+        return (0,);
     }
 
-    // Get first entry from queue
-    let (new_queue: Heap*) = alloc();
-    let (src_nr: felt) = Array.shift(_queue_len - 1, new_queue, _queue_len, _queue, 0, 0);
-    tempvar new_queue_len = _queue_len - 1;
-
-    // Get Source from queue Nr
-    let current_source: Source* = _src + (src_nr * 2);
-    tempvar offset = current_source[0].start;
-
-    // Check if removed item was already visited
-    if (_was_visited[src_nr] == 1) {
-        // if yes, <continue>
-        let (predecessors) = dijkstra(
-            _distances_len,
-            _distances,
-            _was_visited_len,
-            _was_visited,
-            new_new_queue_len,
-            new_new_queue,
-            _vertices,
-            _src,
-            _edge,
-            _predecessors_len,
-            _predecessors,
-        );
-        return (predecessors);
-    }
+    // Get the closest state
+    let (local heap_len, local state, local current_distance) = MinHeap.pop_min{
+        heap_priorities=distances
+    }(_heap_len);
+    let (local hops, local src_nr) = unsigned_div_rem(state, _vertices);
 
     // Stop algorithm if we've reached the destination vertex
     if (src_nr == _vertices - 1) {
-        return (_predecessors,);
+        return (hops,);
     }
 
-    // Get Source from queue Nr
-    let current_source: Source* = _src + (src_nr * 2);
-    tempvar offset = current_source[0].start;
+    // Set current state as being visited
+    dict_write{dict_ptr=was_visited}(key=state, new_value=1);
 
-    // Get distance of current vertex
-    tempvar current_distance = _distances[src_nr];
+    // States that used up all hops can't be expanded
+    if (hops == _max_hops) {
+        let (best_hops) = dijkstra(heap_len, _vertices, _max_hops, _src, _edge);
+        return (best_hops,);
+    }
+
+    // Get Source from heap Nr
+    let current_source: Source* = _src + (src_nr * 2);
 
     // Determine if there is a shorter distance to its different destinations
-    let (
-        _,
-        new_distances: felt*,
-        new_new_queue_len,
-        new_new_queue: felt*,
-        _,
-        new_new_is_in_queue: felt*,
-        _,
-        new_predecessors: felt*,
-    ) = determine_distances(
-        _distances_len,
-        _distances,
-        new_queue_len,
-        new_queue,
-        _is_in_queue_len,
-        new_is_in_queue,
-        _vertices,
-        _edge + (offset * 4),
-        _predecessors_len,
-        _predecessors,
+    let (new_heap_len) = determine_distances(
+        heap_len,
+        _edge + (current_source[0].start * 4),
         current_source[0].stop,
         src_nr,
+        (hops + 1) * _vertices,
         current_distance,
     );
 
-    // Set current vertex as being visited
-    // Mark the removed entry as not being in the queue anymore
-    let (new_was_visited: felt*) = alloc();
-    Array.update(
-        _new_arr_len=_was_visited_len,
-        _new_arr=new_was_visited,
-        _arr_len=_was_visited_len,
-        _arr=_was_visited,
-        _index=src_nr,
-        _new_val=1,
-        _counter=0,
-    );
-
-    let (predecessors) = dijkstra(
-        _distances_len,
-        new_distances,
-        _was_visited_len,
-        new_was_visited,
-        new_new_queue_len,
-        new_new_queue,
-        _vertices,
-        _src,
-        _edge,
-        _predecessors_len,
-        new_predecessors,
-    );
-
-    return (predecessors,);
+    let (best_hops) = dijkstra(new_heap_len, _vertices, _max_hops, _src, _edge);
+    return (best_hops,);
 }
 
-// @notice For a given vertex determine the distances to its neighbors
-// @param _distances - An array of "distance" for each vertex to the origin
-// @param _queue - An array of tokens that makes up the spf queue
-// @param _is_in_queue - An array of bools that is used to determine whether a vertex is currently in the spf queue
-// @param _vertices - number of vercies/routers in the graph
+// @notice For a given state determine the distances to the states of its neighbors with one more hop
+// @dev Unlike SPF the edges into the last vertex keep EXTRA_BASE, so that every distance stays
+//      larger than the distance it was relaxed from and states can be settled in heap order
+// @param distances - dict of the "distance" of each state to the origin (heap priorities)
+// @param predecessors - dict that contains the best predecessor vertex of each state
+// @param was_visited - dict of bools that is used to determine whether a state was already settled
+// @param heap_elements - heap position -> state
+// @param heap_positions - state -> heap position + 1
+// @param _heap_len - Number of states in the heap
 // @param _edge - array of graph Edges
-// @param _predecessors - array that contains the vertices of the shortest path
 // @param _dst_stop - The lenght of the neighbors/destinations that we iterate through
 // @param _src_nr - The index of the vertex in question in the Source arr
-// @param _current_distance - The current distance of the vertex in question
-// @return routers - Array of routers that are used in the trading path
-// @return path - Array of token pairs that are used in the trading path
-// @return amounts - Array of token amount that are used in the trading path
+// @param _next_layer - Key offset of the neighbor states (hops of the neighbors * vertices)
+// @param _current_distance - The current distance of the state in question
+// @return heap_len - Number of states in the heap after the new destinations were added
 func determine_distances{
-    syscall_ptr: felt*, bitwise_ptr: BitwiseBuiltin*, pedersen_ptr: HashBuiltin*, range_check_ptr
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr,
+    distances: DictAccess*,
+    predecessors: DictAccess*,
+    was_visited: DictAccess*,
+    heap_elements: DictAccess*,
+    heap_positions: DictAccess*,
 }(
-    _distances_len: felt,
-    _distances: felt*,
-    _queue_len: felt,
-    _queue: felt*,
-    _is_in_queue_len: felt,
-    _is_in_queue: felt*,
-    _vertices: felt,
+    _heap_len: felt,
     _edge: Edge*,
-    _predecessors_len: felt,
-    _predecessors: felt*,
     _dst_stop: felt,
     _src_nr: felt,
+    _next_layer: felt,
     _current_distance: felt,
-) -> (
-    _distances_len: felt,
-    _distances: felt*,
-    _queue_len: felt,
-    _queue: felt*,
-    _was_visited_len: felt,
-    _was_visited: felt*,
-    res_predecessors_len: felt,
-    res_predecessors: felt*,
-) {
+) -> (heap_len: felt) {
     alloc_locals;
 
     if (_dst_stop == 0) {
         // We end the procedure if all destinations have been evaluated
-        return (
-            _distances_len,
-            _distances,
-            _queue_len,
-            _queue,
-            _is_in_queue_len,
-            _is_in_queue,
-            _predecessors_len,
-            _predecessors,
-        );
+        return (_heap_len,);
     }
 
-    let (new_distances: felt*) = alloc();
-    local new_queue_len: felt;
-    local new_distance: felt;
-    let (new_queue: felt*) = alloc();
+    local dst_state = _next_layer + _edge[0].dst;
+    local new_distance = _current_distance + _edge[0].weight;
 
-    local is_dst_end = is_le_felt(_vertices - 1, _edge[0].dst);
-
-    if (is_dst_end == 1) {
-        // Moving towards the goal token should always improve the distance
-        assert new_distance = _current_distance - EXTRA_BASE + _edge[0].weight;
-        tempvar range_check_ptr = range_check_ptr;
-    } else {
-        assert new_distance = _current_distance + _edge[0].weight;
-        tempvar range_check_ptr = range_check_ptr;
-    }
+    let (dst_was_visited) = dict_read{dict_ptr=was_visited}(key=dst_state);
+    let (old_distance) = dict_read{dict_ptr=distances}(key=dst_state);
+    let is_old_distance_better = is_le_felt(old_distance, new_distance);
 
-    // If vertex was never visited, add new distance
-    if (_was_visited[_edge[0].dst] == 0) {
-        // destination vertex weight = origin vertex + edge weight
-        Array.update(
-            _distances_len, new_distances, _distances_len, _distances, _edge[0].dst, new_distance, 0
+    // Settled states and states with a better distance are skipped
+    if (dst_was_visited + is_old_distance_better != 0) {
+        let (res_heap_len) = determine_distances(
+            _heap_len, _edge + 4, _dst_stop - 1, _src_nr, _next_layer, _current_distance
         );
+        return (res_heap_len,);
+    }
 
-        // We safe the destination vertexes best predecessor (which is this current vertex)
-        let (new_predecessors: felt*) = alloc();
-        Array.update(
-            _predecessors_len,
-            new_predecessors,
-            _predecessors_len,
-            _predecessors,
-            _edge[0].dst,
-            _src_nr,
-            0,
-        );
-
-        // Add new vertex with better weight to queue
-        Array.push(_queue_len + 1, new_queue, _queue_len, _queue, _edge[0].dst);
-        assert new_queue_len = _queue_len + 1;
-
-        Array.update(
-            _is_in_queue_len, new_is_in_queue, _is_in_queue_len, _is_in_queue, _edge[0].dst, 1, 0
-        );
+    // We safe the destination states best predecessor (which is this current vertex)
+    dict_write{dict_ptr=predecessors}(key=dst_state, new_value=_src_nr);
 
-        let (
-            res_distance_len,
-            res_distance,
-            res_queue_len,
-            res_queue,
-            res_is_in_queue_len,
-            res_is_in_queue,
-            res_predecessors_len,
-            res_predecessors,
-        ) = determine_distances(
-            _distances_len,
-            new_distances,
-            new_queue_len,
-            new_queue,
-            _is_in_queue_len,
-            new_is_in_queue,
-            _vertices,
-            _edge + 4,
-            _predecessors_len,
-            new_predecessors,
-            _dst_stop - 1,
-            _src_nr,
-            _current_distance,
-        );
-        return (
-            res_distance_len,
-            res_distance,
-            res_queue_len,
-            res_queue,
-            res_is_in_queue_len,
-            res_is_in_queue,
-            res_predecessors_len,
-            res_predecessors,
-        );
-    } else {
-        let (
-            res_distance_len,
-            res_distance,
-            res_queue_len,
-            res_queue,
-            res_is_in_queue_len,
-            res_is_in_queue,
-            res_predecessors_len,
-            res_predecessors,
-        ) = determine_distances(
-            _distances_len,
-            _distances,
-            _queue_len,
-            _queue,
-            _is_in_queue_len,
-            _is_in_queue,
-            _vertices,
-            _edge + 4,
-            _predecessors_len,
-            _predecessors,
-            _dst_stop - 1,
-            _src_nr,
-            _current_distance,
-        );
-
-        return (
-            res_distance_len,
-            res_distance,
-            res_queue_len,
-            res_queue,
-            res_is_in_queue_len,
-            res_is_in_queue,
-            res_predecessors_len,
-            res_predecessors,
+    // destination state weight = origin state + edge weight
+    let (is_in_heap) = MinHeap.contains(dst_state);
+    if (is_in_heap == 1) {
+        MinHeap.decrease_key{heap_priorities=distances}(dst_state, new_distance);
+        let (res_heap_len) = determine_distances(
+            _heap_len, _edge + 4, _dst_stop - 1, _src_nr, _next_layer, _current_distance
         );
+        return (res_heap_len,);
     }
+
+    let (new_heap_len) = MinHeap.push{heap_priorities=distances}(
+        _heap_len, dst_state, new_distance
+    );
+    let (res_heap_len) = determine_distances(
+        new_heap_len, _edge + 4, _dst_stop - 1, _src_nr, _next_layer, _current_distance
+    );
+    return (res_heap_len,);
 }
 
 // //////////////////////
@@ -468,7 +452,18 @@ func determine_distances{
 func set_high_liq_tokens{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
     _index: felt, _high_liq_tokens: felt
 ) {
-    Ownable.assert_only_owner();
-    high_liq_tokens.write(_index, _high_liq_tokens);
+    GraphConstructor.set_high_liq_tokens(_index, _high_liq_tokens);
+    return ();
+}
+
+// @notice Set the maximum number of trades a path found by the solver may have
+// @dev States with this many hops aren't expanded, quotes return the best path within the limit,
+//      0 resets it to the default (4)
+// @param _max_hops - The new limit
+@external
+func set_max_hops{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _max_hops: felt
+) {
+    GraphConstructor.set_max_hops(_max_hops);
     return ();
 }
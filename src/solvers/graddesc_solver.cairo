@@ -150,6 +150,11 @@ func gradient_descent{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_chec
         return (_amounts, _out_amount);
     }
 
+    // A single router already trades the whole amount, its gradient norm would be 0
+    if (_amounts_len == 1) {
+        return (_amounts, _out_amount);
+    }
+
     // Calculate gradients resulting from new amounts
     // symbols is either + or -
     // + = TRUE
@@ -448,33 +453,32 @@ func calc_new_amounts{range_check_ptr}(
     // Calc delta
     let new_gradient = Utils.felt_fmul(_inverse_norm, _gradients[0], BASE);
     let delta_factor = Utils.felt_fmul(new_gradient, _step_size, BASE);
+    let new_amount = step_amount(_symbols[0], _amounts[0], delta_factor, _KICK_AMOUNT);
 
-    if (_symbols[0] == TRUE) {
-        // Fix upper bound
-        // Max possibel amount to be traded on one router is the input amount
-        let is_input_amount_smaller = is_le(_input_amount,delta_factor + _amounts[0]);
-        if (is_input_amount_smaller == TRUE){
-            assert _new_amounts[0] = _input_amount;
-            calc_new_amounts(_gradients + 1, _symbols + 1, _inverse_norm, _amounts_len - 1, _amounts + 1, _new_amounts + 1, _input_amount, _KICK_AMOUNT, _step_size);
-            return ();
-        }else{
-            assert _new_amounts[0] = _amounts[0] + delta_factor;
-            calc_new_amounts(_gradients + 1, _symbols + 1, _inverse_norm, _amounts_len - 1, _amounts + 1, _new_amounts + 1, _input_amount, _KICK_AMOUNT, _step_size);
-            return ();
-        }
-    }else{
-        // Fix lower bound to 0
-        let is_new_amount_smaller = is_le(_amounts[0] - delta_factor,_KICK_AMOUNT);
-        if (is_new_amount_smaller == TRUE) {
-            assert _new_amounts[0] = 0;
-            calc_new_amounts(_gradients + 1, _symbols + 1, _inverse_norm, _amounts_len - 1, _amounts + 1, _new_amounts + 1, _input_amount, _KICK_AMOUNT, _step_size);
-            return ();
-        }else{
-            assert _new_amounts[0] = _amounts[0] - delta_factor;
-            calc_new_amounts(_gradients + 1, _symbols + 1, _inverse_norm, _amounts_len - 1, _amounts + 1, _new_amounts + 1, _input_amount, _KICK_AMOUNT, _step_size);
-            return ();
-        }
+    // Max possible amount to be traded on one router is what the previous routers left of the input amount,
+    // otherwise the missing weight of the last router would underflow
+    let is_input_amount_smaller = is_le(_input_amount, new_amount);
+    if (is_input_amount_smaller == TRUE) {
+        assert _new_amounts[0] = _input_amount;
+    } else {
+        assert _new_amounts[0] = new_amount;
+    }
+
+    calc_new_amounts(_gradients + 1, _symbols + 1, _inverse_norm, _amounts_len - 1, _amounts + 1, _new_amounts + 1, _input_amount - _new_amounts[0], _KICK_AMOUNT, _step_size);
+    return ();
+}
+
+func step_amount{range_check_ptr}(_symbol: felt, _amount: felt, _delta_factor: felt, _KICK_AMOUNT: felt) -> felt {
+    if (_symbol == TRUE) {
+        return (_amount + _delta_factor);
+    }
+
+    // Fix lower bound to 0
+    let is_new_amount_smaller = is_le(_amount - _delta_factor, _KICK_AMOUNT);
+    if (is_new_amount_smaller == TRUE) {
+        return (0);
     }
+    return (_amount - _delta_factor);
 }
 
 func calc_inverse_norm{range_check_ptr}(_input_amount: felt, _gradients_len: felt, _gradients: felt*) -> felt {
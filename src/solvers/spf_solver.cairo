@@ -3,13 +3,16 @@
 %lang starknet
 
 from starkware.cairo.common.cairo_builtins import HashBuiltin, BitwiseBuiltin
+from starkware.cairo.common.math import unsigned_div_rem
 from starkware.cairo.common.math_cmp import is_le_felt
 from starkware.cairo.common.bitwise import bitwise_or
 from starkware.cairo.common.alloc import alloc
 from starkware.cairo.common.uint256 import Uint256, uint256_eq
+from starkware.cairo.common.default_dict import default_dict_new, default_dict_finalize
+from starkware.cairo.common.dict import dict_read, dict_write
+from starkware.cairo.common.dict_access import DictAccess
 
-from src.lib.array import Array
-from src.lib.graph import GraphConstructor, Source, Edge, router_aggregator
+from src.lib.graph import GraphConstructor, Source, Edge, PairReserves, router_aggregator
 from src.lib.utils import Utils, Router, Path
 from src.lib.constants import MAX_FELT, BASE
 from src.interfaces.i_router_aggregator import IRouterAggregator
@@ -71,8 +74,126 @@ func get_results{
     let (router_aggregator_address) = router_aggregator.read();
 
     // Fetch prices (USD) of all relevant tokens
-    let (prices: Uint256*) = alloc();
-    set_prices(vertices_len, tokens, prices, router_aggregator_address);
+    let (_, prices: Uint256*) = IRouterAggregator.get_global_prices(
+        router_aggregator_address, vertices_len, tokens
+    );
+
+    // Fetch the reserves of every vertex pair with one call
+    let (pairs: PairReserves*) = GraphConstructor.get_all_pair_reserves(
+        router_aggregator_address, vertices_len, tokens
+    );
+
+    let (
+        routers_len: felt,
+        routers: Router*,
+        path_len: felt,
+        path: Path*,
+        amounts_len: felt,
+        amounts: felt*,
+    ) = find_path(_amount_in, vertices_len, tokens, prices, pairs);
+
+    return (routers_len, routers, path_len, path, amounts_len, amounts);
+}
+
+// @notice List the vertices the solver builds its graph on: token_in, the high liquidity tokens and token_out
+// @dev Callers that fetch the market for get_results_with_market use these tokens
+// @param _token_in - Address of the token to be sold
+// @param _token_out - Address of the token to be bought
+// @return tokens - Array of tokens/vertices, token_in first and token_out last
+@view
+func get_vertices{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _token_in: felt, _token_out: felt
+) -> (tokens_len: felt, tokens: felt*) {
+    alloc_locals;
+
+    let (local tokens: felt*) = alloc();
+    assert tokens[0] = _token_in;
+    let (tokens_len) = GraphConstructor.construct_vertices(
+        _token_in=_token_in, _token_out=_token_out, _tokens=tokens + 1, _liq_counter=0, _counter=2
+    );
+
+    return (tokens_len, tokens);
+}
+
+// @notice Find the optimal trading path using the SPF algorithm on a market snapshot
+// @dev The snapshot tokens are used as vertices (token_in first, token_out last), nothing is fetched
+// @param _amount_in - Number of tokens to be sold
+// @param _tokens - Tokens of the market, token_in first and token_out last
+// @param _prices - USD price of each token, scaled by 1e18
+// @param _counts - Number of routers with liquidity of each (low, high) token pair
+// @param _reserves_a - The reserves of the lower token of each router with liquidity
+// @param _reserves_b - The reserves of the higher token of each router with liquidity
+// @param _routers - The routers with liquidity
+// @return routers - Array of routers that are used in the trading path
+// @return path - Array of token pairs that are used in the trading path
+// @return amounts - Array of token amount that are used in the trading path
+@view
+func get_results_with_market{
+    syscall_ptr: felt*, bitwise_ptr: BitwiseBuiltin*, pedersen_ptr: HashBuiltin*, range_check_ptr
+}(
+    _amount_in: Uint256,
+    _tokens_len: felt,
+    _tokens: felt*,
+    _prices_len: felt,
+    _prices: Uint256*,
+    _counts_len: felt,
+    _counts: felt*,
+    _reserves_a_len: felt,
+    _reserves_a: Uint256*,
+    _reserves_b_len: felt,
+    _reserves_b: Uint256*,
+    _routers_len: felt,
+    _routers: Router*,
+) -> (
+    routers_len: felt,
+    routers: Router*,
+    path_len: felt,
+    path: Path*,
+    amounts_len: felt,
+    amounts: felt*,
+) {
+    let (pairs: PairReserves*) = GraphConstructor.get_market_pair_reserves(
+        _tokens_len, _counts_len, _counts, _routers, _reserves_a, _reserves_b
+    );
+
+    let (
+        routers_len: felt,
+        routers: Router*,
+        path_len: felt,
+        path: Path*,
+        amounts_len: felt,
+        amounts: felt*,
+    ) = find_path(_amount_in, _tokens_len, _tokens, _prices, pairs);
+
+    return (routers_len, routers, path_len, path, amounts_len, amounts);
+}
+
+// @notice Build the graph and run the SPF algorithm on it
+// @param _amount_in - Number of tokens to be sold
+// @param _vertices_len - Number of vertices, token_in is the first and token_out the last one
+// @param _tokens - array of tokens/vertices that make up the graph
+// @param _prices - USD price of each vertex, scaled by 1e18
+// @param _pairs - The reserves of every vertex pair
+// @return routers - Array of routers that are used in the trading path
+// @return path - Array of token pairs that are used in the trading path
+// @return amounts - Array of token amount that are used in the trading path
+func find_path{
+    syscall_ptr: felt*, bitwise_ptr: BitwiseBuiltin*, pedersen_ptr: HashBuiltin*, range_check_ptr
+}(
+    _amount_in: Uint256,
+    _vertices_len: felt,
+    _tokens: felt*,
+    _prices: Uint256*,
+    _pairs: PairReserves*,
+) -> (
+    routers_len: felt,
+    routers: Router*,
+    path_len: felt,
+    path: Path*,
+    amounts_len: felt,
+    amounts: felt*,
+) {
+    alloc_locals;
 
     // Declare Arrays that make up the Graph
     let (src: Source*) = alloc();
@@ -80,20 +201,18 @@ func get_results{
 
     // transform input amount to USD amount (Used for determining edge weights)
     // Price is scaled by 1e18
-    let (price: Uint256, _) = IRouterAggregator.get_global_price(
-        router_aggregator_address, tokens[0]
-    );
-    let (amount_in_usd: Uint256) = Utils.fmul(price, _amount_in, Uint256(BASE, 0));
+    let (amount_in_usd: Uint256) = Utils.fmul(_prices[0], _amount_in, Uint256(BASE, 0));
 
     // Build the graph
     GraphConstructor.build_graph(
+        _pairs,
         _amount_in,
         amount_in_usd,
-        vertices_len,
-        tokens,
-        vertices_len,
+        _vertices_len,
+        _tokens,
+        _vertices_len,
         src,
-        prices,
+        _prices,
         _edge_len=0,
         _edge=edge,
         _dst_counter=1,
@@ -102,305 +221,188 @@ func get_results{
     );
 
     // Initialize Parameters required for SPF algorithm
-    let (distances: felt*) = alloc();
-    let (predecessors: felt*) = alloc();
-    let (is_in_queue: felt*) = alloc();
+    // The search runs on (hops, vertex) states, keyed by hops * vertices + vertex, so that it can
+    // stop after max_hops relaxation rounds and still knows the best path of every length
+    // Distances, predecessors and queue flags live in dicts, so a relaxation only writes the entries it changes
+    let (local max_hops) = GraphConstructor.get_max_hops();
+    let (local distances_start: DictAccess*) = default_dict_new(default_value=MAX_FELT);
+    let (local predecessors_start: DictAccess*) = default_dict_new(default_value=0);
+    let (local was_queued_start: DictAccess*) = default_dict_new(default_value=0);
+    let distances = distances_start;
+    let predecessors = predecessors_start;
+    let was_queued = was_queued_start;
+
+    // The queue is only ever appended to, popping moves the head index forward
     let (queue: felt*) = alloc();
-    init_arrays(
-        _distances_len=vertices_len,
-        _distances=distances,
-        _predecessors=predecessors,
-        _is_in_queue=is_in_queue,
-        _queue=queue,
-        _counter=0,
-    );
+    assert queue[0] = 0;  // In token (with 0 hops) is only state in queue
+
+    dict_write{dict_ptr=distances}(key=0, new_value=0);  // Source Token
 
     // Run SPF algorithm
-    // (Getting each tokens best predecessor)
-    let (new_predecessors: felt*) = shortest_path_faster(
-        vertices_len,
-        distances,
-        vertices_len,
-        is_in_queue,
-        1,
-        queue,
-        vertices_len,
-        src,
-        edge,
-        vertices_len,
-        predecessors,
+    // (Getting the best predecessor of each state and the hops of the shortest path)
+    let (local hops) = shortest_path_faster{
+        distances=distances, predecessors=predecessors, was_queued=was_queued
+    }(
+        _queue_head=0,
+        _queue_len=1,
+        _queue=queue,
+        _vertices=_vertices_len,
+        _max_hops=max_hops,
+        _src=src,
+        _edge=edge,
     );
+    local distances_end: DictAccess* = distances;
+    local was_queued_end: DictAccess* = was_queued;
 
+    // Determining the Final path we should be taking for the trade
     let (routers: Router*) = alloc();
-    let (amounts: felt*) = alloc();
-    let (token_ids: felt*) = alloc();
     let (final_tokens: Path*) = alloc();
+    let (amounts: felt*) = alloc();
+    GraphConstructor.write_path{predecessors=predecessors}(
+        _src=src,
+        _edge=edge,
+        _tokens=_tokens,
+        _vertices=_vertices_len,
+        _vertex=_vertices_len - 1,
+        _hops=hops,
+        _routers=routers,
+        _path=final_tokens,
+        _amounts=amounts,
+    );
 
-    assert amounts[0] = BASE;
-
-    // Determining the Final path we should be taking for the trade
-    let (path: felt*) = alloc();
-    assert path[0] = new_predecessors[vertices_len - 1];
-    if (path[0] == 0) {
-        assert token_ids[0] = 0;
-        assert token_ids[1] = vertices_len - 1;
-
-        set_routers_from_edge(1, src, edge, token_ids, routers);
-
-        assert final_tokens[0] = Path(tokens[0], tokens[vertices_len - 1]);
-
-        return (
-            routers_len=1,
-            routers=routers,
-            path_len=1,
-            path=final_tokens,
-            amounts_len=1,
-            amounts=amounts,
-        );
-    }
-    assert path[1] = new_predecessors[path[0]];
-    if (path[1] == 0) {
-        assert token_ids[0] = 0;
-        assert token_ids[1] = path[0];
-        assert token_ids[2] = vertices_len - 1;
-
-        set_routers_from_edge(2, src, edge, token_ids, routers);
-
-        assert final_tokens[0] = Path(tokens[0], tokens[path[0]]);
-        assert final_tokens[1] = Path(tokens[path[0]], tokens[vertices_len - 1]);
-
-        assert amounts[1] = BASE;
-
-        return (
-            routers_len=2,
-            routers=routers,
-            path_len=2,
-            path=final_tokens,
-            amounts_len=2,
-            amounts=amounts,
-        );
-    }
-    assert path[2] = new_predecessors[path[1]];
-    if (path[2] == 0) {
-        assert token_ids[0] = 0;
-        assert token_ids[1] = path[1];
-        assert token_ids[2] = path[0];
-        assert token_ids[3] = vertices_len - 1;
-
-        set_routers_from_edge(3, src, edge, token_ids, routers);
-
-        assert final_tokens[0] = Path(tokens[0], tokens[path[1]]);
-        assert final_tokens[1] = Path(tokens[path[1]], tokens[path[0]]);
-        assert final_tokens[2] = Path(tokens[path[0]], tokens[vertices_len - 1]);
-
-        assert amounts[1] = BASE;
-        assert amounts[2] = BASE;
-
-        return (
-            routers_len=3,
-            routers=routers,
-            path_len=3,
-            path=final_tokens,
-            amounts_len=3,
-            amounts=amounts,
-        );
-    }
-    assert path[3] = new_predecessors[path[2]];
-    if (path[3] == 0) {
-        assert token_ids[0] = 0;
-        assert token_ids[1] = path[2];
-        assert token_ids[2] = path[1];
-        assert token_ids[3] = path[0];
-        assert token_ids[4] = vertices_len - 1;
-
-        set_routers_from_edge(4, src, edge, token_ids, routers);
-
-        assert final_tokens[0] = Path(tokens[0], tokens[path[2]]);
-        assert final_tokens[1] = Path(tokens[path[2]], tokens[path[1]]);
-        assert final_tokens[2] = Path(tokens[path[1]], tokens[path[0]]);
-        assert final_tokens[3] = Path(tokens[path[0]], tokens[vertices_len - 1]);
-
-        assert amounts[1] = BASE;
-        assert amounts[2] = BASE;
-        assert amounts[3] = BASE;
-
-        return (
-            routers_len=4,
-            routers=routers,
-            path_len=4,
-            path=final_tokens,
-            amounts_len=4,
-            amounts=amounts,
-        );
-    }
-    // Should never happen
-    assert 0 = 1;
-    return (0, routers, 0, final_tokens, 0, amounts);
+    default_dict_finalize(predecessors_start, predecessors, 0);
+    default_dict_finalize(distances_start, distances_end, MAX_FELT);
+    default_dict_finalize(was_queued_start, was_queued_end, 0);
+
+    return (
+        routers_len=hops,
+        routers=routers,
+        path_len=hops,
+        path=final_tokens,
+        amounts_len=hops,
+        amounts=amounts,
+    );
 }
 
 // @notice SPF algortihm logic
-// @param _distances - An array of "distance" for each vertex to the origin
-// @param _is_in_queue - An array of bools that is used to determine whether a vertex is currently in the spf queue
-// @param _queue - An array of tokens that makes up the spf queue
+// @dev Hop bounded Bellman-Ford: a state (hops, vertex) is only relaxed into states with hops + 1,
+//      so the queue holds the states in order of their hops and each state is queued at most once.
+//      The search stops at the first state with max_hops hops, after max_hops relaxation rounds.
+//      The queue array is append only: entries before _queue_head have been popped, entries
+//      from _queue_head up to _queue_len are queued.
+// @param distances - dict of the "distance" of each state to the origin
+// @param predecessors - dict that contains the best predecessor vertex of each state
+// @param was_queued - dict of bools that is used to determine whether a state was already added to the spf queue
+// @param _queue_head - Index of the first queued entry
+// @param _queue_len - Number of entries that were ever written to the queue
+// @param _queue - An array of states that makes up the spf queue
 // @param _vertices - number of vercies/routers in the graph
+// @param _max_hops - Maximum number of hops of a path
 // @param _src - array of Edge ranges. Used to map edges to a vertice
 // @param _edge - array of graph Edges
-// @param _predecessors - array that contains the vertices of the shortest path
+// @return hops - Number of hops of the shortest path to the last vertex, 0 if it can't be reached
 func shortest_path_faster{
-    syscall_ptr: felt*, bitwise_ptr: BitwiseBuiltin*, pedersen_ptr: HashBuiltin*, range_check_ptr
+    syscall_ptr: felt*,
+    bitwise_ptr: BitwiseBuiltin*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr,
+    distances: DictAccess*,
+    predecessors: DictAccess*,
+    was_queued: DictAccess*,
 }(
-    _distances_len: felt,
-    _distances: felt*,
-    _is_in_queue_len: felt,
-    _is_in_queue: felt*,
+    _queue_head: felt,
     _queue_len: felt,
     _queue: felt*,
     _vertices: felt,
+    _max_hops: felt,
     _src: Source*,
     _edge: Edge*,
-    _predecessors_len: felt,
-    _predecessors: felt*,
-) -> (final_distances: felt*) {
+) -> (hops: felt) {
     alloc_locals;
 
     // If there is no destination left in the queue we can stop the procedure
-    if (_queue_len == 0) {
-        return (_predecessors,);
+    if (_queue_head == _queue_len) {
+        let (best_hops) = shortest_hops(_vertices, 1, _max_hops, 0, MAX_FELT);
+        return (best_hops,);
     }
 
     // Get first entry from queue
-    let (new_queue: felt*) = alloc();
-    let (src_nr: felt) = Array.shift(_queue_len - 1, new_queue, _queue_len, _queue, 0, 0);
-    tempvar new_queue_len = _queue_len - 1;
-
-    // Mark the removed entry as not being in the queue anymore
-    let (new_is_in_queue: felt*) = alloc();
-    Array.update(
-        _new_arr_len=_is_in_queue_len,
-        _new_arr=new_is_in_queue,
-        _arr_len=_is_in_queue_len,
-        _arr=_is_in_queue,
-        _index=src_nr,
-        _new_val=0,
-        _counter=0,
-    );
+    local state = _queue[_queue_head];
+    let (local hops, local src_nr) = unsigned_div_rem(state, _vertices);
+
+    // Every state that is left in the queue has used up all hops
+    if (hops == _max_hops) {
+        let (best_hops) = shortest_hops(_vertices, 1, _max_hops, 0, MAX_FELT);
+        return (best_hops,);
+    }
 
     // Get Source from queue Nr
     let current_source: Source* = _src + (src_nr * 2);
-    tempvar offset = current_source[0].start;
+    local offset = current_source[0].start;
 
-    tempvar current_distance = _distances[src_nr];
+    let (current_distance) = dict_read{dict_ptr=distances}(key=state);
 
     // Determine if there is a shorter distance to its different destinations
-    let (
-        _,
-        new_distances: felt*,
-        new_new_queue_len,
-        new_new_queue: felt*,
-        _,
-        new_new_is_in_queue: felt*,
-        _,
-        new_predecessors: felt*,
-    ) = determine_distances(
-        _distances_len,
-        _distances,
-        new_queue_len,
-        new_queue,
-        _is_in_queue_len,
-        new_is_in_queue,
+    let (new_queue_len) = determine_distances(
+        _queue_len,
+        _queue,
         _vertices,
         _edge + (offset * 4),
-        _predecessors_len,
-        _predecessors,
         current_source[0].stop,
         src_nr,
+        (hops + 1) * _vertices,
         current_distance,
     );
 
-    let (predecessors) = shortest_path_faster(
-        _distances_len,
-        new_distances,
-        _is_in_queue_len,
-        new_new_is_in_queue,
-        new_new_queue_len,
-        new_new_queue,
-        _vertices,
-        _src,
-        _edge,
-        _predecessors_len,
-        new_predecessors,
+    let (best_hops) = shortest_path_faster(
+        _queue_head + 1, new_queue_len, _queue, _vertices, _max_hops, _src, _edge
     );
-
-    return (predecessors,);
+    return (best_hops,);
 }
 
-// @notice For a given vertex determine the distances to its neighbors
-// @param _distances - An array of "distance" for each vertex to the origin
-// @param _queue - An array of tokens that makes up the spf queue
-// @param _is_in_queue - An array of bools that is used to determine whether a vertex is currently in the spf queue
+// @notice For a given state determine the distances to the states of its neighbors with one more hop
+// @param distances - dict of the "distance" of each state to the origin
+// @param predecessors - dict that contains the best predecessor vertex of each state
+// @param was_queued - dict of bools that is used to determine whether a state was already added to the spf queue
+// @param _queue_len - Number of entries that were ever written to the queue
+// @param _queue - An array of states that makes up the spf queue
 // @param _vertices - number of vercies/routers in the graph
 // @param _edge - array of graph Edges
-// @param _predecessors - array that contains the vertices of the shortest path
 // @param _dst_stop - The lenght of the neighbors/destinations that we iterate through
 // @param _src_nr - The index of the vertex in question in the Source arr
-// @param _current_distance - The current distance of the vertex in question
-// @return routers - Array of routers that are used in the trading path
-// @return path - Array of token pairs that are used in the trading path
-// @return amounts - Array of token amount that are used in the trading path
+// @param _next_layer - Key offset of the neighbor states (hops of the neighbors * vertices)
+// @param _current_distance - The current distance of the state in question
+// @return queue_len - Number of entries in the queue after the new destinations were appended
 func determine_distances{
-    syscall_ptr: felt*, bitwise_ptr: BitwiseBuiltin*, pedersen_ptr: HashBuiltin*, range_check_ptr
+    syscall_ptr: felt*,
+    bitwise_ptr: BitwiseBuiltin*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr,
+    distances: DictAccess*,
+    predecessors: DictAccess*,
+    was_queued: DictAccess*,
 }(
-    _distances_len: felt,
-    _distances: felt*,
     _queue_len: felt,
     _queue: felt*,
-    _is_in_queue_len: felt,
-    _is_in_queue: felt*,
     _vertices: felt,
     _edge: Edge*,
-    _predecessors_len: felt,
-    _predecessors: felt*,
     _dst_stop: felt,
     _src_nr: felt,
+    _next_layer: felt,
     _current_distance: felt,
-) -> (
-    _distances_len: felt,
-    _distances: felt*,
-    _queue_len: felt,
-    _queue: felt*,
-    _is_in_queue_len: felt,
-    _is_in_queue: felt*,
-    res_predecessors_len: felt,
-    res_predecessors: felt*,
-) {
+) -> (queue_len: felt) {
     alloc_locals;
 
     if (_dst_stop == 0) {
         // We end the procedure if all destinations have been evaluated
-        return (
-            _distances_len,
-            _distances,
-            _queue_len,
-            _queue,
-            _is_in_queue_len,
-            _is_in_queue,
-            _predecessors_len,
-            _predecessors,
-        );
+        return (_queue_len,);
     }
 
-    let (new_distances: felt*) = alloc();
-    local new_queue_len: felt;
     local new_distance: felt;
-    let (new_queue: felt*) = alloc();
-    let (new_is_in_queue: felt*) = alloc();
+    local dst_state = _next_layer + _edge[0].dst;
 
     local is_dst_end = is_le_felt(_vertices - 1, _edge[0].dst);
 
-    local test_weight = _edge[0].weight;
-    %{
-        print("Weight: ",ids.test_weight)
-    %}
     if (is_dst_end == 1) {
         // Moving towards the goal token should always improve the distance
         assert new_distance = _current_distance - EXTRA_BASE + _edge[0].weight;
@@ -410,262 +412,99 @@ func determine_distances{
         tempvar range_check_ptr = range_check_ptr;
     }
 
-    let is_old_distance_better = is_le_felt(_distances[_edge[0].dst], new_distance);
+    let (old_distance) = dict_read{dict_ptr=distances}(key=dst_state);
+    let is_old_distance_better = is_le_felt(old_distance, new_distance);
 
     if (is_old_distance_better == 0) {
-        // destination vertex weight = origin vertex + edge weight
-        Array.update(
-            _distances_len, new_distances, _distances_len, _distances, _edge[0].dst, new_distance, 0
-        );
+        // destination state weight = origin state + edge weight
+        dict_write{dict_ptr=distances}(key=dst_state, new_value=new_distance);
+        dict_write{dict_ptr=predecessors}(key=dst_state, new_value=_src_nr);
 
-        let (new_predecessors: felt*) = alloc();
-        Array.update(
-            _predecessors_len,
-            new_predecessors,
-            _predecessors_len,
-            _predecessors,
-            _edge[0].dst,
-            _src_nr,
-            0,
-        );
+        let (dst_was_queued) = dict_read{dict_ptr=was_queued}(key=dst_state);
+        let (already_queued_or_last_dst) = bitwise_or(dst_was_queued, is_dst_end);
 
-        let (already_in_queue_or_last_dst) = bitwise_or(_is_in_queue[_edge[0].dst], is_dst_end);
-
-        if (already_in_queue_or_last_dst == 0) {
-            // Add new vertex with better weight to queue
-            Array.push(_queue_len + 1, new_queue, _queue_len, _queue, _edge[0].dst);
-            assert new_queue_len = _queue_len + 1;
-
-            Array.update(
-                _is_in_queue_len,
-                new_is_in_queue,
-                _is_in_queue_len,
-                _is_in_queue,
-                _edge[0].dst,
-                1,
-                0,
-            );
+        if (already_queued_or_last_dst == 0) {
+            // Add new state with better weight to queue
+            assert _queue[_queue_len] = dst_state;
+            dict_write{dict_ptr=was_queued}(key=dst_state, new_value=1);
 
-            let (
-                res_distance_len,
-                res_distance,
-                res_queue_len,
-                res_queue,
-                res_is_in_queue_len,
-                res_is_in_queue,
-                res_predecessors_len,
-                res_predecessors,
-            ) = determine_distances(
-                _distances_len,
-                new_distances,
-                new_queue_len,
-                new_queue,
-                _is_in_queue_len,
-                new_is_in_queue,
+            let (res_queue_len) = determine_distances(
+                _queue_len + 1,
+                _queue,
                 _vertices,
                 _edge + 4,
-                _predecessors_len,
-                new_predecessors,
                 _dst_stop - 1,
                 _src_nr,
+                _next_layer,
                 _current_distance,
             );
-            return (
-                res_distance_len,
-                res_distance,
-                res_queue_len,
-                res_queue,
-                res_is_in_queue_len,
-                res_is_in_queue,
-                res_predecessors_len,
-                res_predecessors,
-            );
+            return (res_queue_len,);
         } else {
-            let (
-                res_distance_len,
-                res_distance,
-                res_queue_len,
-                res_queue,
-                res_is_in_queue_len,
-                res_is_in_queue,
-                res_predecessors_len,
-                res_predecessors,
-            ) = determine_distances(
-                _distances_len,
-                new_distances,
+            let (res_queue_len) = determine_distances(
                 _queue_len,
                 _queue,
-                _is_in_queue_len,
-                _is_in_queue,
                 _vertices,
                 _edge + 4,
-                _predecessors_len,
-                new_predecessors,
                 _dst_stop - 1,
                 _src_nr,
+                _next_layer,
                 _current_distance,
             );
-            return (
-                res_distance_len,
-                res_distance,
-                res_queue_len,
-                res_queue,
-                res_is_in_queue_len,
-                res_is_in_queue,
-                res_predecessors_len,
-                res_predecessors,
-            );
+            return (res_queue_len,);
         }
     } else {
-        let (
-            res_distance_len,
-            res_distance,
-            res_queue_len,
-            res_queue,
-            res_is_in_queue_len,
-            res_is_in_queue,
-            res_predecessors_len,
-            res_predecessors,
-        ) = determine_distances(
-            _distances_len,
-            _distances,
+        let (res_queue_len) = determine_distances(
             _queue_len,
             _queue,
-            _is_in_queue_len,
-            _is_in_queue,
             _vertices,
             _edge + 4,
-            _predecessors_len,
-            _predecessors,
             _dst_stop - 1,
             _src_nr,
+            _next_layer,
             _current_distance,
         );
-
-        return (
-            res_distance_len,
-            res_distance,
-            res_queue_len,
-            res_queue,
-            res_is_in_queue_len,
-            res_is_in_queue,
-            res_predecessors_len,
-            res_predecessors,
-        );
+        return (res_queue_len,);
     }
 }
 
-// @notice Initialize all relevant Arrays used by the SPF algorithm
-// @param _distances - An array of "distance" for each vertex to the origin
-// @param _predecessors - An Array that contains the vertices of the shortest path
-// @param _is_in_queue - An array of bools that is used to determine whether a vertex is currently in the spf queue
-// @param _queue - An array of tokens that makes up the spf queue
-// @param _counter - A counter used to track the number of iterations
-func init_arrays{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
-    _distances_len: felt,
-    _distances: felt*,
-    _predecessors: felt*,
-    _is_in_queue: felt*,
-    _queue: felt*,
-    _counter: felt,
-) -> () {
-    if (_counter == _distances_len) {
-        return ();
-    }
-
-    if (_counter == 0) {
-        assert _distances[0] = 0;  // Source Token
-        assert _queue[0] = 0;  // In token is only token in queue
-        assert _predecessors[0] = 0;
-        assert _is_in_queue[0] = 0;  // In_token will start in queue
-        init_arrays(
-            _distances_len,
-            _distances + 1,
-            _predecessors + 1,
-            _is_in_queue + 1,
-            _queue,
-            _counter + 1,
-        );
-        return ();
-    } else {
-        assert _distances[0] = MAX_FELT;
-        assert _predecessors[0] = 0;
-        assert _is_in_queue[0] = 0;
-        init_arrays(
-            _distances_len,
-            _distances + 1,
-            _predecessors + 1,
-            _is_in_queue + 1,
-            _queue,
-            _counter + 1,
-        );
-        return ();
-    }
-}
-
-// @notice Extract the router type and address from provided edges
-// @param _src - An array of Edge ranges. Used to map edges to a vertice
-// @param _edge - An array of graph Edges
-// @param _tokens - array of tokens that discribe the trading path
-// @param _routers - An (empty) array of routers
-func set_routers_from_edge{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
-    _src_len: felt, _src: Source*, _edge: Edge*, _tokens: felt*, _routers: Router*
-) {
+// @notice Find the number of hops of the shortest path to the last vertex
+// @dev Paths with fewer hops win ties
+// @param distances - dict of the "distance" of each state to the origin
+// @param _vertices - number of vercies/routers in the graph
+// @param _hops - Number of hops of the path that is compared next
+// @param _max_hops - Maximum number of hops of a path
+// @param _best_hops - Number of hops of the shortest path so far, 0 if there is none
+// @param _best_distance - Distance of the shortest path so far
+// @return hops - Number of hops of the shortest path, 0 if the last vertex can't be reached
+func shortest_hops{range_check_ptr, distances: DictAccess*}(
+    _vertices: felt, _hops: felt, _max_hops: felt, _best_hops: felt, _best_distance: felt
+) -> (hops: felt) {
     alloc_locals;
 
-    if (_src_len == 0) {
-        return ();
+    if (_hops == _max_hops + 1) {
+        return (_best_hops,);
     }
 
-    get_router_and_address(_src, _edge, _tokens, _routers, 0);
+    let (local distance) = dict_read{dict_ptr=distances}(key=_hops * _vertices + _vertices - 1);
+    let is_best_distance_better = is_le_felt(_best_distance, distance);
 
-    set_routers_from_edge(_src_len - 1, _src, _edge, _tokens + 1, _routers + 2);
-
-    return ();
-}
-
-// @notice For a given token trading pair we find the relevant edge and save the router information
-// @param _src - An array of Edge ranges. Used to map edges to a vertice
-// @param _edge - An array of graph Edges
-// @param _tokens - array of tokens that discribe the trading path
-// @param _routers - An array of routers that are used for each token pair trade
-func get_router_and_address{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
-    _src: Source*, _edge: Edge*, _tokens: felt*, _routers: Router*, _counter: felt
-) {
-    alloc_locals;
-
-    local edge_position = _src[_tokens[0]].start + _counter;
-
-    if (_edge[edge_position].dst == _tokens[1]) {
-        assert _routers[0] = _edge[edge_position].router;
-
-        return ();
-    } else {
-        get_router_and_address(_src, _edge, _tokens, _routers, _counter + 1);
-        return ();
+    if (is_best_distance_better == 1) {
+        let (hops) = shortest_hops(_vertices, _hops + 1, _max_hops, _best_hops, _best_distance);
+        return (hops,);
     }
+
+    let (hops) = shortest_hops(_vertices, _hops + 1, _max_hops, _hops, distance);
+    return (hops,);
 }
 
-// @notice fetch the price for each token from the router
-// @param _tokens - array of tokens that make up the vertices
-// @param _prices - An (empty) array of prices that we fill in this function
-func set_prices{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
-    _tokens_len: felt,
-    _tokens: felt*,
-    _prices: Uint256*,
-    _router_aggregator_address: felt,
+// @notice Maximum number of trades a path found by the solver may have
+// @return max_hops - The configured limit
+@view
+func get_max_hops{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() -> (
+    max_hops: felt
 ) {
-    if (_tokens_len == 0) {
-        return ();
-    }
-
-    let (price_out: Uint256, _) = IRouterAggregator.get_global_price(_router_aggregator_address,_tokens[0]);
-    // If this isn't correct, we have bigger problems on the router/oracle side
-    assert _prices[0] = price_out;
-    
-    set_prices(_tokens_len - 1, _tokens, _prices + 2, _router_aggregator_address);
-
-    return();
+    let (max_hops) = GraphConstructor.get_max_hops();
+    return (max_hops,);
 }
 
 // //////////////////////
@@ -685,3 +524,15 @@ func set_high_liq_tokens{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_c
     GraphConstructor.set_high_liq_tokens(_index, _high_liq_tokens);
     return ();
 }
+
+// @notice Set the maximum number of trades a path found by the solver may have
+// @dev The search runs at most this many relaxation rounds and returns the best path within the limit,
+//      0 resets it to the default (4)
+// @param _max_hops - The new limit
+@external
+func set_max_hops{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _max_hops: felt
+) {
+    GraphConstructor.set_max_hops(_max_hops);
+    return ();
+}
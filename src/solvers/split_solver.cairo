@@ -0,0 +1,292 @@
+%lang starknet
+
+from starkware.cairo.common.alloc import alloc
+from starkware.cairo.common.cairo_builtins import HashBuiltin
+from starkware.cairo.common.math import assert_not_zero, sqrt, unsigned_div_rem
+from starkware.cairo.common.math_cmp import is_le_felt
+from starkware.cairo.common.memcpy import memcpy
+from starkware.cairo.common.uint256 import Uint256
+
+from src.lib.utils import Utils, Router, Path
+from src.lib.constants import BASE
+from src.interfaces.i_router_aggregator import IRouterAggregator
+
+// ////////////////////////////////////////////////////////////////////////////////////////
+//                                                                                      //
+//   Splits a trade between the routers of a pair with the optimal split for constant   //
+//   product pools, computed in closed form instead of searched for.                    //
+//                                                                                      //
+//   A pool sold x returns 997 * x * reserve_out / (1000 * reserve_in + 997 * x).       //
+//   At the optimum every used pool ends up with the same marginal price, so            //
+//       1000 * reserve_in + 997 * x = depth * s                                        //
+//   with depth = sqrt(997 * 1000 * reserve_in * reserve_out) and a common s.           //
+//   Pools are filled by increasing 1000 * reserve_in / depth (best price first)        //
+//   for as long as that stays below                                                    //
+//       s = (997 * amount_in + sum(1000 * reserve_in)) / sum(depth)                    //
+//   over the pools that are used.                                                      //
+//                                                                                      //
+// ////////////////////////////////////////////////////////////////////////////////////////
+
+const FEE_NUMERATOR = 997;
+const FEE_DENOMINATOR = 1000;
+
+// @notice Pool of a router for the traded pair
+// @dev Reserves are used as felts (their low part) like in the graddesc solver
+struct Pool {
+    router: Router,
+    based_reserve: felt,  // fee_base * reserve_in
+    depth: felt,  // sqrt(fee * fee_base * reserve_in * reserve_out)
+}
+
+@storage_var
+func router_aggregator() -> (router_aggregator_address: felt) {
+}
+
+@constructor
+func constructor{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _router_aggregator: felt
+) {
+    router_aggregator.write(_router_aggregator);
+    return ();
+}
+
+// @notice Split a trade between every router that has liquidity for the pair
+// @param _amount_in - Number of tokens to be sold
+// @param _token_in - Address of the token to be sold
+// @param _token_out - Address of the token to be bought
+// @return routers - Array of routers that are used in the trading path
+// @return path - Array of token pairs that are used in the trading path
+// @return amounts - Array of token amount that are used in the trading path
+@view
+func get_results{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
+    _amount_in: Uint256, _token_in: felt, _token_out: felt
+) -> (
+    routers_len: felt,
+    routers: Router*,
+    path_len: felt,
+    path: Path*,
+    amounts_len: felt,
+    amounts: felt*,
+) {
+    alloc_locals;
+
+    let (router_aggregator_address) = router_aggregator.read();
+    let (
+        _, reserves_in: Uint256*, _, reserves_out: Uint256*, routers_len: felt, routers: Router*
+    ) = IRouterAggregator.get_all_routers_and_reserves(
+        router_aggregator_address, _token_in, _token_out
+    );
+    with_attr error_message("SPLIT: no router with liquidity for the pair") {
+        assert_not_zero(routers_len);
+    }
+
+    // Sort the pools in filling order
+    let (empty_pools: Pool*) = alloc();
+    let (local pools_len, local pools: Pool*) = sort_pools(
+        routers_len, routers, reserves_in, reserves_out, 0, empty_pools
+    );
+
+    // The best pool always gets a part of the trade
+    let (active_len, numerator, denominator) = fill_pools(
+        pools_len - 1,
+        pools + Pool.SIZE,
+        1,
+        FEE_NUMERATOR * _amount_in.low + pools[0].based_reserve,
+        pools[0].depth,
+    );
+
+    let (local split_routers: Router*) = alloc();
+    let (local path: Path*) = alloc();
+    let (local split_amounts: felt*) = alloc();
+    let (local split_len, local amounts_sum) = split_amount(
+        active_len,
+        pools,
+        numerator,
+        denominator,
+        split_routers,
+        path,
+        split_amounts,
+        _token_in,
+        _token_out,
+        0,
+        0,
+    );
+    with_attr error_message("SPLIT: trade amount is too small to be split") {
+        assert_not_zero(split_len);
+    }
+
+    // Transform amounts to shares
+    let (shares: felt*) = alloc();
+    amounts_to_shares(split_len, shares, split_amounts, amounts_sum);
+
+    return (split_len, split_routers, split_len, path, split_len, shares);
+}
+
+// ////////////////////////
+//       Internal        //
+// ////////////////////////
+
+// @notice Build the pools and sort them by increasing based_reserve / depth (insertion sort)
+// @dev Pools with the same marginal price keep the order of the router aggregator
+// @return pools_len - The number of pools
+// @return pools - The sorted pools
+func sort_pools{range_check_ptr}(
+    _routers_len: felt,
+    _routers: Router*,
+    _reserves_in: Uint256*,
+    _reserves_out: Uint256*,
+    _sorted_len: felt,
+    _sorted: Pool*,
+) -> (pools_len: felt, pools: Pool*) {
+    alloc_locals;
+
+    if (_routers_len == 0) {
+        return (_sorted_len, _sorted);
+    }
+
+    local based_reserve = FEE_DENOMINATOR * _reserves_in[0].low;
+    let depth = sqrt(FEE_NUMERATOR * based_reserve * _reserves_out[0].low);
+    let (local inserted: Pool*) = alloc();
+    insert_pool(_sorted_len, _sorted, Pool(_routers[0], based_reserve, depth), inserted);
+
+    return sort_pools(
+        _routers_len - 1,
+        _routers + Router.SIZE,
+        _reserves_in + Uint256.SIZE,
+        _reserves_out + Uint256.SIZE,
+        _sorted_len + 1,
+        inserted,
+    );
+}
+
+// @notice Copy sorted pools, inserting _pool in front of the first pool with a worse marginal price
+func insert_pool{range_check_ptr}(
+    _sorted_len: felt, _sorted: Pool*, _pool: Pool, _inserted: Pool*
+) {
+    alloc_locals;
+
+    if (_sorted_len == 0) {
+        assert _inserted[0] = _pool;
+        return ();
+    }
+
+    // based_reserve / depth of the sorted pool <= the one of the new pool
+    let is_sorted_first = is_le_felt(
+        _sorted[0].based_reserve * _pool.depth, _pool.based_reserve * _sorted[0].depth
+    );
+    if (is_sorted_first == 1) {
+        assert _inserted[0] = _sorted[0];
+        insert_pool(_sorted_len - 1, _sorted + Pool.SIZE, _pool, _inserted + Pool.SIZE);
+        return ();
+    }
+
+    assert _inserted[0] = _pool;
+    memcpy(_inserted + Pool.SIZE, _sorted, _sorted_len * Pool.SIZE);
+    return ();
+}
+
+// @notice Add pools to the split while their marginal price beats the common one of the pools already in it
+// @dev The common marginal price is (denominator / numerator)^2, the pool joins if based_reserve / depth < numerator / denominator
+// @return active_len - The number of (sorted) pools that get a part of the trade
+// @return numerator - 997 * amount_in + the sum of based_reserve of those pools
+// @return denominator - The sum of depth of those pools
+func fill_pools{range_check_ptr}(
+    _pools_len: felt, _pools: Pool*, _active_len: felt, _numerator: felt, _denominator: felt
+) -> (active_len: felt, numerator: felt, denominator: felt) {
+    if (_pools_len == 0) {
+        return (_active_len, _numerator, _denominator);
+    }
+
+    // Pools are sorted, if this one doesn't join none of the following does
+    let is_full = is_le_felt(
+        _pools[0].depth * _numerator, _pools[0].based_reserve * _denominator
+    );
+    if (is_full == 1) {
+        return (_active_len, _numerator, _denominator);
+    }
+
+    return fill_pools(
+        _pools_len - 1,
+        _pools + Pool.SIZE,
+        _active_len + 1,
+        _numerator + _pools[0].based_reserve,
+        _denominator + _pools[0].depth,
+    );
+}
+
+// @notice Compute the amount of every used pool and build the output, pools whose amount rounds down to 0 are kicked
+// @dev amount = (depth * numerator / denominator - based_reserve) / 997
+// @return split_len - The number of routers that get a part of the trade
+// @return amounts_sum - The sum of their amounts
+func split_amount{range_check_ptr}(
+    _pools_len: felt,
+    _pools: Pool*,
+    _numerator: felt,
+    _denominator: felt,
+    _routers: Router*,
+    _path: Path*,
+    _amounts: felt*,
+    _token_in: felt,
+    _token_out: felt,
+    _split_len: felt,
+    _amounts_sum: felt,
+) -> (split_len: felt, amounts_sum: felt) {
+    if (_pools_len == 0) {
+        return (_split_len, _amounts_sum);
+    }
+
+    let (amount, _) = unsigned_div_rem(
+        _pools[0].depth * _numerator - _pools[0].based_reserve * _denominator,
+        FEE_NUMERATOR * _denominator,
+    );
+    if (amount == 0) {
+        return split_amount(
+            _pools_len - 1,
+            _pools + Pool.SIZE,
+            _numerator,
+            _denominator,
+            _routers,
+            _path,
+            _amounts,
+            _token_in,
+            _token_out,
+            _split_len,
+            _amounts_sum,
+        );
+    }
+
+    assert _routers[0] = _pools[0].router;
+    assert _path[0] = Path(_token_in, _token_out);
+    assert _amounts[0] = amount;
+    return split_amount(
+        _pools_len - 1,
+        _pools + Pool.SIZE,
+        _numerator,
+        _denominator,
+        _routers + Router.SIZE,
+        _path + Path.SIZE,
+        _amounts + 1,
+        _token_in,
+        _token_out,
+        _split_len + 1,
+        _amounts_sum + amount,
+    );
+}
+
+// @notice Transform amounts into shares of the remaining amount, like the graddesc solver
+func amounts_to_shares{range_check_ptr}(
+    _shares_len: felt, _shares: felt*, _amounts: felt*, _sum: felt
+) {
+    if (_shares_len == 1) {
+        // The last share is always 100%
+        assert _shares[0] = BASE;
+        return ();
+    }
+
+    let share = Utils.felt_fmul(_amounts[0], BASE, _sum);
+    assert _shares[0] = share;
+
+    amounts_to_shares(_shares_len - 1, _shares + 1, _amounts + 1, _sum - _amounts[0]);
+
+    return ();
+}
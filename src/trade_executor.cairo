@@ -5,7 +5,7 @@
 from starkware.cairo.common.uint256 import Uint256, uint256_add
 from starkware.cairo.common.cairo_builtins import HashBuiltin
 from starkware.cairo.common.alloc import alloc
-from starkware.cairo.common.bool import TRUE
+from starkware.cairo.common.bool import TRUE, FALSE
 from starkware.cairo.common.default_dict import default_dict_new, default_dict_finalize
 from starkware.cairo.common.dict import dict_write, dict_read
 from starkware.cairo.common.dict_access import DictAccess
@@ -15,6 +15,7 @@ from starkware.cairo.common.math_cmp import is_le_felt
 from src.lib.utils import Utils, Router, Path
 from src.lib.constants import BASE, JediSwap, TenK, MAX_FELT, HALF_MAX
 from src.lib.router_aggregator import RouterAggregator
+from src.lib.graph import GraphConstructor
 
 from src.interfaces.i_erc20 import IERC20
 from src.interfaces.i_router import (IJediRouter, ITenKRouter)
@@ -76,11 +77,62 @@ func simulate_multi_swap{
     return (amount_out,);
 }
 
+// @notice Simulate multiple specified swaps locally from the reserves of the used pools
+// @dev Evaluates x*y=k with a 0.3% fee instead of asking the routers, so no external call is made.
+//      Like the router views, every hop is evaluated against the given (unchanged) reserves.
+// @param _routers - An array of routers to be used for the trades
+// @param _path - An array of token pairs to trade
+// @param _amounts - An array of token amounts (in %) to sell
+// @param _reserves_in - The reserves of the sold token in the pool of each hop
+// @param _reserves_out - The reserves of the bought token in the pool of each hop
+// @param _amount_in - The initial token to sell
+// @return amount_out - The token return amounts for each solver
+@view
+func simulate_multi_swap_with_reserves{
+        syscall_ptr: felt*, 
+        pedersen_ptr: HashBuiltin*, 
+        range_check_ptr
+    }(
+        _routers_len: felt,
+        _routers: Router*,
+        _path_len: felt,
+        _path: Path*,
+        _amounts_len: felt,
+        _amounts: felt*,
+        _reserves_in_len: felt,
+        _reserves_in: Uint256*,
+        _reserves_out_len: felt,
+        _reserves_out: Uint256*,
+        _amount_in: Uint256,
+    ) -> (amount_out: Uint256) {
+    alloc_locals;
+
+    // Create Dict to track token balances
+    let (local token_balances_start) = default_dict_new(default_value=0);
+    let token_balances = token_balances_start;
+    // Set initial balance of token_in
+    dict_write{dict_ptr=token_balances}(key=_path[0].token_in, new_value=_amount_in.low);
+
+    //The last token traded to should always be the token that the user wants to receive
+    tempvar _token_out = _path[_path_len-1].token_out;
+
+    let (amount_out: Uint256, final_token_balances: DictAccess*) = _simulate_multi_swap_with_reserves(
+        _routers_len, _path, _amounts, _reserves_in, _reserves_out, _token_out, token_balances
+    );
+
+    default_dict_finalize(token_balances_start, final_token_balances, 0);
+
+    return (amount_out,);
+}
+
 ////////////////////////////
 //       Externals        //
 ////////////////////////////
 
 // @notice Perform multiple token swap given a specified trading path
+// @dev Only the balance of the first token is read, the balances of the bought tokens are tracked
+//      from the amounts returned by the routers. Consecutive hops on the same router are merged
+//      into one router call (see _coalesce_hops).
 // @param _routers - An array of routers to be used for the trades
 // @param _path - An array of token pairs to trade
 // @param _amounts - An array of token amounts (in %) to sell
@@ -107,23 +159,60 @@ func multi_swap{
 
     let (init_amount: Uint256) = IERC20.balanceOf(_path[0].token_in, _receiver_address);
 
-    let (trade_amount: Uint256) = Utils.fmul(init_amount, Uint256(_amounts[0], 0), Uint256(BASE, 0));
-
-    _swap_exact_in(_routers[0], trade_amount, _path[0].token_in, _path[0].token_out, _receiver_address);
-    
-    // Log swap
-    swap_exact_in.emit(amount_in=trade_amount.low, token_in=_path[0].token_in, dex=_routers[0].address);
-
-    multi_swap(
-        _routers_len - 1,
-        _routers + 2,
+    multi_swap_exact_in(
+        _routers_len,
+        _routers,
         _path_len,
-        _path + 2,
+        _path,
         _amounts_len,
-        _amounts + 1,
-        _receiver_address
+        _amounts,
+        init_amount,
+        _receiver_address,
+    );
+
+    return ();
+}
+
+// @notice Perform multiple token swap given a specified trading path, selling a given amount of the first token
+// @dev Like multi_swap, but the first hop sells its share of _amount_in instead of the whole balance,
+//      the rest of the receiver's balance of the first token isn't touched.
+// @param _routers - An array of routers to be used for the trades
+// @param _path - An array of token pairs to trade
+// @param _amounts - An array of token amounts (in %) to sell
+// @param _amount_in - Amount of the first token that is sold, must be held by the receiver
+// @param _receiver_address - Address to receive the bought tokens
+@external
+func multi_swap_exact_in{
+        syscall_ptr: felt*, 
+        pedersen_ptr: HashBuiltin*, 
+        range_check_ptr
+    }(
+        _routers_len: felt,
+        _routers: Router*,
+        _path_len: felt,
+        _path: Path*,
+        _amounts_len: felt,
+        _amounts: felt*,
+        _amount_in: Uint256,
+        _receiver_address: felt
+    ) {
+    alloc_locals;
+
+    if (_routers_len == 0) {
+        return ();
+    }
+
+    // Create Dict to track token balances
+    let (local token_balances_start) = default_dict_new(default_value=0);
+    let token_balances = token_balances_start;
+    dict_write{dict_ptr=token_balances}(key=_path[0].token_in, new_value=_amount_in.low);
+
+    let (final_token_balances: DictAccess*) = _multi_swap(
+        _routers_len, _routers, _path, _amounts, _receiver_address, token_balances
     );
 
+    default_dict_finalize(token_balances_start, final_token_balances, 0);
+
     return ();
 }
 
@@ -131,12 +220,171 @@ func multi_swap{
 //       Internal         //
 ////////////////////////////
 
-// @notice Perform a single swap with the exact tokens to sell being specified
+// @notice Perform the trades of a trading path, merging consecutive hops on the same router
+// @param _routers - An array of routers to be used for the trades
+// @param _path - An array of token pairs to trade
+// @param _amounts - An array of token amounts (in %) to sell
+// @param _receiver_address - Address to receive the bought tokens
+// @param _token_balances - A dictionary of token address and their amounts owned by the receiver
+// @return final_token_balances - The token balances after all trades, should simply be squashed
+func _multi_swap{
+        syscall_ptr: felt*, 
+        pedersen_ptr: HashBuiltin*, 
+        range_check_ptr
+    }(
+        _routers_len: felt,
+        _routers: Router*,
+        _path: Path*,
+        _amounts: felt*,
+        _receiver_address: felt,
+        _token_balances: DictAccess*,
+    ) -> (final_token_balances: DictAccess*) {
+    alloc_locals;
+
+    if (_routers_len == 0) {
+        return (_token_balances,);
+    }
+
+    // Determine token amount to trade
+    let (current_balance) = dict_read{dict_ptr=_token_balances}(_path[0].token_in);
+    let amount = Utils.felt_fmul(current_balance, _amounts[0], BASE);
+    local trade_amount = amount;
+    dict_write{dict_ptr=_token_balances}(_path[0].token_in, current_balance - trade_amount);
+
+    // Collect the tokens of all hops that can be done with one router call
+    let (local swap_path: felt*) = alloc();
+    assert swap_path[0] = _path[0].token_in;
+    let (local hops, local balances: DictAccess*) = _coalesce_hops(
+        _routers_len, _routers, _path, _amounts, swap_path + 1, _token_balances
+    );
+
+    let (local amount_out: Uint256) = _swap_exact_in(
+        _routers[0], Uint256(trade_amount, 0), hops + 1, swap_path, _receiver_address
+    );
+    
+    // Log swap
+    swap_exact_in.emit(amount_in=trade_amount, token_in=_path[0].token_in, dex=_routers[0].address);
+
+    // Save new balance of the last bought token
+    let token_balances = balances;
+    let (current_balance) = dict_read{dict_ptr=token_balances}(swap_path[hops]);
+    dict_write{dict_ptr=token_balances}(swap_path[hops], current_balance + amount_out.low);
+
+    let (final_token_balances: DictAccess*) = _multi_swap(
+        _routers_len - hops,
+        _routers + hops * Router.SIZE,
+        _path + hops * Path.SIZE,
+        _amounts + hops,
+        _receiver_address,
+        token_balances,
+    );
+
+    return (final_token_balances,);
+}
+
+// @notice Count the consecutive hops that can be performed with a single router call and write their tokens
+// @dev A hop is merged into the previous one if it uses the same router, sells 100% of the token bought
+//      by the previous hop and that token wasn't owned before. The merged hop then sells exactly the
+//      amount the previous hop bought, so one call with the longer path is equivalent.
+// @param _routers - An array of routers, starting with the router of the first hop
+// @param _path - An array of token pairs, starting with the first hop
+// @param _amounts - An array of token amounts (in %) to sell, starting with the first hop
+// @param _swap_path - An (empty) array that is filled with the bought token of each merged hop
+// @param _token_balances - A dictionary of token address and their amounts owned by the receiver
+// @return hops - The number of merged hops (at least 1)
+// @return token_balances - The (unchanged) token balances
+func _coalesce_hops{
+        syscall_ptr: felt*, 
+        pedersen_ptr: HashBuiltin*, 
+        range_check_ptr
+    }(
+        _routers_len: felt,
+        _routers: Router*,
+        _path: Path*,
+        _amounts: felt*,
+        _swap_path: felt*,
+        _token_balances: DictAccess*,
+    ) -> (hops: felt, token_balances: DictAccess*) {
+    alloc_locals;
+
+    assert _swap_path[0] = _path[0].token_out;
+
+    if (_routers_len == 1) {
+        return (1, _token_balances);
+    }
+
+    let (intermediate_balance) = dict_read{dict_ptr=_token_balances}(_path[0].token_out);
+    let is_mergeable = _is_mergeable_hop(
+        _routers[0],
+        _routers[1],
+        _path[0].token_out,
+        _path[1].token_in,
+        _amounts[1],
+        intermediate_balance,
+    );
+
+    if (is_mergeable == FALSE) {
+        return (1, _token_balances);
+    }
+
+    let (hops, token_balances: DictAccess*) = _coalesce_hops(
+        _routers_len - 1,
+        _routers + Router.SIZE,
+        _path + Path.SIZE,
+        _amounts + 1,
+        _swap_path + 1,
+        _token_balances,
+    );
+    return (hops + 1, token_balances);
+}
+
+// @notice Check whether a hop can be merged into the router call of the previous hop
+// @param _router - The router of the previous hop
+// @param _next_router - The router of the hop in question
+// @param _token_bought - The token bought by the previous hop
+// @param _next_token_in - The token sold by the hop in question
+// @param _next_amount - The share (in %) of its token that the hop in question sells
+// @param _intermediate_balance - The balance of _token_bought before the previous hop
+// @return is_mergeable - TRUE if both hops can be done in one router call
+func _is_mergeable_hop(
+        _router: Router,
+        _next_router: Router,
+        _token_bought: felt,
+        _next_token_in: felt,
+        _next_amount: felt,
+        _intermediate_balance: felt,
+    ) -> felt {
+    if (_router.address != _next_router.address) {
+        return (FALSE);
+    }
+    if (_router.type != _next_router.type) {
+        return (FALSE);
+    }
+    if (_token_bought != _next_token_in) {
+        return (FALSE);
+    }
+    if (_next_amount != BASE) {
+        return (FALSE);
+    }
+    if (_intermediate_balance != 0) {
+        return (FALSE);
+    }
+    // Only routers whose swap accepts paths longer than two tokens
+    if (_router.type == JediSwap) {
+        return (TRUE);
+    }
+    if (_router.type == TenK) {
+        return (TRUE);
+    }
+    return (FALSE);
+}
+
+// @notice Perform a single router swap with the exact tokens to sell being specified
 // @param _router - The address of the router used for the trade
-// @param _amount_in - The number of _token_in to be sould
-// @param _token_in - The address of the token that would be sold
-// @param _token_out - The address of the token that would be bought
+// @param _amount_in - The number of _path[0] tokens to be sould
+// @param _path - The tokens to trade through, starting with the token sold and ending with the token bought
 // @param _receiver_address - Address to receive the bought tokens
+// @return amount_out - The number of _path[_path_len - 1] tokens that were bought
 func _swap_exact_in{
         syscall_ptr: felt*, 
         pedersen_ptr: HashBuiltin*, 
@@ -144,41 +392,35 @@ func _swap_exact_in{
     }(
         _router: Router, 
         _amount_in: Uint256, 
-        _token_in: felt, 
-        _token_out: felt, 
+        _path_len: felt,
+        _path: felt*,
         _receiver_address: felt
-    ) {
+    ) -> (amount_out: Uint256) {
     if (_router.type == JediSwap) {
-        IERC20.approve(_token_in, _router.address, _amount_in);
-        let (path: felt*) = alloc();
-        assert path[0] = _token_in;
-        assert path[1] = _token_out;
-        IJediRouter.swap_exact_tokens_for_tokens(
+        IERC20.approve(_path[0], _router.address, _amount_in);
+        let (amounts_len: felt, amounts: Uint256*) = IJediRouter.swap_exact_tokens_for_tokens(
             _router.address, 
             _amount_in, 
             Uint256(0, 0), 
-            2, 
-            path, 
+            _path_len, 
+            _path, 
             _receiver_address, 
             trade_deadline
         );
-        return ();
+        return (amounts[amounts_len - 1],);
     }
     if (_router.type == TenK) {
-        IERC20.approve(_token_in, _router.address, _amount_in);
-        let (path: felt*) = alloc();
-        assert path[0] = _token_in;
-        assert path[1] = _token_out;
-        ITenKRouter.swapExactTokensForTokens(
+        IERC20.approve(_path[0], _router.address, _amount_in);
+        let (amounts_len: felt, amounts: Uint256*) = ITenKRouter.swapExactTokensForTokens(
             _router.address, 
             _amount_in, 
             Uint256(0, 0), 
-            2, 
-            path, 
+            _path_len, 
+            _path, 
             _receiver_address, 
             trade_deadline
         );
-        return ();
+        return (amounts[amounts_len - 1],);
     } else {
         with_attr error_message("TRADE EXECUTIONER: Router type doesn't exist") {
             assert 1 = 2;
@@ -186,7 +428,7 @@ func _swap_exact_in{
         tempvar syscall_ptr = syscall_ptr;
         tempvar pedersen_ptr = pedersen_ptr;
         tempvar range_check_ptr = range_check_ptr;
-        return ();
+        return (Uint256(0, 0),);
     }
 }
 
@@ -207,7 +449,7 @@ func _simulate_swap_exact_in{
         _token_out: felt
     ) -> (amount_out: Uint256) {
 
-    let (amount_out: Uint256) = RouterAggregator.get_router_amount(_amount_in,_token_in,_token_out,_router);
+    let (amount_out: Uint256) = RouterAggregator.get_factory_router_amount(_amount_in,_token_in,_token_out,_router);
 
     return(amount_out,);
 }
@@ -280,3 +522,66 @@ func _simulate_multi_swap{
         return (final_sum, final_token_balances);
     }
 }
+
+// @notice Simulate how many tokens one would receive when performing multiple specified swaps, using the reserves of each hop
+// @param _path - An array of token pairs to trade
+// @param _amounts - An array of token amounts (in %) to sell
+// @param _reserves_in - The reserves of the sold token in the pool of each hop
+// @param _reserves_out - The reserves of the bought token in the pool of each hop
+// @param _token_out - The address of the final token to buy
+// @param _token_balances - A dictionary of token address and their amounts posessed by the function executor
+// @return amount_out - The expected received amount of the final token to be bought 
+// @return final_token_balances - The token balances after all trades, should simply be squashed
+func _simulate_multi_swap_with_reserves{range_check_ptr}(
+        _hops: felt,
+        _path: Path*,
+        _amounts: felt*,
+        _reserves_in: Uint256*,
+        _reserves_out: Uint256*,
+        _token_out: felt,
+        _token_balances: DictAccess*,
+    ) -> (amount_out: Uint256, final_token_balances: DictAccess*) {
+    alloc_locals;
+
+    if (_hops == 0) {
+        return (Uint256(0, 0), _token_balances);
+    }
+
+    // Determine token amount to trade
+    let (current_balance) = dict_read{dict_ptr=_token_balances}(_path[0].token_in);
+
+    let trade_amount = Utils.felt_fmul(current_balance, _amounts[0], BASE);
+
+    // Save new balance of token_in
+    tempvar new_token_in_balance = current_balance - trade_amount;
+    
+    dict_write{dict_ptr=_token_balances}(_path[0].token_in, new_token_in_balance);
+
+    // Evaluate the individual swap locally
+    let (local amount_out: Uint256) = GraphConstructor.get_amount_out(
+        Uint256(trade_amount, 0), _reserves_in[0], _reserves_out[0]
+    );
+
+    // Save new balance of token_out
+    let (current_balance) = dict_read{dict_ptr=_token_balances}(_path[0].token_out);
+    tempvar new_token_out_balance = current_balance + amount_out.low;
+    dict_write{dict_ptr=_token_balances}(_path[0].token_out, new_token_out_balance);
+
+    let (sum, final_token_balances) = _simulate_multi_swap_with_reserves(
+        _hops - 1,
+        _path + Path.SIZE,
+        _amounts + 1,
+        _reserves_in + Uint256.SIZE,
+        _reserves_out + Uint256.SIZE,
+        _token_out,
+        _token_balances,
+    );
+
+    if (_token_out == _path[0].token_out) {
+        let (final_sum: Uint256, _) = uint256_add(amount_out, sum);
+        return (final_sum, final_token_balances);
+    }else{
+        let (final_sum: Uint256, _) = uint256_add(Uint256(0,0), sum);
+        return (final_sum, final_token_balances);
+    }
+}
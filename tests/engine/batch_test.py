@@ -0,0 +1,117 @@
+import pytest
+
+from commercium.batch import Order, convert_amount, list_order_pairs, swap_batch
+from commercium.constants import BASE, JediSwap
+from commercium.felt import CairoAssertionError
+from commercium.simulator import AmmMarket
+from commercium.snapshot import Path, Router, get_amount_out
+
+ETH, USDC, DAI = 0x1, 0x2, 0x3
+JEDI = Router(0xA, JediSwap)
+ALICE, BOB, CAROL = 0x100, 0x200, 0x300
+
+
+def build_market():
+    market = AmmMarket()
+    market.add_router(JEDI.address, JEDI.type)
+    market.set_price(ETH, 1000 * 10**8, 8)
+    market.set_price(USDC, 10**8, 8)
+    market.set_price(DAI, 10**8, 8)
+    market.set_reserves(JEDI.address, ETH, USDC, 1_000 * BASE, 1_000_000 * 10**6)
+    market.set_reserves(JEDI.address, DAI, USDC, 1_000_000 * BASE, 1_000_000 * 10**6)
+    return market
+
+
+DECIMALS = {USDC: 6}
+
+
+def test_pairs_are_listed_once_in_either_direction():
+    orders = [
+        Order(ETH, USDC, 1, 0, ALICE),
+        Order(USDC, ETH, 1, 0, BOB),
+        Order(DAI, USDC, 1, 0, CAROL),
+    ]
+
+    assert list_order_pairs(orders) == [Path(ETH, USDC), Path(DAI, USDC)]
+    with pytest.raises(CairoAssertionError):
+        list_order_pairs([Order(ETH, ETH, 1, 0, ALICE)])
+
+
+def test_opposite_orders_are_matched_without_trading():
+    market = build_market()
+    orders = [
+        Order(ETH, USDC, 2 * BASE, 0, ALICE),
+        Order(USDC, ETH, 2_000 * 10**6, 0, BOB),
+    ]
+
+    assert convert_amount(2 * BASE, 1000 * BASE, 18, BASE, 6) == 2_000 * 10**6
+    assert swap_batch(market, orders, "split", DECIMALS) == [2_000 * 10**6, 2 * BASE]
+    # The pool wasn't touched
+    assert market.get_router(JEDI).get_reserves(ETH, USDC) == (
+        1_000 * BASE,
+        1_000_000 * 10**6,
+    )
+
+
+def test_residual_is_routed_and_split_pro_rata():
+    market = build_market()
+    orders = [
+        Order(ETH, USDC, 1 * BASE, 0, ALICE),
+        Order(USDC, ETH, 1_000 * 10**6, 0, BOB),
+        Order(ETH, USDC, 3 * BASE, 0, CAROL),
+    ]
+
+    amounts_out = swap_batch(market, orders, "split", DECIMALS)
+
+    # Bob is matched with 1 ETH of the sellers, the other 3 ETH go through the pool
+    residual_out = get_amount_out(3 * BASE, 1_000 * BASE, 1_000_000 * 10**6)
+    proceeds = 1_000 * 10**6 + residual_out
+    assert amounts_out == [proceeds // 4, 1 * BASE, proceeds * 3 // 4]
+    assert market.get_router(JEDI).get_reserves(ETH, USDC) == (
+        1_003 * BASE,
+        1_000_000 * 10**6 - residual_out,
+    )
+
+    # The sellers get more than swapping the 4 ETH through the pool
+    assert proceeds > get_amount_out(4 * BASE, 1_000 * BASE, 1_000_000 * 10**6)
+
+
+def test_one_missed_minimum_fails_the_batch():
+    orders = [
+        Order(USDC, ETH, 1_000 * 10**6, 0, BOB),
+        Order(ETH, USDC, 1 * BASE, 1_000 * 10**6 + 1, ALICE),
+    ]
+
+    with pytest.raises(CairoAssertionError, match="Minimum amount not received"):
+        swap_batch(build_market(), orders, "split", DECIMALS)
+
+
+def test_matched_tokens_pay_the_other_side():
+    market = build_market()
+    orders = [
+        Order(ETH, USDC, 2 * BASE, 0, ALICE),
+        Order(USDC, ETH, 100 * 10**6, 0, BOB),
+        Order(ETH, USDC, 1 * BASE, 0, CAROL),
+    ]
+
+    amounts_out = swap_batch(market, orders, "split", DECIMALS)
+
+    # Only the residual reaches the pool, the matched ETH pays Bob
+    reserve_eth, reserve_usdc = market.get_router(JEDI).get_reserves(ETH, USDC)
+    assert reserve_eth - 1_000 * BASE == 3 * BASE - amounts_out[1]
+    assert amounts_out[1] == BASE // 10
+    # The USDC sellers' proceeds are the matched USDC and the pool output, minus rounding dust
+    usdc_in_hub = 100 * 10**6 + 1_000_000 * 10**6 - reserve_usdc
+    assert 0 <= usdc_in_hub - amounts_out[0] - amounts_out[2] < 2
+
+
+def test_tokens_without_price_feed_are_not_matched():
+    market = build_market()
+    market.price_feeds.pop(DAI)
+    orders = [
+        Order(DAI, USDC, 1_000 * BASE, 0, ALICE),
+        Order(USDC, DAI, 1_000 * 10**6, 0, BOB),
+    ]
+
+    with pytest.raises(CairoAssertionError, match="no oracle price feed"):
+        swap_batch(market, orders, "split", DECIMALS)
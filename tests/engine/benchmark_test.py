@@ -0,0 +1,145 @@
+import json
+from enum import Enum
+from types import SimpleNamespace
+
+from commercium.benchmark import (
+    Measurement,
+    Scenario,
+    compare,
+    iter_calls,
+    load_baseline,
+    measure,
+    save_results,
+    update_baseline,
+)
+
+
+class CallType(Enum):
+    CALL = 0
+    DELEGATE = 1
+
+
+def call_info(reads=0, call_type=CallType.CALL, internal_calls=()):
+    return SimpleNamespace(
+        storage_read_values=[0] * reads,
+        call_type=call_type,
+        internal_calls=list(internal_calls),
+        execution_resources=SimpleNamespace(
+            n_steps=1000,
+            n_memory_holes=20,
+            builtin_instance_counter={
+                "pedersen_builtin": 4,
+                "range_check_builtin": 100,
+                "bitwise_builtin": 0,
+            },
+        ),
+    )
+
+
+def quote_call_tree():
+    # hub -> registry, hub -> solver -> aggregator -> router, hub -> library call
+    router = call_info(reads=2)
+    aggregator = call_info(reads=3, internal_calls=[router])
+    solver = call_info(reads=1, internal_calls=[aggregator])
+    registry = call_info(reads=1)
+    library_call = call_info(reads=1, call_type=CallType.DELEGATE)
+    return call_info(reads=1, internal_calls=[registry, solver, library_call])
+
+
+def test_iter_calls_visits_tree_depth_first():
+    root = quote_call_tree()
+    calls = list(iter_calls(root))
+
+    assert len(calls) == 6
+    assert calls[0] is root
+    assert calls[1] is root.internal_calls[0]
+    assert calls[-1] is root.internal_calls[2]
+
+
+def test_measure_counts_calls_and_storage_reads():
+    measurement = measure("spf", Scenario(4, 2).name, quote_call_tree(), 123)
+
+    assert measurement.key == "spf/4t-2r"
+    assert measurement.n_steps == 1000
+    assert measurement.storage_reads == 9
+    assert measurement.calls == 4
+    assert measurement.library_calls == 1
+    # Unused builtins are dropped
+    assert measurement.builtins == {"pedersen_builtin": 4, "range_check_builtin": 100}
+    # Steps (incl. memory holes) weight 0.05, range checks 0.8 -> range checks dominate
+    assert measurement.l1_gas == 80
+    assert not measurement.over_step_limit
+
+
+def test_compare_flags_growth_above_tolerance():
+    baseline = {
+        "tolerance": 0.1,
+        "results": {
+            "spf/4t-2r": {
+                "n_steps": 1000,
+                "storage_reads": 10,
+                "calls": 4,
+                "l1_gas": 80,
+            },
+            "graddesc/4t-2r": {"error": "div=0x0 is out of the valid range."},
+        },
+    }
+    within = Measurement("spf", "4t-2r", n_steps=1099, storage_reads=10, calls=4)
+    assert compare([within], baseline) == []
+
+    regressed = Measurement("spf", "4t-2r", n_steps=1101, storage_reads=10, calls=8)
+    regressions = compare([regressed], baseline)
+    assert [regression.metric for regression in regressions] == ["n_steps", "calls"]
+    assert compare([regressed], baseline, tolerance=1) == []
+
+    # Errors fail on both sides, a stale baseline entry would hide regressions
+    fixed = Measurement("graddesc", "4t-2r", n_steps=1000, storage_reads=10, calls=4)
+    assert [str(regression) for regression in compare([fixed], baseline)] == [
+        "graddesc/4t-2r baseline error: div=0x0 is out of the valid range."
+    ]
+    broken = Measurement("spf", "4t-2r", error="out of resources")
+    assert [str(regression) for regression in compare([broken], baseline)] == [
+        "spf/4t-2r error: out of resources"
+    ]
+
+    # Unknown entries are ignored
+    assert compare([Measurement("spf", "9t-9r", n_steps=10**9)], baseline) == []
+
+
+def test_results_round_trip(tmp_path):
+    measurements = [
+        measure("spf", "4t-2r", quote_call_tree(), 123),
+        Measurement("dijkstra", "4t-2r", error="Unknown identifier 'BitwiseBuiltin'."),
+    ]
+    path = tmp_path / "baseline.json"
+    save_results(path, measurements, tolerance=0.05)
+
+    baseline = load_baseline(path)
+    assert baseline["tolerance"] == 0.05
+    assert baseline["results"]["spf/4t-2r"]["storage_reads"] == 9
+    assert baseline["results"]["dijkstra/4t-2r"] == {
+        "error": "Unknown identifier 'BitwiseBuiltin'."
+    }
+    assert [regression.key for regression in compare(measurements, baseline)] == [
+        "dijkstra/4t-2r"
+    ]
+    json.loads(path.read_text())
+
+
+def test_update_baseline_keeps_other_entries(tmp_path):
+    path = tmp_path / "baseline.json"
+    save_results(
+        path,
+        [
+            Measurement("spf", "4t-2r", n_steps=2000),
+            Measurement("graddesc", "4t-2r", n_steps=500),
+        ],
+        tolerance=0.1,
+    )
+
+    update_baseline(path, [Measurement("spf", "4t-2r", n_steps=1500)])
+
+    baseline = load_baseline(path)
+    assert baseline["tolerance"] == 0.1
+    assert baseline["results"]["spf/4t-2r"]["n_steps"] == 1500
+    assert baseline["results"]["graddesc/4t-2r"]["n_steps"] == 500
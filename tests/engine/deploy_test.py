@@ -0,0 +1,254 @@
+import asyncio
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+import pytest
+
+from commercium.deploy import (
+    DeploymentPlan,
+    Invoke,
+    Manifest,
+    Orchestrator,
+    Ref,
+    StarknetBackend,
+)
+
+
+class InMemoryBackend:
+    """Network double: declares/deploys are kept in dicts, every transaction takes one tick to be accepted"""
+
+    def __init__(self):
+        self.declared = set()
+        self.deployed = {}
+        self.transactions = []
+        self.invoked = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.declaring = 0
+        self.max_declaring = 0
+
+    def class_hash(self, compiled_contract):
+        return abs(hash(compiled_contract)) + 1
+
+    async def declare(self, compiled_contract):
+        self.declaring += 1
+        self.max_declaring = max(self.max_declaring, self.declaring)
+        await asyncio.sleep(0)
+        self.declaring -= 1
+        class_hash = self.class_hash(compiled_contract)
+        self.declared.add(class_hash)
+        self.transactions.append(("declare", compiled_contract))
+        return len(self.transactions), class_hash
+
+    def deploy_call(self, class_hash, calldata):
+        address = abs(hash((class_hash, tuple(calldata)))) + 1
+        return ("deploy", class_hash, tuple(calldata), address), address
+
+    def invoke_call(self, address, function, calldata):
+        return ("invoke", address, function, tuple(calldata))
+
+    async def execute(self, calls):
+        for call in calls:
+            if call[0] == "deploy":
+                self.deployed[call[3]] = call[1]
+            else:
+                self.invoked.append(call[1:])
+        self.transactions.append(("multicall", len(calls)))
+        return len(self.transactions)
+
+    async def wait(self, transaction_hash):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+
+    async def is_declared(self, class_hash):
+        return class_hash in self.declared
+
+    async def is_deployed(self, address):
+        return address in self.deployed
+
+
+def build_plan(tmp_path):
+    for name in ["hub", "registry", "solver"]:
+        (tmp_path / f"{name}.json").write_text(name)
+
+    plan = DeploymentPlan()
+    hub_class = plan.declare("hub_class", tmp_path / "hub.json")
+    registry_class = plan.declare("registry_class", tmp_path / "registry.json")
+    solver_class = plan.declare("solver_class", tmp_path / "solver.json")
+    hub = plan.deploy("hub", hub_class, [1])
+    registry = plan.deploy("registry", registry_class, [1])
+    solver = plan.deploy("solver", solver_class, [registry])
+    plan.invoke("hub.set_solver_registry", hub, "set_solver_registry", [registry])
+    plan.invoke("registry.set_solver", registry, "set_solver", [1, solver])
+    return plan
+
+
+def test_levels(tmp_path):
+    levels = build_plan(tmp_path).levels()
+
+    assert [[node.name for node in level] for level in levels] == [
+        ["hub_class", "registry_class", "solver_class"],
+        ["hub", "registry"],
+        ["solver", "hub.set_solver_registry"],
+        ["registry.set_solver"],
+    ]
+
+
+def test_unknown_dependency_and_cycle():
+    plan = DeploymentPlan()
+    plan.add(Invoke("a", "b", "f"))
+    with pytest.raises(ValueError, match="unknown"):
+        plan.levels()
+
+    plan.add(Invoke("b", "a", "f"))
+    with pytest.raises(ValueError, match="cycle"):
+        plan.levels()
+
+
+async def test_levels_are_bundled(tmp_path):
+    backend = InMemoryBackend()
+    manifest = Manifest(tmp_path / "manifest.json")
+    result = await Orchestrator(backend, manifest, log=lambda _: None).run(
+        build_plan(tmp_path)
+    )
+
+    # 3 declarations + one multicall for each of the 3 following levels
+    assert result.transactions == 6
+    assert [transaction[0] for transaction in backend.transactions].count(
+        "multicall"
+    ) == 3
+    assert backend.max_in_flight == 3
+    assert backend.max_declaring == 3
+    assert (
+        result.contracts["registry"],
+        "set_solver",
+        (1, result.contracts["solver"]),
+    ) in backend.invoked
+
+
+async def test_manifest_skips_finished_steps(tmp_path):
+    backend = InMemoryBackend()
+    await Orchestrator(
+        backend, Manifest(tmp_path / "manifest.json"), log=lambda _: None
+    ).run(build_plan(tmp_path))
+    backend.transactions.clear()
+
+    # Nothing left to do
+    result = await Orchestrator(
+        backend, Manifest(tmp_path / "manifest.json"), log=lambda _: None
+    ).run(build_plan(tmp_path))
+    assert backend.transactions == []
+    assert result.executed == []
+    assert set(result.contracts) == {"hub", "registry", "solver"}
+
+
+async def test_missing_contracts_are_redeployed(tmp_path):
+    backend = InMemoryBackend()
+    first = await Orchestrator(
+        backend, Manifest(tmp_path / "manifest.json"), log=lambda _: None
+    ).run(build_plan(tmp_path))
+
+    # e.g. a restarted devnet that lost the solver
+    del backend.deployed[first.contracts["solver"]]
+    result = await Orchestrator(
+        backend, Manifest(tmp_path / "manifest.json"), log=lambda _: None
+    ).run(build_plan(tmp_path))
+
+    assert sorted(result.executed) == ["registry.set_solver", "solver"]
+    assert result.contracts == first.contracts
+
+
+async def test_changed_classes_are_redeclared(tmp_path):
+    backend = InMemoryBackend()
+    first = await Orchestrator(
+        backend, Manifest(tmp_path / "manifest.json"), log=lambda _: None
+    ).run(build_plan(tmp_path))
+
+    # Rebuilt artifact of the registry, everything that uses the registry is redeployed or called again
+    plan = build_plan(tmp_path)
+    (tmp_path / "registry.json").write_text("registry v2")
+    result = await Orchestrator(
+        backend, Manifest(tmp_path / "manifest.json"), log=lambda _: None
+    ).run(plan)
+
+    assert sorted(result.executed) == [
+        "hub.set_solver_registry",
+        "registry",
+        "registry.set_solver",
+        "registry_class",
+        "solver",
+    ]
+    assert result.classes["registry_class"] == backend.class_hash("registry v2")
+    assert result.contracts["registry"] != first.contracts["registry"]
+    assert result.contracts["hub"] == first.contracts["hub"]
+    assert (
+        result.contracts["hub"],
+        "set_solver_registry",
+        (result.contracts["registry"],),
+    ) in backend.invoked
+
+
+def test_manifest_round_trip(tmp_path):
+    manifest = Manifest(tmp_path / "deployments" / "devnet.json")
+    plan = DeploymentPlan()
+    plan.declare("hub_class", "hub.json")
+    plan.deploy("hub", Ref("hub_class"))
+    manifest.record(plan.nodes["hub_class"], 0xABC)
+    manifest.record(plan.nodes["hub"], 0x123)
+    manifest.save()
+
+    loaded = Manifest(tmp_path / "deployments" / "devnet.json")
+    assert loaded.classes == {"hub_class": 0xABC}
+    assert loaded.contracts == {"hub": 0x123}
+
+
+@dataclass(frozen=True)
+class FakeTransaction:
+    nonce: int = 0
+    signature: tuple = ()
+
+
+class FakeAccount:
+    """AccountClient double: every transaction it builds uses the nonce of the network"""
+
+    address = 0x1234
+
+    def __init__(self):
+        self.client = self
+        self.signer = self
+        self.sent = []
+
+    async def get_contract_nonce(self, address, block_hash):
+        await asyncio.sleep(0)
+        return 7
+
+    def sign_transaction(self, transaction):
+        return [transaction.nonce]
+
+    async def sign_declare_transaction(self, compiled_contract, max_fee):
+        return FakeTransaction(nonce=7, signature=[7])
+
+    async def sign_invoke_transaction(self, calls, max_fee):
+        return FakeTransaction(nonce=7, signature=[7])
+
+    async def declare(self, transaction):
+        self.sent.append(transaction)
+        return SimpleNamespace(transaction_hash=len(self.sent), class_hash=0)
+
+    async def send_transaction(self, transaction):
+        self.sent.append(transaction)
+        return SimpleNamespace(transaction_hash=len(self.sent))
+
+
+async def test_starknet_backend_signs_with_managed_nonces():
+    pytest.importorskip("starknet_py")
+    account = FakeAccount()
+    backend = StarknetBackend(account)
+
+    await asyncio.gather(backend.declare("a"), backend.declare("b"))
+    await backend.execute([])
+
+    assert [transaction.nonce for transaction in account.sent] == [7, 8, 9]
+    assert [transaction.signature for transaction in account.sent] == [[7], [8], [9]]
@@ -0,0 +1,117 @@
+import random
+
+import pytest
+
+from commercium.constants import BASE
+from commercium.felt import CairoAssertionError
+from commercium.snapshot import MarketSnapshot, Path, Router
+from commercium.solvers import graddesc
+
+ETH = 0x49D36570D4E46F48E99674BD3FCC84644DDD6B96F7C741B1562B82F9E004DC7
+DAI = 0xDA114221CB83FA859DBDB4C44BEEAA0BB37C7537AD5AE66FE5E0EFD20E6EB3
+
+
+def build_snapshot(reserves):
+    snapshot = MarketSnapshot()
+    for router_id, (reserve_eth, reserve_dai) in enumerate(reserves):
+        router = Router(router_id + 1, 0)
+        snapshot.routers.append(router)
+        snapshot.set_reserves(router.address, ETH, DAI, reserve_eth, reserve_dai)
+    return snapshot
+
+
+def scalar_results(snapshot, amounts_in):
+    results = []
+    for amount_in in amounts_in:
+        try:
+            results.append(graddesc.get_results(snapshot, amount_in, ETH, DAI))
+        except CairoAssertionError:
+            results.append(None)
+    return results
+
+
+def test_equal_pools_are_split_evenly():
+    snapshot = build_snapshot(
+        [(1_000 * BASE, 1_000 * BASE), (1_000 * BASE, 1_000 * BASE)]
+    )
+    routers, path, amounts = graddesc.get_results(snapshot, 10 * BASE, ETH, DAI)
+
+    # get_all_routers_and_reserves returns the routers in reversed order
+    assert routers == [Router(2, 0), Router(1, 0)]
+    assert path == [Path(ETH, DAI), Path(ETH, DAI)]
+    assert abs(amounts[0] - BASE // 2) < BASE // 10**6
+    assert amounts[-1] == BASE
+
+
+def test_single_router_trades_everything():
+    snapshot = build_snapshot([(1_000 * BASE, 1_000 * BASE)])
+    # With one router there is no gradient, the descent is skipped instead of dividing by a 0 norm
+    result = graddesc.get_results(snapshot, BASE, ETH, DAI)
+    assert result == ([Router(1, 0)], [Path(ETH, DAI)], [BASE])
+    assert graddesc.get_results_batch(snapshot, [BASE, 2 * BASE], ETH, DAI) == [
+        result,
+        result,
+    ]
+
+
+def test_uneven_pools_never_underflow_the_last_amount():
+    # Same ETH/DAI pools as tests/graddesc_test.cairo, the first routers used to take more than the input amount
+    snapshot = build_snapshot(
+        [
+            (10 * BASE, 10_000 * BASE),
+            (1_000 * BASE, 1_000_000 * BASE),
+            (10 * BASE, 10_000 * BASE),
+            (100 * BASE, 100_000 * BASE),
+        ]
+    )
+    routers, path, amounts = graddesc.get_results(snapshot, 2 * BASE, ETH, DAI)
+
+    assert Router(2, 0) in routers
+    assert amounts[-1] == BASE
+    assert graddesc.get_results_batch(snapshot, [2 * BASE], ETH, DAI) == [
+        (routers, path, amounts)
+    ]
+
+
+def test_batch_matches_scalar():
+    if graddesc.np is None:
+        pytest.skip("numpy is not installed")
+
+    rng = random.Random(1)
+    for _ in range(20):
+        reserves = [
+            (rng.randint(100, 10**6) * BASE, rng.randint(100, 10**6) * BASE)
+            for _ in range(rng.randint(2, 4))
+        ]
+        snapshot = build_snapshot(reserves)
+        amounts_in = [rng.randint(1, 10**5) * BASE // 7 for _ in range(10)]
+
+        assert graddesc.get_results_batch(
+            snapshot, amounts_in, ETH, DAI
+        ) == scalar_results(snapshot, amounts_in)
+
+
+def test_batch_without_numpy(monkeypatch):
+    snapshot = build_snapshot(
+        [(1_000 * BASE, 1_300_000 * BASE), (2_000 * BASE, 2_500_000 * BASE)]
+    )
+    amounts_in = [BASE, 5 * BASE, 50 * BASE]
+    monkeypatch.setattr(graddesc, "np", None)
+
+    assert graddesc.get_results_batch(snapshot, amounts_in, ETH, DAI) == scalar_results(
+        snapshot, amounts_in
+    )
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_batch_without_liquidity(monkeypatch, use_numpy):
+    if use_numpy and graddesc.np is None:
+        pytest.skip("numpy is not installed")
+    if not use_numpy:
+        monkeypatch.setattr(graddesc, "np", None)
+    snapshot = MarketSnapshot()
+
+    assert graddesc.get_results_batch(snapshot, [BASE, 2 * BASE], ETH, DAI) == [
+        None,
+        None,
+    ]
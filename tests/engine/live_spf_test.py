@@ -0,0 +1,110 @@
+import random
+
+from commercium.constants import BASE, JediSwap, TenK
+from commercium.snapshot import MarketSnapshot, Router
+from commercium.solvers.live_spf import LiveMarket, LiveSpfGraph
+from commercium.solvers.spf import SpfSolver
+
+ETH = 0x49D36570D4E46F48E99674BD3FCC84644DDD6B96F7C741B1562B82F9E004DC7
+DAI = 0xDA114221CB83FA859DBDB4C44BEEAA0BB37C7537AD5AE66FE5E0EFD20E6EB3
+USDC = 0x53C91253BC9682C04929CA02ED00B3E423F6710D2EE7E0D5EBB06F3ECF368A8
+USDT = 0x68F5C6A61780768455DE69077E07E89787839BF8166DECFBF92B645209C0FB8
+WBTC = 0x3FE2B97C1FD336E750087D68B9B867997FD64A2661FF3CA5A7C771641E8E7AC
+
+JEDI = Router(0x1, JediSwap)
+TENK = Router(0x2, TenK)
+
+TOKENS = [ETH, DAI, USDC, USDT, WBTC]
+
+
+# Every router has a pool for every pair, pool addresses are (router address, token_a index, token_b index)
+def build_market(rng):
+    snapshot = MarketSnapshot(routers=[JEDI, TENK], high_liq_tokens=[USDC, USDT, WBTC])
+    for token in TOKENS:
+        snapshot.set_price(token, rng.randint(1, 30_000) * 10**8, 8)
+
+    market = LiveMarket(snapshot)
+    for router in (JEDI, TENK):
+        for index, token_a in enumerate(TOKENS):
+            for token_b in TOKENS[index + 1 :]:
+                address = (router.address, token_a, token_b)
+                market.add_pool(address, router, token_a, token_b)
+                market.apply_sync(address, *random_reserves(rng))
+    return market
+
+
+def random_reserves(rng):
+    return rng.randint(1, 10**6) * BASE, rng.randint(1, 10**6) * BASE
+
+
+def test_starts_like_the_solver():
+    market = build_market(random.Random(1))
+
+    assert market.quote(BASE, ETH, DAI) == SpfSolver(
+        market.snapshot
+    ).get_amount_and_path(BASE, ETH, DAI)
+
+
+def test_updates_match_a_rebuild():
+    rng = random.Random(2)
+    market = build_market(rng)
+    trades = [(BASE, ETH, DAI), (50 * BASE, DAI, WBTC), (10**15, USDT, USDC)]
+
+    for _ in range(300):
+        for trade in trades:
+            graph = market.graph(*trade)
+            rebuilt = LiveSpfGraph(market.snapshot, *trade)
+            assert graph.edges == rebuilt.edges
+            assert market.quote(*trade) == SpfSolver(
+                market.snapshot
+            ).get_amount_and_path(*trade)
+
+        pool = rng.choice(list(market.pools))
+        if rng.random() < 0.2:
+            market.apply_price(rng.choice(TOKENS), rng.randint(1, 30_000) * BASE)
+        elif rng.random() < 0.1:
+            # The pool is drained, its edge disappears
+            market.apply_sync(pool, 0, 0)
+        else:
+            market.apply_sync(pool, *random_reserves(rng))
+
+
+def test_reserve_updates_do_not_rebuild(monkeypatch):
+    market = build_market(random.Random(3))
+    graph = market.graph(BASE, ETH, DAI)
+    monkeypatch.setattr(graph, "rebuild", lambda: (_ for _ in ()).throw(AssertionError))
+
+    market.apply_sync((TENK.address, DAI, USDC), BASE, 10**9 * BASE)
+    market.apply_price(DAI, 3 * BASE)
+
+    assert graph.edges == LiveSpfGraph(market.snapshot, BASE, ETH, DAI).edges
+    assert market.quote(BASE, ETH, DAI) == SpfSolver(
+        market.snapshot
+    ).get_amount_and_path(BASE, ETH, DAI)
+
+
+def test_spf_only_runs_again_after_a_change():
+    market = build_market(random.Random(5))
+    graph = market.graph(BASE, ETH, DAI)
+    market.apply_sync((TENK.address, ETH, USDC), 10**9 * BASE, 10**9 * BASE)
+    spf_result = graph.shortest_paths()
+
+    # TENK stays the best ETH/USDC router, the edge doesn't change
+    market.apply_sync((JEDI.address, ETH, USDC), BASE, BASE)
+    assert graph.shortest_paths() is spf_result
+
+    market.apply_sync((TENK.address, ETH, USDC), BASE, BASE)
+    assert graph.spf_result is None
+
+
+def test_unknown_pools_and_graph_eviction():
+    market = build_market(random.Random(4))
+    market.max_graphs = 2
+
+    assert not market.apply_sync(0xDEAD, 1, 2)
+    first = market.graph(BASE, ETH, DAI)
+    market.graph(BASE, DAI, ETH)
+    assert market.graph(BASE, ETH, DAI) is first
+    market.graph(BASE, WBTC, ETH)
+    assert market.graph(BASE, ETH, DAI) is first
+    assert market.graph(BASE, DAI, ETH) is not first
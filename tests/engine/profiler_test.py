@@ -0,0 +1,176 @@
+from enum import Enum
+from types import SimpleNamespace
+
+from commercium.profiler import (
+    Frame,
+    Labels,
+    diff_collapsed,
+    diff_functions,
+    format_collapsed,
+    frame_from_call_info,
+    frame_from_trace,
+    to_collapsed,
+    to_speedscope,
+)
+
+HUB, REGISTRY, SOLVER, ROUTER = 0x10, 0x20, 0x30, 0x40
+EXECUTOR_HASH = 0xE0
+
+LABELS = Labels(
+    contracts={HUB: "hub", REGISTRY: "solver_registry", SOLVER: "spf_solver"},
+    classes={EXECUTOR_HASH: "trade_executor"},
+    selectors={1: "swap", 2: "get_solver", 3: "get_results", 4: "multi_swap"},
+)
+
+
+class CallType(Enum):
+    CALL = 0
+    DELEGATE = 1
+
+
+def call_info(address, selector, n_steps, reads=0, internal_calls=(), **kwargs):
+    return SimpleNamespace(
+        contract_address=address,
+        entry_point_selector=selector,
+        call_type=kwargs.get("call_type", CallType.CALL),
+        class_hash=kwargs.get("class_hash"),
+        storage_read_values=[0] * reads,
+        accessed_storage_keys={index for index in range(reads)},
+        internal_calls=list(internal_calls),
+        execution_resources=SimpleNamespace(
+            n_steps=n_steps,
+            n_memory_holes=0,
+            builtin_instance_counter={
+                "range_check_builtin": n_steps // 10,
+                "bitwise_builtin": 0,
+            },
+        ),
+    )
+
+
+def swap_call_tree():
+    # hub.swap -> registry.get_solver, hub.swap -> solver.get_results, hub.swap -> library call multi_swap
+    return call_info(
+        HUB,
+        1,
+        1000,
+        reads=2,
+        internal_calls=[
+            call_info(REGISTRY, 2, 100, reads=1),
+            call_info(SOLVER, 3, 500, reads=4),
+            call_info(
+                HUB,
+                4,
+                300,
+                call_type=CallType.DELEGATE,
+                # Returned as bytes by cairo-lang
+                class_hash=EXECUTOR_HASH.to_bytes(32, "big"),
+            ),
+        ],
+    )
+
+
+def test_frames_are_labelled():
+    root = frame_from_call_info(swap_call_tree(), LABELS)
+
+    assert root.name == "hub.swap"
+    assert [child.name for child in root.children] == [
+        "solver_registry.get_solver",
+        "spf_solver.get_results",
+        # Library calls are named after the class they run
+        "trade_executor.multi_swap",
+    ]
+    assert root.children[2].call_type == "DELEGATE"
+    assert root.builtins == {"range_check_builtin": 100}
+    # Unknown contracts and selectors are shown as hex
+    assert frame_from_call_info(call_info(ROUTER, 9, 10), LABELS).name == "0x40.0x9"
+
+
+def test_collapsed_stacks_hold_self_values():
+    root = frame_from_call_info(swap_call_tree(), LABELS)
+
+    assert to_collapsed(root) == {
+        "hub.swap": 100,
+        "hub.swap;solver_registry.get_solver": 100,
+        "hub.swap;spf_solver.get_results": 500,
+        "hub.swap;trade_executor.multi_swap": 300,
+    }
+    assert to_collapsed(root, "storage_reads") == {
+        "hub.swap": 2,
+        "hub.swap;solver_registry.get_solver": 1,
+        "hub.swap;spf_solver.get_results": 4,
+    }
+    assert format_collapsed({"a;b": 3}) == "a;b 3\n"
+    assert sum(to_collapsed(root).values()) == root.total("n_steps")
+
+
+def test_speedscope_frames_nest():
+    root = frame_from_call_info(swap_call_tree(), LABELS)
+    speedscope = to_speedscope(root, ["n_steps", "storage_reads"])
+
+    assert [frame["name"] for frame in speedscope["shared"]["frames"]][:2] == [
+        "hub.swap",
+        "solver_registry.get_solver",
+    ]
+    steps, reads = speedscope["profiles"]
+    assert steps["endValue"] == 1000
+    assert reads["endValue"] == 7
+    # Events are ordered, every frame closes after it opened and before its caller
+    open_frames = []
+    last_at = 0
+    for event in steps["events"]:
+        assert event["at"] >= last_at
+        last_at = event["at"]
+        if event["type"] == "O":
+            open_frames.append(event["frame"])
+        else:
+            assert open_frames.pop() == event["frame"]
+    assert not open_frames
+
+
+def test_diff_shows_where_steps_moved():
+    before = frame_from_call_info(swap_call_tree(), LABELS)
+    after = Frame.from_json(before.to_json())
+    # The solver got cheaper, the hub itself didn't change
+    after.children[1].n_steps = 200
+    after.n_steps = 700
+    after.children.append(Frame("hub", "emit", n_steps=0))
+
+    diffs = diff_functions(before, after)
+    assert diffs[0].function == "spf_solver.get_results"
+    assert (diffs[0].before, diffs[0].after, diffs[0].change) == (500, 200, -300)
+    assert all(diff.change == 0 for diff in diffs[1:])
+    assert ("hub.swap;spf_solver.get_results", 500, 200) in diff_collapsed(
+        before, after
+    )
+
+
+def test_devnet_traces():
+    trace = {
+        "contract_address": hex(HUB),
+        "selector": hex(1),
+        "call_type": "CALL",
+        "execution_resources": {
+            "n_steps": 50,
+            "n_memory_holes": 1,
+            "builtin_instance_counter": {"range_check_builtin": 3},
+        },
+        "internal_calls": [
+            {
+                "contract_address": hex(HUB),
+                "selector": hex(4),
+                "call_type": "DELEGATE",
+                "class_hash": hex(EXECUTOR_HASH),
+                "execution_resources": {"n_steps": 20},
+                "internal_calls": [],
+            }
+        ],
+    }
+    root = frame_from_trace(trace, LABELS)
+
+    assert root.name == "hub.swap"
+    assert root.children[0].name == "trade_executor.multi_swap"
+    assert to_collapsed(root) == {
+        "hub.swap": 30,
+        "hub.swap;trade_executor.multi_swap": 20,
+    }
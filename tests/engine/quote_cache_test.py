@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+from commercium.constants import BASE
+from commercium.quote_cache import QuoteCache
+from commercium.rpc import RpcError
+from commercium.snapshot import Path, Router
+
+HUB = 0x1234
+ETH, DAI, USDC, WBTC = 0x1, 0x2, 0x3, 0x4
+ROUTER = Router(0xA, 0)
+# pool address -> (token0, token1)
+POOLS = {0xE1: (ETH, DAI), 0xE2: (DAI, USDC), 0xE3: (WBTC, USDC)}
+
+
+class FakeClient:
+    """Answers get_amount_and_path_with_solver with amount_in + block number, and the Sync events of each block"""
+
+    def __init__(self):
+        self.block = 10
+        self.calls = []
+        self.syncs = {}
+        self.latency = 0
+        self.fail = False
+
+    async def block_number(self):
+        return self.block
+
+    async def call(self, call, block_id=None):
+        self.calls.append((call.calldata, block_id))
+        await asyncio.sleep(self.latency)
+        if self.fail:
+            raise RpcError(40, "Contract error")
+        amount_in, _, token_in, token_out, _ = call.calldata
+        amount_out = amount_in + block_id["block_number"]
+        return [1, *ROUTER, 1, token_in, token_out, 1, BASE, amount_out, 0]
+
+    async def request(self, method, params):
+        assert method == "starknet_getEvents"
+        event_filter = params["filter"]
+        blocks = range(
+            event_filter["from_block"]["block_number"],
+            event_filter["to_block"]["block_number"] + 1,
+        )
+        events = [
+            {"from_address": hex(pool), "data": []}
+            for block in blocks
+            for pool in self.syncs.get(block, ())
+        ]
+        return {"events": events}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def client():
+    return FakeClient()
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+async def test_quotes_are_cached_within_a_block(client, clock):
+    cache = QuoteCache(client, HUB, clock=clock)
+
+    routers, path, amounts, amount_out = await cache.get_amount_and_path_with_solver(
+        100, ETH, DAI, 1
+    )
+    assert await cache.get_amount_out_with_solver(100, ETH, DAI, 1) == 110
+    assert (routers, path, amounts, amount_out) == (
+        [ROUTER],
+        [Path(ETH, DAI)],
+        [BASE],
+        110,
+    )
+    # Quotes are read at the block they are cached for
+    assert client.calls == [((100, 0, ETH, DAI, 1), {"block_number": 10})]
+
+    client.block = 11
+    clock.now = 2
+    assert await cache.get_amount_out_with_solver(100, ETH, DAI, 1) == 111
+    assert len(client.calls) == 2
+    assert cache.metrics.hits == 1 and cache.metrics.misses == 2
+    assert cache.metrics.invalidations == 1
+
+
+async def test_only_quotes_of_touched_pairs_are_invalidated(client, clock):
+    cache = QuoteCache(client, HUB, pools=POOLS, routing_tokens=[USDC], clock=clock)
+    await cache.get_amount_out_with_solver(100, ETH, DAI, 1)
+    await cache.get_amount_out_with_solver(100, ETH, WBTC, 1)
+
+    # DAI/USDC is a routing pair of ETH -> DAI only
+    client.block = 12
+    client.syncs = {11: [0xE2], 12: [0xE2]}
+    clock.now = 2
+    assert await cache.get_amount_out_with_solver(100, ETH, DAI, 1) == 112
+    assert await cache.get_amount_out_with_solver(100, ETH, WBTC, 1) == 110
+    assert len(client.calls) == 3
+
+    # WBTC/USDC invalidates ETH -> WBTC, the entry moved to block 12 is still fresh otherwise
+    cache.invalidate_pair(WBTC, USDC)
+    assert await cache.get_amount_out_with_solver(100, ETH, WBTC, 1) == 112
+    assert await cache.get_amount_out_with_solver(100, ETH, DAI, 1) == 112
+    assert len(client.calls) == 4
+
+
+async def test_lru_eviction_and_ttl(client, clock):
+    cache = QuoteCache(client, HUB, max_entries=2, ttl=5, clock=clock)
+    for amount_in in (1, 2, 1, 3):
+        await cache.get_amount_out_with_solver(amount_in, ETH, DAI, 1)
+
+    # 2 was the least recently used
+    assert len(cache) == 2 and cache.metrics.evictions == 1
+    await cache.get_amount_out_with_solver(1, ETH, DAI, 1)
+    assert len(client.calls) == 3
+
+    clock.now = 6
+    await cache.get_amount_out_with_solver(1, ETH, DAI, 1)
+    assert len(client.calls) == 4
+
+
+async def test_stale_while_revalidate(client, clock):
+    cache = QuoteCache(client, HUB, stale_while_revalidate=3, clock=clock)
+    assert await cache.get_amount_out_with_solver(100, ETH, DAI, 1) == 110
+
+    client.block = 11
+    clock.now = 2
+    # The stale quote is served while it is read again in the background
+    assert await cache.get_amount_out_with_solver(100, ETH, DAI, 1) == 110
+    assert await cache.get_amount_out_with_solver(100, ETH, DAI, 1) == 110
+    await asyncio.sleep(0.01)
+    assert await cache.get_amount_out_with_solver(100, ETH, DAI, 1) == 111
+    assert cache.metrics.stale_hits == 2 and cache.metrics.revalidations == 1
+    assert len(client.calls) == 2
+
+    # Too stale to be served
+    client.block = 12
+    clock.now = 10
+    await cache.sync_block()
+    clock.now = 14
+    assert await cache.get_amount_out_with_solver(100, ETH, DAI, 1) == 112
+
+
+async def test_concurrent_misses_share_a_read_and_errors_are_not_cached(client, clock):
+    cache = QuoteCache(client, HUB, clock=clock)
+    client.latency = 0.01
+    results = await asyncio.gather(
+        *(cache.get_amount_out_with_solver(100, ETH, DAI, 1) for _ in range(5))
+    )
+
+    assert results == [110] * 5
+    assert len(client.calls) == 1 and cache.metrics.coalesced == 4
+
+    client.fail = True
+    with pytest.raises(RpcError):
+        await cache.get_amount_out_with_solver(200, ETH, DAI, 1)
+    client.fail = False
+    assert await cache.get_amount_out_with_solver(200, ETH, DAI, 1) == 210
+    assert cache.metrics.errors == 1
+    assert cache.metrics.to_json()["hit_ratio"] == 0
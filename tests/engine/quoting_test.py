@@ -0,0 +1,167 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from aiohttp import web
+
+from commercium.constants import BASE
+from commercium.quoting import (
+    DEADLINE_EXCEEDED,
+    LatencyHistogram,
+    QuotingService,
+    SolverQuote,
+)
+from commercium.rpc import QuoteClient, decode_amount_and_path, get_selector
+from commercium.snapshot import MarketSnapshot, Path, Router
+
+HUB = 0x1234
+REGISTRY = 0x5678
+TOKEN_IN = 0x11
+TOKEN_OUT = 0x22
+ROUTER = Router(0xA, 0)
+
+
+class SolverNode:
+    """JSON-RPC node with a solver registry, the hub quotes each solver after its own latency"""
+
+    def __init__(self, solvers):
+        # solver id -> (latency, amount_out), amount_out None makes the quote revert
+        self.solvers = solvers
+
+    async def handle(self, request):
+        payloads = await request.json()
+        responses = await asyncio.gather(
+            *(self.answer(payload) for payload in payloads)
+        )
+        return web.json_response(responses)
+
+    async def answer(self, payload):
+        call = payload["params"]["request"]
+        selector = int(call["entry_point_selector"], 16)
+        calldata = [int(value, 16) for value in call["calldata"]]
+        if selector == get_selector("get_next_id"):
+            result = [102]
+        elif selector == get_selector("get_solver"):
+            result = [0x100 + calldata[0] if calldata[0] in self.solvers else 0]
+        else:
+            assert selector == get_selector("get_amount_and_path_with_solver")
+            latency, amount_out = self.solvers[calldata[4]]
+            await asyncio.sleep(latency)
+            if amount_out is None:
+                return {
+                    "jsonrpc": "2.0",
+                    "id": payload["id"],
+                    "error": {"code": 40, "message": "Contract error"},
+                }
+            result = [1, *ROUTER, 1, TOKEN_IN, TOKEN_OUT, 1, BASE, amount_out, 0]
+        return {
+            "jsonrpc": "2.0",
+            "id": payload["id"],
+            "result": [hex(value) for value in result],
+        }
+
+
+@pytest.fixture
+async def node():
+    stub = SolverNode(
+        {1: (0.01, 100), 2: (0.05, 300), 3: (1.0, 1_000), 4: (0, None), 101: (0, 200)}
+    )
+    app = web.Application()
+    app.router.add_post("/rpc", stub.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    stub.url = f"http://127.0.0.1:{port}/rpc"
+    yield stub
+    await runner.cleanup()
+
+
+def test_decode_amount_and_path():
+    result = [2, 0xA, 0, 0xB, 1, 2, 1, 2, 2, 3, 2, BASE // 2, BASE, 5, 1]
+
+    assert decode_amount_and_path(result) == (
+        [Router(0xA, 0), Router(0xB, 1)],
+        [Path(1, 2), Path(2, 3)],
+        [BASE // 2, BASE],
+        5 + 2**128,
+    )
+
+
+async def test_best_solver_answering_before_its_deadline_wins(node):
+    async with QuoteClient(node.url, max_batch_size=1) as client:
+        service = QuotingService(client, HUB, REGISTRY, deadline=0.5)
+        assert await service.get_solver_ids() == [1, 2, 3, 4, 101]
+
+        start = asyncio.get_running_loop().time()
+        result = await service.best_quote(BASE, TOKEN_IN, TOKEN_OUT)
+        elapsed = asyncio.get_running_loop().time() - start
+
+    # Solver 3 would be the best, but it is too slow
+    assert elapsed < 0.9
+    assert result.best.solver_id == 2
+    assert result.best.amount_out == 300
+    assert result.best.routers == (ROUTER,)
+    assert result.best.path == (Path(TOKEN_IN, TOKEN_OUT),)
+    assert result.best.amounts == (BASE,)
+    assert result.quotes[3].error == DEADLINE_EXCEEDED
+    assert "Contract error" in result.quotes[4].error
+    assert result.quotes[101].amount_out == 200
+
+
+async def test_solver_deadlines_and_latency_report(node):
+    async with QuoteClient(node.url, max_batch_size=1) as client:
+        service = QuotingService(
+            client, HUB, deadline=0.5, solver_deadlines={2: 0.02, 3: 2}
+        )
+        for _ in range(2):
+            result = await service.best_quote(
+                BASE, TOKEN_IN, TOKEN_OUT, solver_ids=[1, 2, 3]
+            )
+
+    assert result.best.solver_id == 3
+    assert result.quotes[2].error == DEADLINE_EXCEEDED
+    report = service.latency_report()
+    assert list(report) == [1, 2, 3]
+    assert report[1]["count"] == 2 and report[1]["timeouts"] == 0
+    assert report[2]["timeouts"] == 2
+    assert report[3]["buckets"]["1"] + report[3]["buckets"]["2.5"] == 2
+    assert service.histograms[1].quantile(0.5) <= 0.05
+
+
+async def test_local_solvers_run_in_the_executor(node):
+    snapshot = MarketSnapshot(routers=[ROUTER])
+    snapshot.set_reserves(ROUTER.address, TOKEN_IN, TOKEN_OUT, 1_000 * BASE, 10**6)
+
+    async with QuoteClient(node.url, max_batch_size=1) as client:
+        with ThreadPoolExecutor() as executor:
+            service = QuotingService(
+                client,
+                HUB,
+                deadline=0.5,
+                local_solvers={10: "spf", 11: "split"},
+                executor=executor,
+            )
+            result = await service.best_quote(
+                BASE, TOKEN_IN, TOKEN_OUT, solver_ids=[1, 10, 11], snapshot=snapshot
+            )
+            with pytest.raises(ValueError):
+                await service.best_quote(BASE, TOKEN_IN, TOKEN_OUT, solver_ids=[10])
+
+    # Both local solvers trade on the only pool, ties go to the lowest id
+    assert result.quotes[10].amount_out == result.quotes[11].amount_out
+    assert result.best.solver_id == 10
+    assert result.best.path == (Path(TOKEN_IN, TOKEN_OUT),)
+
+
+def test_histogram_quantiles():
+    histogram = LatencyHistogram(buckets=(0.1, 1))
+    assert histogram.quantile(0.5) == 0
+    for latency in (0.05, 0.1, 0.5, 3):
+        histogram.observe(SolverQuote(1, latency=latency))
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1
+    assert histogram.quantile(1) == float("inf")
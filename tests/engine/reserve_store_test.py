@@ -0,0 +1,87 @@
+import ast
+
+import pytest
+
+from commercium import reserve_store
+from commercium.constants import JediSwap, TenK
+from commercium.reserve_store import PairReserves, ReserveStore
+from commercium.snapshot import MarketSnapshot, Router
+
+ETH = 0x49D36570D4E46F48E99674BD3FCC84644DDD6B96F7C741B1562B82F9E004DC7
+DAI = 0xDA114221CB83FA859DBDB4C44BEEAA0BB37C7537AD5AE66FE5E0EFD20E6EB3
+USDC = 0x53C91253BC9682C04929CA02ED00B3E423F6710D2EE7E0D5EBB06F3ECF368A8
+
+JEDI = Router(0x1, JediSwap)
+TENK = Router(0x2, TenK)
+
+PAIRS = [
+    PairReserves(JEDI, 0xA1, ETH, USDC, 1_000 * 10**18, 2**200 + 5),
+    PairReserves(JEDI, 0xA2, DAI, USDC, 5 * 10**24, 5 * 10**24),
+    PairReserves(TENK, 0xB1, USDC, ETH, 1_200_000 * 10**18, 1_000 * 10**18),
+    # Registered pool without liquidity
+    PairReserves(TENK, 0xB2, DAI, ETH, 0, 0),
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ReserveStore.write(str(tmp_path), PAIRS, 10, [JEDI, TENK], [USDC])
+
+
+def test_rows_round_trip(store, tmp_path):
+    reopened = ReserveStore.open(str(tmp_path))
+
+    assert list(reopened) == PAIRS
+    assert reopened.block_number == 10
+    assert reopened.routers == [JEDI, TENK]
+    # Tokens are stored once
+    assert list(reopened.tokens) == [ETH, USDC, DAI]
+
+
+def test_columns_are_npy_files(store, tmp_path):
+    with open(tmp_path / "reserve1.npy", "rb") as file:
+        content = file.read()
+    header_len = int.from_bytes(content[8:10], "little")
+    header = ast.literal_eval(content[10 : 10 + header_len].decode("latin1"))
+
+    assert content[:8] == b"\x93NUMPY\x01\x00"
+    assert (10 + header_len) % 64 == 0
+    assert header == {"descr": "<u8", "fortran_order": False, "shape": (4, 4)}
+    assert len(content) == 10 + header_len + 4 * 32
+
+
+def test_numpy_reads_the_columns(store):
+    if reserve_store.np is None:
+        pytest.skip("numpy is not installed")
+
+    reserve1 = store.array("reserve1")
+    assert reserve1.shape == (4, 4)
+    assert [int(limb) for limb in reserve1[0]] == [5, 0, 0, 2**8]
+    assert list(store.array("token0")) == [0, 2, 1, 2]
+
+
+def test_market_snapshot(store):
+    expected = MarketSnapshot(high_liq_tokens=[USDC], block_number=10)
+    expected.add_router(*JEDI)
+    expected.add_router(*TENK)
+    for pair in PAIRS[:3]:
+        expected.set_reserves(
+            pair.router.address, pair.token0, pair.token1, pair.reserve0, pair.reserve1
+        )
+
+    assert store.to_market_snapshot() == expected
+
+
+def test_update_is_seen_by_open_stores(store, tmp_path):
+    other = ReserveStore.open(str(tmp_path))
+    rows = store.find([0xB1, 0xA2, ETH])
+
+    store.update({rows[0]: (7, 2**255), rows[1]: (1, 2)}, 12)
+
+    assert rows == [1, 2]
+    assert other[1].reserve0 == 7 and other[1].reserve1 == 2**255
+    assert other[2] == PAIRS[2]._replace(reserve0=1, reserve1=2)
+    assert other[0] == PAIRS[0]
+    assert ReserveStore.open(str(tmp_path)).block_number == 12
+    with pytest.raises(ValueError):
+        store.update({}, 11)
@@ -0,0 +1,507 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from commercium.reserve_store import PairReserves
+from commercium.rpc import (
+    Call,
+    QuoteClient,
+    RpcError,
+    crawl_reserve_store,
+    decode_best_routers,
+    decode_reserves_batch,
+    encode_pairs,
+    fetch_market_snapshot,
+    get_amount_and_path_with_commitment,
+    get_amount_and_path_with_solver,
+    get_amounts_out_with_solvers,
+    get_balances,
+    get_selector,
+    refresh_reserve_store,
+    swap_with_path_calldata,
+    to_uint256,
+    update_live_market,
+)
+from commercium.snapshot import MarketSnapshot, Path, Router
+from commercium.solvers.live_spf import LiveMarket
+
+HUB = 0x1234
+TOKEN_IN = 0x11
+TOKEN_OUT = 0x22
+# Selectors are passed as ints so that the stub doesn't need starkware's keccak
+BALANCE_OF = 0xB
+FAILING = 0xF
+
+
+class StubNode:
+    """Minimal JSON-RPC node: starknet_call returns contract_address + sum(calldata) as a Uint256"""
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle(self, request):
+        payloads = await request.json()
+        self.batches.append(len(payloads))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.latency)
+        self.in_flight -= 1
+
+        responses = []
+        for payload in payloads:
+            call = payload["params"]["request"]
+            if int(call["entry_point_selector"], 16) == FAILING:
+                responses.append(
+                    {
+                        "jsonrpc": "2.0",
+                        "id": payload["id"],
+                        "error": {"code": 40, "message": "failed"},
+                    }
+                )
+                continue
+            total = int(call["contract_address"], 16) + sum(
+                int(value, 16) for value in call["calldata"]
+            )
+            responses.append(
+                {"jsonrpc": "2.0", "id": payload["id"], "result": [hex(total), "0x0"]}
+            )
+        # Answer in reverse order, responses have to be matched by id
+        return web.json_response(responses[::-1])
+
+
+@pytest.fixture
+async def node():
+    stub = StubNode()
+    app = web.Application()
+    app.router.add_post("/rpc", stub.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    stub.url = f"http://127.0.0.1:{port}/rpc"
+    yield stub
+    await runner.cleanup()
+
+
+async def test_sweep_is_sent_as_one_batch(node):
+    amounts = [10, 20, 30, 40]
+    solver_ids = [1, 2, 3]
+    async with QuoteClient(node.url, max_batch_size=100) as client:
+        quotes = await get_amounts_out_with_solvers(
+            client, HUB, amounts, TOKEN_IN, TOKEN_OUT, solver_ids
+        )
+
+    assert node.batches == [12]
+    for amount in amounts:
+        for solver_id in solver_ids:
+            assert (
+                quotes[(amount, solver_id)]
+                == HUB + amount + TOKEN_IN + TOKEN_OUT + solver_id
+            )
+
+
+async def test_batches_are_bounded_in_size_and_concurrency(node):
+    calls = [Call(token, BALANCE_OF, (1,)) for token in range(30)]
+    async with QuoteClient(
+        node.url, max_batch_size=4, max_concurrent_requests=2
+    ) as client:
+        balances = await client.call_many(calls)
+
+    assert [balance[0] for balance in balances] == [token + 1 for token in range(30)]
+    assert sorted(node.batches) == [2] + [4] * 7
+    assert node.max_in_flight == 2
+
+
+async def test_errors_only_fail_their_own_call(node):
+    async with QuoteClient(node.url) as client:
+        results = await asyncio.gather(
+            client.call(Call(HUB, FAILING)),
+            get_balances(
+                client, [TOKEN_IN, TOKEN_OUT], 5, block_id={"block_number": 1}
+            ),
+            return_exceptions=True,
+        )
+
+    assert isinstance(results[0], RpcError)
+    assert results[1] == [TOKEN_IN + 5, TOKEN_OUT + 5]
+    assert node.batches == [3]
+
+
+def test_decode_best_routers():
+    result = [2, 5, 0, 7, 1, 2, 0xA, 0, 0xB, 1]
+    assert decode_best_routers(result) == [
+        (5, Router(0xA, 0)),
+        (7 + 2**128, Router(0xB, 1)),
+    ]
+
+
+# @notice Retdata of get_all_routers_and_reserves_batch for a snapshot
+def reserves_batch_result(snapshot, pairs):
+    counts, reserves_a, reserves_b, routers = [], [], [], []
+    for (
+        pair_reserves_a,
+        pair_reserves_b,
+        pair_routers,
+    ) in snapshot.get_all_routers_and_reserves_batch(pairs):
+        counts.append(len(pair_routers))
+        for reserve_a, reserve_b, router in zip(
+            pair_reserves_a, pair_reserves_b, pair_routers
+        ):
+            reserves_a.extend(to_uint256(reserve_a))
+            reserves_b.extend(to_uint256(reserve_b))
+            routers.extend(router)
+    total = sum(counts)
+    return [
+        len(counts),
+        *counts,
+        total,
+        *reserves_a,
+        total,
+        *reserves_b,
+        total,
+        *routers,
+    ]
+
+
+def market():
+    snapshot = MarketSnapshot()
+    snapshot.add_router(0xA, 0)
+    snapshot.add_router(0xB, 1)
+    snapshot.set_reserves(0xA, TOKEN_IN, TOKEN_OUT, 100, 200)
+    snapshot.set_reserves(0xB, TOKEN_IN, TOKEN_OUT, 2**130, 300)
+    snapshot.set_reserves(0xB, TOKEN_OUT, 0x33, 400, 500)
+    return snapshot
+
+
+async def test_get_amount_and_path_with_commitment():
+    class Client:
+        async def call(self, call, block_id=None):
+            assert call.calldata == (10, 0, TOKEN_IN, TOKEN_OUT, 3, 0x99)
+            return [1, 0xA, 0, 1, TOKEN_IN, TOKEN_OUT, 1, 10**18, 7, 0, 42, 0xC0]
+
+    committed = await get_amount_and_path_with_commitment(
+        Client(), HUB, 10, TOKEN_IN, TOKEN_OUT, 3, 0x99
+    )
+
+    assert committed.routers == (Router(0xA, 0),)
+    assert committed.path == (Path(TOKEN_IN, TOKEN_OUT),)
+    assert committed.amount_out == 7
+    assert (committed.solver_id, committed.account, committed.block_number) == (
+        3,
+        0x99,
+        42,
+    )
+    assert committed.swap_calldata(10, 6, 0x99) == [
+        1,
+        0xA,
+        0,
+        1,
+        TOKEN_IN,
+        TOKEN_OUT,
+        1,
+        10**18,
+        10,
+        0,
+        6,
+        0,
+        0x99,
+        3,
+        42,
+        0xC0,
+    ]
+
+
+async def test_swap_quoted_path():
+    class Client:
+        async def call(self, call, block_id=None):
+            assert call.calldata == (10, 0, TOKEN_IN, TOKEN_OUT, 3)
+            return [1, 0xA, 0, 1, TOKEN_IN, TOKEN_OUT, 1, 10**18, 7, 0]
+
+    routers, path, amounts, amount_out = await get_amount_and_path_with_solver(
+        Client(), HUB, 10, TOKEN_IN, TOKEN_OUT, 3
+    )
+
+    assert amount_out == 7
+    assert swap_with_path_calldata(routers, path, amounts, 10, 6) == [
+        1,
+        0xA,
+        0,
+        1,
+        TOKEN_IN,
+        TOKEN_OUT,
+        1,
+        10**18,
+        10,
+        0,
+        6,
+        0,
+    ]
+
+
+def test_decode_reserves_batch():
+    snapshot = market()
+    pairs = [Path(TOKEN_IN, TOKEN_OUT), Path(TOKEN_IN, 0x33), Path(0x33, TOKEN_OUT)]
+
+    decoded = decode_reserves_batch(reserves_batch_result(snapshot, pairs))
+
+    assert decoded == snapshot.get_all_routers_and_reserves_batch(pairs)
+    assert decoded[1] == ([], [], [])
+    assert decoded[2] == ([500], [400], [Router(0xB, 1)])
+
+
+class AggregatorNode:
+    """JSON-RPC node serving the router aggregator views of a snapshot"""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.batches = []
+        self.block_ids = []
+
+    def answer(self, payload):
+        if payload["method"] == "starknet_blockNumber":
+            return 42
+        call = payload["params"]["request"]
+        self.block_ids.append(payload["params"]["block_id"])
+        selector = int(call["entry_point_selector"], 16)
+        calldata = [int(value, 16) for value in call["calldata"]]
+        if selector == get_selector("get_router_index_len"):
+            result = [len(self.snapshot.routers)]
+        elif selector == get_selector("get_router"):
+            result = list(self.snapshot.routers[calldata[0]])
+        else:
+            assert selector == get_selector("get_all_routers_and_reserves_batch")
+            pairs = [
+                Path(*calldata[1 + 2 * index : 3 + 2 * index])
+                for index in range(calldata[0])
+            ]
+            assert encode_pairs(pairs) == calldata
+            result = reserves_batch_result(self.snapshot, pairs)
+        return [hex(value) for value in result]
+
+    async def handle(self, request):
+        payloads = await request.json()
+        self.batches.append(len(payloads))
+        return web.json_response(
+            [
+                {"jsonrpc": "2.0", "id": payload["id"], "result": self.answer(payload)}
+                for payload in payloads
+            ]
+        )
+
+
+async def test_fetch_market_snapshot():
+    snapshot = market()
+    node = AggregatorNode(snapshot)
+    app = web.Application()
+    app.router.add_post("/rpc", node.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    try:
+        async with QuoteClient(f"http://127.0.0.1:{port}/rpc") as client:
+            fetched = await fetch_market_snapshot(
+                client, 0xAA, [TOKEN_IN, TOKEN_OUT, 0x33]
+            )
+    finally:
+        await runner.cleanup()
+
+    # Block number + router count, then the routers and every reserve at that block
+    assert node.batches == [2, 3]
+    assert node.block_ids[1:] == [{"block_number": 42}] * 3
+    assert fetched.block_number == 42
+    assert fetched.routers == snapshot.routers
+    assert fetched.reserves == snapshot.reserves
+
+
+class PoolNode:
+    """JSON-RPC node serving get_pair_info, the pools reserves and the state updates of each block"""
+
+    def __init__(self, routers, pools):
+        self.routers = routers
+        # (router, token_a, token_b) -> [address, token0, reserve0, reserve1]
+        self.pools = pools
+        self.block_number = 5
+        self.changed = {}
+        self.pool_calls = []
+
+    def answer(self, payload):
+        if payload["method"] == "starknet_blockNumber":
+            return self.block_number
+        if payload["method"] == "starknet_getStateUpdate":
+            block = payload["params"]["block_id"]["block_number"]
+            diffs = [
+                {"address": hex(address), "storage_entries": []}
+                for address in self.changed.get(block, ())
+            ]
+            return {"state_diff": {"storage_diffs": diffs}}
+
+        call = payload["params"]["request"]
+        selector = int(call["entry_point_selector"], 16)
+        calldata = [int(value, 16) for value in call["calldata"]]
+        if selector == get_selector("get_router_index_len"):
+            result = [len(self.routers)]
+        elif selector == get_selector("get_router"):
+            result = list(self.routers[calldata[0]])
+        elif selector == get_selector("get_pair_info"):
+            router, token_a, token_b = Router(*calldata[:2]), *calldata[2:]
+            pool = self.pools.get((router, token_a, token_b)) or self.pools.get(
+                (router, token_b, token_a), [0, 0]
+            )
+            result = pool[:2]
+        else:
+            address = int(call["contract_address"], 16)
+            self.pool_calls.append(address)
+            (pool,) = [pool for pool in self.pools.values() if pool[0] == address]
+            if selector == get_selector("get_reserves"):
+                result = [*to_uint256(pool[2]), *to_uint256(pool[3]), 0]
+            else:
+                assert selector == get_selector("getReserves")
+                result = [pool[2], pool[3], 0]
+        return [hex(value) for value in result]
+
+    async def handle(self, request):
+        payloads = await request.json()
+        return web.json_response(
+            [
+                {"jsonrpc": "2.0", "id": payload["id"], "result": self.answer(payload)}
+                for payload in payloads
+            ]
+        )
+
+
+async def test_crawl_and_refresh_reserve_store(tmp_path):
+    jedi, tenk, other = Router(0xA, 0), Router(0xB, 1), Router(0xC, 4)
+    node = PoolNode(
+        [jedi, tenk, other],
+        {
+            (jedi, TOKEN_IN, TOKEN_OUT): [0x100, TOKEN_OUT, 2**130, 200],
+            (tenk, TOKEN_IN, TOKEN_OUT): [0x200, TOKEN_IN, 300, 400],
+            (tenk, TOKEN_OUT, 0x33): [0x300, 0x33, 500, 600],
+        },
+    )
+    app = web.Application()
+    app.router.add_post("/rpc", node.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    try:
+        async with QuoteClient(f"http://127.0.0.1:{port}/rpc") as client:
+            store = await crawl_reserve_store(
+                client, 0xAA, [TOKEN_IN, TOKEN_OUT, 0x33], str(tmp_path)
+            )
+            assert list(store) == [
+                PairReserves(jedi, 0x100, TOKEN_OUT, TOKEN_IN, 2**130, 200),
+                PairReserves(tenk, 0x200, TOKEN_IN, TOKEN_OUT, 300, 400),
+                PairReserves(tenk, 0x300, 0x33, TOKEN_OUT, 500, 600),
+            ]
+            assert store.block_number == 5
+
+            # Only the pool that was touched (the router isn't a pool) is read again
+            node.pools[(tenk, TOKEN_IN, TOKEN_OUT)][2:] = [301, 399]
+            node.changed = {6: [0x200], 8: [tenk.address]}
+            node.block_number = 8
+            node.pool_calls = []
+            store = await refresh_reserve_store(client, str(tmp_path))
+    finally:
+        await runner.cleanup()
+
+    assert node.pool_calls == [0x200]
+    assert store.block_number == 8
+    assert store[1].reserve0 == 301 and store[1].reserve1 == 399
+    assert store.to_market_snapshot().get_router_reserves(
+        TOKEN_OUT, TOKEN_IN, jedi
+    ) == (2**130, 200)
+
+
+class EventNode:
+    """JSON-RPC node returning Sync events one per page, and the aggregator prices"""
+
+    def __init__(self, events, prices):
+        self.events = events
+        self.prices = prices
+        self.filters = []
+
+    def answer(self, payload):
+        if payload["method"] == "starknet_getEvents":
+            event_filter = payload["params"]["filter"]
+            self.filters.append(event_filter)
+            index = int(event_filter.get("continuation_token", "0"))
+            page = {"events": self.events[index : index + 1]}
+            if index + 1 < len(self.events):
+                page["continuation_token"] = str(index + 1)
+            return page
+
+        call = payload["params"]["request"]
+        assert int(call["entry_point_selector"], 16) == get_selector(
+            "get_global_prices"
+        )
+        tokens = [int(value, 16) for value in call["calldata"][1:]]
+        result = [len(tokens)]
+        for token in tokens:
+            result.extend(to_uint256(self.prices[token]))
+        return [hex(value) for value in result]
+
+    async def handle(self, request):
+        payloads = await request.json()
+        return web.json_response(
+            [
+                {"jsonrpc": "2.0", "id": payload["id"], "result": self.answer(payload)}
+                for payload in payloads
+            ]
+        )
+
+
+async def test_update_live_market():
+    jedi, tenk = Router(0xA, 0), Router(0xB, 1)
+    snapshot = MarketSnapshot(routers=[jedi, tenk], high_liq_tokens=[0x33])
+    market = LiveMarket(snapshot)
+    market.add_pool(0x100, jedi, TOKEN_OUT, TOKEN_IN)
+    market.add_pool(0x200, tenk, TOKEN_IN, TOKEN_OUT)
+
+    def event(address, data):
+        return {"from_address": hex(address), "data": [hex(value) for value in data]}
+
+    node = EventNode(
+        [
+            event(0x100, [*to_uint256(2**130), *to_uint256(200)]),
+            event(0x999, [1, 2]),
+            event(0x200, [300, 400]),
+            event(0x200, [301, 399]),
+        ],
+        {TOKEN_IN: 5 * 10**18},
+    )
+    app = web.Application()
+    app.router.add_post("/rpc", node.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    try:
+        async with QuoteClient(f"http://127.0.0.1:{port}/rpc") as client:
+            applied = await update_live_market(
+                client, market, 0xAA, 3, 7, price_tokens=[TOKEN_IN]
+            )
+    finally:
+        await runner.cleanup()
+
+    assert applied == 3
+    assert len(node.filters) == 4
+    assert node.filters[0]["keys"] == [hex(get_selector("Sync"))]
+    assert node.filters[0]["from_block"] == {"block_number": 3}
+    assert snapshot.get_router_reserves(TOKEN_IN, TOKEN_OUT, jedi) == (200, 2**130)
+    assert snapshot.get_router_reserves(TOKEN_IN, TOKEN_OUT, tenk) == (301, 399)
+    assert snapshot.get_global_price(TOKEN_IN) == 5 * 10**18
+    assert snapshot.block_number == 7
@@ -0,0 +1,102 @@
+from commercium.constants import BASE, JediSwap, TenK
+from commercium.simulator import (
+    SOLVERS,
+    AmmMarket,
+    backtest,
+    summarize,
+    synthetic_states,
+)
+from commercium.snapshot import MarketSnapshot, Path, Router, Trade, get_amount_out
+from commercium.solvers.spf import SpfSolver
+from commercium.trade_executor import coalesce_hops, simulate_multi_swap
+
+ETH = 0x49D36570D4E46F48E99674BD3FCC84644DDD6B96F7C741B1562B82F9E004DC7
+DAI = 0xDA114221CB83FA859DBDB4C44BEEAA0BB37C7537AD5AE66FE5E0EFD20E6EB3
+USDC = 0x53C91253BC9682C04929CA02ED00B3E423F6710D2EE7E0D5EBB06F3ECF368A8
+
+JEDI = Router(0x1, JediSwap)
+TENK = Router(0x2, TenK)
+
+
+def build_market():
+    market = AmmMarket(high_liq_tokens=[USDC])
+    market.add_router(JEDI.address, JEDI.type)
+    market.add_router(TENK.address, TENK.type)
+    market.set_price(ETH, 1200 * 10**8, 8)
+    market.set_price(DAI, 10**8, 8)
+    market.set_price(USDC, 10**8, 8)
+    market.set_reserves(JEDI.address, ETH, USDC, 1_000 * BASE, 1_210_000 * BASE)
+    market.set_reserves(JEDI.address, USDC, DAI, 5_000_000 * BASE, 5_000_000 * BASE)
+    market.set_reserves(TENK.address, ETH, USDC, 1_000 * BASE, 1_200_000 * BASE)
+    return market
+
+
+def test_swap_moves_reserves():
+    market = build_market()
+    amount_out = get_amount_out(10 * BASE, 1_000 * BASE, 1_210_000 * BASE)
+
+    amounts = market.swap_exact_tokens_for_tokens(JEDI, 10 * BASE, [ETH, USDC])
+
+    assert amounts == [10 * BASE, amount_out]
+    assert market.get_router(JEDI).get_reserves(USDC, ETH) == (
+        1_210_000 * BASE - amount_out,
+        1_010 * BASE,
+    )
+
+
+def test_snapshot_round_trip():
+    snapshot = build_market().snapshot()
+
+    assert AmmMarket.from_snapshot(snapshot).snapshot() == snapshot
+    assert snapshot.get_global_price(ETH) == 1200 * BASE
+
+
+def test_same_router_hops_are_coalesced():
+    path = [Path(ETH, USDC), Path(USDC, DAI)]
+
+    assert coalesce_hops([JEDI, JEDI], path, [BASE, BASE], {ETH: 0}) == 2
+    assert coalesce_hops([TENK, JEDI], path, [BASE, BASE], {ETH: 0}) == 1
+    # The second hop would also sell the USDC that was held before
+    assert coalesce_hops([JEDI, JEDI], path, [BASE, BASE], {USDC: 1}) == 1
+
+
+def test_execution_matches_quote_on_distinct_pools():
+    market = build_market()
+    snapshot = market.snapshot()
+    routers, path, amounts, amount_out = SpfSolver(snapshot).get_amount_and_path(
+        10 * BASE, ETH, DAI
+    )
+
+    assert path == [Path(ETH, USDC), Path(USDC, DAI)]
+    assert market.execute(routers, path, amounts, 10 * BASE) == amount_out
+
+
+def test_backtest_is_the_same_in_worker_processes():
+    base = build_market().snapshot()
+    states = list(synthetic_states(base, 4, volatility=0.2, seed=1))
+    trades = [Trade(ETH, DAI, BASE), Trade(ETH, USDC, 50 * BASE)]
+
+    results = backtest(states, trades, processes=1)
+
+    assert len(results) == len(states) * len(trades) * len(SOLVERS)
+    assert backtest(states, trades, processes=2, chunksize=1) == results
+    for result in results:
+        if result.error is None and result.solver == "spf":
+            assert result.quoted == result.executed
+
+    summary = summarize(results)
+    assert summary["spf"]["trades"] == len(states) * len(trades)
+
+
+def test_synthetic_states_keep_the_snapshot_layout():
+    base = build_market().snapshot()
+    state = next(iter(synthetic_states(base, 1)))
+
+    assert isinstance(state, MarketSnapshot)
+    assert state.reserves.keys() == base.reserves.keys()
+    assert state.prices == base.prices
+    for (address, token_a, token_b), (reserve_a, reserve_b) in state.reserves.items():
+        assert state.reserves[(address, token_b, token_a)] == (reserve_b, reserve_a)
+    assert simulate_multi_swap(
+        state, [TENK], [Path(ETH, USDC)], [BASE], BASE
+    ) == get_amount_out(BASE, *state.get_router_reserves(ETH, USDC, TENK))
@@ -0,0 +1,143 @@
+import random
+
+import pytest
+
+from commercium.constants import BASE, EXTRA_BASE, JediSwap, TenK
+from commercium.felt import fdiv, fmul
+from commercium.snapshot import MarketSnapshot, Path, Router
+from commercium.solvers import spf
+from commercium.solvers.spf import (
+    Edge,
+    Source,
+    SpfSolver,
+    construct_vertices,
+    get_weight,
+)
+
+ETH = 0x49D36570D4E46F48E99674BD3FCC84644DDD6B96F7C741B1562B82F9E004DC7
+DAI = 0xDA114221CB83FA859DBDB4C44BEEAA0BB37C7537AD5AE66FE5E0EFD20E6EB3
+USDC = 0x53C91253BC9682C04929CA02ED00B3E423F6710D2EE7E0D5EBB06F3ECF368A8
+USDT = 0x68F5C6A61780768455DE69077E07E89787839BF8166DECFBF92B645209C0FB8
+
+JEDI = Router(
+    0x41FD22B238FA21CFCF5DD45A8548974D8263B3A531A60388411C5E230F97023, JediSwap
+)
+TENK = Router(0x07A6F98C03379B9513CA84CCA1373FF452A7462A3B61598F0AF5BB27AD7F76D1, TenK)
+
+
+def build_snapshot():
+    snapshot = MarketSnapshot(routers=[JEDI, TENK], high_liq_tokens=[USDC, USDT])
+    snapshot.set_price(ETH, 1200 * 10**8, 8)
+    snapshot.set_price(DAI, 10**8, 8)
+    snapshot.set_price(USDC, 10**8, 8)
+    snapshot.set_price(USDT, 10**8, 8)
+    # No direct ETH/DAI pool, the trade has to go through USDC
+    snapshot.set_reserves(JEDI.address, ETH, USDC, 1_000 * BASE, 1_210_000 * BASE)
+    snapshot.set_reserves(TENK.address, ETH, USDC, 1_000 * BASE, 1_200_000 * BASE)
+    snapshot.set_reserves(TENK.address, USDC, DAI, 5_000_000 * BASE, 5_000_000 * BASE)
+    return snapshot
+
+
+# Straightforward port of GraphConstructor.build_graph, one get_single_best_router call per edge
+def naive_build_graph(snapshot, amount_in_usd, tokens, prices):
+    src, edges = [], []
+    for src_nr in range(len(tokens) - 1):
+        start = len(edges)
+        src_amount = fdiv(amount_in_usd, prices[src_nr], BASE)
+        for dst in range(1, len(tokens)):
+            if dst == src_nr:
+                continue
+            amount_out, router = snapshot.get_single_best_router(
+                src_amount, tokens[src_nr], tokens[dst]
+            )
+            if amount_out == 0:
+                continue
+            weight = get_weight(amount_in_usd, amount_out, prices[dst])
+            if src_nr == 0:
+                weight += EXTRA_BASE
+            edges.append(Edge(dst, router, weight))
+        src.append(Source(start, len(edges) - start))
+    return src, edges
+
+
+def test_construct_vertices():
+    assert construct_vertices(ETH, DAI, [USDC, ETH, USDT, 0, DAI]) == [
+        ETH,
+        USDC,
+        USDT,
+        DAI,
+    ]
+    assert construct_vertices(ETH, DAI, []) == [ETH, DAI]
+
+
+def test_routes_through_intermediate_token():
+    snapshot = build_snapshot()
+    routers, path, amounts = SpfSolver(snapshot).get_results(BASE, ETH, DAI)
+
+    assert path == [Path(ETH, USDC), Path(USDC, DAI)]
+    assert routers == [JEDI, TENK]
+    assert amounts == [BASE, BASE]
+
+
+def test_max_hops_limits_path_length():
+    snapshot = build_snapshot()
+    # No route fits a single trade
+    assert SpfSolver(snapshot, max_hops=1).get_results(BASE, ETH, DAI) == ([], [], [])
+
+    _, path, _ = SpfSolver(snapshot, max_hops=2).get_results(BASE, ETH, DAI)
+    assert len(path) == 2
+
+
+def test_max_hops_returns_the_best_path_within_the_limit():
+    snapshot = build_snapshot()
+    # A direct pool that the edge weights rank behind going through USDC
+    snapshot.set_reserves(JEDI.address, ETH, DAI, 10 * BASE, 20_000 * BASE)
+
+    _, path, _ = SpfSolver(snapshot).get_results(BASE, ETH, DAI)
+    assert path == [Path(ETH, USDC), Path(USDC, DAI)]
+
+    routers, path, amounts = SpfSolver(snapshot, max_hops=1).get_results(BASE, ETH, DAI)
+    assert path == [Path(ETH, DAI)]
+    assert routers == [JEDI]
+    assert amounts == [BASE]
+
+
+def test_amount_out_matches_simulation():
+    snapshot = build_snapshot()
+    _, _, _, amount_out = SpfSolver(snapshot).get_amount_and_path(BASE, ETH, DAI)
+
+    eth_to_usdc = snapshot.get_router_amount(BASE, ETH, USDC, JEDI)
+    assert amount_out == snapshot.get_router_amount(eth_to_usdc, USDC, DAI, TENK)
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_graph_matches_naive_construction(monkeypatch, use_numpy):
+    if use_numpy and spf.np is None:
+        pytest.skip("numpy is not installed")
+    if not use_numpy:
+        monkeypatch.setattr(spf, "np", None)
+
+    rng = random.Random(7)
+    tokens = [ETH, USDC, USDT, DAI]
+    for _ in range(25):
+        snapshot = MarketSnapshot(
+            routers=[JEDI, TENK, Router(0x1234, JediSwap)], high_liq_tokens=[USDC, USDT]
+        )
+        for token in tokens:
+            snapshot.set_price(token, rng.randint(1, 5000) * 10**8, 8)
+        for router in snapshot.routers:
+            for i, token_a in enumerate(tokens):
+                for token_b in tokens[i + 1 :]:
+                    if rng.random() < 0.7:
+                        reserve_a = rng.randint(1, 10**6) * BASE
+                        reserve_b = rng.randint(1, 10**6) * BASE
+                        snapshot.set_reserves(
+                            router.address, token_a, token_b, reserve_a, reserve_b
+                        )
+
+        prices = [snapshot.get_global_price(token) for token in tokens]
+        amount_in_usd = fmul(prices[0], rng.randint(1, 10**4) * BASE, BASE)
+        expected = naive_build_graph(snapshot, amount_in_usd, tokens, prices)
+        assert (
+            SpfSolver(snapshot).build_graph(amount_in_usd, tokens, prices) == expected
+        )
@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from commercium.constants import BASE
+from commercium.felt import CairoAssertionError
+from commercium.snapshot import MarketSnapshot, Path, Router, get_amount_out
+from commercium.solvers import graddesc, split
+from commercium.trade_executor import simulate_multi_swap
+
+ETH = 0x49D36570D4E46F48E99674BD3FCC84644DDD6B96F7C741B1562B82F9E004DC7
+DAI = 0xDA114221CB83FA859DBDB4C44BEEAA0BB37C7537AD5AE66FE5E0EFD20E6EB3
+
+
+def build_snapshot(reserves):
+    snapshot = MarketSnapshot()
+    for router_id, (reserve_eth, reserve_dai) in enumerate(reserves):
+        router = Router(router_id + 1, 0)
+        snapshot.routers.append(router)
+        snapshot.set_reserves(router.address, ETH, DAI, reserve_eth, reserve_dai)
+    return snapshot
+
+
+def amount_out(snapshot, solver, amount_in):
+    routers, path, amounts = solver.get_results(snapshot, amount_in, ETH, DAI)
+    return simulate_multi_swap(snapshot, routers, path, amounts, amount_in)
+
+
+def test_equal_pools_are_split_evenly():
+    snapshot = build_snapshot(
+        [(1_000 * BASE, 1_000 * BASE), (1_000 * BASE, 1_000 * BASE)]
+    )
+    routers, path, amounts = split.get_results(snapshot, 10 * BASE, ETH, DAI)
+
+    # Same order as get_all_routers_and_reserves between pools with the same price
+    assert routers == [Router(2, 0), Router(1, 0)]
+    assert path == [Path(ETH, DAI), Path(ETH, DAI)]
+    assert abs(amounts[0] - BASE // 2) < BASE // 10**6
+    assert amounts[-1] == BASE
+
+
+def test_small_trades_only_use_the_best_pool():
+    snapshot = build_snapshot(
+        [(1_000 * BASE, 1_000 * BASE), (1_000 * BASE, 1_100 * BASE)]
+    )
+
+    assert split.get_results(snapshot, BASE, ETH, DAI) == (
+        [Router(2, 0)],
+        [Path(ETH, DAI)],
+        [BASE],
+    )
+    # With one router graddesc reverts, the split solver trades on it
+    single = build_snapshot([(1_000 * BASE, 1_000 * BASE)])
+    assert split.get_results(single, BASE, ETH, DAI)[0] == [Router(1, 0)]
+    with pytest.raises(CairoAssertionError):
+        split.get_results(MarketSnapshot(), BASE, ETH, DAI)
+
+
+def test_split_is_optimal():
+    rng = random.Random(1)
+    for _ in range(20):
+        reserves = [
+            (rng.randint(1, 10_000) * BASE, rng.randint(1, 10_000) * BASE)
+            for _ in range(2)
+        ]
+        snapshot = build_snapshot(reserves)
+        amount_in = rng.randint(1, 1_000) * BASE
+        (reserve_a_in, reserve_a_out), (reserve_b_in, reserve_b_out) = reserves
+
+        # Brute force the share of the first pool in steps of 0.1%
+        best = max(
+            get_amount_out(amount_in * step // 1000, reserve_a_in, reserve_a_out)
+            + get_amount_out(
+                amount_in - amount_in * step // 1000, reserve_b_in, reserve_b_out
+            )
+            for step in range(1001)
+        )
+        assert amount_out(snapshot, split, amount_in) >= best - best // 10**6
+
+
+def test_split_beats_graddesc():
+    rng = random.Random(2)
+    for _ in range(20):
+        snapshot = build_snapshot(
+            [
+                (rng.randint(1, 10_000) * BASE, rng.randint(1, 10_000) * BASE)
+                for _ in range(rng.randint(2, 4))
+            ]
+        )
+        amount_in = rng.randint(1, 1_000) * BASE
+        try:
+            graddesc_out = amount_out(snapshot, graddesc, amount_in)
+        except CairoAssertionError:
+            continue
+
+        # Rounding of the shares can cost a few units
+        assert amount_out(snapshot, split, amount_in) >= graddesc_out - 10
@@ -20,16 +20,16 @@ from starkware.cairo.common.uint256 import (
 
 from src.lib.array import Array
 from src.lib.utils import Utils
-from src.lib.constants import MAX_FELT, JediSwap, SithSwap, TenK, AlphaRoad
+from src.lib.constants import MAX_FELT, JediSwap
 from src.interfaces.i_router_aggregator import IRouterAggregator
 from src.interfaces.i_solver import ISolver
 from src.interfaces.i_spf_solver import ISpfSolver
 from src.interfaces.i_solver_registry import ISolverRegistry
 from src.interfaces.i_empiric_oracle import IEmpiricOracle
 from src.interfaces.i_erc20 import IERC20
-from src.interfaces.i_router import IJediRouter, ISithRouter, IAlphaRouter, ITenKRouter
+from src.interfaces.i_router import IJediRouter
 from src.interfaces.i_hub import IHub
-from src.interfaces.i_pool import IAlphaPool, ITenKPool, IJediPool, ISithPool
+from src.interfaces.i_pool import IJediPool
 from src.lib.utils import Router, Path
 
 const Vertices = 6;
@@ -40,17 +40,6 @@ const base_8 = 100000000;
 const small_base = 1000000;  // 1e6
 const extra_base = 100000000000000000000;  // We use this to artificialy increase the weight of each edge, so that we can subtract the last edges without causeing underflows
 
-@contract_interface
-namespace IGraddesc {
-    func get_results(
-        _amount_in: Uint256, _token_in: felt, _token_out: felt
-    ) -> (
-        final_amounts_len: felt, final_amounts: felt*, amount_out: felt
-    ){
-    }
-}
-
-
 @external
 func __setup__{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() {
     alloc_locals;
@@ -84,11 +73,21 @@ func __setup__{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
     %{ context.DAI = ids.DAI %}
     // %{ print("DAI Address: ",ids.DAI) %}
 
+    // Generate Executor Hash
+    local executioner_hash: felt;
+    %{
+        declared = declare("./src/trade_executor.cairo")
+        prepared = prepare(declared, [])
+        # constructor will be affected by prank
+        deploy(prepared)
+        ids.executioner_hash = prepared.class_hash
+    %}
+
     // Deploy Hub
     local hub_address: felt;
     %{
         declared = declare("./src/hub.cairo")
-        prepared = prepare(declared, [ids.public_key_0])
+        prepared = prepare(declared, [ids.public_key_0, ids.executioner_hash])
         stop_prank_callable = start_prank(ids.public_key_0, target_contract_address=prepared.contract_address)
         deploy(prepared)
         ids.hub_address = prepared.contract_address
@@ -113,21 +112,6 @@ func __setup__{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
     IHub.set_solver_registry(hub_address, solver_registry_address);
     %{ stop_prank_callable() %}
 
-    // Generate Executor Hash
-    local executioner_hash: felt;
-    %{
-        declared = declare("./src/trade_executor.cairo")
-        prepared = prepare(declared, [])
-        # constructor will be affected by prank
-        deploy(prepared)
-        ids.executioner_hash = prepared.class_hash
-    %}
-
-    // Set Executor Hash
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.hub_address) %}
-    IHub.set_executor(hub_address, executioner_hash);
-    %{ stop_prank_callable() %}
-
     // Deploy Router Aggregator
     local router_aggregator_hash: felt;
     %{
@@ -148,37 +132,32 @@ func __setup__{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
     %}
 
     // Set routers
+    // Only Jedi routers can be quoted in tests, the TenK factory is a fixed mainnet address
     let (local router_1_address) = create_jedi_router(
         public_key_0, ETH, USDC, USDT, DAI, shitcoin1, shitcoin2
     );
     // %{ print("Router 1: ",ids.router_1_address) %}
-    let (local router_2_address) = create_sith_router(
-        public_key_0, ETH, USDC, USDT, DAI, shitcoin1, shitcoin2
-    );
+    let (local router_2_address) = create_jedi_eth_dai_router(public_key_0, ETH, DAI, 1000, 1000000);
     // %{ print("Router 2: ",ids.router_2_address) %}
-    let (local router_3_address) = create_TenK_router(
-        public_key_0, ETH, USDC, USDT, DAI, shitcoin1, shitcoin2
-    );
+    let (local router_3_address) = create_jedi_eth_dai_router(public_key_0, ETH, DAI, 10, 10000);
     // %{ print("Router 3: ",ids.router_3_address) %}
-    let (local router_4_address) = create_alpha_router(
-        public_key_0, ETH, USDC, USDT, DAI, shitcoin1, shitcoin2
-    );
+    let (local router_4_address) = create_jedi_eth_dai_router(public_key_0, ETH, DAI, 100, 100000);
 
     %{ context.router_1_address = ids.router_1_address %}
     %{ context.router_2_address = ids.router_2_address %}
     %{ context.router_3_address = ids.router_3_address %}
     %{ context.router_4_address = ids.router_4_address %}
-    %{ print("Jedi Router: ",ids.router_1_address) %}
-    %{ print("Sith Router: ",ids.router_2_address) %}
-    %{ print("TenK Router: ",ids.router_3_address) %}
-    %{ print("Alpha Router: ",ids.router_4_address) %}
+    %{ print("Jedi Router 1: ",ids.router_1_address) %}
+    %{ print("Jedi Router 2: ",ids.router_2_address) %}
+    %{ print("Jedi Router 3: ",ids.router_3_address) %}
+    %{ print("Jedi Router 4: ",ids.router_4_address) %}
 
     // Add newly created routers to router aggregator
     %{ stop_prank_callable = start_prank(ids.public_key_0, target_contract_address=ids.router_aggregator_proxy_address) %}
         IRouterAggregator.add_router(router_aggregator_proxy_address, router_1_address, JediSwap);
-        IRouterAggregator.add_router(router_aggregator_proxy_address, router_2_address, SithSwap);
-        IRouterAggregator.add_router(router_aggregator_proxy_address, router_3_address, TenK);
-        IRouterAggregator.add_router(router_aggregator_proxy_address, router_4_address, AlphaRoad);
+        IRouterAggregator.add_router(router_aggregator_proxy_address, router_2_address, JediSwap);
+        IRouterAggregator.add_router(router_aggregator_proxy_address, router_3_address, JediSwap);
+        IRouterAggregator.add_router(router_aggregator_proxy_address, router_4_address, JediSwap);
     %{ stop_prank_callable() %}
 
     // Deploy Solvers
@@ -187,10 +166,16 @@ func __setup__{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
         context.solver1_address = deploy_contract("./src/solvers/graddesc_solver.cairo", [ids.router_aggregator_proxy_address]).contract_address 
         ids.solver1_address = context.solver1_address
     %}
+    local solver2_address: felt;
+    %{
+        context.solver2_address = deploy_contract("./src/solvers/split_solver.cairo", [ids.router_aggregator_proxy_address]).contract_address 
+        ids.solver2_address = context.solver2_address
+    %}
 
     // Add solver to solver_registry
     %{ stop_prank_callable = start_prank(ids.public_key_0,ids.solver_registry_address) %}
     ISolverRegistry.set_solver(solver_registry_address, 1, solver1_address);
+    ISolverRegistry.set_solver(solver_registry_address, 2, solver2_address);
     %{ stop_prank_callable() %}
 
     return ();
@@ -216,8 +201,72 @@ func test_graddesc{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_p
 
     local amount_to_trade: Uint256 = Uint256(2 * base, 0);
 
-    let (final_amounts_len: felt, final_amounts: felt*, amount_out: felt) = IGraddesc.get_results(solver1_address, amount_to_trade, ETH, DAI);
-    %{ print("Get_out amount: ",ids.amount_out) %}
+    let (routers_len: felt, routers: Router*, path_len: felt, path: Path*, amounts_len: felt, amounts: felt*) = ISolver.get_results(solver1_address, amount_to_trade, ETH, DAI);
+    %{ print("Graddesc routers: ",ids.routers_len) %}
+    // Every share is a fraction of what the previous routers left, the last router trades the rest
+    assert_eq(path[0].token_in, ETH);
+    assert_eq(path[0].token_out, DAI);
+    assert_eq(amounts[amounts_len - 1], base);
+
+    return ();
+}
+
+@external
+func test_graddesc_single_router{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() {
+    alloc_locals;
+
+    local solver1_address;
+    %{ ids.solver1_address = context.solver1_address %}
+    local router_1_address;
+    %{ ids.router_1_address = context.router_1_address %}
+
+    local shitcoin1;
+    %{ ids.shitcoin1 = context.shitcoin1 %}
+    local DAI;
+    %{ ids.DAI = context.DAI %}
+
+    local amount_to_trade: Uint256 = Uint256(1 * base, 0);
+
+    // Only router 1 has a shitcoin1/DAI pool, so it trades the whole amount
+    let (routers_len: felt, routers: Router*, path_len: felt, path: Path*, amounts_len: felt, amounts: felt*) = ISolver.get_results(solver1_address, amount_to_trade, shitcoin1, DAI);
+    assert_eq(routers_len, 1);
+    assert_eq(routers[0].address, router_1_address);
+    assert_eq(routers[0].type, JediSwap);
+    assert_eq(path[0].token_in, shitcoin1);
+    assert_eq(path[0].token_out, DAI);
+    assert_eq(amounts[0], base);
+
+    return ();
+}
+
+@external
+func test_split_solver{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() {
+    alloc_locals;
+
+    local hub_address;
+    %{ ids.hub_address = context.hub_address %}
+    local solver2_address;
+    %{ ids.solver2_address = context.solver2_address %}
+
+    local ETH;
+    %{ ids.ETH = context.ETH %}
+    local DAI;
+    %{ ids.DAI = context.DAI %}
+
+    local amount_to_trade: Uint256 = Uint256(2 * base, 0);
+
+    let (routers_len: felt, routers: Router*, path_len: felt, path: Path*, amounts_len: felt, amounts: felt*) = ISolver.get_results(solver2_address, amount_to_trade, ETH, DAI);
+    assert path[0].token_in = ETH;
+    assert path[0].token_out = DAI;
+    assert amounts[amounts_len - 1] = base;
+
+    // Compare with graddesc (solver 1) through the hub
+    let (graddesc_amount_out: Uint256) = IHub.get_amount_out_with_solver(hub_address, amount_to_trade, ETH, DAI, 1);
+    let (split_amount_out: Uint256) = IHub.get_amount_out_with_solver(hub_address, amount_to_trade, ETH, DAI, 2);
+    %{ print("Graddesc amount out: ", ids.graddesc_amount_out.low, " Split amount out: ", ids.split_amount_out.low) %}
+
+    let (is_better) = uint256_le(graddesc_amount_out, split_amount_out);
+    assert is_better = 1;
 
     return ();
 }
@@ -331,271 +380,28 @@ func create_jedi_router{syscall_ptr: felt*, range_check_ptr}(
     return (router_address,);
 }
 
-func create_alpha_router{syscall_ptr: felt*, range_check_ptr}(
-    public_key_0: felt,
-    ETH: felt,
-    USDC: felt,
-    USDT: felt,
-    DAI: felt,
-    shitcoin1: felt,
-    shitcoin2: felt,
+// A Jedi router that only has an ETH/DAI pool, so that the solvers can split between routers
+func create_jedi_eth_dai_router{syscall_ptr: felt*, range_check_ptr}(
+    public_key_0: felt, ETH: felt, DAI: felt, eth_reserve: felt, dai_reserve: felt
 ) -> (router_address: felt) {
     alloc_locals;
 
     local router_address: felt;
-    %{ ids.router_address = deploy_contract("./src/mocks/mock_alpha_router.cairo", []).contract_address %}
-
-    local eth_dai_pair: felt;
-    %{ ids.eth_dai_pair = deploy_contract("./src/mocks/mock_alpha_pair.cairo", []).contract_address %}
-    
-    local eth_usdt_pair: felt;
-    %{ ids.eth_usdt_pair = deploy_contract("./src/mocks/mock_alpha_pair.cairo", []).contract_address %}
-
-    local eth_usdc_pair: felt;
-    %{ ids.eth_usdc_pair = deploy_contract("./src/mocks/mock_alpha_pair.cairo", []).contract_address %}
-
-    local dai_usdc_pair: felt;
-    %{ ids.dai_usdc_pair = deploy_contract("./src/mocks/mock_alpha_pair.cairo", []).contract_address %}
-
-    local dai_usdt_pair: felt;
-    %{ ids.dai_usdt_pair = deploy_contract("./src/mocks/mock_alpha_pair.cairo", []).contract_address %}
-
-    local usdc_usdt_pair: felt;
-    %{ ids.usdc_usdt_pair = deploy_contract("./src/mocks/mock_alpha_pair.cairo", []).contract_address %}
-
-    // shitcoin1 = 10$
-    // ETH = 1000$ ....sadge
-    // DAI = 1$
-    // USDT = 1$
-    // USDC = 1$
-    // shitcoin2 = 10$
-
-
-    //CONFIGURE ROUTER AND PAIRS
-    IAlphaRouter.set_pair(router_address, ETH, DAI, eth_dai_pair);
-    IAlphaRouter.set_pair(router_address, ETH, USDC, eth_usdc_pair);
-    IAlphaRouter.set_pair(router_address, ETH, USDT, eth_usdt_pair);
-    IAlphaRouter.set_pair(router_address, DAI, USDC, dai_usdc_pair);
-    IAlphaRouter.set_pair(router_address, DAI, USDT, dai_usdt_pair);
-    IAlphaRouter.set_pair(router_address, USDC, USDT, usdc_usdt_pair);
-
-    IAlphaPool.set_token0(eth_dai_pair,ETH);
-    IAlphaPool.set_token0(eth_usdc_pair,ETH);
-    IAlphaPool.set_token0(eth_usdt_pair,ETH);
-    IAlphaPool.set_token0(dai_usdc_pair,DAI);
-    IAlphaPool.set_token0(dai_usdt_pair,DAI);
-    IAlphaPool.set_token0(usdc_usdt_pair,USDC);
-
-    //1: ETH 2: DAI
-    IAlphaPool.set_reserves(eth_dai_pair, Uint256(100 * base, 0), Uint256(100000 * base, 0));  // 100,000
-
-    //1: USDT 2: USDC
-    IAlphaPool.set_reserves(usdc_usdt_pair, Uint256(80000 * base, 0), Uint256(80000 * small_base, 0));  // 80,000
-    //1: USDT 2: DAI
-    IAlphaPool.set_reserves(dai_usdt_pair, Uint256(90000 * base, 0), Uint256(90000 * base, 0));  // 90,000
-
-    //1: USDC 2: DAI
-    IAlphaPool.set_reserves(dai_usdc_pair, Uint256(80000 * small_base, 0), Uint256(80000 * base, 0));  // 80,000
-
-    // Transfer tokens to router
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.ETH) %}
-    IERC20.transfer(ETH, router_address, Uint256(100 * base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.USDC) %}
-    IERC20.transfer(USDC, router_address, Uint256(80000 * small_base, 0));
-    IERC20.transfer(USDC, router_address, Uint256(80000 * small_base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.USDT) %}
-    IERC20.transfer(USDT, router_address, Uint256(80000 * base, 0));
-    IERC20.transfer(USDT, router_address, Uint256(90000 * base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.DAI) %}
-    IERC20.transfer(DAI, router_address, Uint256(100000 * base, 0));
-    IERC20.transfer(DAI, router_address, Uint256(80000 * base, 0));
-    IERC20.transfer(DAI, router_address, Uint256(90000 * base, 0));
-    %{ stop_prank_callable() %}
-
-    return (router_address,);
-}
-
-func create_sith_router{syscall_ptr: felt*, range_check_ptr}(
-    public_key_0: felt,
-    ETH: felt,
-    USDC: felt,
-    USDT: felt,
-    DAI: felt,
-    shitcoin1: felt,
-    shitcoin2: felt,
-) -> (router_address: felt) {
-    alloc_locals;
-
-    local router_address: felt;
-    %{ ids.router_address = deploy_contract("./src/mocks/mock_sith_router.cairo", []).contract_address %}
-
-    local eth_dai_pair: felt;
-    %{ ids.eth_dai_pair = deploy_contract("./src/mocks/mock_sith_pair.cairo", []).contract_address %}
-
-    local usdt_usdc_pair: felt;
-    %{ ids.usdt_usdc_pair = deploy_contract("./src/mocks/mock_sith_pair.cairo", []).contract_address %}
-
-    local usdt_dai_pair: felt;
-    %{ ids.usdt_dai_pair = deploy_contract("./src/mocks/mock_sith_pair.cairo", []).contract_address %}
-
-    local usdc_dai_pair: felt;
-    %{ ids.usdc_dai_pair = deploy_contract("./src/mocks/mock_sith_pair.cairo", []).contract_address %}
-
-    // shitcoin1 = 10$
-    // ETH = 1000$ ....sadge
-    // DAI = 1$
-    // USDT = 1$
-    // USDC = 1$
-    // shitcoin2 = 10$
-
-    //CONFIGURE ROUTER AND PAIRS
-    ISithRouter.set_pair(router_address, ETH, DAI, eth_dai_pair);
-    ISithRouter.set_pair(router_address, USDT, USDC, usdt_usdc_pair);
-    ISithRouter.set_pair(router_address, USDT, DAI, usdt_dai_pair);
-    ISithRouter.set_pair(router_address, USDC, DAI, usdc_dai_pair);
-
-    ISithPool.set_token0(eth_dai_pair,ETH);
-    ISithPool.set_token0(usdt_usdc_pair,USDT);
-    ISithPool.set_token0(usdt_dai_pair,USDT);
-    ISithPool.set_token0(usdc_dai_pair,USDC);
-
-    ISithPool.set_reserves(eth_dai_pair, Uint256(1000 * base, 0), Uint256(1000000 * base, 0));  // 1,000,000
-
-    ISithPool.set_reserves(usdt_usdc_pair, Uint256(80000 * base, 0), Uint256(80000 * small_base, 0));  // 80,000
-    ISithPool.set_reserves(usdt_dai_pair, Uint256(90000 * base, 0), Uint256(90000 * base, 0));  // 90,000
-
-    ISithPool.set_reserves(usdc_dai_pair, Uint256(80000 * small_base, 0), Uint256(80000 * base, 0));  // 80,000
-
-    // Transfer tokens to router
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.ETH) %}
-    IERC20.transfer(ETH, router_address, Uint256(1000 * base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.USDC) %}
-    IERC20.transfer(USDC, router_address, Uint256(80000 * small_base, 0));
-    IERC20.transfer(USDC, router_address, Uint256(80000 * small_base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.USDT) %}
-    IERC20.transfer(USDT, router_address, Uint256(80000 * base, 0));
-    IERC20.transfer(USDT, router_address, Uint256(90000 * base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.DAI) %}
-    IERC20.transfer(DAI, router_address, Uint256(1000000 * base, 0));
-    IERC20.transfer(DAI, router_address, Uint256(80000 * base, 0));
-    IERC20.transfer(DAI, router_address, Uint256(90000 * base, 0));
-    %{ stop_prank_callable() %}
-
-    return (router_address,);
-}
-
-func create_TenK_router{syscall_ptr: felt*, range_check_ptr}(
-    public_key_0: felt,
-    ETH: felt,
-    USDC: felt,
-    USDT: felt,
-    DAI: felt,
-    shitcoin1: felt,
-    shitcoin2: felt,
-) -> (router_address: felt) {
-    alloc_locals;
-
-    local router_address: felt;
-    %{ ids.router_address = deploy_contract("./src/mocks/mock_TenK_router.cairo", []).contract_address %}
-
-    local shitcoin1_usdt_pair: felt;
-    %{ ids.shitcoin1_usdt_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
+    %{ ids.router_address = deploy_contract("./src/mocks/mock_jedi_router.cairo", []).contract_address %}
 
-    local eth_usdc_pair: felt;
-    %{ ids.eth_usdc_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
-    
     local eth_dai_pair: felt;
-    %{ ids.eth_dai_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
-
-    local usdt_usdc_pair: felt;
-    %{ ids.usdt_usdc_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
-
-    local usdt_dai_pair: felt;
-    %{ ids.usdt_dai_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
-
-    local usdc_dai_pair: felt;
-    %{ ids.usdc_dai_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
-
-    local shitcoin2_dai_pair: felt;
-    %{ ids.shitcoin2_dai_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
-
-    local shitcoin2_usdt_pair: felt;
-    %{ ids.shitcoin2_usdt_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
-
-    // shitcoin1 = 10$
-    // ETH = 1000$ ....sadge
-    // DAI = 1$
-    // USDT = 1$
-    // USDC = 1$
-    // shitcoin2 = 10$
-
-
-    //CONFIGURE ROUTER AND PAIRS
-    ITenKRouter.set_pair(router_address, shitcoin1, USDT, shitcoin1_usdt_pair);
-    ITenKRouter.set_pair(router_address, ETH, USDC, eth_usdc_pair);
-    ITenKRouter.set_pair(router_address, ETH, DAI, eth_dai_pair);
-    ITenKRouter.set_pair(router_address, USDT, USDC, usdt_usdc_pair);
-    ITenKRouter.set_pair(router_address, USDT, DAI, usdt_dai_pair);
-    ITenKRouter.set_pair(router_address, USDC, DAI, usdc_dai_pair);
-    ITenKRouter.set_pair(router_address, shitcoin2, DAI, shitcoin2_dai_pair);
-    ITenKRouter.set_pair(router_address, shitcoin2, USDT, shitcoin2_usdt_pair);
-
-    ITenKPool.set_token0(shitcoin1_usdt_pair,shitcoin1);
-    ITenKPool.set_token0(eth_usdc_pair,ETH);
-    ITenKPool.set_token0(eth_dai_pair,ETH);
-    ITenKPool.set_token0(usdt_usdc_pair,USDT);
-    ITenKPool.set_token0(usdt_dai_pair,USDT);
-    ITenKPool.set_token0(usdc_dai_pair,USDC);
-    ITenKPool.set_token0(shitcoin2_dai_pair,shitcoin2);
-    ITenKPool.set_token0(shitcoin2_usdt_pair,shitcoin2);
-
-    ITenKPool.set_reserves(shitcoin1_usdt_pair, Uint256(1000 * base, 0), Uint256(10000 * base, 0));  // 10,000
-
-    ITenKPool.set_reserves(eth_usdc_pair, Uint256(10 * base, 0), Uint256(10000 * small_base, 0));  // 10,000
-    ITenKPool.set_reserves(eth_dai_pair, Uint256(10 * base, 0), Uint256(10000 * base, 0));  // 10,000
-
-    ITenKPool.set_reserves(usdt_usdc_pair, Uint256(80000 * base, 0), Uint256(80000 * small_base, 0));  // 80,000
-    ITenKPool.set_reserves(usdt_dai_pair, Uint256(90000 * base, 0), Uint256(90000 * base, 0));  // 90,000
-
-    ITenKPool.set_reserves(usdc_dai_pair, Uint256(80000 * small_base, 0), Uint256(80000 * base, 0));  // 80,000
+    %{ ids.eth_dai_pair = deploy_contract("./src/mocks/mock_jedi_pair.cairo", []).contract_address %}
 
-    ITenKPool.set_reserves(shitcoin2_dai_pair, Uint256(10000 * base, 0), Uint256(100000 * base, 0));  // 100,000
-    ITenKPool.set_reserves(shitcoin2_usdt_pair, Uint256(1000 * base, 0), Uint256(10000 * base, 0));  // 10,000
+    IJediRouter.set_pair(router_address, ETH, DAI, eth_dai_pair);
+    IJediPool.set_token0(eth_dai_pair, ETH);
+    IJediPool.set_reserves(eth_dai_pair, Uint256(eth_reserve * base, 0), Uint256(dai_reserve * base, 0));
 
     // Transfer tokens to router
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.shitcoin2) %}
-    IERC20.transfer(shitcoin2, router_address, Uint256(1000 * base, 0));
-    IERC20.transfer(shitcoin2, router_address, Uint256(10000 * base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.shitcoin1) %}
-    IERC20.transfer(shitcoin1, router_address, Uint256(1000 * base, 0));
-    %{ stop_prank_callable() %}
     %{ stop_prank_callable = start_prank(ids.public_key_0,ids.ETH) %}
-    IERC20.transfer(ETH, router_address, Uint256(10 * base, 0));
-    IERC20.transfer(ETH, router_address, Uint256(10 * base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.USDC) %}
-    IERC20.transfer(USDC, router_address, Uint256(10000 * small_base, 0));
-    IERC20.transfer(USDC, router_address, Uint256(80000 * small_base, 0));
-    IERC20.transfer(USDC, router_address, Uint256(80000 * small_base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.USDT) %}
-    IERC20.transfer(USDT, router_address, Uint256(10000 * base, 0));
-    IERC20.transfer(USDT, router_address, Uint256(10000 * base, 0));
-    IERC20.transfer(USDT, router_address, Uint256(80000 * base, 0));
-    IERC20.transfer(USDT, router_address, Uint256(90000 * base, 0));
+    IERC20.transfer(ETH, router_address, Uint256(eth_reserve * base, 0));
     %{ stop_prank_callable() %}
     %{ stop_prank_callable = start_prank(ids.public_key_0,ids.DAI) %}
-    IERC20.transfer(DAI, router_address, Uint256(10000 * base, 0));
-    IERC20.transfer(DAI, router_address, Uint256(100000 * base, 0));
-    IERC20.transfer(DAI, router_address, Uint256(80000 * base, 0));
-    IERC20.transfer(DAI, router_address, Uint256(90000 * base, 0));
+    IERC20.transfer(DAI, router_address, Uint256(dai_reserve * base, 0));
     %{ stop_prank_callable() %}
 
     return (router_address,);
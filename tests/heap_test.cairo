@@ -0,0 +1,82 @@
+%lang starknet
+
+from protostar.asserts import assert_eq
+
+from starkware.cairo.common.default_dict import default_dict_new, default_dict_finalize
+from starkware.cairo.common.dict_access import DictAccess
+
+from src.lib.heap import MinHeap
+
+@external
+func test_pop_min_returns_lowest_priority{range_check_ptr}() {
+    alloc_locals;
+
+    let (local heap_elements_start: DictAccess*) = default_dict_new(default_value=0);
+    let (local heap_positions_start: DictAccess*) = default_dict_new(default_value=0);
+    let (local heap_priorities_start: DictAccess*) = default_dict_new(default_value=0);
+    let heap_elements = heap_elements_start;
+    let heap_positions = heap_positions_start;
+    let heap_priorities = heap_priorities_start;
+
+    with heap_elements, heap_positions, heap_priorities {
+        let (heap_len) = MinHeap.push(0, 1, 50);
+        let (heap_len) = MinHeap.push(heap_len, 2, 20);
+        let (heap_len) = MinHeap.push(heap_len, 3, 40);
+        let (heap_len) = MinHeap.push(heap_len, 4, 10);
+        let (heap_len) = MinHeap.push(heap_len, 5, 30);
+
+        let (heap_len, value, priority) = MinHeap.pop_min(heap_len);
+        assert_eq(value, 4);
+        assert_eq(priority, 10);
+        let (heap_len, value, _) = MinHeap.pop_min(heap_len);
+        assert_eq(value, 2);
+        let (heap_len, value, _) = MinHeap.pop_min(heap_len);
+        assert_eq(value, 5);
+        let (heap_len, value, _) = MinHeap.pop_min(heap_len);
+        assert_eq(value, 3);
+        let (is_in_heap) = MinHeap.contains(3);
+        assert_eq(is_in_heap, 0);
+        let (heap_len, value, _) = MinHeap.pop_min(heap_len);
+        assert_eq(value, 1);
+        assert_eq(heap_len, 0);
+    }
+
+    default_dict_finalize(heap_elements_start, heap_elements, 0);
+    default_dict_finalize(heap_positions_start, heap_positions, 0);
+    default_dict_finalize(heap_priorities_start, heap_priorities, 0);
+    return ();
+}
+
+@external
+func test_decrease_key_moves_value_up{range_check_ptr}() {
+    alloc_locals;
+
+    let (local heap_elements_start: DictAccess*) = default_dict_new(default_value=0);
+    let (local heap_positions_start: DictAccess*) = default_dict_new(default_value=0);
+    let (local heap_priorities_start: DictAccess*) = default_dict_new(default_value=0);
+    let heap_elements = heap_elements_start;
+    let heap_positions = heap_positions_start;
+    let heap_priorities = heap_priorities_start;
+
+    with heap_elements, heap_positions, heap_priorities {
+        let (heap_len) = MinHeap.push(0, 1, 10);
+        let (heap_len) = MinHeap.push(heap_len, 2, 20);
+        let (heap_len) = MinHeap.push(heap_len, 3, 30);
+        let (is_in_heap) = MinHeap.contains(3);
+        assert_eq(is_in_heap, 1);
+
+        MinHeap.decrease_key(3, 5);
+
+        let (heap_len, value, priority) = MinHeap.pop_min(heap_len);
+        assert_eq(value, 3);
+        assert_eq(priority, 5);
+        let (heap_len, value, _) = MinHeap.pop_min(heap_len);
+        assert_eq(value, 1);
+        assert_eq(heap_len, 1);
+    }
+
+    default_dict_finalize(heap_elements_start, heap_elements, 0);
+    default_dict_finalize(heap_positions_start, heap_positions, 0);
+    default_dict_finalize(heap_priorities_start, heap_priorities, 0);
+    return ();
+}
@@ -20,17 +20,17 @@ from starkware.cairo.common.uint256 import (
 
 from src.lib.array import Array
 from src.lib.utils import Utils
-from src.lib.constants import MAX_FELT, JediSwap, SithSwap, TenK, AlphaRoad
+from src.lib.constants import MAX_FELT, JediSwap
 from src.interfaces.i_router_aggregator import IRouterAggregator
 from src.interfaces.i_solver import ISolver
 from src.interfaces.i_spf_solver import ISpfSolver
 from src.interfaces.i_solver_registry import ISolverRegistry
 from src.interfaces.i_empiric_oracle import IEmpiricOracle
 from src.interfaces.i_erc20 import IERC20
-from src.interfaces.i_router import IJediRouter, ISithRouter, IAlphaRouter, ITenKRouter
+from src.interfaces.i_router import IJediRouter
 from src.interfaces.i_hub import IHub
-from src.interfaces.i_pool import IAlphaPool, ITenKPool, IJediPool, ISithPool
-from src.lib.utils import Router, Path
+from src.interfaces.i_pool import IJediPool
+from src.lib.utils import Router, Path, SolverInfo, AmountRange, Order
 
 const Vertices = 6;
 const Edges = 21;
@@ -132,31 +132,19 @@ func __setup__{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
     %}
 
     // Set routers
+    // Only Jedi routers can be quoted in tests, the TenK factory is a fixed mainnet address
     let (local router_1_address) = create_jedi_router(
         public_key_0, ETH, USDC, USDT, DAI, shitcoin1, shitcoin2
     );
     // %{ print("Router 1: ",ids.router_1_address) %}
-    let (local router_2_address) = create_sith_router(
-        public_key_0, ETH, USDC, USDT, DAI, shitcoin1, shitcoin2
-    );
+    let (local router_2_address) = create_jedi_eth_dai_router(public_key_0, ETH, DAI, 100, 100000);
     // %{ print("Router 2: ",ids.router_2_address) %}
-    let (local router_3_address) = create_TenK_router(
-        public_key_0, ETH, USDC, USDT, DAI, shitcoin1, shitcoin2
-    );
-    // %{ print("Router 3: ",ids.router_3_address) %}
-    let (local router_4_address) = create_alpha_router(
-        public_key_0, ETH, USDC, USDT, DAI, shitcoin1, shitcoin2
-    );
 
     %{ context.router_1_address = ids.router_1_address %}
     %{ context.router_2_address = ids.router_2_address %}
-    %{ context.router_3_address = ids.router_3_address %}
-    %{ context.router_4_address = ids.router_4_address %}
     %{ 
-        print("Jedi Router: ",ids.router_1_address) 
-        print("Sith Router: ",ids.router_2_address) 
-        print("TenK Router: ",ids.router_3_address) 
-        print("Alpha Router: ",ids.router_4_address) 
+        print("Jedi Router 1: ",ids.router_1_address) 
+        print("Jedi Router 2: ",ids.router_2_address) 
         print("shitcoin1: ",ids.shitcoin1) 
         print("shitcoin2: ",ids.shitcoin2) 
         print("USDC: ",ids.USDC) 
@@ -191,9 +179,7 @@ func __setup__{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}(
     // Add newly created routers to router aggregator
     %{ stop_prank_callable = start_prank(ids.public_key_0, target_contract_address=ids.router_aggregator_proxy_address) %}
     IRouterAggregator.add_router(router_aggregator_proxy_address, router_1_address, JediSwap);
-    IRouterAggregator.add_router(router_aggregator_proxy_address, router_2_address, SithSwap);
-    IRouterAggregator.add_router(router_aggregator_proxy_address, router_3_address, TenK);
-    IRouterAggregator.add_router(router_aggregator_proxy_address, router_4_address, AlphaRoad);
+    IRouterAggregator.add_router(router_aggregator_proxy_address, router_2_address, JediSwap);
 
     // Set Price feeds at the Router
     IRouterAggregator.set_global_price(
@@ -410,6 +396,249 @@ func test_heuristic_splitter{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, ran
     return ();
 }
 
+@external
+func test_automatic_solver_selection{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() {
+    alloc_locals;
+
+    local public_key_0;
+    %{ ids.public_key_0 = context.public_key_0 %}
+
+    local hub_address;
+    %{ ids.hub_address = context.hub_address %}
+
+    local solver_registry_address;
+    %{ ids.solver_registry_address = context.solver_registry_address %}
+
+    local ETH;
+    %{ ids.ETH = context.ETH %}
+    local DAI;
+    %{ ids.DAI = context.DAI %}
+
+    // Single swap for ETH trades up to 5 ETH, the heuristic splitter for larger ones
+    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.solver_registry_address) %}
+    ISolverRegistry.set_solver_info(solver_registry_address, 1, SolverInfo(complexity=1, step_budget=8000));
+    ISolverRegistry.set_solver_info(solver_registry_address, 3, SolverInfo(complexity=2, step_budget=13000));
+    ISolverRegistry.set_solver_range(
+        solver_registry_address,
+        1,
+        ETH,
+        0,
+        AmountRange(min_amount=Uint256(0, 0), max_amount=Uint256(5 * base, 0)),
+    );
+    ISolverRegistry.set_auto_solver(solver_registry_address, 0, 3);
+    ISolverRegistry.set_auto_solver(solver_registry_address, 1, 1);
+    %{ stop_prank_callable() %}
+
+    let (local small_trade_solver) = IHub.get_solver_for_trade(hub_address, Uint256(1 * base, 0), ETH, DAI);
+    assert_eq(small_trade_solver, 1);
+    let (local large_trade_solver) = IHub.get_solver_for_trade(hub_address, Uint256(10 * base, 0), ETH, DAI);
+    assert_eq(large_trade_solver, 3);
+    // The ETH range doesn't apply when selling DAI, the single swap solver has no default limit
+    let (local dai_trade_solver) = IHub.get_solver_for_trade(hub_address, Uint256(10 * base, 0), DAI, ETH);
+    assert_eq(dai_trade_solver, 1);
+
+    local amount_to_trade: Uint256 = Uint256(10 * base, 0);
+
+    // The quote uses the same solver as the swap
+    let (local amount_out: Uint256) = IHub.get_amount_out(hub_address, amount_to_trade, ETH, DAI);
+    let (local splitter_amount_out: Uint256) = IHub.get_amount_out_with_solver(hub_address, amount_to_trade, ETH, DAI, 3);
+    assert_eq(amount_out.low, splitter_amount_out.low);
+
+    // Allow hub to take tokens
+    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.ETH) %}
+    IERC20.approve(ETH, hub_address, amount_to_trade);
+    %{ stop_prank_callable() %}
+
+    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.hub_address) %}
+    let (received_amount: Uint256) = IHub.swap_exact_tokens_for_tokens(
+        hub_address, amount_to_trade, amount_out, ETH, DAI, public_key_0
+    );
+    %{ stop_prank_callable() %}
+
+    // The automatically selected solver delivers at least its quote
+    assert_le(amount_out.low, received_amount.low);
+
+    return ();
+}
+
+@external
+func test_swap_with_commitment{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() {
+    alloc_locals;
+
+    local public_key_0;
+    %{ ids.public_key_0 = context.public_key_0 %}
+
+    local hub_address;
+    %{ ids.hub_address = context.hub_address %}
+
+    local ETH;
+    %{ ids.ETH = context.ETH %}
+    local DAI;
+    %{ ids.DAI = context.DAI %}
+
+    local amount_to_trade: Uint256 = Uint256(1 * base, 0);
+
+    // Solve once, the swap reuses the path
+    let (
+        routers_len: felt,
+        routers: Router*,
+        path_len: felt,
+        path: Path*,
+        amounts_len: felt,
+        amounts: felt*,
+        amount_out: Uint256,
+        block_number: felt,
+        commitment: felt,
+    ) = IHub.get_amount_and_path_with_commitment(
+        hub_address, amount_to_trade, ETH, DAI, 2, public_key_0
+    );
+
+    // Allow hub to take tokens
+    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.ETH) %}
+    IERC20.approve(ETH, hub_address, amount_to_trade);
+    %{ stop_prank_callable() %}
+
+    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.hub_address) %}
+    let (received_amount: Uint256) = IHub.swap_with_commitment(
+        hub_address,
+        routers_len,
+        routers,
+        path_len,
+        path,
+        amounts_len,
+        amounts,
+        amount_to_trade,
+        amount_out,
+        public_key_0,
+        2,
+        block_number,
+        commitment,
+    );
+    %{ stop_prank_callable() %}
+
+    assert_eq(received_amount.low, amount_out.low);
+
+    // The swap used up the commitment
+    let (nonce) = IHub.commitment_nonce(hub_address, public_key_0);
+    assert_eq(nonce, 1);
+
+    // So it can't be replayed
+    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.ETH) %}
+    IERC20.approve(ETH, hub_address, amount_to_trade);
+    %{ stop_prank_callable() %}
+
+    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.hub_address) %}
+    %{ expect_revert(error_message="path commitment invalid") %}
+    IHub.swap_with_commitment(
+        hub_address,
+        routers_len,
+        routers,
+        path_len,
+        path,
+        amounts_len,
+        amounts,
+        amount_to_trade,
+        Uint256(0, 0),
+        public_key_0,
+        2,
+        block_number,
+        commitment,
+    );
+    %{ stop_prank_callable() %}
+
+    return ();
+}
+
+@external
+func test_swap_batch{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() {
+    alloc_locals;
+
+    local public_key_0;
+    %{ ids.public_key_0 = context.public_key_0 %}
+
+    local hub_address;
+    %{ ids.hub_address = context.hub_address %}
+
+    local router_aggregator_proxy_address;
+    %{ ids.router_aggregator_proxy_address = context.router_aggregator_proxy_address %}
+
+    local ETH;
+    %{ ids.ETH = context.ETH %}
+    local DAI;
+    %{ ids.DAI = context.DAI %}
+
+    // Opposite orders are matched at the oracle prices of the router aggregator
+    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.hub_address) %}
+    IHub.set_router_aggregator(hub_address, router_aggregator_proxy_address);
+    %{ stop_prank_callable() %}
+
+    // Every order pays a different receiver, so their balances can be checked
+    let (orders: Order*) = alloc();
+    assert orders[0] = Order(
+        token_in=ETH,
+        token_out=DAI,
+        amount_in=Uint256(2 * base, 0),
+        min_amount_out=Uint256(0, 0),
+        to=111,
+    );
+    assert orders[1] = Order(
+        token_in=DAI,
+        token_out=ETH,
+        amount_in=Uint256(100 * base, 0),
+        min_amount_out=Uint256(0, 0),
+        to=222,
+    );
+    assert orders[2] = Order(
+        token_in=ETH,
+        token_out=DAI,
+        amount_in=Uint256(1 * base, 0),
+        min_amount_out=Uint256(0, 0),
+        to=333,
+    );
+
+    // Allow hub to take tokens
+    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.ETH) %}
+    IERC20.approve(ETH, hub_address, Uint256(3 * base, 0));
+    %{ stop_prank_callable() %}
+    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.DAI) %}
+    IERC20.approve(DAI, hub_address, Uint256(100 * base, 0));
+    %{ stop_prank_callable() %}
+
+    let (local hub_eth_before: Uint256) = IERC20.balanceOf(ETH, hub_address);
+    let (local hub_dai_before: Uint256) = IERC20.balanceOf(DAI, hub_address);
+
+    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.hub_address) %}
+    let (amounts_out_len: felt, amounts_out: Uint256*) = IHub.swap_batch(hub_address, 3, orders, 1);
+    %{ stop_prank_callable() %}
+
+    assert_eq(amounts_out_len, 3);
+
+    // The DAI seller is matched at the oracle prices (1000 DAI / ETH) without touching a pool
+    assert_eq(amounts_out[1].low, base / 10);
+
+    // Every receiver got exactly the reported amount
+    let (received_0: Uint256) = IERC20.balanceOf(DAI, 111);
+    let (received_1: Uint256) = IERC20.balanceOf(ETH, 222);
+    let (received_2: Uint256) = IERC20.balanceOf(DAI, 333);
+    assert_eq(received_0.low, amounts_out[0].low);
+    assert_eq(received_1.low, amounts_out[1].low);
+    assert_eq(received_2.low, amounts_out[2].low);
+
+    // The ETH sellers share their proceeds 2:1
+    let (share: Uint256, _) = uint256_unsigned_div_rem(amounts_out[0], Uint256(2, 0));
+    assert_le(share.low, amounts_out[2].low);
+    assert_le(amounts_out[2].low, share.low + 1);
+
+    // Only the 100 DAI and the 2.9 ETH residual left the hub, at most rounding dust stays behind
+    let (hub_eth_after: Uint256) = IERC20.balanceOf(ETH, hub_address);
+    let (hub_dai_after: Uint256) = IERC20.balanceOf(DAI, hub_address);
+    assert_eq(hub_eth_after.low, hub_eth_before.low);
+    assert_le(hub_dai_before.low, hub_dai_after.low);
+    assert_le(hub_dai_after.low, hub_dai_before.low + 2);
+
+    return ();
+}
+
 //@external
 func test_swap_with_path{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() {
     alloc_locals;
@@ -606,271 +835,28 @@ func create_jedi_router{syscall_ptr: felt*, range_check_ptr}(
     return (router_address,);
 }
 
-func create_alpha_router{syscall_ptr: felt*, range_check_ptr}(
-    public_key_0: felt,
-    ETH: felt,
-    USDC: felt,
-    USDT: felt,
-    DAI: felt,
-    shitcoin1: felt,
-    shitcoin2: felt,
-) -> (router_address: felt) {
-    alloc_locals;
-
-    local router_address: felt;
-    %{ ids.router_address = deploy_contract("./src/mocks/mock_alpha_router.cairo", []).contract_address %}
-
-    local eth_dai_pair: felt;
-    %{ ids.eth_dai_pair = deploy_contract("./src/mocks/mock_alpha_pair.cairo", []).contract_address %}
-    
-    local eth_usdt_pair: felt;
-    %{ ids.eth_usdt_pair = deploy_contract("./src/mocks/mock_alpha_pair.cairo", []).contract_address %}
-
-    local eth_usdc_pair: felt;
-    %{ ids.eth_usdc_pair = deploy_contract("./src/mocks/mock_alpha_pair.cairo", []).contract_address %}
-
-    local dai_usdc_pair: felt;
-    %{ ids.dai_usdc_pair = deploy_contract("./src/mocks/mock_alpha_pair.cairo", []).contract_address %}
-
-    local dai_usdt_pair: felt;
-    %{ ids.dai_usdt_pair = deploy_contract("./src/mocks/mock_alpha_pair.cairo", []).contract_address %}
-
-    local usdc_usdt_pair: felt;
-    %{ ids.usdc_usdt_pair = deploy_contract("./src/mocks/mock_alpha_pair.cairo", []).contract_address %}
-
-    // shitcoin1 = 10$
-    // ETH = 1000$ ....sadge
-    // DAI = 1$
-    // USDT = 1$
-    // USDC = 1$
-    // shitcoin2 = 10$
-
-
-    //CONFIGURE ROUTER AND PAIRS
-    IAlphaRouter.set_pair(router_address, ETH, DAI, eth_dai_pair);
-    IAlphaRouter.set_pair(router_address, ETH, USDC, eth_usdc_pair);
-    IAlphaRouter.set_pair(router_address, ETH, USDT, eth_usdt_pair);
-    IAlphaRouter.set_pair(router_address, DAI, USDC, dai_usdc_pair);
-    IAlphaRouter.set_pair(router_address, DAI, USDT, dai_usdt_pair);
-    IAlphaRouter.set_pair(router_address, USDC, USDT, usdc_usdt_pair);
-
-    IAlphaPool.set_token0(eth_dai_pair,ETH);
-    IAlphaPool.set_token0(eth_usdc_pair,ETH);
-    IAlphaPool.set_token0(eth_usdt_pair,ETH);
-    IAlphaPool.set_token0(dai_usdc_pair,DAI);
-    IAlphaPool.set_token0(dai_usdt_pair,DAI);
-    IAlphaPool.set_token0(usdc_usdt_pair,USDC);
-
-    //1: ETH 2: DAI
-    IAlphaPool.set_reserves(eth_dai_pair, Uint256(100 * base, 0), Uint256(100000 * base, 0));  // 100,000
-
-    //1: USDT 2: USDC
-    IAlphaPool.set_reserves(usdc_usdt_pair, Uint256(80000 * base, 0), Uint256(80000 * small_base, 0));  // 80,000
-    //1: USDT 2: DAI
-    IAlphaPool.set_reserves(dai_usdt_pair, Uint256(90000 * base, 0), Uint256(90000 * base, 0));  // 90,000
-
-    //1: USDC 2: DAI
-    IAlphaPool.set_reserves(dai_usdc_pair, Uint256(80000 * small_base, 0), Uint256(80000 * base, 0));  // 80,000
-
-    // Transfer tokens to router
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.ETH) %}
-    IERC20.transfer(ETH, router_address, Uint256(100 * base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.USDC) %}
-    IERC20.transfer(USDC, router_address, Uint256(80000 * small_base, 0));
-    IERC20.transfer(USDC, router_address, Uint256(80000 * small_base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.USDT) %}
-    IERC20.transfer(USDT, router_address, Uint256(80000 * base, 0));
-    IERC20.transfer(USDT, router_address, Uint256(90000 * base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.DAI) %}
-    IERC20.transfer(DAI, router_address, Uint256(100000 * base, 0));
-    IERC20.transfer(DAI, router_address, Uint256(80000 * base, 0));
-    IERC20.transfer(DAI, router_address, Uint256(90000 * base, 0));
-    %{ stop_prank_callable() %}
-
-    return (router_address,);
-}
-
-func create_sith_router{syscall_ptr: felt*, range_check_ptr}(
-    public_key_0: felt,
-    ETH: felt,
-    USDC: felt,
-    USDT: felt,
-    DAI: felt,
-    shitcoin1: felt,
-    shitcoin2: felt,
-) -> (router_address: felt) {
-    alloc_locals;
-
-    local router_address: felt;
-    %{ ids.router_address = deploy_contract("./src/mocks/mock_sith_router.cairo", []).contract_address %}
-
-    local eth_dai_pair: felt;
-    %{ ids.eth_dai_pair = deploy_contract("./src/mocks/mock_sith_pair.cairo", []).contract_address %}
-
-    local usdt_usdc_pair: felt;
-    %{ ids.usdt_usdc_pair = deploy_contract("./src/mocks/mock_sith_pair.cairo", []).contract_address %}
-
-    local usdt_dai_pair: felt;
-    %{ ids.usdt_dai_pair = deploy_contract("./src/mocks/mock_sith_pair.cairo", []).contract_address %}
-
-    local usdc_dai_pair: felt;
-    %{ ids.usdc_dai_pair = deploy_contract("./src/mocks/mock_sith_pair.cairo", []).contract_address %}
-
-    // shitcoin1 = 10$
-    // ETH = 1000$ ....sadge
-    // DAI = 1$
-    // USDT = 1$
-    // USDC = 1$
-    // shitcoin2 = 10$
-
-    //CONFIGURE ROUTER AND PAIRS
-    ISithRouter.set_pair(router_address, ETH, DAI, eth_dai_pair);
-    ISithRouter.set_pair(router_address, USDT, USDC, usdt_usdc_pair);
-    ISithRouter.set_pair(router_address, USDT, DAI, usdt_dai_pair);
-    ISithRouter.set_pair(router_address, USDC, DAI, usdc_dai_pair);
-
-    ISithPool.set_token0(eth_dai_pair,ETH);
-    ISithPool.set_token0(usdt_usdc_pair,USDT);
-    ISithPool.set_token0(usdt_dai_pair,USDT);
-    ISithPool.set_token0(usdc_dai_pair,USDC);
-
-    ISithPool.set_reserves(eth_dai_pair, Uint256(100 * base, 0), Uint256(100000 * base, 0));  // 100,000
-
-    ISithPool.set_reserves(usdt_usdc_pair, Uint256(80000 * base, 0), Uint256(80000 * small_base, 0));  // 80,000
-    ISithPool.set_reserves(usdt_dai_pair, Uint256(90000 * base, 0), Uint256(90000 * base, 0));  // 90,000
-
-    ISithPool.set_reserves(usdc_dai_pair, Uint256(80000 * small_base, 0), Uint256(80000 * base, 0));  // 80,000
-
-    // Transfer tokens to router
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.ETH) %}
-    IERC20.transfer(ETH, router_address, Uint256(100 * base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.USDC) %}
-    IERC20.transfer(USDC, router_address, Uint256(80000 * small_base, 0));
-    IERC20.transfer(USDC, router_address, Uint256(80000 * small_base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.USDT) %}
-    IERC20.transfer(USDT, router_address, Uint256(80000 * base, 0));
-    IERC20.transfer(USDT, router_address, Uint256(90000 * base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.DAI) %}
-    IERC20.transfer(DAI, router_address, Uint256(100000 * base, 0));
-    IERC20.transfer(DAI, router_address, Uint256(80000 * base, 0));
-    IERC20.transfer(DAI, router_address, Uint256(90000 * base, 0));
-    %{ stop_prank_callable() %}
-
-    return (router_address,);
-}
-
-func create_TenK_router{syscall_ptr: felt*, range_check_ptr}(
-    public_key_0: felt,
-    ETH: felt,
-    USDC: felt,
-    USDT: felt,
-    DAI: felt,
-    shitcoin1: felt,
-    shitcoin2: felt,
+// A second Jedi router that only has an ETH/DAI pool, so that the solvers can split between routers
+func create_jedi_eth_dai_router{syscall_ptr: felt*, range_check_ptr}(
+    public_key_0: felt, ETH: felt, DAI: felt, eth_reserve: felt, dai_reserve: felt
 ) -> (router_address: felt) {
     alloc_locals;
 
     local router_address: felt;
-    %{ ids.router_address = deploy_contract("./src/mocks/mock_TenK_router.cairo", []).contract_address %}
-
-    local shitcoin1_usdt_pair: felt;
-    %{ ids.shitcoin1_usdt_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
+    %{ ids.router_address = deploy_contract("./src/mocks/mock_jedi_router.cairo", []).contract_address %}
 
-    local eth_usdc_pair: felt;
-    %{ ids.eth_usdc_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
-    
     local eth_dai_pair: felt;
-    %{ ids.eth_dai_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
-
-    local usdt_usdc_pair: felt;
-    %{ ids.usdt_usdc_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
-
-    local usdt_dai_pair: felt;
-    %{ ids.usdt_dai_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
-
-    local usdc_dai_pair: felt;
-    %{ ids.usdc_dai_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
-
-    local shitcoin2_dai_pair: felt;
-    %{ ids.shitcoin2_dai_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
-
-    local shitcoin2_usdt_pair: felt;
-    %{ ids.shitcoin2_usdt_pair = deploy_contract("./src/mocks/mock_TenK_pair.cairo", []).contract_address %}
-
-    // shitcoin1 = 10$
-    // ETH = 1000$ ....sadge
-    // DAI = 1$
-    // USDT = 1$
-    // USDC = 1$
-    // shitcoin2 = 10$
-
-
-    //CONFIGURE ROUTER AND PAIRS
-    ITenKRouter.set_pair(router_address, shitcoin1, USDT, shitcoin1_usdt_pair);
-    ITenKRouter.set_pair(router_address, ETH, USDC, eth_usdc_pair);
-    ITenKRouter.set_pair(router_address, ETH, DAI, eth_dai_pair);
-    ITenKRouter.set_pair(router_address, USDT, USDC, usdt_usdc_pair);
-    ITenKRouter.set_pair(router_address, USDT, DAI, usdt_dai_pair);
-    ITenKRouter.set_pair(router_address, USDC, DAI, usdc_dai_pair);
-    ITenKRouter.set_pair(router_address, shitcoin2, DAI, shitcoin2_dai_pair);
-    ITenKRouter.set_pair(router_address, shitcoin2, USDT, shitcoin2_usdt_pair);
-
-    ITenKPool.set_token0(shitcoin1_usdt_pair,shitcoin1);
-    ITenKPool.set_token0(eth_usdc_pair,ETH);
-    ITenKPool.set_token0(eth_dai_pair,ETH);
-    ITenKPool.set_token0(usdt_usdc_pair,USDT);
-    ITenKPool.set_token0(usdt_dai_pair,USDT);
-    ITenKPool.set_token0(usdc_dai_pair,USDC);
-    ITenKPool.set_token0(shitcoin2_dai_pair,shitcoin2);
-    ITenKPool.set_token0(shitcoin2_usdt_pair,shitcoin2);
-
-    ITenKPool.set_reserves(shitcoin1_usdt_pair, Uint256(1000 * base, 0), Uint256(10000 * base, 0));  // 10,000
-
-    ITenKPool.set_reserves(eth_usdc_pair, Uint256(10 * base, 0), Uint256(10000 * small_base, 0));  // 10,000
-    ITenKPool.set_reserves(eth_dai_pair, Uint256(100 * base, 0), Uint256(100000 * base, 0));  // 100,000
-
-    ITenKPool.set_reserves(usdt_usdc_pair, Uint256(80000 * base, 0), Uint256(80000 * small_base, 0));  // 80,000
-    ITenKPool.set_reserves(usdt_dai_pair, Uint256(90000 * base, 0), Uint256(90000 * base, 0));  // 90,000
-
-    ITenKPool.set_reserves(usdc_dai_pair, Uint256(80000 * small_base, 0), Uint256(80000 * base, 0));  // 80,000
+    %{ ids.eth_dai_pair = deploy_contract("./src/mocks/mock_jedi_pair.cairo", []).contract_address %}
 
-    ITenKPool.set_reserves(shitcoin2_dai_pair, Uint256(10000 * base, 0), Uint256(100000 * base, 0));  // 100,000
-    ITenKPool.set_reserves(shitcoin2_usdt_pair, Uint256(1000 * base, 0), Uint256(10000 * base, 0));  // 10,000
+    IJediRouter.set_pair(router_address, ETH, DAI, eth_dai_pair);
+    IJediPool.set_token0(eth_dai_pair, ETH);
+    IJediPool.set_reserves(eth_dai_pair, Uint256(eth_reserve * base, 0), Uint256(dai_reserve * base, 0));
 
     // Transfer tokens to router
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.shitcoin2) %}
-    IERC20.transfer(shitcoin2, router_address, Uint256(1000 * base, 0));
-    IERC20.transfer(shitcoin2, router_address, Uint256(10000 * base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.shitcoin1) %}
-    IERC20.transfer(shitcoin1, router_address, Uint256(1000 * base, 0));
-    %{ stop_prank_callable() %}
     %{ stop_prank_callable = start_prank(ids.public_key_0,ids.ETH) %}
-    IERC20.transfer(ETH, router_address, Uint256(10 * base, 0));
-    IERC20.transfer(ETH, router_address, Uint256(100 * base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.USDC) %}
-    IERC20.transfer(USDC, router_address, Uint256(10000 * small_base, 0));
-    IERC20.transfer(USDC, router_address, Uint256(80000 * small_base, 0));
-    IERC20.transfer(USDC, router_address, Uint256(80000 * small_base, 0));
-    %{ stop_prank_callable() %}
-    %{ stop_prank_callable = start_prank(ids.public_key_0,ids.USDT) %}
-    IERC20.transfer(USDT, router_address, Uint256(10000 * base, 0));
-    IERC20.transfer(USDT, router_address, Uint256(10000 * base, 0));
-    IERC20.transfer(USDT, router_address, Uint256(80000 * base, 0));
-    IERC20.transfer(USDT, router_address, Uint256(90000 * base, 0));
+    IERC20.transfer(ETH, router_address, Uint256(eth_reserve * base, 0));
     %{ stop_prank_callable() %}
     %{ stop_prank_callable = start_prank(ids.public_key_0,ids.DAI) %}
-    IERC20.transfer(DAI, router_address, Uint256(100000 * base, 0));
-    IERC20.transfer(DAI, router_address, Uint256(100000 * base, 0));
-    IERC20.transfer(DAI, router_address, Uint256(80000 * base, 0));
-    IERC20.transfer(DAI, router_address, Uint256(90000 * base, 0));
+    IERC20.transfer(DAI, router_address, Uint256(dai_reserve * base, 0));
     %{ stop_prank_callable() %}
 
     return (router_address,);
@@ -1,6 +1,6 @@
-from starknet_py.net.account.account_client import (AccountClient)
 from starknet_py.contract import Contract
 from pathlib import Path
+from commercium.deploy import DeploymentPlan, Manifest, Orchestrator, StarknetBackend
 
 from global_info import (
     client, 
@@ -17,79 +17,64 @@ from global_info import (
     USDC_Contract
 )
 
-contractAddresses = {
-    "hub": int("0x0",16),
-    "solver_registry": int("0x0",16),
-    "router_aggregator": int("0x0",16),
-    "single_swap_solver": int("0x0",16),
-    "spf_solver": int("0x0",16),
-    "heuristic_splitter": int("0x0",16)
-}
+#Deployed addresses are persisted here, entries that don't exist on the devnet are ignored
+manifest_path = Path("./tests/integration/deployments/", "devnet.json")
+
+
+def protocol_plan() -> DeploymentPlan:
+    plan = DeploymentPlan()
+
+    #Declare Contracts
+    trade_executor_class = plan.declare("trade_executor_class", Path("./build/", "trade-executor.json"))
+    router_aggregator_class = plan.declare("router_aggregator_class", Path("./build/", "router-aggregator.json"))
+    hub_class = plan.declare("hub_class", Path("./build/", "hub.json"))
+    solver_registry_class = plan.declare("solver_registry_class", Path("./build/", "solver-registry.json"))
+    proxy_class = plan.declare("router_aggregator_proxy_class", Path("./build/", "router-aggregator-proxy.json"))
+    single_swap_solver_class = plan.declare("single_swap_solver_class", Path("./build/", "single-swap-solver.json"))
+    spf_solver_class = plan.declare("spf_solver_class", Path("./build/", "spf-solver.json"))
+    graddesc_solver_class = plan.declare("graddesc_solver_class", Path("./build/", "graddesc-solver.json"))
+
+    #Deploy Contracts
+    hub = plan.deploy("hub", hub_class, [account_address, trade_executor_class])
+    solver_registry = plan.deploy("solver_registry", solver_registry_class, [account_address])
+    router_aggregator = plan.deploy("router_aggregator", proxy_class, [router_aggregator_class, account_address, account_address])
+    single_swap_solver = plan.deploy("single_swap_solver", single_swap_solver_class, [router_aggregator])
+    spf_solver = plan.deploy("spf_solver", spf_solver_class, [account_address, router_aggregator])
+    graddesc_solver = plan.deploy("graddesc_solver", graddesc_solver_class, [router_aggregator])
+
+    #Configure Hub
+    plan.invoke("hub.set_solver_registry", hub, "set_solver_registry", [solver_registry])
+
+    #Configure Router Aggregator
+    #Set Price Feeds
+    plan.invoke("router_aggregator.set_global_price.eth", router_aggregator, "set_global_price", [ETH_Contract.address, ETH_USD_Key, EMPIRIC_ORACLE_ADDRESS])
+    plan.invoke("router_aggregator.set_global_price.dai", router_aggregator, "set_global_price", [DAI_Contract.address, DAI_USD_Key, EMPIRIC_ORACLE_ADDRESS])
+    plan.invoke("router_aggregator.set_global_price.usdc", router_aggregator, "set_global_price", [USDC_Contract.address, USDC_USD_Key, EMPIRIC_ORACLE_ADDRESS])
+    #Add Routers (router ids follow the order of the calls)
+    add_jediswap = plan.invoke("router_aggregator.add_router.jediswap", router_aggregator, "add_router", [JediSwapRouter, 0])
+    plan.invoke("router_aggregator.add_router.tenk", router_aggregator, "add_router", [TenKRouter, 1], depends_on=[add_jediswap])
+
+    #Configure Solver Registry
+    plan.invoke("solver_registry.set_solver.1", solver_registry, "set_solver", [1, single_swap_solver])
+    plan.invoke("solver_registry.set_solver.2", solver_registry, "set_solver", [2, spf_solver])
+    plan.invoke("solver_registry.set_solver.3", solver_registry, "set_solver", [3, graddesc_solver])
+
+    #Configure Solvers
+    #Set high liq tokens for spf solver
+    plan.invoke("spf_solver.set_high_liq_tokens.0", spf_solver, "set_high_liq_tokens", [0, ETH_Contract.address])
+    plan.invoke("spf_solver.set_high_liq_tokens.1", spf_solver, "set_high_liq_tokens", [1, DAI_Contract.address])
+    plan.invoke("spf_solver.set_high_liq_tokens.2", spf_solver, "set_high_liq_tokens", [2, USDC_Contract.address])
+
+    return plan
 
 
 async def deployContracts():
 
     print("________DEPLOYING CONTRACTS___________")
 
-    if contractAddresses["hub"] == 0 :
-
-        # Declare Trade Executor Contract
-        declare_transaction = await client.sign_declare_transaction(
-            compiled_contract=Path("./build/", "trade-executor.json").read_text("utf-8"), max_fee=int(1e16)
-        )
-        resp = await client.declare(transaction=declare_transaction)
-        await client.wait_for_tx(resp.transaction_hash)
-        execution_contract_hash = resp.class_hash
-
-        # Declare Router Aggregator Contract
-        declare_transaction = await client.sign_declare_transaction(
-            compiled_contract=Path("./build/", "router-aggregator.json").read_text("utf-8"), max_fee=int(1e16)
-        )
-        resp = await client.declare(transaction=declare_transaction)
-        await client.wait_for_tx(resp.transaction_hash)
-        router_aggregator_contract_hash = resp.class_hash
-
-        # Deploy Hub
-        compiled_contract = Path("./build/", "hub.json").read_text("utf-8")
-        contract_address = await deployContract(client=client,compiled_contract=compiled_contract,calldata=[account_address,execution_contract_hash])
-        contractAddresses["hub"] = int(contract_address,16)
-        print("✅ Hub: ",contract_address)
-
-        # Deploy Solver Registry
-        compiled_contract = Path("./build/", "solver-registry.json").read_text("utf-8")
-        contract_address = await deployContract(client=client,compiled_contract=compiled_contract,calldata=[account_address])
-        contractAddresses["solver_registry"] = int(contract_address,16)
-        print("✅ Solver Registry: ",contract_address)
-
-        # Deploy Router Aggregator
-        compiled_contract = Path("./build/", "router-aggregator-proxy.json").read_text("utf-8")
-        contract_address = await deployContract(client=client,compiled_contract=compiled_contract,calldata=[router_aggregator_contract_hash,account_address,account_address])
-        contractAddresses["router_aggregator"] = int(contract_address,16)
-        print("✅ Router Aggregator: ",contract_address)
-
-        # Deploy Single Swap Solver
-        compiled_contract = Path("./build/", "single-swap-solver.json").read_text("utf-8")
-        contract_address = await deployContract(client=client,compiled_contract=compiled_contract,calldata=[contractAddresses["router_aggregator"]])
-        contractAddresses["single_swap_solver"] = int(contract_address,16)
-        print("✅ Single Swap Solver: ",contract_address)
-
-        # Deploy SPF Solver
-        compiled_contract = Path("./build/", "spf-solver.json").read_text("utf-8")
-        contract_address = await deployContract(client=client,compiled_contract=compiled_contract,calldata=[account_address,contractAddresses["router_aggregator"]])
-        contractAddresses["spf_solver"] = int(contract_address,16)
-        print("✅ SPF Solver: ",contract_address)
-
-        # Deploy Splitter Solver
-        compiled_contract = Path("./build/", "graddesc-solver.json").read_text("utf-8")
-        contract_address = await deployContract(client=client,compiled_contract=compiled_contract,calldata=[contractAddresses["router_aggregator"]])
-        contractAddresses["graddesc_solver"] = int(contract_address,16)
-        print("✅ GradDesc Solver: ",contract_address)
-    
-    ##########################
-    #                        #
-    #   CONFIGURE CONTRACTS  #
-    #                        #
-    ##########################   
+    manifest = Manifest(manifest_path)
+    result = await Orchestrator(StarknetBackend(client, max_fee=int(1e16)), manifest).run(protocol_plan())
+    contractAddresses = result.contracts
 
     hubContract = await Contract.from_address(address=contractAddresses["hub"],client=client)
     routerAggregatorContract = Contract(address=contractAddresses["router_aggregator"], abi=router_aggregator_abi, client=client)
@@ -107,54 +92,6 @@ async def deployContracts():
         "graddesc_solver": gradDescSolverContract
     }
 
-    #Configure Hub
-    #Set Solver Registry
-    invocation = await hubContract.functions["set_solver_registry"].invoke(solverRegistryContract.address,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
-
-    #Configure Router Aggregator
-    #Set Price Feeds
-    invocation = await routerAggregatorContract.functions["set_global_price"].invoke(ETH_Contract.address,ETH_USD_Key,EMPIRIC_ORACLE_ADDRESS,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
-    invocation = await routerAggregatorContract.functions["set_global_price"].invoke(DAI_Contract.address,DAI_USD_Key,EMPIRIC_ORACLE_ADDRESS,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
-    invocation = await routerAggregatorContract.functions["set_global_price"].invoke(USDC_Contract.address,USDC_USD_Key,EMPIRIC_ORACLE_ADDRESS,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
-    #Add Routers
-    invocation = await routerAggregatorContract.functions["add_router"].invoke(JediSwapRouter,0,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()        
-    invocation = await routerAggregatorContract.functions["add_router"].invoke(TenKRouter,1,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
-
-    #Configure Solver Registry
-    #Add Single Swap Solver to Registry
-    invocation = await solverRegistryContract.functions["set_solver"].invoke(1,singleSwapSolverContract.address,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance() 
-    invocation = await solverRegistryContract.functions["set_solver"].invoke(2,spfSolverContract.address,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance() 
-    invocation = await solverRegistryContract.functions["set_solver"].invoke(3,gradDescSolverContract.address,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
-
-    #Configure Solvers
-    #Set high liq tokens for spf solver
-    invocation = await spfSolverContract.functions["set_high_liq_tokens"].invoke("0",ETH_Contract.address,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
-    invocation = await spfSolverContract.functions["set_high_liq_tokens"].invoke("1",DAI_Contract.address,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
-    invocation = await spfSolverContract.functions["set_high_liq_tokens"].invoke("2",USDC_Contract.address,max_fee=50000000000000000000)
-    await invocation.wait_for_acceptance()
-
-    print("✅ Configured Contracts")
+    print(f"✅ Configured Contracts ({result.transactions} transactions)")
 
     return protocol_contracts
-
-async def deployContract(client: AccountClient,compiled_contract: str, calldata) -> (str):
-    declare_result = await Contract.declare(
-        account=client, compiled_contract=compiled_contract, max_fee=int(1e16)
-    )
-    await declare_result.wait_for_acceptance()
-
-    deploy_result = await declare_result.deploy(max_fee=int(1e16), constructor_args=calldata)
-    await deploy_result.wait_for_acceptance()
-    contract = deploy_result.deployed_contract
-    return hex(contract.address)
\ No newline at end of file
@@ -31,6 +31,8 @@ account_address = int("0x31cc6334a599584cdda006716992e7e60af6e3b03eda692b2719ca6
 public_key = private_to_stark_key(private_key)
 signer_key_pair = KeyPair(private_key,public_key)
 client = AccountClient(address=account_address, client=GatewayClient(net="http://127.0.0.1:5050/"), key_pair=signer_key_pair, chain=StarknetChainId.TESTNET, supported_tx_version=1)
+#Devnet JSON-RPC endpoint, used by the batched quote client
+rpc_url = "http://127.0.0.1:5050/rpc"
 
 erc20_abi = erc20_abi = [
     {
@@ -1,4 +1,7 @@
 from starknet_py.contract import Contract
+import asyncio
+from commercium.rpc import QuoteClient, get_amounts_out_with_solvers, get_balances
+from global_info import rpc_url
 
 async def swap_with_solver(
     In_Token_Contract: Contract, 
@@ -9,33 +12,48 @@ async def swap_with_solver(
     sender_address: str
     ):
 
-    for spend_amount in amounts_to_spend:
-        for solver_id in solvers_to_use:
-            
-            #Approve token transfer
-            invocation = await In_Token_Contract.functions["approve"].invoke(Hub_Contract.address,{"low": spend_amount, "high":0},max_fee=50000000000000000000)
-            await invocation.wait_for_acceptance()
+    tokens = [Out_Token_Contract.address, In_Token_Contract.address]
 
-            (previous_dai_balance,) = await Out_Token_Contract.functions["balanceOf"].call(sender_address)
-            (previous_eth_balance,) = await In_Token_Contract.functions["balanceOf"].call(sender_address)
+    async with QuoteClient(rpc_url) as quote_client:
+        for spend_amount in amounts_to_spend:
+            for solver_id in solvers_to_use:
+                
+                #Approve token transfer
+                invocation = await In_Token_Contract.functions["approve"].invoke(Hub_Contract.address,{"low": spend_amount, "high":0},max_fee=50000000000000000000)
+                await invocation.wait_for_acceptance()
 
-            #Getting the solver estimated amount
-            (received_dai_amount,) = await Hub_Contract.functions["get_amount_out_with_solver"].call({"low": spend_amount, "high":0},In_Token_Contract.address,Out_Token_Contract.address,solver_id)
+                #Getting the balances and the solver estimated amount in one batch
+                (previous_dai_balance, previous_eth_balance), quotes = await asyncio.gather(
+                    get_balances(quote_client, tokens, sender_address),
+                    get_amounts_out_with_solvers(quote_client, Hub_Contract.address, [spend_amount], In_Token_Contract.address, Out_Token_Contract.address, [solver_id])
+                )
+                received_dai_amount = quotes[(spend_amount, solver_id)]
 
-            #Executing the swap
-            invocation = await Hub_Contract.functions["swap_exact_tokens_for_tokens_with_solver"].invoke({"low": spend_amount, "high":0},{"low": 0, "high":0},In_Token_Contract.address,Out_Token_Contract.address,sender_address,solver_id,max_fee=50000000000000000000)
-            await invocation.wait_for_acceptance()
+                #Executing the swap
+                invocation = await Hub_Contract.functions["swap_exact_tokens_for_tokens_with_solver"].invoke({"low": spend_amount, "high":0},{"low": 0, "high":0},In_Token_Contract.address,Out_Token_Contract.address,sender_address,solver_id,max_fee=50000000000000000000)
+                await invocation.wait_for_acceptance()
 
-            #Get new Balance
-            (new_dai_balance,) = await Out_Token_Contract.functions["balanceOf"].call(sender_address)
-            (new_eth_balance,) = await In_Token_Contract.functions["balanceOf"].call(sender_address)
+                #Get new Balance
+                (new_dai_balance, new_eth_balance) = await get_balances(quote_client, tokens, sender_address)
 
-            print("previous_dai_balance: ",previous_dai_balance)
-            print("received_dai_amount: ",received_dai_amount)
-            print("new_dai_balance: ",new_dai_balance)
+                print("previous_dai_balance: ",previous_dai_balance)
+                print("received_dai_amount: ",received_dai_amount)
+                print("new_dai_balance: ",new_dai_balance)
 
-            #Make sure new balance are correct
-            assert new_dai_balance == previous_dai_balance + received_dai_amount, f"actual DAI balance: {new_dai_balance} expected DAI balance: {previous_dai_balance + received_dai_amount}"
-            assert new_eth_balance == previous_eth_balance - spend_amount, f"actual ETH balance: {new_eth_balance} expected ETH balance: {previous_eth_balance + spend_amount}"
+                #Make sure new balance are correct
+                assert new_dai_balance == previous_dai_balance + received_dai_amount, f"actual DAI balance: {new_dai_balance} expected DAI balance: {previous_dai_balance + received_dai_amount}"
+                assert new_eth_balance == previous_eth_balance - spend_amount, f"actual ETH balance: {new_eth_balance} expected ETH balance: {previous_eth_balance + spend_amount}"
 
-            print("✅")
\ No newline at end of file
+                print("✅")
+
+async def quote_solvers(
+    In_Token_Contract: Contract, 
+    Out_Token_Contract: Contract, 
+    Hub_Contract: Contract,
+    amounts_to_spend: list,
+    solvers_to_use: list
+    ) -> dict:
+
+    #All amounts x solvers are quoted concurrently, in as few batch requests as possible
+    async with QuoteClient(rpc_url) as quote_client:
+        return await get_amounts_out_with_solvers(quote_client, Hub_Contract.address, amounts_to_spend, In_Token_Contract.address, Out_Token_Contract.address, solvers_to_use)
@@ -0,0 +1,224 @@
+%lang starknet
+
+from protostar.asserts import assert_eq
+
+from starkware.cairo.common.cairo_builtins import HashBuiltin
+from starkware.cairo.common.alloc import alloc
+from starkware.cairo.common.uint256 import Uint256
+
+from src.lib.constants import JediSwap, TenK, BASE, BASE_8
+from src.lib.router_aggregator import PairInfo, PriceSnapshot
+from src.interfaces.i_router_aggregator import IRouterAggregator
+from src.interfaces.i_router import IJediRouter
+from src.interfaces.i_pool import IJediPool
+from src.interfaces.i_empiric_oracle import IEmpiricOracle
+
+@external
+func __setup__{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() {
+    alloc_locals;
+
+    local public_key_0 = 111813453203092678575228394645067365508785178229282836578911214210165801044;
+    %{ context.public_key_0 = ids.public_key_0 %}
+
+    // Deploy Router Aggregator
+    local router_aggregator_hash: felt;
+    %{
+        declared = declare("./src/router_aggregators/router_aggregator.cairo")
+        ids.router_aggregator_hash = declared.class_hash
+    %}
+
+    // Deploy Router Aggregator Proxy
+    %{
+        declared = declare("./src/router_aggregators/router_proxy.cairo")
+        prepared = prepare(declared, [ids.router_aggregator_hash,ids.public_key_0,ids.public_key_0])
+        stop_prank_callable = start_prank(ids.public_key_0, target_contract_address=prepared.contract_address)
+        deploy(prepared)
+        context.router_aggregator_proxy_address = prepared.contract_address
+        stop_prank_callable()
+    %}
+
+    return ();
+}
+
+@external
+func test_remove_router_moves_the_last_router{
+    syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr
+}() {
+    alloc_locals;
+
+    local public_key_0;
+    %{ ids.public_key_0 = context.public_key_0 %}
+    local router_aggregator_proxy_address;
+    %{ ids.router_aggregator_proxy_address = context.router_aggregator_proxy_address %}
+
+    %{ stop_prank_callable = start_prank(ids.public_key_0, target_contract_address=ids.router_aggregator_proxy_address) %}
+    IRouterAggregator.add_router(router_aggregator_proxy_address, 111, JediSwap);
+    IRouterAggregator.add_router(router_aggregator_proxy_address, 222, TenK);
+    IRouterAggregator.add_router(router_aggregator_proxy_address, 333, JediSwap);
+
+    // The last router takes the place of the removed one
+    IRouterAggregator.remove_router(router_aggregator_proxy_address, 0);
+    %{ stop_prank_callable() %}
+
+    let (len) = IRouterAggregator.get_router_index_len(router_aggregator_proxy_address);
+    assert_eq(len, 2);
+    let (router_address, router_type) = IRouterAggregator.get_router(
+        router_aggregator_proxy_address, 0
+    );
+    assert_eq(router_address, 333);
+    assert_eq(router_type, JediSwap);
+    let (router_address, router_type) = IRouterAggregator.get_router(
+        router_aggregator_proxy_address, 1
+    );
+    assert_eq(router_address, 222);
+    assert_eq(router_type, TenK);
+    let (router_address, _) = IRouterAggregator.get_router(router_aggregator_proxy_address, 2);
+    assert_eq(router_address, 0);
+
+    // Removing the last router only clears its entry
+    %{ stop_prank_callable = start_prank(ids.public_key_0, target_contract_address=ids.router_aggregator_proxy_address) %}
+    IRouterAggregator.remove_router(router_aggregator_proxy_address, 1);
+    %{ stop_prank_callable() %}
+
+    let (len) = IRouterAggregator.get_router_index_len(router_aggregator_proxy_address);
+    assert_eq(len, 1);
+    let (router_address, _) = IRouterAggregator.get_router(router_aggregator_proxy_address, 0);
+    assert_eq(router_address, 333);
+    let (router_address, _) = IRouterAggregator.get_router(router_aggregator_proxy_address, 1);
+    assert_eq(router_address, 0);
+
+    return ();
+}
+
+// Deploys a Jedi router with a single pool for (111, 222) and adds it as router 0
+func setup_jedi_router{syscall_ptr: felt*, range_check_ptr}(
+    _public_key_0: felt, _router_aggregator_proxy_address: felt
+) -> (router_address: felt, pair_address: felt) {
+    alloc_locals;
+
+    local router_address;
+    %{ ids.router_address = deploy_contract("./src/mocks/mock_jedi_router.cairo", []).contract_address %}
+    local pair_address;
+    %{ ids.pair_address = deploy_contract("./src/mocks/mock_jedi_pair.cairo", []).contract_address %}
+
+    IJediRouter.set_pair(router_address, 111, 222, pair_address);
+    IJediPool.set_token0(pair_address, 111);
+    IJediPool.set_reserves(pair_address, Uint256(1000, 0), Uint256(2000, 0));
+
+    %{ stop_prank_callable = start_prank(ids._public_key_0, target_contract_address=ids._router_aggregator_proxy_address) %}
+    IRouterAggregator.add_router(_router_aggregator_proxy_address, router_address, JediSwap);
+    %{ stop_prank_callable() %}
+
+    return (router_address, pair_address);
+}
+
+@external
+func test_register_pairs{syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr}() {
+    alloc_locals;
+
+    local public_key_0;
+    %{ ids.public_key_0 = context.public_key_0 %}
+    local router_aggregator_proxy_address;
+    %{ ids.router_aggregator_proxy_address = context.router_aggregator_proxy_address %}
+
+    let (router_address, pair_address) = setup_jedi_router(
+        public_key_0, router_aggregator_proxy_address
+    );
+
+    let (tokens_a: felt*) = alloc();
+    let (tokens_b: felt*) = alloc();
+    let (pairs: felt*) = alloc();
+    assert tokens_a[0] = 222;
+    assert tokens_b[0] = 111;
+    assert pairs[0] = pair_address;
+
+    %{ stop_prank_callable = start_prank(ids.public_key_0, target_contract_address=ids.router_aggregator_proxy_address) %}
+    IRouterAggregator.register_pairs(router_aggregator_proxy_address, 0, 1, tokens_a, 1, tokens_b, 1, pairs);
+    %{ stop_prank_callable() %}
+
+    // The pool stays registered once the factory stops returning it
+    IJediPool.set_reserves(pair_address, Uint256(0, 0), Uint256(0, 0));
+    let (pair: PairInfo) = IRouterAggregator.get_pair_info(
+        router_aggregator_proxy_address, router_address, JediSwap, 111, 222
+    );
+    assert_eq(pair.address, pair_address);
+    assert_eq(pair.token0, 111);
+
+    return ();
+}
+
+@external
+func test_register_pairs_rejects_unknown_pools{
+    syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr
+}() {
+    alloc_locals;
+
+    local public_key_0;
+    %{ ids.public_key_0 = context.public_key_0 %}
+    local router_aggregator_proxy_address;
+    %{ ids.router_aggregator_proxy_address = context.router_aggregator_proxy_address %}
+
+    let (router_address, pair_address) = setup_jedi_router(
+        public_key_0, router_aggregator_proxy_address
+    );
+
+    // The factory has no pool for (111, 333)
+    let (tokens_a: felt*) = alloc();
+    let (tokens_b: felt*) = alloc();
+    let (pairs: felt*) = alloc();
+    assert tokens_a[0] = 111;
+    assert tokens_b[0] = 333;
+    assert pairs[0] = pair_address;
+
+    %{
+        stop_prank_callable = start_prank(ids.public_key_0, target_contract_address=ids.router_aggregator_proxy_address)
+        expect_revert(error_message="ROUTER AGGREGATOR: Pair doesn't match the factory")
+    %}
+    IRouterAggregator.register_pairs(router_aggregator_proxy_address, 0, 1, tokens_a, 1, tokens_b, 1, pairs);
+    %{ stop_prank_callable() %}
+
+    return ();
+}
+
+@external
+func test_set_global_price_drops_the_price_snapshot{
+    syscall_ptr: felt*, pedersen_ptr: HashBuiltin*, range_check_ptr
+}() {
+    alloc_locals;
+
+    local public_key_0;
+    %{ ids.public_key_0 = context.public_key_0 %}
+    local router_aggregator_proxy_address;
+    %{ ids.router_aggregator_proxy_address = context.router_aggregator_proxy_address %}
+    local mock_oracle_address;
+    %{ ids.mock_oracle_address = deploy_contract("./src/mocks/mock_price_oracle.cairo", []).contract_address %}
+
+    IEmpiricOracle.set_token_price(mock_oracle_address, 1, 10 * BASE_8, 8);
+    IEmpiricOracle.set_token_price(mock_oracle_address, 2, 20 * BASE_8, 8);
+
+    let (tokens: felt*) = alloc();
+    assert tokens[0] = 111;
+
+    %{ stop_prank_callable = start_prank(ids.public_key_0, target_contract_address=ids.router_aggregator_proxy_address) %}
+    IRouterAggregator.set_global_price(router_aggregator_proxy_address, 111, 1, mock_oracle_address);
+    IRouterAggregator.set_price_snapshot_window(router_aggregator_proxy_address, 100);
+    IRouterAggregator.refresh_prices(router_aggregator_proxy_address, 1, tokens);
+    %{ stop_prank_callable() %}
+
+    let (price: Uint256, _) = IRouterAggregator.get_global_price(router_aggregator_proxy_address, 111);
+    assert_eq(price.low, 10 * BASE);
+
+    // Overriding the feed serves the new price within the snapshot window
+    %{ stop_prank_callable = start_prank(ids.public_key_0, target_contract_address=ids.router_aggregator_proxy_address) %}
+    IRouterAggregator.set_global_price(router_aggregator_proxy_address, 111, 2, mock_oracle_address);
+    %{ stop_prank_callable() %}
+
+    let (snapshot: PriceSnapshot) = IRouterAggregator.get_price_snapshot(
+        router_aggregator_proxy_address, 111
+    );
+    assert_eq(snapshot.price, 0);
+    let (price: Uint256, _) = IRouterAggregator.get_global_price(router_aggregator_proxy_address, 111);
+    assert_eq(price.low, 20 * BASE);
+
+    return ();
+}